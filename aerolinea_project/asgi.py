@@ -3,6 +3,12 @@ ASGI config for aerolinea_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+En producción se sirve con gunicorn y el worker de uvicorn, para que las
+conexiones abiertas a /api/flightSeatsStream/<id>/ esperen en el event loop
+en lugar de ocupar un hilo cada una:
+
+    gunicorn aerolinea_project.asgi:application -k uvicorn.workers.UvicornWorker
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
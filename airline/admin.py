@@ -3,7 +3,21 @@ Configuración del panel de administración de Django para los modelos de Airlin
 """
 
 from django.contrib import admin
-from .models import Avion, Vuelo, Asiento, Pasajero, Reserva, Boleto
+from .models import (
+    Avion,
+    Aeropuerto,
+    Vuelo,
+    Asiento,
+    AsientoVuelo,
+    CupoClase,
+    Pasajero,
+    Reserva,
+    ListaEspera,
+    Boleto,
+    EventoReserva,
+    ResumenEstado,
+)
+from .services import ReservaService
 
 
 @admin.register(Avion)
@@ -25,6 +39,14 @@ class VueloAdmin(admin.ModelAdmin):
     list_filter = ("estado", "origen", "destino")
     search_fields = ("origen", "destino")
     date_hierarchy = "fecha_salida"
+    # Se completan a partir de origen y destino al guardar
+    readonly_fields = ("aeropuerto_origen", "aeropuerto_destino")
+
+
+@admin.register(Aeropuerto)
+class AeropuertoAdmin(admin.ModelAdmin):
+    list_display = ("codigo", "ciudad", "clave")
+    search_fields = ("codigo", "clave")
 
 
 @admin.register(Asiento)
@@ -34,6 +56,22 @@ class AsientoAdmin(admin.ModelAdmin):
     search_fields = ("numero",)
 
 
+@admin.register(AsientoVuelo)
+class AsientoVueloAdmin(admin.ModelAdmin):
+    list_display = ("vuelo", "asiento", "tipo", "estado", "reserva")
+    list_filter = ("estado", "tipo")
+    raw_id_fields = ("vuelo", "asiento", "reserva")
+
+
+@admin.register(CupoClase)
+class CupoClaseAdmin(admin.ModelAdmin):
+    list_display = ("vuelo", "tipo", "capacidad", "sobreventa", "vendidos", "retenidos")
+    list_editable = ("sobreventa",)
+    list_filter = ("tipo",)
+    raw_id_fields = ("vuelo",)
+    readonly_fields = ("capacidad", "vendidos", "retenidos")
+
+
 @admin.register(Pasajero)
 class PasajeroAdmin(admin.ModelAdmin):
     list_display = ("nombre", "apellido", "documento", "email", "telefono")
@@ -47,6 +85,7 @@ class ReservaAdmin(admin.ModelAdmin):
         "vuelo",
         "pasajero",
         "asiento",
+        "clase",
         "estado",
         "fecha_reserva",
         "precio",
@@ -55,6 +94,21 @@ class ReservaAdmin(admin.ModelAdmin):
     search_fields = ("codigo_reserva", "pasajero__nombre", "pasajero__apellido")
     date_hierarchy = "fecha_reserva"
 
+    # Se elimina por el service para que el lugar pase a la lista de espera
+    def delete_model(self, request, obj):
+        ReservaService.eliminar_reserva(obj.id)
+
+    def delete_queryset(self, request, queryset):
+        for reserva_id in queryset.values_list("id", flat=True):
+            ReservaService.eliminar_reserva(reserva_id)
+
+
+@admin.register(ListaEspera)
+class ListaEsperaAdmin(admin.ModelAdmin):
+    list_display = ("vuelo", "pasajero", "clase", "estado", "creada", "reserva")
+    list_filter = ("estado", "clase")
+    raw_id_fields = ("vuelo", "pasajero", "reserva")
+
 
 @admin.register(Boleto)
 class BoletoAdmin(admin.ModelAdmin):
@@ -62,3 +116,36 @@ class BoletoAdmin(admin.ModelAdmin):
     list_filter = ("estado", "fecha_emision")
     search_fields = ("codigo_barra", "reserva__codigo_reserva")
     date_hierarchy = "fecha_emision"
+
+
+@admin.register(EventoReserva)
+class EventoReservaAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "entidad",
+        "objeto_id",
+        "vuelo_id",
+        "clase",
+        "estado_anterior",
+        "estado_nuevo",
+        "creado",
+    )
+    list_filter = ("entidad", "estado_nuevo")
+    search_fields = ("objeto_id", "vuelo_id")
+
+    # El registro es de solo agregado
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ResumenEstado)
+class ResumenEstadoAdmin(admin.ModelAdmin):
+    list_display = ("vuelo_id", "entidad", "clase", "estado", "cantidad")
+    list_filter = ("entidad", "estado", "clase")
+    search_fields = ("vuelo_id",)
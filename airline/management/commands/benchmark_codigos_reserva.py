@@ -0,0 +1,71 @@
+"""
+Comando que mide el costo de generar códigos de reserva según cuántos
+códigos se emitieron antes.
+
+Para cada posición indicada se ubica la secuencia de códigos en ese número
+(simulando esa cantidad de reservas ya creadas), se generan códigos de a uno
+como lo hace Reserva.save() y se informan el tiempo y las consultas por
+código. Todo corre dentro de una transacción que se revierte al terminar, así
+que no consume códigos reales.
+
+Uso:
+    python manage.py benchmark_codigos_reserva
+    python manage.py benchmark_codigos_reserva --codigos 50000 --posicion 0 --posicion 10000000
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from airline.models import SecuenciaCodigo, generador_codigos_reserva
+
+
+class Command(BaseCommand):
+    help = "Mide el costo por código de reserva con distintas cantidades de reservas emitidas"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--codigos",
+            type=int,
+            default=20000,
+            help="Códigos a generar por posición (default: 20000)",
+        )
+        parser.add_argument(
+            "--posicion",
+            type=int,
+            action="append",
+            dest="posiciones",
+            help="Códigos ya emitidos a simular (se puede repetir). "
+            "Por defecto: 0, 1.000.000 y 10.000.000",
+        )
+
+    def handle(self, *args, **options):
+        cantidad = options["codigos"]
+        posiciones = options["posiciones"] or [0, 1_000_000, 10_000_000]
+
+        with transaction.atomic():
+            for posicion in posiciones:
+                generador_codigos_reserva.reiniciar()
+                SecuenciaCodigo.objects.update_or_create(
+                    nombre="reserva", defaults={"siguiente": posicion}
+                )
+
+                codigos = set()
+                with CaptureQueriesContext(connection) as consultas:
+                    inicio = time.perf_counter()
+                    for _ in range(cantidad):
+                        codigos.update(generador_codigos_reserva.generar(1))
+                    segundos = time.perf_counter() - inicio
+
+                self.stdout.write(
+                    f"{posicion:>12,} emitidos: "
+                    f"{segundos / cantidad * 1e6:8.2f} µs/código, "
+                    f"{len(consultas) / cantidad:.4f} consultas/código, "
+                    f"{cantidad - len(codigos)} repetidos"
+                )
+            transaction.set_rollback(True)
+
+        generador_codigos_reserva.reiniciar()
+        self.stdout.write(self.style.SUCCESS("Benchmark terminado (sin cambios en la base)"))
@@ -0,0 +1,226 @@
+"""
+Comando que mide el grafo de rutas de la búsqueda de conexiones con una red
+de vuelos sintética.
+
+Genera los vuelos programados de una red con algunos aeropuertos centrales
+(que concentran la mayoría de las salidas y llegadas) y mide, sobre una
+instancia propia de GrafoRutas: la carga completa, la actualización de un
+vuelo por vez (como después de invalidar_vuelos) y la búsqueda de
+itinerarios de hasta dos escalas entre pares de aeropuertos al azar.
+
+Después guarda la misma red en la base y mide el camino real: la lectura y
+carga completa con VueloRepository.get_tramos, la sincronización de un vuelo
+modificado por vez y las búsquedas mientras una recarga completa se arma en
+segundo plano. Los vuelos y aeropuertos de prueba se borran al final salvo
+que se indique --sin-base.
+
+Uso:
+    python manage.py benchmark_conexiones
+    python manage.py benchmark_conexiones --vuelos 500000 --aeropuertos 150 --busquedas 5000
+    python manage.py benchmark_conexiones --sin-base
+"""
+
+import random
+import statistics
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from django.utils import timezone
+
+from airline.models import Aeropuerto, Avion, Vuelo
+from airline.repositories import VueloRepository
+from airline.utils.grafo_rutas import GrafoRutas
+
+# Aeropuertos centrales y cuántas veces más vuelos tienen que el resto
+CENTRALES = 8
+PESO_CENTRAL = 10
+# Vuelos por INSERT al guardar la red en la base
+VUELOS_BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = "Mide la carga, actualización y búsqueda de conexiones del grafo de rutas"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--vuelos",
+            type=int,
+            default=100_000,
+            help="Vuelos programados de la red (default: 100000)",
+        )
+        parser.add_argument(
+            "--aeropuertos", type=int, default=80, help="Aeropuertos de la red (default: 80)"
+        )
+        parser.add_argument(
+            "--dias", type=int, default=30, help="Días cubiertos por los vuelos (default: 30)"
+        )
+        parser.add_argument(
+            "--busquedas", type=int, default=1000, help="Búsquedas a medir (default: 1000)"
+        )
+        parser.add_argument(
+            "--actualizaciones",
+            type=int,
+            default=1000,
+            help="Vuelos a actualizar de a uno (default: 1000)",
+        )
+        parser.add_argument("--semilla", type=int, default=None, help="Semilla aleatoria")
+        parser.add_argument(
+            "--sin-base",
+            action="store_true",
+            help="Medir solo el grafo en memoria, sin guardar la red en la base",
+        )
+
+    def handle(self, *args, **options):
+        azar = random.Random(options["semilla"])
+        aeropuertos = list(range(1, options["aeropuertos"] + 1))
+        pesos = [PESO_CENTRAL if a <= CENTRALES else 1 for a in aeropuertos]
+        inicio = timezone.now() + timedelta(hours=1)
+        minutos = options["dias"] * 24 * 60
+
+        def fila(vuelo_id):
+            origen, destino = azar.choices(aeropuertos, pesos, k=2)
+            while destino == origen:
+                destino = azar.choice(aeropuertos)
+            salida = inicio + timedelta(minutes=azar.randrange(minutos))
+            llegada = salida + timedelta(minutes=azar.randrange(60, 6 * 60))
+            return (
+                vuelo_id,
+                origen,
+                destino,
+                f"Ciudad {origen}",
+                f"Ciudad {destino}",
+                salida,
+                llegada,
+                Decimal(azar.randrange(50, 900)),
+                azar.randrange(0, 180),
+            )
+
+        filas = [fila(vuelo_id) for vuelo_id in range(1, options["vuelos"] + 1)]
+        grafo = GrafoRutas(recarga=float("inf"))
+
+        segundos = self._medir(lambda: grafo.cargar(filas))
+        self.stdout.write(f"Carga completa de {len(grafo):,} vuelos: {segundos * 1000:.1f} ms")
+
+        actualizaciones = options["actualizaciones"]
+        ids = azar.sample(range(1, len(filas) + 1), min(actualizaciones, len(filas)))
+        tiempos = [self._medir(lambda: grafo.actualizar([i], [fila(i)])) for i in ids]
+        self.stdout.write(
+            f"Actualización de un vuelo: {statistics.mean(tiempos) * 1e6:.1f} µs en promedio"
+        )
+
+        def busqueda(grafo, aeropuerto_ids):
+            origen, destino = azar.sample(aeropuerto_ids, 2)
+            desde = inicio + timedelta(days=azar.randrange(options["dias"]))
+            return lambda: grafo.buscar([origen], [destino], desde, desde + timedelta(days=1))
+
+        tiempos, encontrados = [], []
+        for _ in range(options["busquedas"]):
+            buscar = busqueda(grafo, aeropuertos)
+            itinerarios = []
+            tiempos.append(self._medir(lambda: itinerarios.extend(buscar())))
+            encontrados.append(len(itinerarios))
+
+        self._informar(f"Búsquedas de hasta 2 escalas ({len(tiempos):,})", tiempos)
+        self.stdout.write(
+            f"Itinerarios por búsqueda: {statistics.mean(encontrados):.1f} en promedio, "
+            f"{sum(1 for n in encontrados if n) / len(encontrados):.0%} con resultados"
+        )
+
+        if not options["sin_base"]:
+            self._medir_base(filas, aeropuertos, ids, busqueda)
+        self.stdout.write(self.style.SUCCESS("Benchmark terminado"))
+
+    def _medir_base(self, filas, aeropuertos, ids, busqueda):
+        """Guarda la red en la base y mide la lectura y sincronización reales"""
+        prefijo = uuid.uuid4().hex[:8]
+        avion = Avion.objects.create(modelo=f"Benchmark {prefijo}", filas=1, columnas=1)
+        por_numero = {
+            numero: Aeropuerto.para_ciudad(f"Benchmark {prefijo} {numero}")
+            for numero in aeropuertos
+        }
+        try:
+            segundos = self._medir(
+                lambda: Vuelo.objects.bulk_create(
+                    (
+                        Vuelo(
+                            avion=avion,
+                            origen=por_numero[origen].ciudad,
+                            destino=por_numero[destino].ciudad,
+                            aeropuerto_origen=por_numero[origen],
+                            aeropuerto_destino=por_numero[destino],
+                            fecha_salida=salida,
+                            fecha_llegada=llegada,
+                            duracion=llegada - salida,
+                            precio_base=precio,
+                            asientos_libres=libres,
+                        )
+                        for _, origen, destino, _, _, salida, llegada, precio, libres in filas
+                    ),
+                    batch_size=VUELOS_BATCH_SIZE,
+                )
+            )
+            vuelo_ids = list(
+                Vuelo.objects.filter(avion=avion).order_by("id").values_list("id", flat=True)
+            )
+            self.stdout.write(f"Guardado de {len(vuelo_ids):,} vuelos en la base: {segundos:.1f} s")
+
+            grafo = GrafoRutas(recarga=float("inf"))
+            segundos = self._medir(lambda: grafo.sincronizar(VueloRepository.get_tramos))
+            self.stdout.write(
+                f"Lectura y carga completa desde la base ({len(grafo):,} vuelos): "
+                f"{segundos * 1000:.1f} ms"
+            )
+
+            tiempos = []
+            for indice in ids:
+                vuelo_id = vuelo_ids[indice - 1]
+                Vuelo.objects.filter(pk=vuelo_id).update(asientos_libres=F("asientos_libres") + 1)
+                grafo.marcar([vuelo_id])
+                tiempos.append(self._medir(lambda: grafo.sincronizar(VueloRepository.get_tramos)))
+            self._informar("Sincronización de un vuelo modificado", tiempos)
+
+            # Vencido el intervalo, la próxima búsqueda lanza la recarga completa
+            # y las siguientes usan el grafo anterior hasta que termina
+            aeropuerto_ids = [aeropuerto.id for aeropuerto in por_numero.values()]
+            grafo.recarga = 0
+            tiempos = []
+            inicio = time.perf_counter()
+            while True:
+                buscar = busqueda(grafo, aeropuerto_ids)
+                tiempos.append(
+                    self._medir(lambda: (grafo.sincronizar(VueloRepository.get_tramos), buscar()))
+                )
+                grafo.recarga = float("inf")
+                if grafo.esperar_recarga(0):
+                    break
+            recarga = time.perf_counter() - inicio
+            self._informar(
+                f"Búsquedas durante la recarga en segundo plano ({recarga * 1000:.0f} ms)", tiempos
+            )
+        finally:
+            Vuelo.objects.filter(avion=avion).delete()
+            avion.delete()
+            Aeropuerto.objects.filter(pk__in=[a.pk for a in por_numero.values()]).delete()
+
+    def _informar(self, titulo, tiempos):
+        if len(tiempos) < 2:
+            self.stdout.write(f"{titulo}: {tiempos[0] * 1000:.2f} ms")
+            return
+        percentiles = statistics.quantiles(tiempos, n=100)
+        self.stdout.write(
+            f"{titulo}: "
+            f"p50 {percentiles[49] * 1000:.2f} ms, "
+            f"p95 {percentiles[94] * 1000:.2f} ms, "
+            f"p99 {percentiles[98] * 1000:.2f} ms, "
+            f"máx {max(tiempos) * 1000:.2f} ms"
+        )
+
+    @staticmethod
+    def _medir(funcion):
+        inicio = time.perf_counter()
+        funcion()
+        return time.perf_counter() - inicio
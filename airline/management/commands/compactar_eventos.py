@@ -0,0 +1,54 @@
+"""
+Comando que acumula el registro de eventos de reservas en su resumen.
+
+Aplica al resumen por vuelo, clase y estado los eventos posteriores al punto
+de control, por lotes y en orden, y opcionalmente elimina los eventos ya
+acumulados que superan la antigüedad indicada. Pensado para ejecutarse
+periódicamente (cron, scheduler de la plataforma, etc.).
+
+Uso:
+    python manage.py compactar_eventos
+    python manage.py compactar_eventos --lote 5000 --conservar-dias 90
+"""
+
+from django.core.management.base import BaseCommand
+
+from airline.services import EventoService
+
+
+class Command(BaseCommand):
+    help = "Acumula los eventos de reservas nuevos en el resumen y compacta los antiguos"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=1000,
+            help="Cantidad máxima de eventos por transacción (default: 1000)",
+        )
+        parser.add_argument(
+            "--margen-segundos",
+            type=int,
+            default=60,
+            help="Antigüedad mínima de los eventos a acumular (default: 60)",
+        )
+        parser.add_argument(
+            "--conservar-dias",
+            type=int,
+            default=None,
+            help="Eliminar los eventos acumulados con más días de antigüedad "
+            "(por defecto no se elimina ninguno)",
+        )
+
+    def handle(self, *args, **options):
+        resultado = EventoService.consolidar(
+            lote=options["lote"], margen_segundos=options["margen_segundos"]
+        )
+        mensaje = (
+            f"Eventos acumulados: {resultado['eventos_procesados']}, "
+            f"último evento: {resultado['ultimo_evento']}"
+        )
+        if options["conservar_dias"] is not None:
+            eliminados = EventoService.compactar(options["conservar_dias"])
+            mensaje += f", eventos eliminados: {eliminados}"
+        self.stdout.write(self.style.SUCCESS(mensaje))
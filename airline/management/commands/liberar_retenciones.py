@@ -0,0 +1,36 @@
+"""
+Comando que libera las retenciones de asientos vencidas.
+
+Cancela las reservas pendientes cuya retención venció y devuelve sus
+asientos al inventario del vuelo. Pensado para ejecutarse periódicamente
+(cron, scheduler de la plataforma, etc.).
+
+Uso:
+    python manage.py liberar_retenciones
+    python manage.py liberar_retenciones --lote 1000
+"""
+
+from django.core.management.base import BaseCommand
+
+from airline.services import ReservaService
+
+
+class Command(BaseCommand):
+    help = "Cancela las reservas pendientes vencidas y libera sus asientos retenidos"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=500,
+            help="Cantidad máxima de filas por UPDATE (default: 500)",
+        )
+
+    def handle(self, *args, **options):
+        resultado = ReservaService.expirar_reservas_pendientes(lote=options["lote"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Reservas canceladas: {resultado['reservas_canceladas']}, "
+                f"asientos liberados: {resultado['asientos_liberados']}"
+            )
+        )
@@ -0,0 +1,370 @@
+"""
+Comando de prueba de carga de reservas concurrentes.
+
+Crea un vuelo de prueba con sus pasajeros y lanza muchos intentos de reserva
+en paralelo (un pool de hilos, cada uno con su propia conexión a la base)
+que compiten por unos pocos asientos. Al terminar informa el throughput, los
+percentiles de latencia, los errores por bloqueo de la base y verifica que
+ningún asiento haya quedado vendido dos veces. Los datos de prueba se borran
+al final salvo que se indique --conservar.
+
+Funciona con SQLite y con PostgreSQL (configurado con DATABASE_URL); en
+PostgreSQL además mide las esperas de bloqueos consultando pg_locks.
+
+Uso:
+    python manage.py prueba_carga_reservas
+    python manage.py prueba_carga_reservas --intentos 1000 --hilos 32 --asientos 20
+    python manage.py prueba_carga_reservas --modo api --estado confirmada
+"""
+
+import logging
+import random
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, OperationalError, connection, connections
+from django.db.models import Count, Q
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+
+from airline.models import AsientoVuelo, Avion, Pasajero, Reserva, Vuelo
+from airline.services import ReservaService
+
+# Intervalo de muestreo de pg_locks (segundos)
+INTERVALO_MONITOR = 0.05
+
+
+class Command(BaseCommand):
+    help = "Lanza reservas concurrentes sobre un vuelo de prueba y mide su comportamiento"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--intentos",
+            type=int,
+            default=200,
+            help="Cantidad de intentos de reserva (default: 200)",
+        )
+        parser.add_argument(
+            "--hilos",
+            type=int,
+            default=16,
+            help="Intentos simultáneos (default: 16)",
+        )
+        parser.add_argument(
+            "--asientos",
+            type=int,
+            default=10,
+            help="Asientos por los que compiten los intentos (default: 10)",
+        )
+        parser.add_argument(
+            "--modo",
+            choices=["servicio", "api"],
+            default="servicio",
+            help="Reservar con ReservaService o con POST /api/createReservation/",
+        )
+        parser.add_argument(
+            "--estado",
+            choices=["pendiente", "confirmada"],
+            default="pendiente",
+            help="Estado de las reservas creadas, solo en modo servicio: la API "
+            "siempre crea reservas pendientes (default: pendiente)",
+        )
+        parser.add_argument("--semilla", type=int, default=None, help="Semilla aleatoria")
+        parser.add_argument(
+            "--conservar",
+            action="store_true",
+            help="No borrar el vuelo ni los pasajeros de prueba al terminar",
+        )
+
+    def handle(self, *args, **options):
+        intentos = options["intentos"]
+        hilos = options["hilos"]
+        if intentos < 1 or hilos < 1 or options["asientos"] < 1:
+            raise CommandError("--intentos, --hilos y --asientos deben ser positivos")
+
+        datos = self.sembrar(intentos, options["asientos"])
+        aleatorio = random.Random(options["semilla"])
+        tareas = [
+            (pasajero_id, aleatorio.choice(datos["asientos"]))
+            for pasajero_id in datos["pasajeros"]
+        ]
+        reservar = self.reservar_api if options["modo"] == "api" else self.reservar_servicio
+
+        # Los rechazos y errores de la API se cuentan en el informe
+        logger = logging.getLogger("django.request")
+        nivel = logger.level
+        logger.setLevel(logging.CRITICAL)
+
+        monitor = MonitorBloqueos()
+        monitor.iniciar()
+        inicio = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=hilos) as pool:
+                resultados = list(
+                    pool.map(
+                        lambda tarea: self.intentar(
+                            reservar, datos, tarea, options["estado"]
+                        ),
+                        tareas,
+                    )
+                )
+                self.cerrar_conexiones(pool, hilos)
+        finally:
+            duracion = time.perf_counter() - inicio
+            monitor.detener()
+            logger.setLevel(nivel)
+
+        try:
+            self.informar(resultados, duracion, monitor, options, datos)
+            violaciones = self.verificar(datos["vuelo"])
+            self.informar_violaciones(violaciones)
+        finally:
+            if not options["conservar"]:
+                self.limpiar(datos)
+
+    def sembrar(self, intentos, cantidad_asientos):
+        """Crea el avión, el vuelo, los pasajeros y el admin de prueba"""
+        prefijo = f"carga-{uuid.uuid4().hex[:8]}"
+        filas = max(1, -(-cantidad_asientos // 6))
+        avion = Avion.objects.create(modelo=f"Prueba {prefijo}", filas=filas, columnas=6)
+        salida = timezone.now() + timedelta(days=30)
+        vuelo = Vuelo.objects.create(
+            avion=avion,
+            origen="Origen prueba",
+            destino="Destino prueba",
+            fecha_salida=salida,
+            fecha_llegada=salida + timedelta(hours=2),
+            duracion=timedelta(hours=2),
+            precio_base=Decimal("100.00"),
+        )
+        asientos = list(
+            AsientoVuelo.objects.filter(vuelo=vuelo, estado="disponible")
+            .order_by("asiento_id")
+            .values_list("asiento_id", flat=True)[:cantidad_asientos]
+        )
+        pasajeros = Pasajero.objects.bulk_create(
+            [
+                Pasajero(
+                    nombre="Carga",
+                    apellido=str(i),
+                    tipo_documento="PAS",
+                    documento=f"{prefijo}-{i}",
+                    email=f"{prefijo}-{i}@example.com",
+                )
+                for i in range(intentos)
+            ]
+        )
+        admin = User.objects.create_superuser(username=prefijo, password=None)
+        return {
+            "avion": avion,
+            "vuelo": vuelo,
+            "asientos": asientos,
+            "pasajeros": [p.id for p in Pasajero.objects.filter(documento__startswith=prefijo)],
+            "admin": admin,
+            "prefijo": prefijo,
+        }
+
+    def intentar(self, reservar, datos, tarea, estado):
+        """Ejecuta un intento y devuelve (resultado, segundos)"""
+        inicio = time.perf_counter()
+        try:
+            resultado = reservar(datos, *tarea, estado)
+        except OperationalError as e:
+            # SQLite: "database is locked"; PostgreSQL: lock_timeout, deadlock
+            resultado = "bloqueo" if _es_bloqueo(e) else "error"
+        except DatabaseError:
+            resultado = "error"
+        return resultado, time.perf_counter() - inicio
+
+    @staticmethod
+    def cerrar_conexiones(pool, hilos):
+        """
+        Cierra la conexión de cada hilo del pool: cada tarea espera en la
+        barrera, así que cada hilo ejecuta exactamente una.
+        """
+        barrera = threading.Barrier(hilos)
+
+        def cerrar():
+            connections.close_all()
+            barrera.wait()
+
+        for futuro in [pool.submit(cerrar) for _ in range(hilos)]:
+            futuro.result()
+
+    @staticmethod
+    def reservar_servicio(datos, pasajero_id, asiento_id, estado):
+        try:
+            ReservaService.create_reserva(
+                vuelo_id=datos["vuelo"].id,
+                pasajero_id=pasajero_id,
+                asiento_id=asiento_id,
+                estado=estado,
+            )
+        except APIException:
+            return "rechazada"
+        return "reservada"
+
+    @staticmethod
+    def reservar_api(datos, pasajero_id, asiento_id, estado):
+        from rest_framework.test import APIClient
+
+        cliente = APIClient(HTTP_HOST="localhost")
+        cliente.force_authenticate(datos["admin"])
+        respuesta = cliente.post(
+            "/api/createReservation/",
+            {"vuelo": datos["vuelo"].id, "pasajero": pasajero_id, "asiento": asiento_id},
+            format="json",
+        )
+        if respuesta.status_code == 201:
+            return "reservada"
+        if respuesta.status_code in (400, 409):
+            return "rechazada"
+        return "error"
+
+    def informar(self, resultados, duracion, monitor, options, datos):
+        conteo = Counter(resultado for resultado, _ in resultados)
+        latencias = sorted(segundos for _, segundos in resultados)
+        percentiles = statistics.quantiles(latencias, n=100) if len(latencias) > 1 else latencias * 99
+
+        self.stdout.write(
+            f"Base: {connection.vendor} | modo: {options['modo']} | estado: {options['estado']} | "
+            f"{options['intentos']} intentos, {options['hilos']} hilos, "
+            f"{len(datos['asientos'])} asientos"
+        )
+        self.stdout.write(
+            f"Duración: {duracion:.2f} s | throughput: {len(resultados) / duracion:.1f} intentos/s, "
+            f"{conteo['reservada'] / duracion:.1f} reservas/s"
+        )
+        self.stdout.write(
+            "Latencia (ms): "
+            f"p50={percentiles[49] * 1000:.1f} "
+            f"p90={percentiles[89] * 1000:.1f} "
+            f"p99={percentiles[98] * 1000:.1f} "
+            f"máx={latencias[-1] * 1000:.1f}"
+        )
+        self.stdout.write(
+            f"Resultados: {conteo['reservada']} reservadas, {conteo['rechazada']} rechazadas, "
+            f"{conteo['bloqueo']} errores por bloqueo, {conteo['error']} otros errores"
+        )
+        if monitor.disponible:
+            self.stdout.write(
+                f"Esperas de bloqueo (pg_locks): máximo {monitor.maximo} simultáneas, "
+                f"promedio {monitor.promedio:.2f} en {monitor.muestras} muestras"
+            )
+        else:
+            self.stdout.write(
+                "Esperas de bloqueo: no medibles en esta base (ver errores por bloqueo)"
+            )
+
+    @staticmethod
+    def verificar(vuelo):
+        """
+        Busca asientos vendidos dos veces y diferencias entre las reservas,
+        el inventario y los contadores del vuelo.
+        """
+        ahora = timezone.now()
+        activas = Reserva.objects.filter(vuelo=vuelo).filter(
+            Q(estado="confirmada") | Q(estado="pendiente", expira_en__gt=ahora)
+        )
+        duplicados = list(
+            activas.values("asiento_id")
+            .annotate(total=Count("id"))
+            .filter(total__gt=1)
+            .values_list("asiento_id", "total")
+        )
+        sin_inventario = activas.exclude(
+            id__in=AsientoVuelo.objects.filter(vuelo=vuelo).values("reserva_id")
+        ).count()
+        vuelo.refresh_from_db()
+        contador = vuelo.asientos_libres
+        Vuelo.recalcular_disponibles([vuelo.id])
+        vuelo.refresh_from_db()
+        return {
+            "duplicados": duplicados,
+            "sin_inventario": sin_inventario,
+            "contador": (contador, vuelo.asientos_libres),
+        }
+
+    def informar_violaciones(self, violaciones):
+        problemas = []
+        for asiento_id, total in violaciones["duplicados"]:
+            problemas.append(f"asiento {asiento_id} reservado {total} veces")
+        if violaciones["sin_inventario"]:
+            problemas.append(
+                f"{violaciones['sin_inventario']} reservas activas sin su asiento en el inventario"
+            )
+        contador, real = violaciones["contador"]
+        if contador != real:
+            problemas.append(f"contador de asientos libres {contador}, real {real}")
+
+        if problemas:
+            for problema in problemas:
+                self.stdout.write(self.style.ERROR(f"Violación: {problema}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Sin reservas dobles ni inconsistencias"))
+
+    @staticmethod
+    def limpiar(datos):
+        Reserva.objects.filter(vuelo=datos["vuelo"]).delete()
+        datos["vuelo"].delete()
+        datos["avion"].delete()
+        Pasajero.objects.filter(documento__startswith=datos["prefijo"]).delete()
+        datos["admin"].delete()
+
+
+class MonitorBloqueos:
+    """
+    Muestrea en segundo plano cuántas sesiones esperan un bloqueo. Solo en
+    PostgreSQL; en otras bases queda deshabilitado.
+    """
+
+    def __init__(self):
+        self.disponible = connection.vendor == "postgresql"
+        self.maximo = 0
+        self.muestras = 0
+        self._total = 0
+        self._detener = threading.Event()
+        self._hilo = None
+
+    @property
+    def promedio(self):
+        return self._total / self.muestras if self.muestras else 0
+
+    def iniciar(self):
+        if self.disponible:
+            self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+
+    def _muestrear(self):
+        try:
+            with connection.cursor() as cursor:
+                while not self._detener.is_set():
+                    cursor.execute("SELECT count(*) FROM pg_locks WHERE NOT granted")
+                    esperando = cursor.fetchone()[0]
+                    self.maximo = max(self.maximo, esperando)
+                    self._total += esperando
+                    self.muestras += 1
+                    time.sleep(INTERVALO_MONITOR)
+        finally:
+            connection.close()
+
+
+def _es_bloqueo(error):
+    mensaje = str(error).lower()
+    return any(
+        texto in mensaje
+        for texto in ("locked", "deadlock", "lock timeout", "could not serialize")
+    )
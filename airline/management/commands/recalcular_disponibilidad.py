@@ -0,0 +1,37 @@
+"""
+Comando para reconstruir los contadores de asientos libres y los cupos por
+clase de los vuelos.
+
+Uso:
+    python manage.py recalcular_disponibilidad
+    python manage.py recalcular_disponibilidad --vuelo 12 --vuelo 15
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from airline.models import CupoClase, Vuelo
+
+
+class Command(BaseCommand):
+    help = "Recalcula los cupos por clase y, a partir de ellos, los contadores de libres por vuelo"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--vuelo",
+            type=int,
+            action="append",
+            dest="vuelos",
+            help="ID de un vuelo a recalcular (se puede repetir). Por defecto, todos.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # Los contadores de libres del vuelo salen de los cupos
+            cupos = CupoClase.recalcular(options["vuelos"])
+            total = Vuelo.recalcular_disponibles(options["vuelos"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Contadores recalculados para {total} vuelo(s) y {cupos} cupo(s) por clase"
+            )
+        )
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airline', '0004_remove_pasajero_nacionalidad'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AsientoVuelo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('economico', 'Económico'), ('ejecutivo', 'Ejecutivo'), ('primera', 'Primera Clase')], max_length=20)),
+                ('estado', models.CharField(choices=[('disponible', 'Disponible'), ('ocupado', 'Ocupado'), ('bloqueado', 'Bloqueado')], default='disponible', max_length=20)),
+                ('asiento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventario', to='airline.asiento')),
+                ('reserva', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='airline.reserva')),
+                ('vuelo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventario', to='airline.vuelo')),
+            ],
+            options={
+                'verbose_name': 'Asiento por vuelo',
+                'verbose_name_plural': 'Asientos por vuelo',
+                'indexes': [models.Index(fields=['vuelo', 'estado'], name='airline_asi_vuelo_i_3aa1a0_idx')],
+                'unique_together': {('vuelo', 'asiento')},
+            },
+        ),
+    ]
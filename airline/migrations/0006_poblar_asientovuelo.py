@@ -0,0 +1,54 @@
+from django.db import migrations
+
+
+def poblar_inventario(apps, schema_editor):
+    """Crea el inventario por vuelo de los vuelos existentes"""
+    Vuelo = apps.get_model("airline", "Vuelo")
+    Asiento = apps.get_model("airline", "Asiento")
+    AsientoVuelo = apps.get_model("airline", "AsientoVuelo")
+    Reserva = apps.get_model("airline", "Reserva")
+
+    asientos_por_avion = {}
+    for asiento_id, avion_id, tipo, estado in Asiento.objects.values_list(
+        "id", "avion_id", "tipo", "estado"
+    ):
+        asientos_por_avion.setdefault(avion_id, []).append((asiento_id, tipo, estado))
+
+    confirmadas = {
+        (vuelo_id, asiento_id): reserva_id
+        for reserva_id, vuelo_id, asiento_id in Reserva.objects.filter(
+            estado="confirmada"
+        ).values_list("id", "vuelo_id", "asiento_id")
+    }
+
+    inventario = []
+    for vuelo_id, avion_id in Vuelo.objects.values_list("id", "avion_id"):
+        for asiento_id, tipo, estado in asientos_por_avion.get(avion_id, []):
+            reserva_id = confirmadas.get((vuelo_id, asiento_id))
+            if reserva_id:
+                estado_vuelo = "ocupado"
+            elif estado == "mantenimiento":
+                estado_vuelo = "bloqueado"
+            else:
+                estado_vuelo = "disponible"
+            inventario.append(
+                AsientoVuelo(
+                    vuelo_id=vuelo_id,
+                    asiento_id=asiento_id,
+                    tipo=tipo,
+                    estado=estado_vuelo,
+                    reserva_id=reserva_id,
+                )
+            )
+    AsientoVuelo.objects.bulk_create(inventario, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airline", "0005_asientovuelo"),
+    ]
+
+    operations = [
+        migrations.RunPython(poblar_inventario, migrations.RunPython.noop),
+    ]
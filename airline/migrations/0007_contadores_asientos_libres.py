@@ -0,0 +1,59 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:26
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def calcular_contadores(apps, schema_editor):
+    """Inicializa los contadores de asientos libres desde el inventario"""
+    Vuelo = apps.get_model("airline", "Vuelo")
+    AsientoVuelo = apps.get_model("airline", "AsientoVuelo")
+
+    libres = (
+        AsientoVuelo.objects.filter(estado="disponible")
+        .values_list("vuelo_id", "tipo")
+        .annotate(total=Count("id"))
+    )
+    conteos = {}
+    for vuelo_id, tipo, total in libres:
+        conteos.setdefault(vuelo_id, {})[f"libres_{tipo}"] = total
+
+    for vuelo_id, campos in conteos.items():
+        Vuelo.objects.filter(pk=vuelo_id).update(
+            asientos_libres=sum(campos.values()), **campos
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airline', '0006_poblar_asientovuelo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vuelo',
+            name='asientos_libres',
+            field=models.IntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='vuelo',
+            name='libres_economico',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vuelo',
+            name='libres_ejecutivo',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vuelo',
+            name='libres_primera',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='vuelo',
+            index=models.Index(fields=['fecha_salida', 'asientos_libres'], name='airline_vue_fecha_s_f6a2ba_idx'),
+        ),
+        migrations.RunPython(calcular_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airline', '0007_contadores_asientos_libres'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asientovuelo',
+            name='retenido_hasta',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reserva',
+            name='expira_en',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='asientovuelo',
+            name='estado',
+            field=models.CharField(choices=[('disponible', 'Disponible'), ('retenido', 'Retenido'), ('ocupado', 'Ocupado'), ('bloqueado', 'Bloqueado')], default='disponible', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='asientovuelo',
+            index=models.Index(fields=['estado', 'retenido_hasta'], name='airline_asi_estado_6a48d4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['estado', 'expira_en'], name='airline_res_estado_622f29_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airline', '0008_retenciones_asientos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asientovuelo',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vuelo',
+            name='version_inventario',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='asientovuelo',
+            index=models.Index(fields=['vuelo', 'version'], name='airline_asi_vuelo_i_2793c1_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airline', '0010_secuencia_codigos_reserva'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reserva',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='vuelo',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def poblar_cupos(apps, schema_editor):
+    """Copia la clase del asiento a las reservas y crea los cupos de los vuelos"""
+    Asiento = apps.get_model("airline", "Asiento")
+    AsientoVuelo = apps.get_model("airline", "AsientoVuelo")
+    Reserva = apps.get_model("airline", "Reserva")
+    CupoClase = apps.get_model("airline", "CupoClase")
+
+    Reserva.objects.update(
+        clase=Subquery(Asiento.objects.filter(pk=OuterRef("asiento_id")).values("tipo")[:1])
+    )
+
+    cupos = {}
+    for vuelo_id, tipo, total in (
+        AsientoVuelo.objects.exclude(estado="bloqueado")
+        .values_list("vuelo_id", "tipo")
+        .annotate(total=Count("id"))
+        .order_by()
+    ):
+        cupos[vuelo_id, tipo] = CupoClase(vuelo_id=vuelo_id, tipo=tipo, capacidad=total)
+    campos = {"pendiente": "retenidos", "confirmada": "vendidos"}
+    for vuelo_id, tipo, estado, total in (
+        Reserva.objects.filter(estado__in=campos)
+        .values_list("vuelo_id", "clase", "estado")
+        .annotate(total=Count("id"))
+        .order_by()
+    ):
+        cupo = cupos.setdefault((vuelo_id, tipo), CupoClase(vuelo_id=vuelo_id, tipo=tipo))
+        setattr(cupo, campos[estado], total)
+    CupoClase.objects.bulk_create(cupos.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airline', '0011_versiones_concurrencia_optimista'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reserva',
+            name='clase',
+            field=models.CharField(choices=[('economico', 'Económico'), ('ejecutivo', 'Ejecutivo'), ('primera', 'Primera Clase')], default='economico', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='reserva',
+            name='asiento',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='airline.asiento'),
+        ),
+        migrations.CreateModel(
+            name='CupoClase',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('economico', 'Económico'), ('ejecutivo', 'Ejecutivo'), ('primera', 'Primera Clase')], max_length=20)),
+                ('capacidad', models.PositiveIntegerField(default=0)),
+                ('sobreventa', models.PositiveIntegerField(default=0)),
+                ('vendidos', models.IntegerField(default=0)),
+                ('retenidos', models.IntegerField(default=0)),
+                ('vuelo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cupos', to='airline.vuelo')),
+            ],
+            options={
+                'verbose_name': 'Cupo por clase',
+                'verbose_name_plural': 'Cupos por clase',
+                'unique_together': {('vuelo', 'tipo')},
+            },
+        ),
+        migrations.RunPython(poblar_cupos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airline', '0012_cupos_por_clase'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListaEspera',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clase', models.CharField(choices=[('economico', 'Económico'), ('ejecutivo', 'Ejecutivo'), ('primera', 'Primera Clase')], max_length=20)),
+                ('estado', models.CharField(choices=[('esperando', 'Esperando'), ('promovida', 'Promovida'), ('retirada', 'Retirada')], default='esperando', max_length=20)),
+                ('creada', models.DateTimeField(auto_now_add=True)),
+                ('pasajero', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='esperas', to='airline.pasajero')),
+                ('reserva', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='airline.reserva')),
+                ('vuelo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lista_espera', to='airline.vuelo')),
+            ],
+            options={
+                'verbose_name': 'Entrada de lista de espera',
+                'verbose_name_plural': 'Lista de espera',
+                'ordering': ['id'],
+                'indexes': [models.Index(condition=models.Q(('estado', 'esperando')), fields=['vuelo', 'clase', 'id'], name='lista_espera_cola')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('estado', 'esperando')), fields=('vuelo', 'pasajero'), name='lista_espera_pasajero_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:14
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airline', '0013_lista_espera'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PuntoControlEventos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True)),
+                ('ultimo_evento', models.BigIntegerField(default=0)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Punto de control de eventos',
+                'verbose_name_plural': 'Puntos de control de eventos',
+            },
+        ),
+        migrations.CreateModel(
+            name='EventoReserva',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entidad', models.CharField(choices=[('reserva', 'Reserva'), ('boleto', 'Boleto')], max_length=10)),
+                ('objeto_id', models.BigIntegerField()),
+                ('vuelo_id', models.BigIntegerField()),
+                ('clase', models.CharField(blank=True, default='', max_length=20)),
+                ('estado_anterior', models.CharField(blank=True, default='', max_length=20)),
+                ('estado_nuevo', models.CharField(max_length=20)),
+                ('creado', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Evento de reserva',
+                'verbose_name_plural': 'Eventos de reservas',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['entidad', 'objeto_id'], name='airline_eve_entidad_61c2e4_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenEstado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entidad', models.CharField(choices=[('reserva', 'Reserva'), ('boleto', 'Boleto')], max_length=10)),
+                ('vuelo_id', models.BigIntegerField()),
+                ('clase', models.CharField(blank=True, default='', max_length=20)),
+                ('estado', models.CharField(max_length=20)),
+                ('cantidad', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Resumen de estados',
+                'verbose_name_plural': 'Resúmenes de estados',
+                'constraints': [models.UniqueConstraint(fields=('vuelo_id', 'entidad', 'clase', 'estado'), name='resumen_estado_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from airline.utils.aeropuertos import generar_codigo, normalizar_ciudad
+
+
+def poblar_aeropuertos(apps, schema_editor):
+    """Crea un aeropuerto por ciudad de los vuelos existentes y los asigna"""
+    Vuelo = apps.get_model("airline", "Vuelo")
+    Aeropuerto = apps.get_model("airline", "Aeropuerto")
+
+    ciudades = set(Vuelo.objects.values_list("origen", flat=True)) | set(
+        Vuelo.objects.values_list("destino", flat=True)
+    )
+    por_clave = {}
+    ocupados = set(Aeropuerto.objects.values_list("codigo", flat=True))
+    for ciudad in sorted(ciudades):
+        clave = normalizar_ciudad(ciudad)
+        if clave not in por_clave:
+            aeropuerto = Aeropuerto.objects.filter(clave=clave).first()
+            if aeropuerto is None:
+                codigo = generar_codigo(clave, ocupados)
+                ocupados.add(codigo)
+                aeropuerto = Aeropuerto.objects.create(
+                    codigo=codigo, ciudad=ciudad.strip(), clave=clave
+                )
+            por_clave[clave] = aeropuerto
+        aeropuerto = por_clave[clave]
+        Vuelo.objects.filter(origen=ciudad).update(aeropuerto_origen=aeropuerto)
+        Vuelo.objects.filter(destino=ciudad).update(aeropuerto_destino=aeropuerto)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airline', '0014_registro_eventos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Aeropuerto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('codigo', models.CharField(max_length=10, unique=True)),
+                ('ciudad', models.CharField(max_length=100)),
+                ('clave', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'verbose_name': 'Aeropuerto',
+                'verbose_name_plural': 'Aeropuertos',
+                'ordering': ['codigo'],
+            },
+        ),
+        migrations.AddField(
+            model_name='vuelo',
+            name='aeropuerto_destino',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='llegadas', to='airline.aeropuerto'),
+        ),
+        migrations.AddField(
+            model_name='vuelo',
+            name='aeropuerto_origen',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='salidas', to='airline.aeropuerto'),
+        ),
+        migrations.AddIndex(
+            model_name='vuelo',
+            index=models.Index(fields=['aeropuerto_origen', 'aeropuerto_destino', 'fecha_salida'], name='vuelo_ruta_fecha'),
+        ),
+        migrations.RunPython(poblar_aeropuertos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airline', '0015_aeropuertos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['vuelo', 'estado'], name='reserva_vuelo_estado'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['pasajero', 'estado'], name='reserva_pasajero_estado'),
+        ),
+        migrations.AddIndex(
+            model_name='vuelo',
+            index=models.Index(fields=['estado', 'fecha_salida'], name='vuelo_estado_salida'),
+        ),
+    ]
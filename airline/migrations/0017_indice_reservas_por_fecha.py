@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airline', '0016_indices_consultas_frecuentes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['-fecha_reserva', 'id'], name='reserva_fecha_id'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-17 05:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airline', '0017_indice_reservas_por_fecha'),
+    ]
+
+    operations = [
+        migrations.RenameIndex(
+            model_name='vuelo',
+            new_name='vuelo_salida_libres',
+            old_name='airline_vue_fecha_s_f6a2ba_idx',
+        ),
+        migrations.AlterField(
+            model_name='reserva',
+            name='pasajero',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='airline.pasajero'),
+        ),
+        migrations.AlterField(
+            model_name='reserva',
+            name='vuelo',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='airline.vuelo'),
+        ),
+    ]
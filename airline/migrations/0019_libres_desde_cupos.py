@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:40
+
+from django.db import migrations
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def libres_desde_cupos(apps, schema_editor):
+    """Recalcula los contadores de libres de los vuelos a partir de sus cupos"""
+    Vuelo = apps.get_model("airline", "Vuelo")
+    CupoClase = apps.get_model("airline", "CupoClase")
+
+    disponibles = F("capacidad") + F("sobreventa") - F("vendidos") - F("retenidos")
+
+    def libres(tipo=None):
+        cupos = CupoClase.objects.filter(vuelo_id=OuterRef("pk"))
+        if tipo is not None:
+            cupos = cupos.filter(tipo=tipo)
+        # Las clases que el avión no tiene quedan en cero
+        return Coalesce(
+            Subquery(
+                cupos.order_by()
+                .values("vuelo_id")
+                .annotate(total=Sum(disponibles))
+                .values("total")[:1]
+            ),
+            0,
+        )
+
+    Vuelo.objects.update(
+        asientos_libres=libres(),
+        libres_economico=libres("economico"),
+        libres_ejecutivo=libres("ejecutivo"),
+        libres_primera=libres("primera"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airline', '0018_indices_reservas_sin_fk'),
+    ]
+
+    operations = [
+        migrations.RunPython(libres_desde_cupos, migrations.RunPython.noop),
+    ]
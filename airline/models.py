@@ -1,15 +1,119 @@
 """
 Modelos de la aplicación Airline.
-Contiene todos los modelos del sistema: Avion, Vuelo, Asiento, Pasajero, Reserva y Boleto.
+Contiene todos los modelos del sistema: Avion, Aeropuerto, Vuelo, Asiento, AsientoVuelo,
+CupoClase, Pasajero, Reserva, ListaEspera y Boleto, y el registro de eventos
+de reservas (EventoReserva) con su resumen acumulado.
 """
 
-from django.db import models
+from django.db import IntegrityError, connections, models, router, transaction
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Value, When, signals
+from django.utils import timezone
 from django.contrib.auth.models import User
+from django.core.exceptions import EmptyResultSet, ValidationError
 from django.core.validators import MinValueValidator
+from airline.utils.aeropuertos import codigo_base, generar_codigo, normalizar_ciudad
+from airline.utils.cache_busquedas import invalidar_aeropuertos, invalidar_vuelos
+from airline.utils.mapa_asientos import construir_mapa_asientos
+from airline.utils.plantillas_asientos import get_plantilla, generar_distribucion
+from airline.utils.publicador_asientos import get_broker_asientos
+from airline.utils.codigos_reserva import GeneradorCodigos
+from collections import Counter
 from datetime import date
 import uuid
-import random
-import string
+
+# Cantidad de asientos por INSERT al crear un avión
+ASIENTOS_BATCH_SIZE = 500
+
+# Cantidad de eventos por INSERT al registrar cambios por lote
+EVENTOS_BATCH_SIZE = 1000
+
+
+class ConflictoVersion(Exception):
+    """La fila cambió desde que se leyó: su versión ya no es la esperada"""
+
+
+class SinCupo(ValidationError):
+    """No quedan lugares para vender en la clase pedida del vuelo"""
+
+
+class AsientoNoDisponible(SinCupo):
+    """El asiento pedido ya no está libre en el vuelo"""
+
+
+class ModeloVersionado(models.Model):
+    """
+    Modelo con control de concurrencia optimista.
+
+    Cada guardado de una instancia ya existente se escribe con un UPDATE
+    condicional (WHERE version = la leída) que además incrementa la versión.
+    Si otro proceso la modificó entretanto no se pisa su cambio: se lanza
+    ConflictoVersion sin bloquear la fila mientras se edita. Los UPDATEs
+    masivos que cambian datos editables también deben incrementar version.
+    """
+
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if (
+            self._state.adding
+            or args
+            or kwargs.get("force_insert")
+            or kwargs.get("force_update")
+        ):
+            return super().save(*args, **kwargs)
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            update_fields = frozenset(update_fields)
+            if not update_fields:
+                return None
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+
+        campos = [
+            campo
+            for campo in self._meta.concrete_fields
+            if not campo.primary_key
+            and campo.name != "version"
+            and (
+                update_fields is None
+                or campo.name in update_fields
+                or campo.attname in update_fields
+            )
+        ]
+        signals.pre_save.send(
+            sender=type(self), instance=self, raw=False, using=using, update_fields=update_fields
+        )
+        # UPDATE ... WHERE id = pk AND version = la leída, que además la incrementa
+        actualizadas = (
+            type(self)._base_manager.using(using)
+            .filter(pk=self.pk, version=self.version)
+            .update(
+                version=self.version + 1,
+                **{campo.attname: campo.pre_save(self, False) for campo in campos},
+            )
+        )
+        if not actualizadas:
+            if type(self)._base_manager.using(using).filter(pk=self.pk).exists():
+                raise ConflictoVersion(
+                    f"{self._meta.verbose_name} {self.pk} fue modificado por otra operación"
+                )
+            # La fila ya no existe: se guarda como lo haría Django
+            return super().save(*args, **kwargs)
+
+        self.version += 1
+        self._state.db = using
+        signals.post_save.send(
+            sender=type(self),
+            instance=self,
+            created=False,
+            update_fields=update_fields,
+            raw=False,
+            using=using,
+        )
+        return None
 
 
 class Avion(models.Model):
@@ -34,33 +138,37 @@ class Avion(models.Model):
         # Calcular capacidad automáticamente
         self.capacidad = self.filas * self.columnas
         is_new = self.pk is None
-        super().save(*args, **kwargs)
-        if is_new:
-            self.crear_asientos()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if is_new:
+                self.crear_asientos()
 
-    def crear_asientos(self):
-        """Crear asientos automáticamente cuando se crea un avión"""
-        for fila in range(1, self.filas + 1):
-            for col_idx in range(self.columnas):
-                columna_letra = chr(65 + col_idx)  # A, B, C, D, E, F
-                numero_asiento = f"{fila}{columna_letra}"
-
-                # Determinar tipo de asiento según la fila
-                if fila <= 3:
-                    tipo = "primera"
-                elif fila <= 10:
-                    tipo = "ejecutivo"
-                else:
-                    tipo = "economico"
+    def get_plantilla(self):
+        """Retorna la plantilla de distribución de asientos de este modelo"""
+        return get_plantilla(self.modelo)
 
-                Asiento.objects.create(
+    def crear_asientos(self):
+        """
+        Crear los asientos del avión en lote a partir de la plantilla de su modelo.
+        La distribución se precalcula por plantilla y se inserta con bulk_create.
+        """
+        distribucion = generar_distribucion(
+            self.get_plantilla(), self.filas, self.columnas
+        )
+        Asiento.objects.bulk_create(
+            [
+                Asiento(
                     avion=self,
-                    numero=numero_asiento,
+                    numero=numero,
                     fila=fila,
-                    columna=columna_letra,
+                    columna=columna,
                     tipo=tipo,
-                    estado="disponible",
+                    estado=estado,
                 )
+                for numero, fila, columna, tipo, estado in distribucion
+            ],
+            batch_size=ASIENTOS_BATCH_SIZE,
+        )
 
 
 class Asiento(models.Model):
@@ -99,7 +207,60 @@ class Asiento(models.Model):
         return f"Avión: {self.avion.modelo}, Asiento: {self.numero} ({self.tipo})"
 
 
-class Vuelo(models.Model):
+class Aeropuerto(models.Model):
+    """
+    Ciudad o aeropuerto de referencia para el origen y el destino de los vuelos.
+
+    La clave es el nombre normalizado (sin tildes, en minúsculas): las
+    búsquedas resuelven primero el texto del usuario contra esta tabla, que
+    es chica, y después filtran los vuelos por igualdad sobre sus claves
+    foráneas indexadas.
+    """
+
+    codigo = models.CharField(max_length=10, unique=True)
+    ciudad = models.CharField(max_length=100)
+    clave = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        verbose_name = "Aeropuerto"
+        verbose_name_plural = "Aeropuertos"
+        ordering = ["codigo"]
+
+    def __str__(self):
+        return f"{self.codigo} - {self.ciudad}"
+
+    @classmethod
+    def para_ciudad(cls, ciudad):
+        """
+        Obtiene el aeropuerto de una ciudad, creándolo si no existe.
+
+        Args:
+            ciudad (str): Nombre de la ciudad como figura en el vuelo
+
+        Returns:
+            Aeropuerto: Aeropuerto con la misma clave normalizada
+        """
+        clave = normalizar_ciudad(ciudad)
+        aeropuerto = cls.objects.filter(clave=clave).first()
+        while aeropuerto is None:
+            ocupados = set(
+                cls.objects.filter(
+                    Q(codigo=generar_codigo(clave)) | Q(codigo__startswith=codigo_base(clave))
+                ).values_list("codigo", flat=True)
+            )
+            try:
+                with transaction.atomic():
+                    aeropuerto = cls.objects.create(
+                        codigo=generar_codigo(clave, ocupados), ciudad=ciudad.strip(), clave=clave
+                    )
+                invalidar_aeropuertos()
+            except IntegrityError:
+                # Otra transacción creó la misma ciudad o tomó el mismo código
+                aeropuerto = cls.objects.filter(clave=clave).first()
+        return aeropuerto
+
+
+class Vuelo(ModeloVersionado):
     """
     Modelo que representa un vuelo programado.
     Contiene información sobre origen, destino, fechas y estado del vuelo.
@@ -108,6 +269,13 @@ class Vuelo(models.Model):
     avion = models.ForeignKey(Avion, on_delete=models.PROTECT)
     origen = models.CharField(max_length=100)
     destino = models.CharField(max_length=100)
+    # Se completan en save() a partir de origen y destino
+    aeropuerto_origen = models.ForeignKey(
+        Aeropuerto, on_delete=models.PROTECT, null=True, blank=True, related_name="salidas"
+    )
+    aeropuerto_destino = models.ForeignKey(
+        Aeropuerto, on_delete=models.PROTECT, null=True, blank=True, related_name="llegadas"
+    )
     fecha_salida = models.DateTimeField()
     fecha_llegada = models.DateTimeField()
     duracion = models.DurationField()
@@ -123,47 +291,785 @@ class Vuelo(models.Model):
     )
     precio_base = models.DecimalField(max_digits=10, decimal_places=2)
 
+    # Contadores de lugares libres (desnormalizados para los listados): son
+    # los disponibles de los cupos por clase y se mueven junto con ellos, así
+    # que cuentan también las ventas sin asiento. Se pueden reconstruir con
+    # el comando recalcular_disponibilidad.
+    asientos_libres = models.IntegerField(default=0, db_index=True)
+    libres_economico = models.IntegerField(default=0)
+    libres_ejecutivo = models.IntegerField(default=0)
+    libres_primera = models.IntegerField(default=0)
+
+    # Versión del inventario: crece con cada cambio de estado de un asiento
+    # del vuelo (o del propio vuelo). Se usa para los ETag del mapa de
+    # asientos y para devolver solo los cambios desde una versión dada.
+    version_inventario = models.PositiveBigIntegerField(default=0)
+
     class Meta:
         verbose_name = "Vuelo"
         verbose_name_plural = "Vuelos"
         ordering = ["fecha_salida"]
+        indexes = [
+            models.Index(fields=["fecha_salida", "asientos_libres"], name="vuelo_salida_libres"),
+            models.Index(
+                fields=["aeropuerto_origen", "aeropuerto_destino", "fecha_salida"],
+                name="vuelo_ruta_fecha",
+            ),
+            models.Index(fields=["estado", "fecha_salida"], name="vuelo_estado_salida"),
+        ]
 
     def __str__(self):
         return f"Vuelo de {self.origen} a {self.destino} ({self.fecha_salida.strftime('%Y-%m-%d %H:%M')})"
 
+    # Campos que solo se modifican con UPDATEs atómicos; un save() completo
+    # de una instancia vieja no debe pisarlos
+    CAMPOS_MANTENIDOS = (
+        "asientos_libres",
+        "libres_economico",
+        "libres_ejecutivo",
+        "libres_primera",
+        "version_inventario",
+    )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        vuelo = super().from_db(db, field_names, values)
+        vuelo._guardar_ciudades()
+        return vuelo
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._guardar_ciudades()
+
+    def _guardar_ciudades(self):
+        """Recuerda el origen y el destino guardados en la base"""
+        self._ciudades = (self.__dict__.get("origen"), self.__dict__.get("destino"))
+
+    def _asignar_aeropuertos(self, update_fields):
+        """
+        Completa los aeropuertos de origen y destino cuando cambia su texto
+        o todavía no están asignados.
+
+        Returns:
+            set: Campos de aeropuerto asignados
+        """
+        originales = getattr(self, "_ciudades", (None, None))
+        asignados = set()
+        for campo, original in zip(("origen", "destino"), originales):
+            campo_fk = f"aeropuerto_{campo}"
+            if update_fields is not None and campo not in update_fields:
+                continue
+            if getattr(self, f"{campo_fk}_id") is None or getattr(self, campo) != original:
+                setattr(self, campo_fk, Aeropuerto.para_ciudad(getattr(self, campo)))
+                asignados.add(campo_fk)
+        return asignados
+
+    def save(self, *args, **kwargs):
+        is_new = self.pk is None
+        if not is_new and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.CAMPOS_MANTENIDOS
+            ]
+        with transaction.atomic():
+            asignados = self._asignar_aeropuertos(kwargs.get("update_fields"))
+            if asignados and kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], *asignados}
+            super().save(*args, **kwargs)
+            self._guardar_ciudades()
+            if is_new:
+                self.crear_inventario()
+            else:
+                # Los datos del vuelo forman parte del detalle: invalidan el ETag
+                Vuelo.incrementar_version([self.pk])
+            invalidar_vuelos(
+                [self.pk], origenes=[self.aeropuerto_origen_id], estados=[self.estado]
+            )
+
+    def delete(self, *args, **kwargs):
+        vuelo_id = self.pk
+        resultado = super().delete(*args, **kwargs)
+        invalidar_vuelos([vuelo_id])
+        return resultado
+
+    def crear_inventario(self):
+        """
+        Crear en lote el inventario de asientos del vuelo: una fila por cada
+        asiento del avión. Los asientos en mantenimiento quedan bloqueados.
+        """
+        inventario = [
+            AsientoVuelo(
+                vuelo=self,
+                asiento_id=asiento_id,
+                tipo=tipo,
+                estado="bloqueado" if estado == "mantenimiento" else "disponible",
+            )
+            for asiento_id, tipo, estado in Asiento.objects.filter(
+                avion_id=self.avion_id
+            ).values_list("id", "tipo", "estado")
+        ]
+        AsientoVuelo.objects.bulk_create(inventario, batch_size=ASIENTOS_BATCH_SIZE)
+
+        capacidades = Counter(fila.tipo for fila in inventario if fila.estado != "bloqueado")
+        CupoClase.objects.bulk_create(
+            [
+                CupoClase(vuelo=self, tipo=tipo, capacidad=capacidad)
+                for tipo, capacidad in capacidades.items()
+            ]
+        )
+
+        # Sin ventas, los libres de cada clase son su capacidad
+        contadores = {
+            campo: capacidades.get(tipo, 0) for tipo, campo in self.CAMPOS_LIBRES_POR_TIPO.items()
+        }
+        contadores["asientos_libres"] = sum(contadores.values())
+        Vuelo.objects.filter(pk=self.pk).update(**contadores)
+        for campo, valor in contadores.items():
+            setattr(self, campo, valor)
+
+    # Campo contador correspondiente a cada tipo de asiento
+    CAMPOS_LIBRES_POR_TIPO = {
+        "economico": "libres_economico",
+        "ejecutivo": "libres_ejecutivo",
+        "primera": "libres_primera",
+    }
+
+    @classmethod
+    def ajustar_disponibles(cls, vuelo_id, tipo, delta):
+        """
+        Suma delta a los contadores de asientos libres de un vuelo con un
+        UPDATE atómico (F expressions), sin leer la fila del vuelo.
+        """
+        cls.ajustar_disponibles_por_tipo(vuelo_id, {tipo: delta})
+
+    @classmethod
+    def ajustar_disponibles_por_tipo(cls, vuelo_id, deltas):
+        """
+        Igual que ajustar_disponibles, para varios tipos de asiento a la vez
+        en un único UPDATE.
+
+        Args:
+            vuelo_id: ID del vuelo
+            deltas (dict): Tipo de asiento -> cantidad a sumar
+        """
+        cambios = {
+            cls.CAMPOS_LIBRES_POR_TIPO[tipo]: F(cls.CAMPOS_LIBRES_POR_TIPO[tipo]) + delta
+            for tipo, delta in deltas.items()
+        }
+        cls.objects.filter(pk=vuelo_id).update(
+            asientos_libres=F("asientos_libres") + sum(deltas.values()), **cambios
+        )
+        invalidar_vuelos([vuelo_id], disponibilidad=True)
+
+    @classmethod
+    def incrementar_version(cls, vuelo_ids):
+        """
+        Incrementa la versión de inventario de los vuelos indicados.
+        El UPDATE bloquea la fila del vuelo hasta el fin de la transacción,
+        por lo que las versiones se confirman en orden.
+        """
+        cls.objects.filter(pk__in=vuelo_ids).update(
+            version_inventario=F("version_inventario") + 1
+        )
+        invalidar_vuelos(vuelo_ids, disponibilidad=True)
+
+    @classmethod
+    def recalcular_disponibles(cls, vuelo_ids=None):
+        """
+        Reconstruye los contadores de lugares libres a partir de los cupos
+        por clase (capacidad + sobreventa - vendidos - retenidos).
+
+        Args:
+            vuelo_ids: IDs de los vuelos a recalcular (None = todos)
+
+        Returns:
+            int: Cantidad de vuelos actualizados
+        """
+        vuelos = cls.objects.all()
+        if vuelo_ids is not None:
+            vuelos = vuelos.filter(pk__in=vuelo_ids)
+        vuelos = list(vuelos.only("id"))
+
+        libres = CupoClase.objects.filter(vuelo__in=vuelos).values_list(
+            "vuelo_id",
+            "tipo",
+            F("capacidad") + F("sobreventa") - F("vendidos") - F("retenidos"),
+        )
+        conteos = {(vuelo_id, tipo): total for vuelo_id, tipo, total in libres}
+
+        for vuelo in vuelos:
+            vuelo.asientos_libres = 0
+            for tipo, campo in cls.CAMPOS_LIBRES_POR_TIPO.items():
+                valor = conteos.get((vuelo.id, tipo), 0)
+                setattr(vuelo, campo, valor)
+                vuelo.asientos_libres += valor
+
+        cls.objects.bulk_update(
+            vuelos,
+            ["asientos_libres", *cls.CAMPOS_LIBRES_POR_TIPO.values()],
+            batch_size=ASIENTOS_BATCH_SIZE,
+        )
+        invalidar_vuelos([vuelo.id for vuelo in vuelos], disponibilidad=True)
+        return len(vuelos)
+
     def asientos_disponibles_count(self):
         """Retorna el número de asientos disponibles para este vuelo"""
-        total_asientos = self.avion.capacidad
-        reservados = self.reservas.filter(estado="confirmada").count()
-        return total_asientos - reservados
+        return self.asientos_libres
 
     def get_asientos_con_estado_para_vuelo(self):
-        """Retorna todos los asientos del avión con su estado para este vuelo"""
-        asientos_info = []
-
-        for asiento in self.avion.asiento_set.all().order_by("fila", "columna"):
-            # Verificar si hay una reserva confirmada para este asiento en este vuelo
-            reserva_confirmada = self.reservas.filter(
-                asiento=asiento, estado="confirmada"
-            ).first()
-
-            if reserva_confirmada:
-                estado_vuelo = "ocupado"
-                pasajero = reserva_confirmada.pasajero
-            else:
-                estado_vuelo = "disponible"
-                pasajero = None
+        """
+        Retorna todos los asientos del avión con su estado para este vuelo.
+        Resuelve el mapa con una consulta para los asientos y otra para el
+        inventario del vuelo (con la reserva y el pasajero que ocupan cada
+        asiento), en lugar de una consulta por asiento. Si el inventario viene
+        precargado (prefetch_related) no consulta la base.
+        """
+        if "inventario" in getattr(self, "_prefetched_objects_cache", {}):
+            inventario = self.inventario.all()
+        else:
+            inventario = self.inventario.select_related("reserva__pasajero")
+
+        return construir_mapa_asientos(self.avion.asiento_set.all(), inventario)
+
+
+class AsientoVueloQuerySet(models.QuerySet):
+    def libres(self, ahora=None):
+        """Asientos disponibles o con una retención ya vencida"""
+        ahora = ahora or timezone.now()
+        return self.filter(
+            Q(estado="disponible") | Q(estado="retenido", retenido_hasta__lte=ahora)
+        )
+
+
+class AsientoVuelo(models.Model):
+    """
+    Modelo que representa el inventario de un asiento en un vuelo específico.
+    Hay una fila por cada combinación Vuelo x Asiento, de modo que el estado
+    de un asiento en un vuelo no afecta a los demás vuelos del mismo avión.
+    """
+
+    vuelo = models.ForeignKey(
+        Vuelo, on_delete=models.CASCADE, related_name="inventario"
+    )
+    asiento = models.ForeignKey(
+        Asiento, on_delete=models.CASCADE, related_name="inventario"
+    )
+    # Copia del tipo del asiento para filtrar por clase sin hacer JOIN
+    tipo = models.CharField(max_length=20, choices=Asiento.tipo_choices)
+    estado_choices = [
+        ("disponible", "Disponible"),
+        ("retenido", "Retenido"),
+        ("ocupado", "Ocupado"),
+        ("bloqueado", "Bloqueado"),
+    ]
+    estado = models.CharField(
+        max_length=20, choices=estado_choices, default="disponible"
+    )
+    # Reserva que retiene (pendiente) u ocupa (confirmada) el asiento en este vuelo
+    reserva = models.ForeignKey(
+        "Reserva",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    # Vencimiento de la retención; pasado este momento el asiento vuelve a estar libre
+    retenido_hasta = models.DateTimeField(null=True, blank=True)
+    # Versión de inventario del vuelo en la que cambió por última vez esta fila
+    version = models.PositiveBigIntegerField(default=0)
+
+    objects = AsientoVueloQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Asiento por vuelo"
+        verbose_name_plural = "Asientos por vuelo"
+        unique_together = ("vuelo", "asiento")
+        indexes = [
+            models.Index(fields=["vuelo", "estado"]),
+            models.Index(fields=["estado", "retenido_hasta"]),
+            models.Index(fields=["vuelo", "version"]),
+        ]
+
+    def __str__(self):
+        return f"Vuelo {self.vuelo_id}, Asiento {self.asiento_id}: {self.estado}"
+
+    def estado_actual(self, ahora=None):
+        """Estado efectivo del asiento, tratando las retenciones vencidas como libres"""
+        if (
+            self.estado == "retenido"
+            and self.retenido_hasta is not None
+            and self.retenido_hasta <= (ahora or timezone.now())
+        ):
+            return "disponible"
+        return self.estado
+
+    @classmethod
+    def transicionar(cls, filas, vuelo_ids, **cambios):
+        """
+        Aplica un cambio de estado a un conjunto de filas del inventario y
+        registra la nueva versión de inventario de sus vuelos.
+
+        Primero se bloquean las filas que cumplen la condición; si ninguna
+        la cumple (por ejemplo, otro ganó el asiento) no se toca el vuelo.
+        Si no, se incrementa la versión de los vuelos que cambiaron (lo que
+        los bloquea hasta el fin de la transacción, así las versiones se
+        confirman en orden) y las filas se actualizan tomando esa versión.
+        Todo cambio de estado del inventario pasa por acá para que los
+        deltas por versión no pierdan cambios.
+
+        Args:
+            filas: QuerySet de AsientoVuelo a actualizar
+            vuelo_ids: Vuelos de esas filas (las demás se ignoran)
+            **cambios: Campos a actualizar
+
+        Returns:
+            int: Cantidad de filas actualizadas
+        """
+        vuelo_ids = set(vuelo_ids)
+        if not vuelo_ids:
+            return 0
+        version = Vuelo.objects.filter(pk=OuterRef("vuelo_id")).values(
+            "version_inventario"
+        )[:1]
+        with transaction.atomic(savepoint=False):
+            bloqueadas = list(
+                filas.filter(vuelo_id__in=vuelo_ids)
+                .select_for_update(of=("self",))
+                .values_list("id", "vuelo_id")
+            )
+            if not bloqueadas:
+                return 0
+            cambiados = {vuelo_id for _, vuelo_id in bloqueadas}
+            Vuelo.incrementar_version(cambiados)
+            actualizados = cls.objects.filter(id__in=[fila[0] for fila in bloqueadas]).update(
+                version=Subquery(version), **cambios
+            )
+            cls.notificar_cambios(cambiados)
+            return actualizados
+
+    @classmethod
+    def notificar_cambios(cls, vuelo_ids):
+        """
+        Publica los asientos que cambiaron en la versión actual de cada vuelo
+        cuando se confirma la transacción. Si nadie escucha esos vuelos no
+        consulta la base.
+        """
+        broker = get_broker_asientos()
+        if not broker.requiere_eventos(vuelo_ids):
+            return
 
-            asientos_info.append(
+        filas = cls.objects.filter(
+            vuelo_id__in=vuelo_ids, version=F("vuelo__version_inventario")
+        ).values_list(
+            "vuelo_id",
+            "version",
+            "asiento_id",
+            "asiento__numero",
+            "estado",
+            "retenido_hasta",
+        )
+        eventos = {}
+        for vuelo_id, version, asiento_id, numero, estado, retenido_hasta in filas:
+            evento = eventos.setdefault(
+                vuelo_id, {"vuelo": vuelo_id, "version": version, "asientos": []}
+            )
+            evento["asientos"].append(
                 {
-                    "asiento": asiento,
-                    "estado_vuelo": estado_vuelo,
-                    "pasajero": pasajero,
-                    "reserva": reserva_confirmada,
+                    "asiento_id": asiento_id,
+                    "numero": numero,
+                    "estado": estado,
+                    "retenido_hasta": retenido_hasta,
                 }
             )
+        if eventos:
+            transaction.on_commit(lambda: broker.publicar(list(eventos.values())))
+
+    @classmethod
+    def retener(cls, reserva, hasta):
+        """
+        Retiene el asiento de una reserva pendiente hasta el momento indicado.
+        Se resuelve con un único UPDATE condicional: solo tiene efecto si el
+        asiento está libre (o su retención venció) o ya es de esta reserva.
+
+        Returns:
+            bool: True si se obtuvo la retención
+        """
+        ahora = timezone.now()
+        filas = cls.objects.filter(
+            vuelo_id=reserva.vuelo_id, asiento_id=reserva.asiento_id
+        ).filter(
+            Q(estado="disponible")
+            | Q(estado="retenido", retenido_hasta__lte=ahora)
+            | Q(estado="retenido", reserva=reserva)
+        )
+        actualizados = cls.transicionar(
+            filas,
+            [reserva.vuelo_id],
+            estado="retenido",
+            reserva=reserva,
+            retenido_hasta=hasta,
+        )
+        return actualizados == 1
+
+    @classmethod
+    def ocupar(cls, reserva):
+        """
+        Marca como ocupado el asiento de una reserva en su vuelo.
+        Solo tiene efecto si el asiento está libre o retenido por la misma
+        reserva (los contadores del vuelo los mueve CupoClase).
+
+        Returns:
+            bool: True si el asiento quedó ocupado por la reserva
+        """
+        ahora = timezone.now()
+        asiento = cls.objects.filter(
+            vuelo_id=reserva.vuelo_id, asiento_id=reserva.asiento_id
+        )
+        filas = asiento.filter(
+            Q(estado="disponible")
+            | Q(estado="retenido", retenido_hasta__lte=ahora)
+            | Q(estado="retenido", reserva=reserva)
+        )
+        actualizados = cls.transicionar(
+            filas,
+            [reserva.vuelo_id],
+            estado="ocupado",
+            reserva=reserva,
+            retenido_hasta=None,
+        )
+        if actualizados:
+            return True
+        return asiento.filter(estado="ocupado", reserva=reserva).exists()
+
+    @classmethod
+    def ocupar_lote(cls, reserva_ids):
+        """
+        Ocupa con un único UPDATE los asientos retenidos por un lote de
+        reservas.
+
+        Args:
+            reserva_ids: IDs de las reservas a confirmar
+
+        Returns:
+            list: IDs de las reservas cuyo asiento quedó ocupado
+        """
+        filas = list(
+            cls.objects.filter(reserva_id__in=reserva_ids, estado="retenido").values_list(
+                "id", "reserva_id", "vuelo_id"
+            )
+        )
+        if not filas:
+            return []
+        cls.transicionar(
+            cls.objects.filter(id__in=[fila[0] for fila in filas], estado="retenido"),
+            {fila[2] for fila in filas},
+            estado="ocupado",
+            retenido_hasta=None,
+        )
+        return [fila[1] for fila in filas]
+
+    @classmethod
+    def liberar_lote(cls, reserva_ids):
+        """
+        Libera con un único UPDATE los asientos retenidos u ocupados por un
+        lote de reservas.
+
+        Returns:
+            int: Cantidad de asientos liberados
+        """
+        return cls._liberar_filas(cls.objects.filter(reserva_id__in=reserva_ids))
+
+    @classmethod
+    def liberar_vuelo(cls, vuelo_id):
+        """
+        Libera todos los asientos retenidos u ocupados de un vuelo con un
+        único UPDATE.
+
+        Returns:
+            int: Cantidad de asientos liberados
+        """
+        filas = cls.objects.filter(vuelo_id=vuelo_id, estado__in=("retenido", "ocupado"))
+        return cls.transicionar(
+            filas, [vuelo_id], estado="disponible", reserva=None, retenido_hasta=None
+        )
+
+    @classmethod
+    def _liberar_filas(cls, filas):
+        filas = filas.filter(estado__in=("retenido", "ocupado"))
+        vuelo_ids = set(filas.values_list("vuelo_id", flat=True).order_by().distinct())
+        return cls.transicionar(
+            filas, vuelo_ids, estado="disponible", reserva=None, retenido_hasta=None
+        )
+
+    @classmethod
+    def asignar_lote(cls, vuelo_id, reservas, estado, hasta=None):
+        """
+        Retiene u ocupa en un único UPDATE los asientos de un grupo de
+        reservas de un mismo vuelo. Es todo o nada: si alguno de los asientos
+        ya no está libre no se asigna ninguno (la transacción debe revertirse).
+
+        Args:
+            vuelo_id: ID del vuelo
+            reservas: Reservas ya guardadas, con su asiento cargado
+            estado: "retenido" u "ocupado"
+            hasta: Vencimiento de la retención (solo para "retenido")
+
+        Returns:
+            bool: True si se asignaron todos los asientos
+        """
+        por_asiento = {reserva.asiento_id: reserva.pk for reserva in reservas}
+        filas = cls.objects.libres().filter(
+            vuelo_id=vuelo_id, asiento_id__in=por_asiento
+        )
+        actualizados = cls.transicionar(
+            filas,
+            [vuelo_id],
+            estado=estado,
+            reserva_id=Case(
+                *[
+                    When(asiento_id=asiento_id, then=Value(reserva_id))
+                    for asiento_id, reserva_id in por_asiento.items()
+                ]
+            ),
+            retenido_hasta=hasta,
+        )
+        return actualizados == len(por_asiento)
+
+    @classmethod
+    def liberar(cls, reserva, excepto_asiento_id=None):
+        """
+        Libera los asientos retenidos u ocupados por una reserva y devuelve
+        los lugares vendidos a los contadores del vuelo.
+
+        Args:
+            reserva: Reserva que ocupaba los asientos
+            excepto_asiento_id: Asiento que debe seguir asignado (cambio de asiento)
+        """
+        filas = cls.objects.filter(reserva=reserva)
+        if excepto_asiento_id is not None:
+            filas = filas.exclude(asiento_id=excepto_asiento_id)
+        cls._liberar_filas(filas)
+
+
+class CupoClase(models.Model):
+    """
+    Cupo de venta de una clase (tipo de asiento) en un vuelo.
+
+    Lleva la capacidad de la clase, los lugares vendidos (reservas
+    confirmadas) y retenidos (reservas pendientes) y un margen de
+    sobreventa. Decidir si se puede vender es un UPDATE condicional sobre
+    esta única fila, sin recorrer los asientos, así que una reserva puede
+    venderse sin asiento y recibirlo más tarde, en el check-in.
 
-        return asientos_info
+    Los contadores se mantienen desde Reserva (save, delete y los cambios de
+    estado en lote) y se pueden reconstruir con recalcular(). Cada cambio
+    mueve también los contadores de libres del vuelo, que son la suma de
+    los disponibles de sus cupos.
+    """
+
+    vuelo = models.ForeignKey(Vuelo, on_delete=models.CASCADE, related_name="cupos")
+    tipo = models.CharField(max_length=20, choices=Asiento.tipo_choices)
+    # Asientos vendibles de la clase (sin contar los bloqueados)
+    capacidad = models.PositiveIntegerField(default=0)
+    # Lugares que se pueden vender por encima de la capacidad
+    sobreventa = models.PositiveIntegerField(default=0)
+    vendidos = models.IntegerField(default=0)
+    retenidos = models.IntegerField(default=0)
+
+    # Contador que consume una reserva según su estado (las canceladas no consumen)
+    CAMPO_POR_ESTADO = {"pendiente": "retenidos", "confirmada": "vendidos"}
+
+    class Meta:
+        verbose_name = "Cupo por clase"
+        verbose_name_plural = "Cupos por clase"
+        unique_together = ("vuelo", "tipo")
+
+    def __str__(self):
+        return f"Vuelo {self.vuelo_id}, {self.tipo}: {self.disponibles} disponibles"
+
+    @property
+    def disponibles(self):
+        """Lugares que todavía se pueden vender, incluida la sobreventa"""
+        return self.capacidad + self.sobreventa - self.vendidos - self.retenidos
+
+    @classmethod
+    def tomar(cls, vuelo_id, tipo, estado, cantidad=1):
+        """
+        Consume lugares de la clase con un único UPDATE condicional: solo
+        tiene efecto si quedan al menos `cantidad` lugares (sobreventa
+        incluida). Debe llamarse con el vuelo ya bloqueado en la transacción.
+
+        Args:
+            vuelo_id: ID del vuelo
+            tipo (str): Clase del asiento
+            estado (str): "pendiente" (retiene) o "confirmada" (vende)
+            cantidad (int): Lugares a consumir
+
+        Returns:
+            bool: True si se consumieron los lugares
+        """
+        campo = cls.CAMPO_POR_ESTADO[estado]
+        tomado = bool(
+            cls.objects.filter(vuelo_id=vuelo_id, tipo=tipo)
+            .alias(ocupados=F("vendidos") + F("retenidos") + cantidad)
+            .filter(ocupados__lte=F("capacidad") + F("sobreventa"))
+            .update(**{campo: F(campo) + cantidad})
+        )
+        if tomado:
+            Vuelo.ajustar_disponibles(vuelo_id, tipo, -cantidad)
+        return tomado
+
+    @classmethod
+    def ajustar(cls, movimientos):
+        """
+        Aplica movimientos a los contadores sin controlar el límite (se usa
+        para confirmar y liberar lugares ya consumidos), con un UPDATE por
+        cupo afectado y otro por vuelo, que va primero para bloquear el
+        vuelo antes que sus cupos.
+
+        Args:
+            movimientos: Tuplas (vuelo_id, tipo, estado, cantidad); los
+                estados que no consumen cupo se ignoran
+        """
+        por_cupo = {}
+        for vuelo_id, tipo, estado, cantidad in movimientos:
+            campo = cls.CAMPO_POR_ESTADO.get(estado)
+            if campo:
+                por_cupo.setdefault((vuelo_id, tipo), Counter())[campo] += cantidad
+        libres = {}
+        for (vuelo_id, tipo), deltas in por_cupo.items():
+            consumidos = sum(deltas.values())
+            if consumidos:
+                libres.setdefault(vuelo_id, {})[tipo] = -consumidos
+        for vuelo_id, deltas in libres.items():
+            Vuelo.ajustar_disponibles_por_tipo(vuelo_id, deltas)
+        for (vuelo_id, tipo), deltas in por_cupo.items():
+            cambios = {campo: F(campo) + delta for campo, delta in deltas.items() if delta}
+            if cambios:
+                cls.objects.filter(vuelo_id=vuelo_id, tipo=tipo).update(**cambios)
+
+    @classmethod
+    def mover(cls, vuelo_id, antes, despues):
+        """
+        Refleja en los cupos el cambio de una reserva.
+
+        Si la reserva pasa a consumir un lugar de una clase que antes no
+        consumía (alta, o cambio de clase) el lugar se toma con tomar();
+        los demás cambios (confirmar, cancelar) solo mueven contadores.
+        Antes se bloquea el vuelo, así el orden de bloqueo al guardar una
+        reserva es siempre vuelo, cupos y después inventario.
+
+        Args:
+            vuelo_id: ID del vuelo de la reserva
+            antes: (tipo, estado) guardados, o None si la reserva es nueva
+            despues: (tipo, estado) a guardar
+
+        Raises:
+            SinCupo: Si no quedan lugares en la clase nueva
+        """
+        if antes == despues:
+            return
+        list(Vuelo.objects.select_for_update().filter(pk=vuelo_id).values_list("pk"))
+        consumia = antes is not None and antes[1] in cls.CAMPO_POR_ESTADO
+        consume = despues[1] in cls.CAMPO_POR_ESTADO
+        movimientos = [(vuelo_id, *antes, -1)] if consumia else []
+        if consume and (not consumia or antes[0] != despues[0]):
+            if not cls.tomar(vuelo_id, *despues):
+                raise SinCupo(f"No quedan lugares en clase {despues[0]} para este vuelo")
+        else:
+            movimientos.append((vuelo_id, *despues, 1))
+        cls.ajustar(movimientos)
+
+    @classmethod
+    def vaciar(cls, vuelo_id):
+        """
+        Devuelve todos los lugares vendidos y retenidos de un vuelo y repone
+        sus contadores de libres. Debe llamarse con el vuelo ya bloqueado.
+
+        Returns:
+            int: Cantidad de cupos actualizados
+        """
+        actualizados = cls.objects.filter(vuelo_id=vuelo_id).update(vendidos=0, retenidos=0)
+        Vuelo.recalcular_disponibles([vuelo_id])
+        return actualizados
+
+    @classmethod
+    def fijar_sobreventa(cls, vuelo_id, tipo, cantidad):
+        """
+        Fija el margen de sobreventa de una clase y mueve los libres del
+        vuelo en la diferencia. Bloquea el vuelo y después el cupo, como
+        mover().
+
+        Returns:
+            bool: True si el vuelo tiene esa clase
+        """
+        list(Vuelo.objects.select_for_update().filter(pk=vuelo_id).values_list("pk"))
+        anterior = (
+            cls.objects.select_for_update()
+            .filter(vuelo_id=vuelo_id, tipo=tipo)
+            .values_list("sobreventa", flat=True)
+            .first()
+        )
+        if anterior is None:
+            return False
+        cls.objects.filter(vuelo_id=vuelo_id, tipo=tipo).update(sobreventa=cantidad)
+        if cantidad != anterior:
+            Vuelo.ajustar_disponibles(vuelo_id, tipo, cantidad - anterior)
+        return True
+
+    @classmethod
+    def recalcular(cls, vuelo_ids=None):
+        """
+        Reconstruye capacidad, vendidos y retenidos a partir del inventario
+        y de las reservas, conservando la sobreventa configurada.
+
+        Args:
+            vuelo_ids: IDs de los vuelos a recalcular (None = todos)
+
+        Returns:
+            int: Cantidad de cupos actualizados o creados
+        """
+        inventario = AsientoVuelo.objects.exclude(estado="bloqueado")
+        reservas = Reserva.objects.filter(estado__in=cls.CAMPO_POR_ESTADO)
+        cupos = cls.objects.all()
+        if vuelo_ids is not None:
+            inventario = inventario.filter(vuelo_id__in=vuelo_ids)
+            reservas = reservas.filter(vuelo_id__in=vuelo_ids)
+            cupos = cupos.filter(vuelo_id__in=vuelo_ids)
+
+        conteos = {}
+        for vuelo_id, tipo, total in (
+            inventario.values_list("vuelo_id", "tipo").annotate(total=Count("id")).order_by()
+        ):
+            conteos.setdefault((vuelo_id, tipo), {})["capacidad"] = total
+        for vuelo_id, tipo, estado, total in (
+            reservas.values_list("vuelo_id", "clase", "estado")
+            .annotate(total=Count("id"))
+            .order_by()
+        ):
+            conteos.setdefault((vuelo_id, tipo), {})[cls.CAMPO_POR_ESTADO[estado]] = total
+
+        existentes = {(cupo.vuelo_id, cupo.tipo): cupo for cupo in cupos}
+        nuevos = []
+        for clave, valores in conteos.items():
+            if clave not in existentes:
+                nuevos.append(cls(vuelo_id=clave[0], tipo=clave[1]))
+                existentes[clave] = nuevos[-1]
+        for clave, cupo in existentes.items():
+            valores = conteos.get(clave, {})
+            cupo.capacidad = valores.get("capacidad", 0)
+            cupo.vendidos = valores.get("vendidos", 0)
+            cupo.retenidos = valores.get("retenidos", 0)
+
+        campos = ["capacidad", "vendidos", "retenidos"]
+        cls.objects.bulk_create(nuevos, batch_size=ASIENTOS_BATCH_SIZE)
+        cls.objects.bulk_update(
+            [cupo for cupo in existentes.values() if cupo not in nuevos],
+            campos,
+            batch_size=ASIENTOS_BATCH_SIZE,
+        )
+        return len(existentes)
 
 
 class Pasajero(models.Model):
@@ -213,19 +1119,80 @@ class Pasajero(models.Model):
         )
 
 
-class Reserva(models.Model):
+class SecuenciaCodigo(models.Model):
+    """
+    Contador de una secuencia de códigos (por ejemplo, los de reserva).
+
+    Los procesos reservan números de a bloques con reservar_bloque() y los
+    reparten en memoria, de modo que la fila se actualiza una vez por bloque y
+    no una vez por código.
+    """
+
+    nombre = models.CharField(max_length=50, unique=True)
+    # Primer número todavía no reservado por ningún proceso
+    siguiente = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Secuencia de códigos"
+        verbose_name_plural = "Secuencias de códigos"
+
+    @classmethod
+    def reservar_bloque(cls, nombre, cantidad):
+        """
+        Reserva números consecutivos de una secuencia.
+
+        Args:
+            nombre (str): Nombre de la secuencia (se crea si no existe)
+            cantidad (int): Cantidad de números a reservar
+
+        Returns:
+            int: Primer número del bloque reservado
+        """
+        with transaction.atomic(savepoint=False):
+            actualizadas = cls.objects.filter(nombre=nombre).update(
+                siguiente=F("siguiente") + cantidad
+            )
+            if not actualizadas:
+                _, creada = cls.objects.get_or_create(
+                    nombre=nombre, defaults={"siguiente": cantidad}
+                )
+                if creada:
+                    return 0
+                cls.objects.filter(nombre=nombre).update(
+                    siguiente=F("siguiente") + cantidad
+                )
+            # La fila sigue bloqueada por el UPDATE hasta el fin de la transacción
+            siguiente = cls.objects.values_list("siguiente", flat=True).get(nombre=nombre)
+        return siguiente - cantidad
+
+    def __str__(self):
+        return f"{self.nombre}: {self.siguiente}"
+
+
+generador_codigos_reserva = GeneradorCodigos(
+    lambda cantidad: SecuenciaCodigo.reservar_bloque("reserva", cantidad)
+)
+
+
+class Reserva(ModeloVersionado):
     """
     Modelo que representa una reserva de vuelo.
-    Vincula un pasajero con un vuelo y un asiento específico.
+    Vincula un pasajero con un vuelo y una clase; el asiento puede asignarse
+    al reservar o más tarde, en el check-in.
     """
 
-    vuelo = models.ForeignKey(Vuelo, on_delete=models.CASCADE, related_name="reservas")
+    # Sin índice propio: los índices (vuelo, ...) y (pasajero, estado) lo cubren
+    vuelo = models.ForeignKey(
+        Vuelo, on_delete=models.CASCADE, related_name="reservas", db_index=False
+    )
     pasajero = models.ForeignKey(
-        Pasajero, on_delete=models.CASCADE, related_name="reservas"
+        Pasajero, on_delete=models.CASCADE, related_name="reservas", db_index=False
     )
     asiento = models.ForeignKey(
-        Asiento, on_delete=models.CASCADE, related_name="reservas"
+        Asiento, on_delete=models.CASCADE, related_name="reservas", null=True, blank=True
     )
+    # Clase vendida; consume el cupo de esa clase en el vuelo
+    clase = models.CharField(max_length=20, choices=Asiento.tipo_choices, default="economico")
 
     estado_choices = [
         ("pendiente", "Pendiente"),
@@ -238,39 +1205,293 @@ class Reserva(models.Model):
     fecha_reserva = models.DateTimeField(auto_now_add=True)
     precio = models.DecimalField(max_digits=10, decimal_places=2)
     codigo_reserva = models.CharField(max_length=8, unique=True, editable=False)
+    # Vencimiento de la retención del asiento mientras la reserva está pendiente
+    expira_en = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         unique_together = ("vuelo", "pasajero")
+        indexes = [
+            models.Index(fields=["estado", "expira_en"]),
+            # Reservas de un vuelo o de un pasajero, filtradas por estado
+            models.Index(fields=["vuelo", "estado"], name="reserva_vuelo_estado"),
+            models.Index(fields=["pasajero", "estado"], name="reserva_pasajero_estado"),
+            # Listado paginado por posición, de la más reciente a la más antigua
+            models.Index(fields=["-fecha_reserva", "id"], name="reserva_fecha_id"),
+        ]
         verbose_name = "Reserva"
         verbose_name_plural = "Reservas"
         ordering = ["-fecha_reserva"]
 
+    # Transiciones de estado permitidas: pendiente -> confirmada -> cancelada
+    TRANSICIONES = {
+        "pendiente": ("confirmada", "cancelada"),
+        "confirmada": ("cancelada",),
+        "cancelada": (),
+    }
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        reserva = super().from_db(db, field_names, values)
+        reserva._guardar_originales()
+        return reserva
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._guardar_originales()
+
+    def _guardar_originales(self):
+        """Recuerda el estado, el asiento y la clase guardados en la base"""
+        self._originales = {
+            "estado": self.__dict__.get("estado"),
+            "asiento": self.__dict__.get("asiento_id"),
+            "clase": self.__dict__.get("clase"),
+        }
+
+    def _cambia_inventario(self, update_fields):
+        """
+        Indica si el guardado cambia el estado o el asiento de la reserva, que
+        son lo único que afecta al inventario del vuelo.
+        """
+        originales = getattr(self, "_originales", None)
+        if self._state.adding or originales is None:
+            return True
+        campos = {"estado", "asiento"}
+        if update_fields is not None:
+            campos &= {campo.removesuffix("_id") for campo in update_fields}
+        return any(
+            originales[campo] != getattr(self, "asiento_id" if campo == "asiento" else campo)
+            for campo in campos
+        )
+
+    def _cupo(self):
+        """(clase, estado) guardados en la base, o None si no se conocen"""
+        originales = getattr(self, "_originales", None)
+        if self._state.adding or originales is None:
+            return None
+        return (originales["clase"], originales["estado"])
+
     def save(self, *args, **kwargs):
         if not self.codigo_reserva:
             self.codigo_reserva = self._generar_codigo_reserva()
-        super().save(*args, **kwargs)
+        if self.estado != "pendiente":
+            self.expira_en = None
+        # La clase es la del asiento, cuando lo tiene
+        if self.asiento_id and Reserva.asiento.is_cached(self):
+            self.clase = self.asiento.tipo
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            extra = set()
+            if "estado" in update_fields:
+                extra.add("expira_en")
+            if {"asiento", "asiento_id"} & set(update_fields):
+                extra.add("clase")
+            if extra:
+                kwargs["update_fields"] = {*update_fields, *extra}
+        cambia_inventario = self._cambia_inventario(update_fields)
+        antes = self._cupo()
+        nueva = self._state.adding
+        originales = getattr(self, "_originales", None)
+        cambia_asiento = (
+            not nueva
+            and originales is not None
+            and originales["asiento"] != self.asiento_id
+            and (update_fields is None or bool({"asiento", "asiento_id"} & set(update_fields)))
+        )
+        with transaction.atomic():
+            # El cupo se consume antes de escribir: sin lugar no se guarda nada
+            if nueva or antes is not None:
+                CupoClase.mover(self.vuelo_id, antes, (self.clase, self.estado))
+            super().save(*args, **kwargs)
+            if nueva or (antes is not None and antes[1] != self.estado):
+                EventoReserva.registrar(
+                    "reserva",
+                    self.pk,
+                    self.vuelo_id,
+                    self.clase,
+                    None if nueva else antes[1],
+                    self.estado,
+                )
+
+            # Actualizar el inventario del asiento solo para este vuelo y solo
+            # si cambió el estado o el asiento. Las pendientes conservan la
+            # retención de su asiento actual y retienen el nuevo si cambia
+            # (al crearlas la retención la pide el service). Si el asiento ya
+            # no está libre se revierte todo el guardado.
+            if cambia_inventario:
+                if self.estado == "confirmada":
+                    AsientoVuelo.liberar(self, excepto_asiento_id=self.asiento_id)
+                    if self.asiento_id and not AsientoVuelo.ocupar(self):
+                        raise AsientoNoDisponible("El asiento ya está ocupado en este vuelo.")
+                elif self.estado == "pendiente":
+                    AsientoVuelo.liberar(self, excepto_asiento_id=self.asiento_id)
+                    if (
+                        self.asiento_id
+                        and cambia_asiento
+                        and not AsientoVuelo.retener(self, self.expira_en)
+                    ):
+                        raise AsientoNoDisponible("El asiento ya está reservado para este vuelo.")
+                else:
+                    AsientoVuelo.liberar(self)
+        self._guardar_originales()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            CupoClase.mover(self.vuelo_id, (self.clase, self.estado), (self.clase, "cancelada"))
+            AsientoVuelo.liberar(self)
+            EventoReserva.registrar(
+                "reserva", self.pk, self.vuelo_id, self.clase, self.estado, "eliminada"
+            )
+            return super().delete(*args, **kwargs)
+
+    def puede_pasar_a(self, nuevo_estado):
+        """Indica si la reserva puede pasar de su estado actual a nuevo_estado"""
+        return nuevo_estado in self.TRANSICIONES.get(self.estado, ())
+
+    def cambiar_estado(self, nuevo_estado):
+        """
+        Aplica una transición de estado y guarda solo las columnas que
+        cambian (estado y vencimiento de la retención).
+
+        Args:
+            nuevo_estado (str): "confirmada" o "cancelada"
+
+        Raises:
+            ValidationError: Si la transición no está permitida
+        """
+        if not self.puede_pasar_a(nuevo_estado):
+            raise ValidationError(
+                f"No se puede pasar una reserva {self.estado} a {nuevo_estado}"
+            )
+        self.estado = nuevo_estado
+        self.save(update_fields=["estado"])
 
-        # Actualizar estado del asiento después de guardar la reserva
-        if self.estado == "confirmada":
-            self.asiento.estado = "ocupado"
-            self.asiento.save()
-        elif self.estado == "cancelada":
-            self.asiento.estado = "disponible"
-            self.asiento.save()
+    @classmethod
+    def transicionar_lote(cls, reserva_ids, nuevo_estado):
+        """
+        Aplica una transición de estado a varias reservas con UPDATEs por
+        conjunto, sin cargar ni guardar cada reserva.
+
+        Solo cambian las reservas cuyo estado actual permite la transición.
+        Al confirmar, además, la reserva con asiento debe seguir reteniéndolo;
+        las que perdieron la retención quedan pendientes.
+
+        Args:
+            reserva_ids: IDs de las reservas
+            nuevo_estado (str): "confirmada" o "cancelada"
+
+        Returns:
+            list: IDs de las reservas que cambiaron de estado
+        """
+        origenes = [
+            estado for estado, destinos in cls.TRANSICIONES.items() if nuevo_estado in destinos
+        ]
+        if not origenes:
+            raise ValidationError(f"Estado de destino inválido: {nuevo_estado}")
+        with transaction.atomic():
+            filas = list(
+                cls.objects.select_for_update()
+                .filter(id__in=reserva_ids, estado__in=origenes)
+                .values_list("id", "vuelo_id", "clase", "estado", "asiento_id")
+            )
+            if not filas:
+                return []
+            if nuevo_estado == "confirmada":
+                confirmadas = set(
+                    AsientoVuelo.ocupar_lote([fila[0] for fila in filas if fila[4]])
+                )
+                filas = [fila for fila in filas if fila[0] in confirmadas or not fila[4]]
+            else:
+                AsientoVuelo.liberar_lote([fila[0] for fila in filas])
+            ids = [fila[0] for fila in filas]
+            if ids:
+                CupoClase.ajustar(
+                    [(vuelo_id, clase, estado, -1) for _, vuelo_id, clase, estado, _ in filas]
+                    + [(vuelo_id, clase, nuevo_estado, 1) for _, vuelo_id, clase, _, _ in filas]
+                )
+                cls.objects.filter(id__in=ids).update(
+                    estado=nuevo_estado, expira_en=None, version=F("version") + 1
+                )
+                EventoReserva.registrar_lote(
+                    "reserva",
+                    [
+                        (id_, vuelo_id, clase, estado, nuevo_estado)
+                        for id_, vuelo_id, clase, estado, _ in filas
+                    ],
+                )
+        return ids
 
     def _generar_codigo_reserva(self):
         """Genera un código único de reserva de 8 caracteres"""
-        while True:
-            codigo = "".join(
-                random.choices(string.ascii_uppercase + string.digits, k=8)
-            )
-            if not Reserva.objects.filter(codigo_reserva=codigo).exists():
-                return codigo
+        return Reserva.generar_codigos(1)[0]
+
+    @classmethod
+    def generar_codigos(cls, cantidad):
+        """
+        Genera varios códigos únicos de reserva de 8 caracteres.
+
+        Los códigos salen de la secuencia de SecuenciaCodigo, así que no se
+        repiten y no hace falta consultar las reservas existentes.
+
+        Args:
+            cantidad (int): Cantidad de códigos a generar
+
+        Returns:
+            list: Códigos sin repetir
+        """
+        return generador_codigos_reserva.generar(cantidad)
 
     def __str__(self):
         return f"Reserva {self.codigo_reserva} - Vuelo {self.vuelo.origen}-{self.vuelo.destino} - Pasajero {self.pasajero.nombre} {self.pasajero.apellido}"
 
 
+class ListaEspera(models.Model):
+    """
+    Pasajero en espera de un lugar en una clase de un vuelo completo.
+
+    Cada (vuelo, clase) es una cola atendida por orden de llegada: cuando se
+    libera un lugar se promueve la entrada en espera más antigua, que pasa a
+    tener una reserva pendiente. El índice parcial sobre las entradas en
+    espera hace que tomar la siguiente sea una lectura por índice.
+    """
+
+    vuelo = models.ForeignKey(Vuelo, on_delete=models.CASCADE, related_name="lista_espera")
+    pasajero = models.ForeignKey(Pasajero, on_delete=models.CASCADE, related_name="esperas")
+    clase = models.CharField(max_length=20, choices=Asiento.tipo_choices)
+    estado_choices = [
+        ("esperando", "Esperando"),
+        ("promovida", "Promovida"),
+        ("retirada", "Retirada"),
+    ]
+    estado = models.CharField(max_length=20, choices=estado_choices, default="esperando")
+    creada = models.DateTimeField(auto_now_add=True)
+    # Reserva creada al promover la entrada
+    reserva = models.ForeignKey(
+        Reserva, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+
+    class Meta:
+        verbose_name = "Entrada de lista de espera"
+        verbose_name_plural = "Lista de espera"
+        ordering = ["id"]
+        indexes = [
+            models.Index(
+                fields=["vuelo", "clase", "id"],
+                condition=Q(estado="esperando"),
+                name="lista_espera_cola",
+            )
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["vuelo", "pasajero"],
+                condition=Q(estado="esperando"),
+                name="lista_espera_pasajero_unico",
+            )
+        ]
+
+    def __str__(self):
+        return f"Vuelo {self.vuelo_id}, {self.clase}: pasajero {self.pasajero_id} ({self.estado})"
+
+
 class Boleto(models.Model):
     """
     Modelo que representa un boleto electrónico.
@@ -293,10 +1514,220 @@ class Boleto(models.Model):
         verbose_name_plural = "Boletos"
         ordering = ["-fecha_emision"]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        boleto = super().from_db(db, field_names, values)
+        boleto._estado_original = boleto.__dict__.get("estado")
+        return boleto
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._estado_original = self.__dict__.get("estado")
+
     def save(self, *args, **kwargs):
         if not self.codigo_barra:
             self.codigo_barra = str(uuid.uuid4())
-        super().save(*args, **kwargs)
+        nuevo = self._state.adding
+        anterior = getattr(self, "_estado_original", None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if nuevo or (anterior is not None and anterior != self.estado):
+                reserva = self.reserva
+                EventoReserva.registrar(
+                    "boleto",
+                    self.pk,
+                    reserva.vuelo_id,
+                    reserva.clase,
+                    None if nuevo else anterior,
+                    self.estado,
+                )
+        self._estado_original = self.estado
 
     def __str__(self):
         return f"Boleto para reserva {self.reserva.codigo_reserva}"
+
+
+class EventoReserva(models.Model):
+    """
+    Registro de solo agregado de los cambios de estado de reservas y boletos.
+
+    Cada cambio de estado escribe un evento en la misma transacción que lo
+    produce: los guardados individuales desde save() y las operaciones por
+    lote con un único INSERT por lote. Los eventos no se modifican ni se
+    eliminan uno por uno; el comando compactar_eventos los acumula en
+    ResumenEstado y puede borrar los ya acumulados.
+
+    Los campos no son claves foráneas: el evento sobrevive a la fila que lo
+    originó.
+    """
+
+    entidad_choices = [
+        ("reserva", "Reserva"),
+        ("boleto", "Boleto"),
+    ]
+    entidad = models.CharField(max_length=10, choices=entidad_choices)
+    objeto_id = models.BigIntegerField()
+    vuelo_id = models.BigIntegerField()
+    clase = models.CharField(max_length=20, blank=True, default="")
+    # Vacío cuando el evento es la creación de la fila
+    estado_anterior = models.CharField(max_length=20, blank=True, default="")
+    # "eliminada" cuando la reserva se borra
+    estado_nuevo = models.CharField(max_length=20)
+    creado = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Evento de reserva"
+        verbose_name_plural = "Eventos de reservas"
+        ordering = ["id"]
+        indexes = [models.Index(fields=["entidad", "objeto_id"])]
+
+    # Columnas que escriben los lotes, en el orden del INSERT ... SELECT
+    CAMPOS_LOTE = (
+        "entidad",
+        "objeto_id",
+        "vuelo_id",
+        "clase",
+        "estado_anterior",
+        "estado_nuevo",
+        "creado",
+    )
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Los eventos de reserva no se modifican")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Los eventos de reserva no se eliminan")
+
+    @classmethod
+    def registrar(cls, entidad, objeto_id, vuelo_id, clase, anterior, nuevo):
+        """Registra un cambio de estado individual"""
+        return cls.objects.create(
+            entidad=entidad,
+            objeto_id=objeto_id,
+            vuelo_id=vuelo_id,
+            clase=clase or "",
+            estado_anterior=anterior or "",
+            estado_nuevo=nuevo,
+        )
+
+    @classmethod
+    def registrar_lote(cls, entidad, filas):
+        """
+        Registra con un único INSERT los cambios de un lote ya leído.
+
+        Args:
+            entidad (str): "reserva" o "boleto"
+            filas (list): Tuplas (objeto_id, vuelo_id, clase, estado_anterior,
+                estado_nuevo); estado_anterior es None para las filas recién
+                creadas
+        """
+        ahora = timezone.now()
+        cls.objects.bulk_create(
+            [
+                cls(
+                    entidad=entidad,
+                    objeto_id=objeto_id,
+                    vuelo_id=vuelo_id,
+                    clase=clase or "",
+                    estado_anterior=anterior or "",
+                    estado_nuevo=nuevo,
+                    creado=ahora,
+                )
+                for objeto_id, vuelo_id, clase, anterior, nuevo in filas
+            ],
+            batch_size=EVENTOS_BATCH_SIZE,
+        )
+
+    @classmethod
+    def registrar_consulta(cls, entidad, queryset, nuevo, objeto, vuelo, clase, anterior):
+        """
+        Registra los cambios de las filas de una consulta con un único
+        INSERT ... SELECT, sin traerlas a memoria.
+
+        Debe ejecutarse antes del UPDATE que cambia el estado, con el mismo
+        filtro, para leer el estado anterior.
+
+        Args:
+            entidad (str): "reserva" o "boleto"
+            queryset (QuerySet): Filas que van a cambiar de estado
+            nuevo (str): Estado nuevo de todas las filas
+            objeto, vuelo, clase, anterior (str): Campos de la consulta con el
+                ID de la fila, el vuelo, la clase y el estado actual
+
+        Returns:
+            int: Cantidad de eventos registrados
+        """
+        consulta = (
+            queryset.order_by()
+            .annotate(
+                evento_entidad=Value(entidad),
+                evento_nuevo=Value(nuevo),
+                evento_creado=Value(timezone.now(), output_field=models.DateTimeField()),
+            )
+            .values_list(
+                "evento_entidad", objeto, vuelo, clase, anterior, "evento_nuevo", "evento_creado"
+            )
+        )
+        conexion = connections[queryset.db]
+        try:
+            sql, params = consulta.query.get_compiler(connection=conexion).as_sql()
+        except EmptyResultSet:
+            return 0
+        columnas = ", ".join(
+            conexion.ops.quote_name(cls._meta.get_field(campo).column) for campo in cls.CAMPOS_LOTE
+        )
+        tabla = conexion.ops.quote_name(cls._meta.db_table)
+        with conexion.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {tabla} ({columnas}) {sql}", params)
+            return cursor.rowcount
+
+    def __str__(self):
+        return (
+            f"{self.entidad} {self.objeto_id}: "
+            f"{self.estado_anterior or '-'} -> {self.estado_nuevo}"
+        )
+
+
+class ResumenEstado(models.Model):
+    """
+    Cantidad de reservas y boletos por vuelo, clase y estado, acumulada a
+    partir de los eventos hasta PuntoControlEventos.ultimo_evento.
+
+    Es la foto desde la que los reportes reproducen solo los eventos nuevos,
+    sin recorrer las tablas de reservas y boletos.
+    """
+
+    entidad = models.CharField(max_length=10, choices=EventoReserva.entidad_choices)
+    vuelo_id = models.BigIntegerField()
+    clase = models.CharField(max_length=20, blank=True, default="")
+    estado = models.CharField(max_length=20)
+    cantidad = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Resumen de estados"
+        verbose_name_plural = "Resúmenes de estados"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["vuelo_id", "entidad", "clase", "estado"], name="resumen_estado_unico"
+            )
+        ]
+
+    def __str__(self):
+        return f"Vuelo {self.vuelo_id} {self.entidad} {self.clase} {self.estado}: {self.cantidad}"
+
+
+class PuntoControlEventos(models.Model):
+    """Último evento acumulado por un consumidor del registro de eventos"""
+
+    nombre = models.CharField(max_length=50, unique=True)
+    ultimo_evento = models.BigIntegerField(default=0)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Punto de control de eventos"
+        verbose_name_plural = "Puntos de control de eventos"
+
+    def __str__(self):
+        return f"{self.nombre}: {self.ultimo_evento}"
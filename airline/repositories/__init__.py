@@ -2,15 +2,26 @@
 Repositories para acceso a datos
 """
 
-from .vuelo_repository import VueloRepository, AvionRepository, AsientoRepository
+from .vuelo_repository import (
+    VueloRepository,
+    AvionRepository,
+    AeropuertoRepository,
+    AsientoRepository,
+    CupoRepository,
+)
 from .pasajero_repository import PasajeroRepository
-from .reserva_repository import ReservaRepository, BoletoRepository
+from .reserva_repository import ReservaRepository, BoletoRepository, ListaEsperaRepository
+from .evento_repository import EventoRepository
 
 __all__ = [
     "VueloRepository",
     "AvionRepository",
+    "AeropuertoRepository",
     "AsientoRepository",
+    "CupoRepository",
     "PasajeroRepository",
     "ReservaRepository",
     "BoletoRepository",
+    "ListaEsperaRepository",
+    "EventoRepository",
 ]
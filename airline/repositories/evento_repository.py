@@ -0,0 +1,143 @@
+"""
+Repository para el registro de eventos de reservas
+
+Este módulo contiene el acceso a datos del registro de solo agregado de
+cambios de estado (EventoReserva), del resumen acumulado por vuelo, clase y
+estado (ResumenEstado) y de los puntos de control de sus consumidores.
+"""
+
+from airline.models import EventoReserva, PuntoControlEventos, ResumenEstado
+
+
+class EventoRepository:
+    """
+    Repository para el registro de eventos y su resumen acumulado
+
+    Los eventos se leen siempre en orden de ID a partir de un punto de
+    control, de modo que cada consumidor procesa solo los eventos nuevos.
+    """
+
+    @staticmethod
+    def get_punto_control(nombre):
+        """
+        Obtener y bloquear el punto de control de un consumidor
+
+        Se crea en cero si no existe. Debe llamarse dentro de una transacción:
+        el bloqueo impide que dos consolidaciones procesen los mismos eventos.
+
+        Returns:
+            PuntoControlEventos: Punto de control bloqueado
+        """
+        PuntoControlEventos.objects.get_or_create(nombre=nombre)
+        return PuntoControlEventos.objects.select_for_update().get(nombre=nombre)
+
+    @staticmethod
+    def get_ultimo_evento(nombre):
+        """
+        Obtener el último evento acumulado por un consumidor, sin bloquear
+
+        Returns:
+            int: ID del último evento acumulado (0 si nunca se consolidó)
+        """
+        return (
+            PuntoControlEventos.objects.filter(nombre=nombre)
+            .values_list("ultimo_evento", flat=True)
+            .first()
+            or 0
+        )
+
+    @staticmethod
+    def guardar_punto_control(punto, ultimo_evento):
+        """Avanzar el punto de control hasta un evento"""
+        punto.ultimo_evento = ultimo_evento
+        punto.save(update_fields=["ultimo_evento", "actualizado"])
+
+    @staticmethod
+    def get_posteriores(desde_id, lote, hasta=None, vuelo_id=None):
+        """
+        Obtener los eventos posteriores a un ID, en orden
+
+        Con `hasta`, la lectura se corta en el primer evento creado desde ese
+        momento, aunque le sigan IDs mayores creados antes: así lo devuelto
+        es siempre un tramo contiguo de IDs a partir del punto de control y
+        nunca queda atrás un evento sin leer.
+
+        Args:
+            desde_id (int): Último evento ya procesado
+            lote (int|None): Cantidad máxima de eventos (None: todos)
+            hasta (datetime|None): Cortar en el primer evento creado desde
+                este momento
+            vuelo_id (int|None): Solo eventos de este vuelo
+
+        Returns:
+            list: Tuplas (id, entidad, vuelo_id, clase, estado_anterior,
+                estado_nuevo)
+        """
+        eventos = EventoReserva.objects.filter(id__gt=desde_id)
+        if vuelo_id is not None:
+            eventos = eventos.filter(vuelo_id=vuelo_id)
+        columnas = ("id", "entidad", "vuelo_id", "clase", "estado_anterior", "estado_nuevo")
+        if hasta is None:
+            eventos = eventos.order_by("id").values_list(*columnas)
+            return list(eventos if lote is None else eventos[:lote])
+
+        eventos = eventos.order_by("id").values_list(*columnas, "creado")
+        anteriores = []
+        for *evento, creado in eventos if lote is None else eventos[:lote]:
+            if creado >= hasta:
+                break
+            anteriores.append(tuple(evento))
+        return anteriores
+
+    @staticmethod
+    def get_resumen(vuelo_ids):
+        """
+        Obtener las filas del resumen de varios vuelos
+
+        Returns:
+            QuerySet: Filas de ResumenEstado de esos vuelos
+        """
+        return ResumenEstado.objects.filter(vuelo_id__in=vuelo_ids)
+
+    @staticmethod
+    def aplicar_al_resumen(deltas):
+        """
+        Sumar cantidades al resumen con un UPDATE y un INSERT por lote
+
+        Args:
+            deltas (dict): {(entidad, vuelo_id, clase, estado): cantidad}
+        """
+        existentes = {
+            (fila.entidad, fila.vuelo_id, fila.clase, fila.estado): fila
+            for fila in EventoRepository.get_resumen({clave[1] for clave in deltas})
+        }
+        modificadas, nuevas = [], []
+        for clave, cantidad in deltas.items():
+            fila = existentes.get(clave)
+            if fila is not None:
+                fila.cantidad += cantidad
+                modificadas.append(fila)
+            else:
+                entidad, vuelo_id, clase, estado = clave
+                nuevas.append(
+                    ResumenEstado(
+                        entidad=entidad,
+                        vuelo_id=vuelo_id,
+                        clase=clase,
+                        estado=estado,
+                        cantidad=cantidad,
+                    )
+                )
+        ResumenEstado.objects.bulk_update(modificadas, ["cantidad"])
+        ResumenEstado.objects.bulk_create(nuevas)
+
+    @staticmethod
+    def compactar(hasta_id, antes):
+        """
+        Eliminar los eventos ya acumulados y anteriores a una fecha
+
+        Returns:
+            int: Cantidad de eventos eliminados
+        """
+        eliminados, _ = EventoReserva.objects.filter(id__lte=hasta_id, creado__lt=antes).delete()
+        return eliminados
@@ -43,6 +43,19 @@ class PasajeroRepository:
         """
         return Pasajero.objects.filter(id=pasajero_id).first()
 
+    @staticmethod
+    def get_by_ids(pasajero_ids):
+        """
+        Buscar varios pasajeros por ID con una sola consulta
+
+        Args:
+            pasajero_ids (list): IDs de los pasajeros
+
+        Returns:
+            dict: ID -> Pasajero, solo con los pasajeros que existen
+        """
+        return Pasajero.objects.in_bulk(pasajero_ids)
+
     @staticmethod
     def get_by_documento(documento):
         """
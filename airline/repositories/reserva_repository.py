@@ -1,13 +1,14 @@
 """
-Repository para Reservas y Boletos
+Repository para Reservas, Boletos y lista de espera
 
 Este módulo contiene las capas de acceso a datos para los modelos
-Reserva y Boleto. Encapsula todas las consultas a la base de datos
+Reserva, Boleto y ListaEspera. Encapsula todas las consultas a la base de datos
 relacionadas con el sistema de reservas y emisión de boletos.
 """
 
-from airline.models import Reserva, Boleto
-from django.db.models import Q
+from airline.models import Reserva, Boleto, CupoClase, EventoReserva, ListaEspera
+from django.db import transaction
+from django.db.models import F, Q
 
 
 class ReservaRepository:
@@ -112,6 +113,50 @@ class ReservaRepository:
         """
         return Reserva.objects.create(**data)
 
+    @staticmethod
+    def create_lote(reservas):
+        """
+        Insertar varias reservas con un único INSERT (bulk_create)
+
+        No llama a Reserva.save(): el código de reserva y el inventario de
+        asientos deben resolverse antes y después, respectivamente. Los
+        eventos de creación se registran con otro único INSERT.
+
+        Args:
+            reservas (list): Objetos Reserva sin guardar
+
+        Returns:
+            list: Las mismas reservas, con su ID asignado
+        """
+        with transaction.atomic(savepoint=False):
+            reservas = Reserva.objects.bulk_create(reservas)
+            EventoReserva.registrar_lote(
+                "reserva",
+                [
+                    (reserva.pk, reserva.vuelo_id, reserva.clase, None, reserva.estado)
+                    for reserva in reservas
+                ],
+            )
+        return reservas
+
+    @staticmethod
+    def get_pasajeros_con_reserva(vuelo_id, pasajero_ids):
+        """
+        Obtener cuáles de los pasajeros ya tienen una reserva en un vuelo
+
+        Args:
+            vuelo_id (int): ID del vuelo
+            pasajero_ids (list): IDs de los pasajeros a verificar
+
+        Returns:
+            set: IDs de los pasajeros que ya tienen reserva en el vuelo
+        """
+        return set(
+            Reserva.objects.filter(
+                vuelo_id=vuelo_id, pasajero_id__in=pasajero_ids
+            ).values_list("pasajero_id", flat=True)
+        )
+
     @staticmethod
     def update(reserva_id, data):
         """
@@ -148,9 +193,117 @@ class ReservaRepository:
         reserva = ReservaRepository.get_by_id(reserva_id)
         if reserva:
             reserva.estado = nuevo_estado
-            reserva.save()
+            reserva.save(update_fields=["estado"])
         return reserva
 
+    @staticmethod
+    def transicionar_lote(reserva_ids, nuevo_estado):
+        """
+        Cambiar el estado de varias reservas con UPDATEs por conjunto
+
+        Solo cambian las reservas cuyo estado actual permite la transición
+        (ver Reserva.TRANSICIONES); el inventario de asientos se actualiza
+        en el mismo paso.
+
+        Args:
+            reserva_ids (list): IDs de las reservas
+            nuevo_estado (str): "confirmada" o "cancelada"
+
+        Returns:
+            list: IDs de las reservas que cambiaron de estado
+        """
+        return Reserva.transicionar_lote(reserva_ids, nuevo_estado)
+
+    @staticmethod
+    def get_ids_pendientes_vencidas(ahora, lote=500):
+        """
+        Obtener un lote de IDs de reservas pendientes cuya retención venció
+
+        Args:
+            ahora (datetime): Momento de referencia para el vencimiento
+            lote (int): Cantidad máxima de IDs a devolver
+
+        Returns:
+            list: IDs de las reservas vencidas
+        """
+        return list(
+            Reserva.objects.filter(estado="pendiente", expira_en__lte=ahora)
+            .order_by("expira_en")
+            .values_list("id", flat=True)[:lote]
+        )
+
+    @staticmethod
+    def cancelar_lote(reserva_ids):
+        """
+        Cancelar un lote de reservas pendientes con un único UPDATE y
+        devolver sus lugares retenidos a los cupos de cada clase
+
+        Args:
+            reserva_ids (list): IDs de las reservas a cancelar
+
+        Returns:
+            list: IDs de las reservas canceladas
+        """
+        filas = list(
+            Reserva.objects.select_for_update()
+            .filter(id__in=reserva_ids, estado="pendiente")
+            .values_list("id", "vuelo_id", "clase")
+        )
+        if not filas:
+            return []
+        CupoClase.ajustar(
+            [(vuelo_id, clase, "pendiente", -1) for _, vuelo_id, clase in filas]
+        )
+        EventoReserva.registrar_lote(
+            "reserva",
+            [(id_, vuelo_id, clase, "pendiente", "cancelada") for id_, vuelo_id, clase in filas],
+        )
+        ids = [fila[0] for fila in filas]
+        Reserva.objects.filter(id__in=ids).update(
+            estado="cancelada", expira_en=None, version=F("version") + 1
+        )
+        return ids
+
+    @staticmethod
+    def get_lugares(reserva_ids):
+        """
+        Obtener el lugar que ocupaba cada reserva de un lote
+
+        Args:
+            reserva_ids (list): IDs de las reservas
+
+        Returns:
+            list: Tuplas (vuelo_id, clase, asiento_id)
+        """
+        return list(
+            Reserva.objects.filter(id__in=reserva_ids)
+            .order_by("id")
+            .values_list("vuelo_id", "clase", "asiento_id")
+        )
+
+    @staticmethod
+    def cancelar_por_vuelo(vuelo_id):
+        """
+        Cancelar con un único UPDATE todas las reservas activas de un vuelo
+
+        No libera los asientos ni los cupos: el inventario del vuelo se
+        libera aparte. Los eventos se registran antes con un INSERT ... SELECT
+        sobre las mismas filas.
+
+        Args:
+            vuelo_id (int): ID del vuelo
+
+        Returns:
+            int: Cantidad de reservas canceladas
+        """
+        activas = Reserva.objects.filter(
+            vuelo_id=vuelo_id, estado__in=("pendiente", "confirmada")
+        )
+        EventoReserva.registrar_consulta(
+            "reserva", activas, "cancelada", "id", "vuelo_id", "clase", "estado"
+        )
+        return activas.update(estado="cancelada", expira_en=None, version=F("version") + 1)
+
     @staticmethod
     def delete(reserva_id):
         """
@@ -279,3 +432,140 @@ class BoletoRepository:
             boleto.estado = nuevo_estado
             boleto.save()
         return boleto
+
+    @staticmethod
+    def anular_por_vuelo(vuelo_id):
+        """
+        Anular con un único UPDATE todos los boletos de un vuelo
+
+        Args:
+            vuelo_id (int): ID del vuelo
+
+        Returns:
+            int: Cantidad de boletos anulados
+        """
+        return BoletoRepository._anular(Boleto.objects.filter(reserva__vuelo_id=vuelo_id))
+
+    @staticmethod
+    def anular_por_reservas(reserva_ids):
+        """
+        Anular con un único UPDATE los boletos de un lote de reservas
+
+        Args:
+            reserva_ids (list): IDs de las reservas
+
+        Returns:
+            int: Cantidad de boletos anulados
+        """
+        return BoletoRepository._anular(Boleto.objects.filter(reserva_id__in=reserva_ids))
+
+    @staticmethod
+    def _anular(boletos):
+        """Registrar los eventos y anular los boletos no anulados de la consulta"""
+        boletos = boletos.exclude(estado="anulado")
+        EventoReserva.registrar_consulta(
+            "boleto", boletos, "anulado", "id", "reserva__vuelo_id", "reserva__clase", "estado"
+        )
+        return boletos.update(estado="anulado")
+
+
+class ListaEsperaRepository:
+    """
+    Repository para la lista de espera de los vuelos
+
+    Cada (vuelo, clase) es una cola FIFO; las consultas de la cola usan el
+    índice parcial de las entradas en espera.
+    """
+
+    @staticmethod
+    def create(vuelo_id, pasajero_id, clase):
+        """
+        Agregar un pasajero al final de la cola de una clase
+
+        Returns:
+            ListaEspera: Entrada creada
+        """
+        return ListaEspera.objects.create(vuelo_id=vuelo_id, pasajero_id=pasajero_id, clase=clase)
+
+    @staticmethod
+    def get_by_id(entrada_id):
+        """
+        Obtener una entrada de la lista de espera por su ID
+
+        Returns:
+            ListaEspera: Entrada encontrada o None si no existe
+        """
+        return ListaEspera.objects.filter(pk=entrada_id).first()
+
+    @staticmethod
+    def esta_esperando(vuelo_id, pasajero_id):
+        """
+        Indicar si un pasajero ya está en espera en un vuelo
+
+        Returns:
+            bool: True si tiene una entrada en espera
+        """
+        return ListaEspera.objects.filter(
+            vuelo_id=vuelo_id, pasajero_id=pasajero_id, estado="esperando"
+        ).exists()
+
+    @staticmethod
+    def tomar_siguiente(vuelo_id, clase):
+        """
+        Tomar la entrada en espera más antigua de una cola
+
+        SELECT ... FOR UPDATE SKIP LOCKED LIMIT 1: la fila queda bloqueada
+        hasta el fin de la transacción y las transacciones concurrentes
+        saltan a la siguiente en lugar de esperarla, así dos cancelaciones
+        simultáneas promueven a pasajeros distintos.
+
+        Returns:
+            ListaEspera: Entrada bloqueada, o None si la cola está vacía
+        """
+        return (
+            ListaEspera.objects.select_for_update(skip_locked=True)
+            .filter(vuelo_id=vuelo_id, clase=clase, estado="esperando")
+            .order_by("id")
+            .first()
+        )
+
+    @staticmethod
+    def get_posicion(entrada):
+        """
+        Obtener la posición (desde 1) de una entrada en espera en su cola
+
+        Returns:
+            int: Posición en la cola
+        """
+        return ListaEspera.objects.filter(
+            vuelo_id=entrada.vuelo_id,
+            clase=entrada.clase,
+            estado="esperando",
+            id__lte=entrada.id,
+        ).count()
+
+    @staticmethod
+    def cambiar_estado(entrada, nuevo_estado, reserva=None):
+        """
+        Marcar una entrada como promovida (con su reserva) o retirada
+
+        Returns:
+            ListaEspera: Entrada actualizada
+        """
+        entrada.estado = nuevo_estado
+        entrada.reserva = reserva
+        entrada.save(update_fields=["estado", "reserva"])
+        return entrada
+
+    @staticmethod
+    def retirar_por_vuelo(vuelo_id):
+        """
+        Retirar con un único UPDATE todas las entradas en espera de un vuelo
+        (por ejemplo, al cancelarlo)
+
+        Returns:
+            int: Cantidad de entradas retiradas
+        """
+        return ListaEspera.objects.filter(vuelo_id=vuelo_id, estado="esperando").update(
+            estado="retirada"
+        )
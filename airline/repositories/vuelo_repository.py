@@ -1,10 +1,15 @@
 """
-Repository para Vuelos, Aviones y Asientos.
+Repository para Vuelos, Aviones, Aeropuertos, Asientos y cupos por clase.
 Los Repositories son la capa de acceso a datos, encapsulan las consultas a la base de datos.
 """
 
-from airline.models import Vuelo, Avion, Asiento
-from django.db.models import Q, Count
+from airline.models import Vuelo, Avion, Aeropuerto, Asiento, AsientoVuelo, CupoClase
+from airline.utils.aeropuertos import normalizar_ciudad
+from airline.utils.cache_busquedas import invalidar_vuelos
+from airline.utils.helpers import rango_del_dia
+from django.db import transaction
+from django.db.models import Q, Count, F, Prefetch
+from django.utils import timezone
 from datetime import datetime
 
 
@@ -117,28 +122,298 @@ class AsientoRepository:
         """
         return Asiento.objects.filter(id=asiento_id).first()
 
+    @staticmethod
+    def get_by_codigo(avion_id, numero):
+        """
+        Obtener un asiento de un avión por su código (ej: "12A").
+
+        Args:
+            avion_id: ID del avión
+            numero: Código del asiento
+
+        Returns:
+            Objeto Asiento o None si no existe
+        """
+        return Asiento.objects.filter(avion_id=avion_id, numero=numero.upper()).first()
+
     @staticmethod
     def check_disponibilidad(asiento_id, vuelo_id):
         """
         Verificar si un asiento está disponible para un vuelo.
-        Un asiento está ocupado si existe una reserva confirmada para ese vuelo.
+        Consulta el inventario por vuelo (índice único vuelo + asiento).
 
         Args:
             asiento_id: ID del asiento
             vuelo_id: ID del vuelo
 
         Returns:
-            True si está disponible, False si está ocupado
+            True si está disponible (o su retención venció), False si está
+            retenido, ocupado, bloqueado o no pertenece al avión del vuelo
+        """
+        fila = AsientoRepository.get_inventario(vuelo_id, asiento_id)
+        return fila is not None and fila.estado_actual() == "disponible"
+
+    @staticmethod
+    def check_disponibilidad_lote(pares):
+        """
+        Verificar la disponibilidad de muchos asientos en muchos vuelos con
+        una sola consulta al inventario.
+
+        Args:
+            pares: Iterable de tuplas (vuelo_id, codigo_asiento)
+
+        Returns:
+            Diccionario {(vuelo_id, codigo_asiento): AsientoVuelo o None}, con
+            el código en mayúsculas; None si el asiento no existe en ese vuelo
+        """
+        pares = [(vuelo_id, codigo.upper()) for vuelo_id, codigo in pares]
+        if not pares:
+            return {}
+
+        filas = AsientoVuelo.objects.filter(
+            vuelo_id__in={vuelo_id for vuelo_id, _ in pares},
+            asiento__numero__in={codigo for _, codigo in pares},
+        ).select_related("asiento")
+        por_par = {(fila.vuelo_id, fila.asiento.numero): fila for fila in filas}
+        return {par: por_par.get(par) for par in pares}
+
+    @staticmethod
+    def get_libres_por_tipo(vuelo_id, tipo):
+        """
+        Obtener los asientos libres de una clase en un vuelo, con una consulta.
+
+        Args:
+            vuelo_id: ID del vuelo
+            tipo: Tipo de asiento (economico, ejecutivo, primera)
+
+        Returns:
+            Lista de tuplas (asiento_id, numero, fila, columna)
+        """
+        return list(
+            AsientoVuelo.objects.libres()
+            .filter(vuelo_id=vuelo_id, tipo=tipo)
+            .values_list(
+                "asiento_id", "asiento__numero", "asiento__fila", "asiento__columna"
+            )
+        )
+
+    @staticmethod
+    def get_inventario(vuelo_id, asiento_id, bloquear=False):
+        """
+        Obtener la fila de inventario de un asiento en un vuelo.
+
+        Args:
+            vuelo_id: ID del vuelo
+            asiento_id: ID del asiento
+            bloquear: Si es True, bloquea la fila (SELECT ... FOR UPDATE)
+                hasta el final de la transacción en curso
+
+        Returns:
+            Objeto AsientoVuelo o None si el asiento no pertenece al avión del vuelo
+        """
+        queryset = AsientoVuelo.objects.filter(vuelo_id=vuelo_id, asiento_id=asiento_id)
+        if bloquear:
+            # Mismo orden de bloqueo que Reserva.save (CupoClase.mover toma
+            # el vuelo antes de tocar el inventario), para no provocar deadlocks
+            list(Vuelo.objects.select_for_update().filter(pk=vuelo_id).values_list("pk"))
+            queryset = queryset.select_for_update()
+        return queryset.first()
+
+    @staticmethod
+    def get_inventario_lote(vuelo_id, asiento_ids, bloquear=False):
+        """
+        Obtener las filas de inventario de varios asientos de un vuelo.
+
+        Args:
+            vuelo_id: ID del vuelo
+            asiento_ids: IDs de los asientos
+            bloquear: Si es True, bloquea el vuelo y luego las filas
+                (SELECT ... FOR UPDATE) hasta el final de la transacción
+
+        Returns:
+            Diccionario {asiento_id: AsientoVuelo} con el asiento (y su avión)
+            precargado
+        """
+        queryset = AsientoVuelo.objects.filter(
+            vuelo_id=vuelo_id, asiento_id__in=asiento_ids
+        ).select_related("asiento__avion")
+        if bloquear:
+            list(Vuelo.objects.select_for_update().filter(pk=vuelo_id).values_list("pk"))
+            queryset = queryset.select_for_update(of=("self",))
+        return {fila.asiento_id: fila for fila in queryset}
+
+    @staticmethod
+    def liberar_vuelo(vuelo_id):
+        """
+        Liberar todos los asientos retenidos u ocupados de un vuelo.
+
+        Args:
+            vuelo_id: ID del vuelo (ya bloqueado en la transacción)
+
+        Returns:
+            Cantidad de asientos liberados
+        """
+        return AsientoVuelo.liberar_vuelo(vuelo_id)
+
+    @staticmethod
+    def asignar_lote(vuelo_id, reservas, estado, hasta=None):
+        """
+        Retener u ocupar en un único UPDATE los asientos de un grupo de reservas.
+
+        Returns:
+            True si se asignaron todos los asientos
+        """
+        return AsientoVuelo.asignar_lote(vuelo_id, reservas, estado, hasta)
+
+    @staticmethod
+    def retener(reserva, hasta):
+        """
+        Retener el asiento de una reserva pendiente hasta el momento indicado.
+        La retención se obtiene con un único UPDATE condicional.
+
+        Args:
+            reserva: Reserva pendiente que retiene el asiento
+            hasta: Fecha y hora de vencimiento de la retención
+
+        Returns:
+            True si se obtuvo la retención, False si el asiento no está libre
+        """
+        return AsientoVuelo.retener(reserva, hasta)
+
+    @staticmethod
+    def liberar_retenciones(reserva_ids):
+        """
+        Liberar en un solo UPDATE los asientos retenidos por un lote de reservas.
+
+        Args:
+            reserva_ids: IDs de las reservas cuyas retenciones se liberan
+
+        Returns:
+            Cantidad de asientos liberados
+        """
+        filas = AsientoVuelo.objects.filter(
+            reserva_id__in=reserva_ids, estado="retenido"
+        )
+        vuelo_ids = filas.values_list("vuelo_id", flat=True).distinct()
+        return AsientoVuelo.transicionar(
+            filas, vuelo_ids, estado="disponible", reserva=None, retenido_hasta=None
+        )
+
+    @staticmethod
+    def liberar_retenciones_vencidas(ahora, lote=500):
+        """
+        Liberar por lotes las retenciones vencidas que sigan marcadas como retenidas.
+
+        Args:
+            ahora: Momento de referencia para el vencimiento
+            lote: Cantidad máxima de filas por UPDATE
+
+        Returns:
+            Cantidad de asientos liberados
+        """
+        total = 0
+        while True:
+            filas = list(
+                AsientoVuelo.objects.filter(
+                    estado="retenido", retenido_hasta__lte=ahora
+                ).values_list("id", "vuelo_id")[:lote]
+            )
+            if not filas:
+                return total
+            with transaction.atomic():
+                total += AsientoVuelo.transicionar(
+                    AsientoVuelo.objects.filter(
+                        id__in=[fila_id for fila_id, _ in filas],
+                        estado="retenido",
+                        retenido_hasta__lte=ahora,
+                    ),
+                    [vuelo_id for _, vuelo_id in filas],
+                    estado="disponible",
+                    reserva=None,
+                    retenido_hasta=None,
+                )
+
+
+class CupoRepository:
+    """
+    Repository para los cupos de venta por clase de cada vuelo.
+    """
+
+    @staticmethod
+    def get_por_vuelo(vuelo_id):
+        """
+        Obtener los cupos de un vuelo.
+
+        Returns:
+            Diccionario {tipo: CupoClase}
+        """
+        return {cupo.tipo: cupo for cupo in CupoClase.objects.filter(vuelo_id=vuelo_id)}
+
+    @staticmethod
+    def tomar(vuelo_id, tipo, estado, cantidad=1):
+        """
+        Consumir lugares de una clase con un único UPDATE condicional.
+
+        Returns:
+            True si quedaban lugares (sobreventa incluida)
+        """
+        return CupoClase.tomar(vuelo_id, tipo, estado, cantidad)
+
+    @staticmethod
+    def vaciar_vuelo(vuelo_id):
+        """
+        Devolver todos los lugares vendidos y retenidos de un vuelo (ya
+        bloqueado en la transacción) y reponer sus contadores de libres.
+
+        Returns:
+            Cantidad de cupos actualizados
+        """
+        return CupoClase.vaciar(vuelo_id)
+
+    @staticmethod
+    def set_sobreventa(vuelo_id, tipo, cantidad):
+        """
+        Fijar el margen de sobreventa de una clase.
+
+        Returns:
+            True si el vuelo tiene esa clase
+        """
+        return CupoClase.fijar_sobreventa(vuelo_id, tipo, cantidad)
+
+
+class AeropuertoRepository:
+    """
+    Repository para la tabla de referencia de aeropuertos y ciudades.
+    """
+
+    @staticmethod
+    def get_all():
+        """
+        Obtener todos los aeropuertos.
+        Returns: QuerySet de Aeropuerto ordenado por código
         """
-        from airline.models import Reserva
+        return Aeropuerto.objects.all()
 
-        # Buscar si existe una reserva confirmada para este asiento en este vuelo
-        reserva_existente = Reserva.objects.filter(
-            asiento_id=asiento_id, vuelo_id=vuelo_id, estado="confirmada"
-        ).exists()
+    @staticmethod
+    def get_ids_por_texto(texto):
+        """
+        Resolver el texto de una búsqueda a los aeropuertos que corresponden.
+
+        El texto puede ser un código exacto o parte del nombre de la ciudad,
+        sin importar tildes ni mayúsculas. Recorre solo la tabla de
+        aeropuertos, que tiene una fila por ciudad.
 
-        # Si existe reserva, NO está disponible
-        return not reserva_existente
+        Args:
+            texto: Texto ingresado por el usuario
+
+        Returns:
+            Lista de IDs de Aeropuerto (vacía si no hay coincidencias)
+        """
+        clave = normalizar_ciudad(texto)
+        return list(
+            Aeropuerto.objects.filter(Q(codigo=clave.upper()) | Q(clave__contains=clave))
+            .values_list("id", flat=True)
+        )
 
 
 class VueloRepository:
@@ -170,43 +445,139 @@ class VueloRepository:
         """
         return Vuelo.objects.select_related("avion").filter(id=vuelo_id).first()
 
+    @staticmethod
+    def get_detalle(vuelo_id):
+        """
+        Obtener un vuelo con todo lo necesario para armar su mapa de asientos.
+        Precarga el avión, sus asientos y el inventario del vuelo con la reserva
+        y el pasajero de cada asiento, de modo que el detalle se resuelve con
+        una cantidad fija de consultas.
+
+        Args:
+            vuelo_id: ID del vuelo
+
+        Returns:
+            Objeto Vuelo con relaciones precargadas o None si no existe
+        """
+        return (
+            Vuelo.objects.select_related("avion")
+            .prefetch_related(
+                "avion__asiento_set",
+                Prefetch(
+                    "inventario",
+                    queryset=AsientoVuelo.objects.select_related("reserva__pasajero"),
+                ),
+            )
+            .filter(id=vuelo_id)
+            .first()
+        )
+
+    @staticmethod
+    def get_version_inventario(vuelo_id, ahora):
+        """
+        Obtener la versión de inventario de un vuelo con una sola consulta.
+        Además de la versión cuenta las retenciones vencidas que todavía no
+        se liberaron, porque cambian el mapa sin pasar por una escritura.
+
+        Args:
+            vuelo_id: ID del vuelo
+            ahora: Momento de referencia para el vencimiento de las retenciones
+
+        Returns:
+            Tupla (version_inventario, retenciones_vencidas) o None si no existe
+        """
+        return (
+            Vuelo.objects.filter(id=vuelo_id)
+            .annotate(
+                vencidas=Count(
+                    "inventario",
+                    filter=Q(
+                        inventario__estado="retenido",
+                        inventario__retenido_hasta__lte=ahora,
+                    ),
+                )
+            )
+            .values_list("version_inventario", "vencidas")
+            .first()
+        )
+
+    @staticmethod
+    def get_inventario_modificado(vuelo_id, desde_version, ahora):
+        """
+        Obtener las filas del inventario de un vuelo que cambiaron después de
+        una versión, junto con las retenciones que vencieron sin liberarse.
+
+        Args:
+            vuelo_id: ID del vuelo
+            desde_version: Última versión conocida por el cliente
+            ahora: Momento de referencia para el vencimiento de las retenciones
+
+        Returns:
+            QuerySet de AsientoVuelo con asiento, reserva y pasajero precargados
+        """
+        return (
+            AsientoVuelo.objects.filter(vuelo_id=vuelo_id)
+            .filter(
+                Q(version__gt=desde_version)
+                | Q(estado="retenido", retenido_hasta__lte=ahora)
+            )
+            .select_related("asiento", "reserva__pasajero")
+            .order_by("asiento__fila", "asiento__columna")
+        )
+
     @staticmethod
     def filter_vuelos(
-        origen=None, destino=None, fecha=None, estado=None, fecha_desde=None
+        origen=None,
+        destino=None,
+        fecha=None,
+        estado=None,
+        fecha_desde=None,
+        min_asientos=None,
+        clase=None,
     ):
         """
         Filtrar vuelos por múltiples criterios.
         Todos los filtros son opcionales y se aplican solo si se proporcionan.
 
         Args:
-            origen: Filtrar por ciudad de origen (búsqueda parcial)
-            destino: Filtrar por ciudad de destino (búsqueda parcial)
+            origen: Código o parte del nombre de la ciudad de origen
+                (sin distinguir tildes ni mayúsculas)
+            destino: Código o parte del nombre de la ciudad de destino
             fecha: Filtrar por fecha exacta de salida
             estado: Filtrar por estado del vuelo
             fecha_desde: Filtrar vuelos desde una fecha específica
+            min_asientos: Mínimo de asientos libres (usa los contadores del vuelo)
+            clase: Tipo de asiento al que se aplica min_asientos
+                (economico, ejecutivo, primera); None = cualquier clase
 
         Returns:
             QuerySet de Vuelo filtrado y ordenado por fecha_salida
         """
         queryset = Vuelo.objects.select_related("avion").all()
 
-        # Filtro por origen (búsqueda parcial, case-insensitive)
+        # Filtro por origen y destino: el texto se resuelve primero a
+        # aeropuertos y los vuelos se filtran por igualdad sobre el índice
+        # de la ruta
         if origen:
-            queryset = queryset.filter(origen__icontains=origen)
-
-        # Filtro por destino (búsqueda parcial, case-insensitive)
+            queryset = queryset.filter(
+                aeropuerto_origen_id__in=AeropuertoRepository.get_ids_por_texto(origen)
+            )
         if destino:
-            queryset = queryset.filter(destino__icontains=destino)
+            queryset = queryset.filter(
+                aeropuerto_destino_id__in=AeropuertoRepository.get_ids_por_texto(destino)
+            )
 
-        # Filtro por fecha exacta
+        # Filtro por fecha exacta, como rango semiabierto sobre fecha_salida
+        # para que la consulta pueda usar los índices que la incluyen
         if fecha:
             # Convertir string a datetime si es necesario
             if isinstance(fecha, str):
                 try:
                     fecha = datetime.strptime(fecha, "%Y-%m-%d").date()
                 except ValueError:
-                    pass
-            queryset = queryset.filter(fecha_salida__date=fecha)
+                    return queryset.none()
+            inicio, fin = rango_del_dia(fecha)
+            queryset = queryset.filter(fecha_salida__gte=inicio, fecha_salida__lt=fin)
 
         # Filtro por fecha desde (para vuelos futuros)
         if fecha_desde:
@@ -216,6 +587,11 @@ class VueloRepository:
         if estado:
             queryset = queryset.filter(estado=estado)
 
+        # Filtro por disponibilidad, resuelto con los contadores del vuelo
+        if min_asientos:
+            campo = Vuelo.CAMPOS_LIBRES_POR_TIPO.get(clase, "asientos_libres")
+            queryset = queryset.filter(**{f"{campo}__gte": min_asientos})
+
         return queryset.order_by("fecha_salida")
 
     @staticmethod
@@ -232,24 +608,82 @@ class VueloRepository:
         return Vuelo.objects.create(**data)
 
     @staticmethod
-    def update(vuelo_id, data):
+    def update(vuelo_id, data, version=None):
         """
         Actualizar un vuelo existente.
 
         Args:
             vuelo_id: ID del vuelo a actualizar
             data: Diccionario con los campos a actualizar
+            version: Versión esperada del vuelo (por defecto, la leída acá)
 
         Returns:
             Objeto Vuelo actualizado o None si no existe
+
+        Raises:
+            ConflictoVersion: Si el vuelo ya no está en la versión esperada
         """
         vuelo = VueloRepository.get_by_id(vuelo_id)
         if vuelo:
+            if version is not None:
+                vuelo.version = version
             for key, value in data.items():
                 setattr(vuelo, key, value)
             vuelo.save()
         return vuelo
 
+    @staticmethod
+    def get_tramos(vuelo_ids=None):
+        """
+        Obtener los próximos vuelos que pueden formar parte de una conexión
+        (programados o retrasados, con sus aeropuertos resueltos).
+
+        Args:
+            vuelo_ids: Limitar a estos vuelos (None: todos)
+
+        Returns:
+            Iterador de tuplas con las columnas de grafo_rutas.Tramo
+        """
+        queryset = Vuelo.objects.filter(
+            fecha_salida__gte=timezone.now(),
+            estado__in=("programado", "retrasado"),
+            aeropuerto_origen__isnull=False,
+            aeropuerto_destino__isnull=False,
+        )
+        if vuelo_ids is not None:
+            queryset = queryset.filter(id__in=vuelo_ids)
+        return queryset.order_by().values_list(
+            "id",
+            "aeropuerto_origen_id",
+            "aeropuerto_destino_id",
+            "origen",
+            "destino",
+            "fecha_salida",
+            "fecha_llegada",
+            "precio_base",
+            "asientos_libres",
+        ).iterator(chunk_size=5000)
+
+    @staticmethod
+    def marcar_cancelado(vuelo_id):
+        """
+        Marcar un vuelo como cancelado con un único UPDATE, que además
+        bloquea el vuelo hasta el fin de la transacción.
+
+        Args:
+            vuelo_id: ID del vuelo
+
+        Returns:
+            True si el vuelo existe
+        """
+        actualizados = Vuelo.objects.filter(pk=vuelo_id).update(
+            estado="cancelado",
+            version=F("version") + 1,
+            version_inventario=F("version_inventario") + 1,
+        )
+        invalidar_vuelos([vuelo_id], estados=["cancelado"])
+        return bool(actualizados)
+
     @staticmethod
     def delete(vuelo_id):
         """
@@ -271,7 +705,8 @@ class VueloRepository:
     def get_asientos_con_disponibilidad(vuelo_id):
         """
         Obtener todos los asientos del avión con su estado de disponibilidad para un vuelo.
-        Usa el método del modelo Vuelo que calcula la disponibilidad.
+        Usa el método del modelo Vuelo que calcula la disponibilidad; la cantidad
+        de consultas es constante sin importar el tamaño del avión.
 
         Args:
             vuelo_id: ID del vuelo
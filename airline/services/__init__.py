@@ -5,6 +5,7 @@ Services para lógica de negocio
 from .vuelo_service import VueloService, AvionService, AsientoService
 from .pasajero_service import PasajeroService
 from .reserva_service import ReservaService, BoletoService
+from .evento_service import EventoService
 
 __all__ = [
     "VueloService",
@@ -13,4 +14,5 @@ __all__ = [
     "PasajeroService",
     "ReservaService",
     "BoletoService",
+    "EventoService",
 ]
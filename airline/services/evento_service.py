@@ -0,0 +1,131 @@
+"""
+Services para el registro de eventos de reservas
+
+Este módulo acumula los cambios de estado registrados en EventoReserva en el
+resumen por vuelo, clase y estado (ResumenEstado). Los reportes parten del
+resumen y reproducen solo los eventos posteriores a su punto de control, sin
+recorrer las tablas de reservas y boletos.
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from airline.repositories import EventoRepository
+
+# Consumidor del registro de eventos que mantiene ResumenEstado
+PUNTO_CONTROL_RESUMEN = "resumen_estados"
+
+
+class EventoService:
+    """
+    Service para consolidar, compactar y consultar el registro de eventos
+    """
+
+    @staticmethod
+    def _deltas(eventos):
+        """
+        Convertir eventos en cambios de cantidad por (entidad, vuelo, clase, estado)
+
+        Cada evento resta uno a su estado anterior (si lo tiene) y suma uno a
+        su estado nuevo; las reservas eliminadas solo restan.
+        """
+        deltas = Counter()
+        for _, entidad, vuelo_id, clase, anterior, nuevo in eventos:
+            if anterior:
+                deltas[(entidad, vuelo_id, clase, anterior)] -= 1
+            if nuevo != "eliminada":
+                deltas[(entidad, vuelo_id, clase, nuevo)] += 1
+        return {clave: cantidad for clave, cantidad in deltas.items() if cantidad}
+
+    @staticmethod
+    def consolidar(lote=1000, margen_segundos=60):
+        """
+        Acumular en el resumen los eventos posteriores al punto de control
+
+        Cada lote se aplica en su propia transacción junto con el avance del
+        punto de control, así que una consolidación interrumpida retoma donde
+        quedó sin contar eventos dos veces. La consolidación se detiene en el
+        primer evento (en orden de ID) más reciente que el margen y deja ese
+        evento y todos los siguientes para la próxima ejecución: un ID menor
+        puede confirmarse después que uno mayor y no debe quedar atrás del
+        punto de control.
+
+        Args:
+            lote (int): Cantidad máxima de eventos por transacción
+            margen_segundos (int): Antigüedad mínima de los eventos a acumular
+
+        Returns:
+            dict: Eventos procesados y último evento acumulado
+        """
+        hasta = timezone.now() - timedelta(seconds=margen_segundos)
+        procesados = 0
+        while True:
+            with transaction.atomic():
+                punto = EventoRepository.get_punto_control(PUNTO_CONTROL_RESUMEN)
+                eventos = EventoRepository.get_posteriores(punto.ultimo_evento, lote, hasta=hasta)
+                if not eventos:
+                    break
+                EventoRepository.aplicar_al_resumen(EventoService._deltas(eventos))
+                EventoRepository.guardar_punto_control(punto, eventos[-1][0])
+                procesados += len(eventos)
+            if len(eventos) < lote:
+                break
+
+        return {
+            "eventos_procesados": procesados,
+            "ultimo_evento": EventoRepository.get_ultimo_evento(PUNTO_CONTROL_RESUMEN),
+        }
+
+    @staticmethod
+    def compactar(dias):
+        """
+        Eliminar los eventos ya acumulados en el resumen con más de `dias` de antigüedad
+
+        Args:
+            dias (int): Días de eventos a conservar
+
+        Returns:
+            int: Cantidad de eventos eliminados
+        """
+        with transaction.atomic():
+            punto = EventoRepository.get_punto_control(PUNTO_CONTROL_RESUMEN)
+            return EventoRepository.compactar(
+                punto.ultimo_evento, timezone.now() - timedelta(days=dias)
+            )
+
+    @staticmethod
+    def get_resumen_vuelo(vuelo_id):
+        """
+        Obtener la cantidad actual de reservas y boletos de un vuelo por
+        clase y estado
+
+        Parte del resumen acumulado y le suma los eventos del vuelo
+        posteriores al punto de control, que se bloquea durante la lectura
+        para que una consolidación en curso no haga contar eventos dos veces.
+
+        Args:
+            vuelo_id (int): ID del vuelo
+
+        Returns:
+            list: Diccionarios con entidad, clase, estado y cantidad
+        """
+        with transaction.atomic():
+            ultimo = EventoRepository.get_punto_control(PUNTO_CONTROL_RESUMEN).ultimo_evento
+            cantidades = Counter(
+                {
+                    (fila.entidad, fila.clase, fila.estado): fila.cantidad
+                    for fila in EventoRepository.get_resumen([vuelo_id])
+                }
+            )
+            eventos = EventoRepository.get_posteriores(ultimo, None, vuelo_id=vuelo_id)
+        for (entidad, _, clase, estado), cantidad in EventoService._deltas(eventos).items():
+            cantidades[(entidad, clase, estado)] += cantidad
+
+        return [
+            {"entidad": entidad, "clase": clase, "estado": estado, "cantidad": cantidad}
+            for (entidad, clase, estado), cantidad in sorted(cantidades.items())
+            if cantidad
+        ]
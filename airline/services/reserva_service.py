@@ -5,16 +5,24 @@ Este módulo contiene las capas de servicios para reservas y boletos.
 Implementa todas las reglas de negocio complejas como validación de
 disponibilidad de asientos, estados de reservas, generación de boletos, etc.
 """
-from django.db import transaction
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
 from airline.repositories import (
     ReservaRepository,
     BoletoRepository,
     VueloRepository,
     PasajeroRepository,
     AsientoRepository,
+    CupoRepository,
+    ListaEsperaRepository,
 )
-from airline.models import Vuelo, Pasajero, Asiento, Reserva,  User
+from airline.models import Vuelo, Pasajero, Asiento, Reserva, User, ConflictoVersion, SinCupo
 from rest_framework.exceptions import ValidationError, NotFound
+from airline.services.vuelo_service import AsientoService
 
 
 class ReservaService:
@@ -81,10 +89,24 @@ class ReservaService:
         vuelo=None, vuelo_id=None,
         pasajero=None, pasajero_id=None,
         asiento=None, asiento_id=None,
+        clase=None,
         codigo_reserva=None,
         precio=None,
         estado="pendiente"
     ) -> Reserva:
+        """
+        Crear una reserva, con asiento o solo con la clase
+
+        Con asiento, el asiento debe estar libre en el vuelo (las pendientes
+        lo retienen). Sin asiento se vende un lugar del cupo de la clase,
+        sobreventa incluida, y el asiento se asigna después con
+        asignar_asiento (check-in).
+
+        Raises:
+            NotFound: Si el vuelo, el pasajero o el asiento no existen
+            ValidationError: Si el asiento no está libre o no quedan lugares
+                en la clase
+        """
         # Resolver objetos a partir de IDs si hace falta
         if vuelo is None:
             if vuelo_id is None:
@@ -102,36 +124,281 @@ class ReservaService:
             except Pasajero.DoesNotExist:
                 raise NotFound("Pasajero no encontrado")
 
-        if asiento is None:
-            if asiento_id is None:
-                raise ValidationError({"asiento": "Debe indicar 'asiento' o 'asiento_id'."})
+        if asiento is None and asiento_id is not None:
             try:
                 asiento = Asiento.objects.get(pk=asiento_id)
             except Asiento.DoesNotExist:
                 raise NotFound("Asiento no encontrado")
+        if asiento is None and clase is None:
+            raise ValidationError(
+                {"asiento": "Debe indicar 'asiento', 'asiento_id' o 'clase'."}
+            )
+
+        if vuelo.estado == "cancelado":
+            raise ValidationError({"vuelo": "El vuelo está cancelado."})
+
+        if asiento is None:
+            return ReservaService._vender_sin_asiento(
+                vuelo, pasajero, clase, codigo_reserva, precio, estado
+            )
 
-        # Validaciones de negocio
-        if asiento.avion_id != vuelo.avion_id:
+        # Validaciones de negocio sobre el inventario de este asiento en este
+        # vuelo. Las reservas confirmadas bloquean la fila; las pendientes
+        # obtienen una retención con un UPDATE condicional atómico.
+        inventario = AsientoRepository.get_inventario(
+            vuelo.id, asiento.id, bloquear=(estado == "confirmada")
+        )
+        if inventario is None:
             raise ValidationError({"asiento": "El asiento no pertenece al avión de este vuelo."})
 
-        if Reserva.objects.filter(vuelo=vuelo, asiento=asiento, estado="confirmada").exists():
+        if inventario.estado_actual() != "disponible":
             raise ValidationError({"asiento": "El asiento ya está reservado para este vuelo."})
 
         # Precio por defecto desde el vuelo
         if precio is None:
             precio = vuelo.precio_base
 
-        # Crear
-        reserva = Reserva.objects.create(
-            vuelo=vuelo,
-            pasajero=pasajero,
-            asiento=asiento,
-            codigo_reserva=codigo_reserva,
-            precio=precio,
-            estado=estado,
+        expira_en = None
+        if estado == "pendiente":
+            expira_en = timezone.now() + timedelta(
+                minutes=settings.RETENCION_ASIENTO_MINUTOS
+            )
+
+        # Crear (consume el cupo de la clase del asiento)
+        try:
+            reserva = Reserva.objects.create(
+                vuelo=vuelo,
+                pasajero=pasajero,
+                asiento=asiento,
+                codigo_reserva=codigo_reserva,
+                precio=precio,
+                estado=estado,
+                expira_en=expira_en,
+            )
+        except SinCupo as exc:
+            raise ValidationError({"asiento": exc.messages})
+
+        if estado == "pendiente" and not AsientoRepository.retener(reserva, expira_en):
+            raise ValidationError({"asiento": "El asiento ya está reservado para este vuelo."})
+        return reserva
+
+    @staticmethod
+    def _vender_sin_asiento(vuelo, pasajero, clase, codigo_reserva, precio, estado):
+        """Crear una reserva que solo consume el cupo de su clase"""
+        if clase not in dict(Asiento.tipo_choices):
+            raise ValidationError({"clase": "Clase de asiento inválida."})
+        expira_en = None
+        if estado == "pendiente":
+            expira_en = timezone.now() + timedelta(
+                minutes=settings.RETENCION_ASIENTO_MINUTOS
+            )
+        try:
+            return Reserva.objects.create(
+                vuelo=vuelo,
+                pasajero=pasajero,
+                clase=clase,
+                codigo_reserva=codigo_reserva,
+                precio=vuelo.precio_base if precio is None else precio,
+                estado=estado,
+                expira_en=expira_en,
+            )
+        except SinCupo as exc:
+            raise ValidationError({"clase": exc.messages})
+
+    @staticmethod
+    @transaction.atomic
+    def asignar_asiento(reserva_id, asiento_id=None):
+        """
+        Asignar el asiento de una reserva vendida sin asiento (check-in)
+
+        Si no se indica el asiento se elige uno libre de la clase de la
+        reserva. El cupo no cambia: el lugar ya estaba vendido o retenido.
+
+        Args:
+            reserva_id (int): ID de la reserva
+            asiento_id (int): Asiento elegido (opcional)
+
+        Returns:
+            Reserva: Reserva con su asiento
+
+        Raises:
+            NotFound: Si la reserva no existe
+            ValidationError: Si la reserva ya tiene asiento o está cancelada,
+                o si el asiento no es de su clase o no está libre
+        """
+        reserva = ReservaRepository.get_by_id(reserva_id)
+        if not reserva:
+            raise NotFound("Reserva no encontrada")
+        if reserva.estado == "cancelada":
+            raise ValidationError("No se puede asignar asiento a una reserva cancelada")
+        if reserva.asiento_id:
+            raise ValidationError("La reserva ya tiene asiento")
+
+        if asiento_id is None:
+            asiento_id = AsientoService.asignar_asientos(reserva.vuelo_id, reserva.clase, 1)[0][
+                "asiento_id"
+            ]
+        inventario = AsientoRepository.get_inventario(
+            reserva.vuelo_id, asiento_id, bloquear=True
         )
+        if inventario is None:
+            raise ValidationError({"asiento": "El asiento no pertenece al avión de este vuelo."})
+        if inventario.tipo != reserva.clase:
+            raise ValidationError({"asiento": f"El asiento no es de clase {reserva.clase}."})
+        if inventario.estado_actual() != "disponible":
+            raise ValidationError({"asiento": "El asiento ya está reservado para este vuelo."})
+
+        reserva.asiento = inventario.asiento
+        try:
+            reserva.save(update_fields=["asiento"])
+        except SinCupo as exc:
+            raise ValidationError({"asiento": exc.messages})
         return reserva
 
+    # Cantidad máxima de pasajeros por reserva grupal
+    MAX_PASAJEROS_GRUPO = 50
+
+    @staticmethod
+    @transaction.atomic
+    def create_reservas_grupo(*, vuelo_id, pasajeros, clase=None, estado="pendiente"):
+        """
+        Crear las reservas de un grupo de pasajeros en un mismo vuelo
+
+        Es todo o nada: valida en lote todos los pares pasajero/asiento,
+        bloquea una sola vez el inventario involucrado e inserta todas las
+        reservas con bulk_create dentro de una transacción. La cantidad de
+        consultas no depende del tamaño del grupo.
+
+        Args:
+            vuelo_id (int): ID del vuelo
+            pasajeros (list): Diccionarios con "pasajero" (ID) y opcionalmente
+                "asiento" (ID); los que no indican asiento reciben uno del
+                mejor bloque libre de la clase indicada
+            clase (str): Clase para asignar los asientos no indicados
+            estado (str): "pendiente" (retiene los asientos) o "confirmada"
+
+        Returns:
+            list: Reservas creadas, en el orden recibido
+
+        Raises:
+            NotFound: Si el vuelo no existe
+            ValidationError: Si algún pasajero o asiento no es válido o no
+                está disponible; en ese caso no se crea ninguna reserva
+        """
+        if estado not in ("pendiente", "confirmada"):
+            raise ValidationError({"estado": "Debe ser 'pendiente' o 'confirmada'."})
+        if not pasajeros:
+            raise ValidationError({"pasajeros": "Debe indicar al menos un pasajero."})
+        if len(pasajeros) > ReservaService.MAX_PASAJEROS_GRUPO:
+            raise ValidationError(
+                {
+                    "pasajeros": f"Máximo {ReservaService.MAX_PASAJEROS_GRUPO} "
+                    "pasajeros por grupo."
+                }
+            )
+
+        pasajero_ids = [item["pasajero"] for item in pasajeros]
+        if len(set(pasajero_ids)) != len(pasajero_ids):
+            raise ValidationError({"pasajeros": "Hay pasajeros repetidos."})
+        indicados = [item["asiento"] for item in pasajeros if item.get("asiento")]
+        if len(set(indicados)) != len(indicados):
+            raise ValidationError({"asiento": "Hay asientos repetidos."})
+
+        vuelo = VueloRepository.get_by_id(vuelo_id)
+        if not vuelo:
+            raise NotFound("Vuelo no encontrado")
+        if vuelo.estado == "cancelado":
+            raise ValidationError({"vuelo": "El vuelo está cancelado."})
+
+        # Asignar automáticamente los asientos que no se indicaron
+        sin_asiento = [item for item in pasajeros if not item.get("asiento")]
+        asignados = {}
+        if sin_asiento:
+            if clase is None:
+                raise ValidationError(
+                    {"clase": "Debe indicar la clase para asignar los asientos."}
+                )
+            sugeridos = AsientoService.asignar_asientos(
+                vuelo_id, clase, len(sin_asiento), excluir=set(indicados)
+            )
+            asignados = {
+                item["pasajero"]: sugerido["asiento_id"]
+                for item, sugerido in zip(sin_asiento, sugeridos)
+            }
+        asiento_por_pasajero = {
+            item["pasajero"]: item.get("asiento") or asignados[item["pasajero"]]
+            for item in pasajeros
+        }
+
+        encontrados = PasajeroRepository.get_by_ids(pasajero_ids)
+        faltantes = [pid for pid in pasajero_ids if pid not in encontrados]
+        if faltantes:
+            raise ValidationError({"pasajeros": f"Pasajeros inexistentes: {faltantes}"})
+
+        con_reserva = ReservaRepository.get_pasajeros_con_reserva(vuelo_id, pasajero_ids)
+        if con_reserva:
+            raise ValidationError(
+                {"pasajeros": f"Ya tienen reserva en este vuelo: {sorted(con_reserva)}"}
+            )
+
+        # Bloquear una sola vez el inventario de todos los asientos del grupo
+        inventario = AsientoRepository.get_inventario_lote(
+            vuelo_id, asiento_por_pasajero.values(), bloquear=True
+        )
+        no_disponibles = [
+            asiento_id
+            for asiento_id in asiento_por_pasajero.values()
+            if asiento_id not in inventario
+            or inventario[asiento_id].estado_actual() != "disponible"
+        ]
+        if no_disponibles:
+            raise ValidationError(
+                {"asiento": f"Asientos no disponibles en este vuelo: {no_disponibles}"}
+            )
+
+        # Un UPDATE condicional por clase sobre el cupo del vuelo
+        por_clase = Counter(inventario[a].tipo for a in asiento_por_pasajero.values())
+        sin_cupo = [
+            tipo
+            for tipo, cantidad in por_clase.items()
+            if not CupoRepository.tomar(vuelo_id, tipo, estado, cantidad)
+        ]
+        if sin_cupo:
+            raise ValidationError({"clase": f"No quedan lugares en: {sin_cupo}"})
+
+        expira_en = None
+        if estado == "pendiente":
+            expira_en = timezone.now() + timedelta(
+                minutes=settings.RETENCION_ASIENTO_MINUTOS
+            )
+
+        codigos = Reserva.generar_codigos(len(pasajero_ids))
+        reservas = ReservaRepository.create_lote(
+            [
+                Reserva(
+                    vuelo=vuelo,
+                    pasajero=encontrados[pasajero_id],
+                    asiento=inventario[asiento_por_pasajero[pasajero_id]].asiento,
+                    clase=inventario[asiento_por_pasajero[pasajero_id]].tipo,
+                    codigo_reserva=codigo,
+                    precio=vuelo.precio_base,
+                    estado=estado,
+                    expira_en=expira_en,
+                )
+                for pasajero_id, codigo in zip(pasajero_ids, codigos)
+            ]
+        )
+
+        asignado = AsientoRepository.asignar_lote(
+            vuelo_id,
+            reservas,
+            "retenido" if estado == "pendiente" else "ocupado",
+            expira_en,
+        )
+        if not asignado:
+            raise ValidationError({"asiento": "Alguno de los asientos ya no está disponible."})
+        return reservas
+
     @staticmethod
     def confirmar_reserva(reserva_id):
         """
@@ -160,7 +427,23 @@ class ReservaService:
         if reserva.estado == "cancelada":
             raise ValidationError("No se puede confirmar una reserva cancelada")
 
-        return ReservaRepository.cambiar_estado(reserva_id, "confirmada")
+        with transaction.atomic():
+            if reserva.asiento_id is None:
+                # Vendida sin asiento: solo pasa el lugar de retenido a vendido
+                reserva.cambiar_estado("confirmada")
+                return reserva
+            inventario = AsientoRepository.get_inventario(
+                reserva.vuelo_id, reserva.asiento_id, bloquear=True
+            )
+            if inventario is None or (
+                inventario.reserva_id != reserva.id
+                and inventario.estado_actual() != "disponible"
+            ):
+                raise ValidationError(
+                    "La retención del asiento venció y el asiento ya no está disponible"
+                )
+            reserva.cambiar_estado("confirmada")
+            return reserva
 
     @staticmethod
     def cancelar_reserva(reserva_id):
@@ -168,7 +451,9 @@ class ReservaService:
         Cancelar una reserva existente
 
         Cambia el estado de la reserva a 'cancelada'. Si la reserva tiene
-        un boleto asociado, también lo anula automáticamente.
+        un boleto asociado, también lo anula automáticamente. El lugar
+        liberado pasa, en la misma transacción, al primero de la lista de
+        espera de su clase.
 
         Args:
             reserva_id (int): ID de la reserva a cancelar
@@ -187,11 +472,293 @@ class ReservaService:
         if reserva.estado == "cancelada":
             raise ValidationError("La reserva ya está cancelada")
 
-        # Si tiene boleto asociado, anularlo automáticamente
-        if hasattr(reserva, "boleto"):
-            BoletoService.anular_boleto(reserva.boleto.id)
+        with transaction.atomic():
+            # Si tiene boleto asociado, anularlo automáticamente
+            BoletoRepository.anular_por_reservas([reserva.id])
+            reserva.cambiar_estado("cancelada")
+            ReservaService.promover_lista_espera(
+                reserva.vuelo, reserva.clase, asiento_id=reserva.asiento_id
+            )
+        return reserva
+
+    @staticmethod
+    def eliminar_reserva(reserva_id):
+        """
+        Eliminar una reserva
+
+        Si la reserva estaba activa, su lugar pasa, en la misma transacción,
+        al primero de la lista de espera de su clase.
+
+        Args:
+            reserva_id (int): ID de la reserva a eliminar
+
+        Raises:
+            NotFound: Si la reserva no existe
+        """
+        reserva = ReservaRepository.get_by_id(reserva_id)
+        if not reserva:
+            raise NotFound("Reserva no encontrada")
 
-        return ReservaRepository.cambiar_estado(reserva_id, "cancelada")
+        with transaction.atomic():
+            ReservaRepository.delete(reserva.id)
+            if reserva.estado != "cancelada":
+                ReservaService.promover_liberados(
+                    [(reserva.vuelo_id, reserva.clase, reserva.asiento_id)]
+                )
+
+    @staticmethod
+    def agregar_lista_espera(*, vuelo_id, pasajero_id, clase):
+        """
+        Agregar un pasajero a la lista de espera de una clase de un vuelo
+
+        Solo se puede esperar cuando la clase no tiene lugares para vender.
+
+        Args:
+            vuelo_id (int): ID del vuelo
+            pasajero_id (int): ID del pasajero
+            clase (str): Clase de asiento
+
+        Returns:
+            ListaEspera: Entrada creada
+
+        Raises:
+            NotFound: Si el vuelo o el pasajero no existen
+            ValidationError: Si el vuelo está cancelado, la clase no es
+                válida o tiene lugares, o el pasajero ya reservó o espera
+        """
+        vuelo = VueloRepository.get_by_id(vuelo_id)
+        if not vuelo:
+            raise NotFound("Vuelo no encontrado")
+        if not PasajeroRepository.get_by_id(pasajero_id):
+            raise NotFound("Pasajero no encontrado")
+        if vuelo.estado == "cancelado":
+            raise ValidationError({"vuelo": "El vuelo está cancelado."})
+
+        cupo = CupoRepository.get_por_vuelo(vuelo_id).get(clase)
+        if cupo is None:
+            raise ValidationError({"clase": "El vuelo no tiene asientos de esa clase."})
+        if cupo.disponibles > 0:
+            raise ValidationError({"clase": "Hay lugares disponibles en esa clase."})
+        if ReservaRepository.get_pasajeros_con_reserva(vuelo_id, [pasajero_id]):
+            raise ValidationError({"pasajero": "Ya tiene una reserva en este vuelo."})
+        if ListaEsperaRepository.esta_esperando(vuelo_id, pasajero_id):
+            raise ValidationError({"pasajero": "Ya está en la lista de espera de este vuelo."})
+        return ListaEsperaRepository.create(vuelo_id, pasajero_id, clase)
+
+    @staticmethod
+    def get_posicion_lista_espera(entrada):
+        """
+        Obtener la posición (desde 1) de una entrada en su cola, o None si
+        ya no está en espera
+        """
+        if entrada.estado != "esperando":
+            return None
+        return ListaEsperaRepository.get_posicion(entrada)
+
+    @staticmethod
+    def retirar_lista_espera(entrada_id):
+        """
+        Sacar una entrada de la lista de espera
+
+        Raises:
+            NotFound: Si la entrada no existe
+            ValidationError: Si la entrada ya no está en espera
+        """
+        entrada = ListaEsperaRepository.get_by_id(entrada_id)
+        if not entrada:
+            raise NotFound("Entrada de lista de espera no encontrada")
+        if entrada.estado != "esperando":
+            raise ValidationError("La entrada ya no está en espera")
+        return ListaEsperaRepository.cambiar_estado(entrada, "retirada")
+
+    @staticmethod
+    def promover_lista_espera(vuelo, clase, asiento_id=None):
+        """
+        Dar un lugar liberado al primero de la lista de espera de una clase
+
+        Debe llamarse dentro de la transacción que liberó el lugar. La
+        entrada se toma de la cola con SKIP LOCKED, de modo que las
+        cancelaciones concurrentes no se bloquean entre sí ni promueven dos
+        veces al mismo pasajero. El promovido recibe una reserva pendiente
+        (con la retención habitual) y, si se indica y sigue libre, el
+        asiento liberado; si no, queda sin asiento hasta el check-in.
+
+        Args:
+            vuelo (Vuelo): Vuelo donde se liberó el lugar
+            clase (str): Clase del lugar liberado
+            asiento_id (int): Asiento liberado (opcional)
+
+        Returns:
+            Reserva: Reserva del pasajero promovido, o None si nadie espera
+                o ya no hay cupo. Las entradas de pasajeros que ya reservaron
+                en el vuelo se retiran y se pasa a la siguiente.
+        """
+        expira_en = timezone.now() + timedelta(minutes=settings.RETENCION_ASIENTO_MINUTOS)
+        while True:
+            entrada = ListaEsperaRepository.tomar_siguiente(vuelo.id, clase)
+            if entrada is None:
+                return None
+            try:
+                with transaction.atomic():
+                    reserva = Reserva.objects.create(
+                        vuelo=vuelo,
+                        pasajero_id=entrada.pasajero_id,
+                        asiento_id=asiento_id,
+                        clase=clase,
+                        precio=vuelo.precio_base,
+                        estado="pendiente",
+                        expira_en=expira_en,
+                    )
+                break
+            except SinCupo:
+                return None
+            except IntegrityError:
+                # El pasajero reservó por su cuenta mientras esperaba
+                ListaEsperaRepository.cambiar_estado(entrada, "retirada")
+
+        if asiento_id and not AsientoRepository.retener(reserva, expira_en):
+            reserva.asiento = None
+            reserva.save(update_fields=["asiento"])
+        ListaEsperaRepository.cambiar_estado(entrada, "promovida", reserva)
+        return reserva
+
+    @staticmethod
+    def promover_liberados(lugares):
+        """
+        Dar los lugares liberados por un lote de reservas a la lista de espera
+
+        Debe llamarse dentro de la transacción que liberó los lugares. Cada
+        lugar se ofrece al siguiente de la cola de su clase; cuando una
+        clase se queda sin espera o sin cupo, sus lugares restantes se saltean.
+
+        Args:
+            lugares (list): Tuplas (vuelo_id, clase, asiento_id) de los
+                lugares liberados
+
+        Returns:
+            list: Reservas de los pasajeros promovidos
+        """
+        vuelos = {}
+        agotadas = set()
+        promovidas = []
+        for vuelo_id, clase, asiento_id in lugares:
+            if (vuelo_id, clase) in agotadas:
+                continue
+            if vuelo_id not in vuelos:
+                vuelos[vuelo_id] = VueloRepository.get_by_id(vuelo_id)
+            vuelo = vuelos[vuelo_id]
+            reserva = None
+            if vuelo and vuelo.estado != "cancelado":
+                reserva = ReservaService.promover_lista_espera(vuelo, clase, asiento_id=asiento_id)
+            if reserva is None:
+                agotadas.add((vuelo_id, clase))
+            else:
+                promovidas.append(reserva)
+        return promovidas
+
+    @staticmethod
+    def cambiar_estado(reserva_id, nuevo_estado):
+        """
+        Aplicar una transición de estado a una reserva
+
+        Args:
+            reserva_id (int): ID de la reserva
+            nuevo_estado (str): "confirmada" o "cancelada"
+
+        Returns:
+            Reserva: Objeto reserva actualizado
+
+        Raises:
+            NotFound: Si la reserva no existe
+            ValidationError: Si la transición no está permitida
+        """
+        if nuevo_estado == "confirmada":
+            return ReservaService.confirmar_reserva(reserva_id)
+        if nuevo_estado == "cancelada":
+            return ReservaService.cancelar_reserva(reserva_id)
+        raise ValidationError({"estado": "Debe ser 'confirmada' o 'cancelada'."})
+
+    @staticmethod
+    def confirmar_reservas(reserva_ids):
+        """
+        Confirmar varias reservas pendientes con UPDATEs por conjunto
+
+        Solo se confirman las reservas pendientes que siguen reteniendo su
+        asiento; las demás quedan como estaban.
+
+        Args:
+            reserva_ids (list): IDs de las reservas a confirmar
+
+        Returns:
+            dict: Cantidad de reservas confirmadas e IDs de las que no cambiaron
+        """
+        confirmadas = set(ReservaRepository.transicionar_lote(reserva_ids, "confirmada"))
+        return {
+            "reservas_confirmadas": len(confirmadas),
+            "sin_cambios": [rid for rid in reserva_ids if rid not in confirmadas],
+        }
+
+    @staticmethod
+    @transaction.atomic
+    def cancelar_reservas(reserva_ids):
+        """
+        Cancelar varias reservas con UPDATEs por conjunto
+
+        Libera sus asientos, devuelve los vendidos a los contadores de los
+        vuelos y anula sus boletos. Los lugares liberados pasan, en la misma
+        transacción, a la lista de espera. Las reservas ya canceladas se
+        ignoran.
+
+        Args:
+            reserva_ids (list): IDs de las reservas a cancelar
+
+        Returns:
+            dict: Cantidad de reservas canceladas y de boletos anulados
+        """
+        canceladas = ReservaRepository.transicionar_lote(reserva_ids, "cancelada")
+        boletos_anulados = BoletoRepository.anular_por_reservas(canceladas)
+        ReservaService.promover_liberados(ReservaRepository.get_lugares(canceladas))
+        return {
+            "reservas_canceladas": len(canceladas),
+            "boletos_anulados": boletos_anulados,
+        }
+
+    @staticmethod
+    def expirar_reservas_pendientes(lote=500):
+        """
+        Cancelar las reservas pendientes cuya retención venció y liberar
+        sus asientos, además de las retenciones vencidas que hayan quedado
+        huérfanas. Trabaja por lotes con UPDATEs masivos; los lugares de
+        cada lote pasan, en su misma transacción, a la lista de espera.
+
+        Args:
+            lote (int): Cantidad máxima de filas por UPDATE
+
+        Returns:
+            dict: Cantidad de reservas canceladas y de asientos liberados
+        """
+        ahora = timezone.now()
+        reservas_canceladas = 0
+        asientos_liberados = 0
+
+        while True:
+            with transaction.atomic():
+                ids = ReservaRepository.get_ids_pendientes_vencidas(ahora, lote)
+                if not ids:
+                    break
+                # Primero el inventario, que bloquea los vuelos; después las
+                # reservas y sus cupos
+                asientos_liberados += AsientoRepository.liberar_retenciones(ids)
+                canceladas = ReservaRepository.cancelar_lote(ids)
+                reservas_canceladas += len(canceladas)
+                ReservaService.promover_liberados(ReservaRepository.get_lugares(canceladas))
+
+        asientos_liberados += AsientoRepository.liberar_retenciones_vencidas(ahora, lote)
+
+        return {
+            "reservas_canceladas": reservas_canceladas,
+            "asientos_liberados": asientos_liberados,
+        }
 
     @staticmethod
     @transaction.atomic
@@ -200,12 +767,35 @@ class ReservaService:
         reserva_id: int,
         estado=None,
         asiento=None, asiento_id=None,
-        precio=None
+        precio=None,
+        version=None
     ) -> Reserva:
+        """
+        Actualizar una reserva con control de concurrencia optimista
+
+        No bloquea la reserva: el guardado es un UPDATE condicional sobre la
+        versión leída (o la indicada), y si otra operación la modificó
+        entretanto se lanza ConflictoVersion en lugar de pisar su cambio.
+
+        Args:
+            reserva_id (int): ID de la reserva
+            estado (str): Nuevo estado (opcional)
+            asiento / asiento_id: Nuevo asiento (opcional)
+            precio: Nuevo precio (opcional)
+            version (int): Versión que el cliente leyó (opcional)
+
+        Raises:
+            NotFound: Si la reserva no existe
+            ConflictoVersion: Si la reserva ya no está en la versión esperada
+        """
         try:
-            reserva = Reserva.objects.select_for_update().get(pk=reserva_id)
+            reserva = Reserva.objects.select_related("vuelo").get(pk=reserva_id)
         except Reserva.DoesNotExist:
             raise NotFound("Reserva no encontrada")
+        if version is not None and version != reserva.version:
+            raise ConflictoVersion(f"La reserva {reserva_id} cambió desde la versión {version}")
+
+        cambios = []
 
         # Cambiar asiento (opcional)
         if asiento is None and asiento_id is not None:
@@ -217,19 +807,37 @@ class ReservaService:
         if asiento is not None:
             if asiento.avion_id != reserva.vuelo.avion_id:
                 raise ValidationError({"asiento": "El asiento no pertenece al avión del vuelo."})
-            if Reserva.objects.filter(
-                vuelo=reserva.vuelo, asiento=asiento, estado="confirmada"
-            ).exclude(pk=reserva.pk).exists():
+            # El inventario decide: el asiento tiene que estar libre o ser ya
+            # de esta reserva, y queda bloqueado hasta guardar
+            inventario = AsientoRepository.get_inventario(
+                reserva.vuelo_id, asiento.id, bloquear=True
+            )
+            if inventario is None or (
+                inventario.estado_actual() != "disponible" and inventario.reserva_id != reserva.pk
+            ):
                 raise ValidationError({"asiento": "El asiento ya está reservado para este vuelo."})
             reserva.asiento = asiento
+            cambios.append("asiento")
 
-        if estado is not None:
+        if estado is not None and estado != reserva.estado:
+            if not reserva.puede_pasar_a(estado):
+                raise ValidationError(
+                    {"estado": f"No se puede pasar una reserva {reserva.estado} a {estado}."}
+                )
             reserva.estado = estado
+            cambios.append("estado")
 
         if precio is not None:
             reserva.precio = precio
+            cambios.append("precio")
 
-        reserva.save()
+        # Solo se escriben las columnas que cambian; el inventario se toca
+        # únicamente si cambió el estado o el asiento
+        if cambios:
+            try:
+                reserva.save(update_fields=cambios)
+            except SinCupo as exc:
+                raise ValidationError({"asiento": exc.messages})
         return reserva
 
 
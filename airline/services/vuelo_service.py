@@ -4,9 +4,49 @@ Los Services actúan como capa intermedia entre las Views y los Repositories,
 conteniendo la lógica de negocio y validaciones.
 """
 
-from airline.repositories import VueloRepository, AvionRepository, AsientoRepository
+from airline.repositories import (
+    VueloRepository,
+    AvionRepository,
+    AeropuertoRepository,
+    AsientoRepository,
+    CupoRepository,
+)
 from rest_framework.exceptions import ValidationError, NotFound
-from datetime import timedelta
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from airline.utils import construir_mapa_asientos
+from airline.utils.helpers import rango_del_dia
+from airline.utils.aeropuertos import normalizar_ciudad
+from airline.utils.asignacion_asientos import buscar_bloque, estructura_cabina
+from airline.utils.cache_busquedas import TODOS, cache_busquedas
+from airline.utils.grafo_rutas import grafo_rutas
+from airline.utils.paginacion import filtrar_desde
+from airline.models import Asiento, ConflictoVersion
+
+# Columnas de cada vuelo que guarda la caché de búsquedas (las del listado)
+COLUMNAS_BUSQUEDA = (
+    "id",
+    "origen",
+    "destino",
+    "fecha_salida",
+    "fecha_llegada",
+    "precio_base",
+    "estado",
+    "avion__modelo",
+    "asientos_libres",
+    "libres_economico",
+    "libres_ejecutivo",
+    "libres_primera",
+)
+
+# Orden de los resultados de búsqueda, también el de su paginación por posición
+ORDEN_BUSQUEDA = ("fecha_salida", "id")
+
+# Búsqueda de conexiones: escalas permitidas e itinerarios devueltos como máximo
+MAX_ESCALAS = 2
+MAX_ITINERARIOS = 20
 
 
 class AvionService:
@@ -112,7 +152,8 @@ class AsientoService:
     def check_disponibilidad(asiento_id, vuelo_id):
         """
         Verificar si un asiento está disponible para un vuelo específico.
-        Un asiento está disponible si no tiene una reserva confirmada para ese vuelo.
+        Un asiento está disponible si su fila de inventario en ese vuelo está
+        libre (o su retención venció). Se resuelve con una consulta.
 
         Args:
             asiento_id: ID del asiento
@@ -124,15 +165,132 @@ class AsientoService:
         Raises:
             NotFound: Si el asiento o vuelo no existen
         """
-        asiento = AsientoRepository.get_by_id(asiento_id)
+        fila = AsientoRepository.get_inventario(vuelo_id, asiento_id)
+        if fila is None:
+            # Solo en el caso de error se consulta qué es lo que no existe
+            if not AsientoRepository.get_by_id(asiento_id):
+                raise NotFound("Asiento no encontrado")
+            if not VueloRepository.get_by_id(vuelo_id):
+                raise NotFound("Vuelo no encontrado")
+            return False
+
+        return fila.estado_actual() == "disponible"
+
+    @staticmethod
+    def get_asiento_por_codigo(avion_id, numero):
+        """
+        Obtener un asiento de un avión por su código (ej: "1A").
+
+        Args:
+            avion_id: ID del avión
+            numero: Código del asiento
+
+        Returns:
+            Objeto Asiento
+
+        Raises:
+            NotFound: Si el asiento no existe en ese avión
+        """
+        asiento = AsientoRepository.get_by_codigo(avion_id, numero)
         if not asiento:
-            raise NotFound("Asiento no encontrado")
+            raise NotFound("El asiento no existe.")
+        return asiento
+
+    @staticmethod
+    def asignar_asientos(vuelo_id, tipo, cantidad, excluir=()):
+        """
+        Sugerir el mejor bloque de asientos libres y contiguos de una clase
+        para un grupo: primero en la misma fila, después en filas vecinas.
+        Trabaja en memoria con la estructura de cabina precalculada del avión
+        y los asientos libres del vuelo (dos consultas en total).
+
+        Args:
+            vuelo_id: ID del vuelo
+            tipo: Clase de los asientos (economico, ejecutivo, primera)
+            cantidad: Cantidad de personas del grupo
+            excluir: IDs de asientos que no deben sugerirse
+
+        Returns:
+            Lista de diccionarios con asiento_id, numero, fila y columna,
+            ordenada por fila y columna
+
+        Raises:
+            NotFound: Si el vuelo no existe
+            ValidationError: Si la clase o la cantidad no son válidas, o si no
+                hay suficientes asientos libres en la clase
+        """
+        tipos_validos = dict(Asiento.tipo_choices)
+        if tipo not in tipos_validos:
+            raise ValidationError(
+                {"clase": f"Debe ser una de: {', '.join(tipos_validos)}."}
+            )
+        try:
+            cantidad = int(cantidad)
+        except (TypeError, ValueError):
+            raise ValidationError({"cantidad": "Debe ser un número entero."})
+        if cantidad < 1:
+            raise ValidationError({"cantidad": "Debe ser mayor a 0."})
 
         vuelo = VueloRepository.get_by_id(vuelo_id)
         if not vuelo:
             raise NotFound("Vuelo no encontrado")
 
-        return AsientoRepository.check_disponibilidad(asiento_id, vuelo_id)
+        avion = vuelo.avion
+        estructura = estructura_cabina(avion.get_plantilla(), avion.filas, avion.columnas)
+        por_posicion = {
+            (fila, ord(columna) - ord("A")): (asiento_id, numero)
+            for asiento_id, numero, fila, columna in AsientoRepository.get_libres_por_tipo(
+                vuelo_id, tipo
+            )
+            if asiento_id not in excluir
+        }
+
+        bloque = buscar_bloque(estructura, tipo, set(por_posicion), cantidad)
+        if not bloque:
+            raise ValidationError(
+                {"cantidad": "No hay suficientes asientos libres en esa clase."}
+            )
+        return [
+            {
+                "asiento_id": por_posicion[(fila, col)][0],
+                "numero": por_posicion[(fila, col)][1],
+                "fila": fila,
+                "columna": chr(ord("A") + col),
+            }
+            for fila, col in sorted(bloque)
+        ]
+
+    @staticmethod
+    def check_disponibilidad_lote(pares):
+        """
+        Verificar la disponibilidad de una lista de asientos en distintos vuelos.
+        Resuelve toda la lista con una cantidad fija de consultas.
+
+        Args:
+            pares: Lista de tuplas (vuelo_id, codigo_asiento)
+
+        Returns:
+            Lista de diccionarios (en el mismo orden recibido) con vuelo,
+            asiento, asiento_id, existe, estado y disponible
+        """
+        filas = AsientoRepository.check_disponibilidad_lote(pares)
+        ahora = timezone.now()
+
+        resultados = []
+        for vuelo_id, codigo in pares:
+            fila = filas.get((vuelo_id, codigo.upper()))
+            estado = fila.estado_actual(ahora) if fila else None
+            resultados.append(
+                {
+                    "vuelo": vuelo_id,
+                    "asiento": codigo.upper(),
+                    "asiento_id": fila.asiento_id if fila else None,
+                    "existe": fila is not None,
+                    "estado": estado,
+                    "disponible": estado == "disponible",
+                }
+            )
+        return resultados
 
 
 class VueloService:
@@ -169,20 +327,220 @@ class VueloService:
         vuelo = VueloRepository.get_by_id(vuelo_id)
         if not vuelo:
             raise NotFound("Vuelo no encontrado")
-        return vuelo.objects.get(pk=vuelo_id)
+        return vuelo
+
+    @staticmethod
+    def get_vuelo_detalle(vuelo_id):
+        """
+        Obtener un vuelo con avión, asientos y reservas precargados,
+        listo para serializar su mapa de asientos.
+
+        Args:
+            vuelo_id: ID del vuelo a buscar
+
+        Returns:
+            Objeto Vuelo
+
+        Raises:
+            NotFound: Si el vuelo no existe
+        """
+        vuelo = VueloRepository.get_detalle(vuelo_id)
+        if not vuelo:
+            raise NotFound("Vuelo no encontrado")
+        return vuelo
 
     @staticmethod
-    def get_upcoming_flights():
+    def get_version_mapa(vuelo_id):
+        """
+        Obtener un identificador del estado actual del mapa de asientos de un
+        vuelo, sin armar el mapa. Cambia cada vez que cambia el inventario o
+        vence una retención, por lo que sirve como ETag fuerte del detalle.
+
+        Args:
+            vuelo_id: ID del vuelo
+
+        Returns:
+            str: Identificador de la versión (ej: "12-40-0")
+
+        Raises:
+            NotFound: Si el vuelo no existe
+        """
+        datos = VueloRepository.get_version_inventario(vuelo_id, timezone.now())
+        if datos is None:
+            raise NotFound("Vuelo no encontrado")
+        version, vencidas = datos
+        return f"{vuelo_id}-{version}-{vencidas}"
+
+    @staticmethod
+    def get_version_mapa_de(vuelo):
+        """
+        Igual que get_version_mapa, pero para un vuelo ya obtenido con
+        get_vuelo_detalle: usa el inventario precargado, sin consultar la base.
+
+        Args:
+            vuelo: Objeto Vuelo con el inventario precargado
+
+        Returns:
+            str: Identificador de la versión (ej: "12-40-0")
+        """
+        ahora = timezone.now()
+        vencidas = sum(
+            1
+            for fila in vuelo.inventario.all()
+            if fila.estado == "retenido" and fila.estado_actual(ahora) == "disponible"
+        )
+        return f"{vuelo.pk}-{vuelo.version_inventario}-{vencidas}"
+
+    @staticmethod
+    def get_cambios_mapa(vuelo_id, desde_version):
+        """
+        Obtener solo los asientos de un vuelo que cambiaron desde una versión
+        de inventario conocida por el cliente.
+
+        Args:
+            vuelo_id: ID del vuelo
+            desde_version: Versión de inventario que ya tiene el cliente
+
+        Returns:
+            dict: version_inventario (a usar en la próxima consulta),
+            desde_version y asientos (mapa con los asientos modificados)
+
+        Raises:
+            ValidationError: Si la versión no es un entero no negativo
+            NotFound: Si el vuelo no existe
+        """
+        try:
+            desde_version = int(desde_version)
+        except (TypeError, ValueError):
+            raise ValidationError({"since_version": "Debe ser un número entero."})
+        if desde_version < 0:
+            raise ValidationError({"since_version": "Debe ser mayor o igual a 0."})
+
+        ahora = timezone.now()
+        datos = VueloRepository.get_version_inventario(vuelo_id, ahora)
+        if datos is None:
+            raise NotFound("Vuelo no encontrado")
+        version, vencidas = datos
+
+        asientos = []
+        if version > desde_version or vencidas:
+            filas = list(
+                VueloRepository.get_inventario_modificado(vuelo_id, desde_version, ahora)
+            )
+            asientos = construir_mapa_asientos(
+                [fila.asiento for fila in filas], filas, ahora
+            )
+
+        return {
+            "version_inventario": version,
+            "desde_version": desde_version,
+            "asientos": asientos,
+        }
+
+    @staticmethod
+    def get_upcoming_flights(min_asientos=None, clase=None):
         """
         Obtener vuelos futuros (fecha de salida mayor a hoy).
         Útil para mostrar vuelos disponibles para reservar.
 
+        Args:
+            min_asientos: Mínimo de asientos libres requeridos (opcional)
+            clase: Tipo de asiento para min_asientos (opcional)
+
         Returns:
             QuerySet de Vuelo con fecha_salida > hoy
+
+        Raises:
+            ValidationError: Si la clase o el mínimo de asientos no son válidos
         """
-        from django.utils import timezone
+        min_asientos = VueloService._validar_disponibilidad(min_asientos, clase)
+        return VueloRepository.filter_vuelos(
+            fecha_desde=timezone.now(), min_asientos=min_asientos, clase=clase
+        )
 
-        return VueloRepository.filter_vuelos(fecha_desde=timezone.now())
+    @staticmethod
+    def _validar_disponibilidad(min_asientos, clase):
+        """
+        Validar los filtros de disponibilidad de los vuelos futuros.
+
+        Returns:
+            min_asientos convertido a entero (o None)
+
+        Raises:
+            ValidationError: Si la clase o el mínimo de asientos no son válidos
+        """
+        from airline.models import Vuelo
+
+        if clase and clase not in Vuelo.CAMPOS_LIBRES_POR_TIPO:
+            raise ValidationError({"clase": "Clase de asiento inválida."})
+        if min_asientos is not None:
+            try:
+                min_asientos = int(min_asientos)
+            except (TypeError, ValueError):
+                raise ValidationError({"min_seats": "Debe ser un número entero."})
+            if min_asientos < 0:
+                raise ValidationError({"min_seats": "No puede ser negativo."})
+        return min_asientos
+
+    @staticmethod
+    def buscar_proximos_vuelos(
+        min_asientos=None, clase=None, posicion=None, cantidad=None, hacia_atras=False
+    ):
+        """
+        Igual que get_upcoming_flights, a través de la caché de búsquedas.
+
+        Cada página se guarda por separado y vence, a más tardar, cuando sale
+        su primer vuelo, así que un vuelo que ya salió no queda en la caché.
+
+        Args:
+            min_asientos: Mínimo de asientos libres (total o de la clase)
+            clase: Clase para min_asientos (economico, ejecutivo, primera)
+            posicion: Valores de ORDEN_BUSQUEDA de la última fila vista
+            cantidad (int|None): Máximo de filas (None: todas)
+            hacia_atras (bool): Devolver las filas anteriores a la posición,
+                de la más cercana a la más lejana
+
+        Returns:
+            list: Diccionarios con las columnas del listado de vuelos
+
+        Raises:
+            ValidationError: Si la clase o el mínimo de asientos no son válidos
+            ValueError: Si la posición no corresponde a ORDEN_BUSQUEDA
+        """
+        min_asientos = VueloService._validar_disponibilidad(min_asientos, clase)
+        # La clase solo importa junto con un mínimo de asientos
+        clave = (
+            "proximos",
+            min_asientos or None,
+            clase if min_asientos else None,
+            *VueloService._clave_pagina(posicion, cantidad, hacia_atras),
+        )
+
+        def calcular():
+            filas = VueloService._filas_busqueda(
+                VueloService.get_upcoming_flights(min_asientos, clase),
+                posicion,
+                cantidad,
+                hacia_atras,
+            )
+            etiquetas = {("vuelo", fila[0]) for fila in filas}
+            etiquetas.add(("origen", TODOS))
+            if min_asientos:
+                etiquetas.add(("disponibilidad",))
+            return filas, etiquetas
+
+        salida = COLUMNAS_BUSQUEDA.index("fecha_salida")
+
+        def vigencia(filas):
+            if not filas:
+                return None
+            primera = min(fila[salida] for fila in filas)
+            return (primera - timezone.now()).total_seconds()
+
+        return [
+            VueloService._fila_busqueda(fila)
+            for fila in cache_busquedas.obtener(clave, calcular, vigencia)
+        ]
 
     @staticmethod
     def filter_vuelos(origen=None, destino=None, fecha=None, estado=None):
@@ -191,8 +549,9 @@ class VueloService:
         Todos los parámetros son opcionales.
 
         Args:
-            origen: Ciudad de origen (búsqueda parcial, case-insensitive)
-            destino: Ciudad de destino (búsqueda parcial, case-insensitive)
+            origen: Ciudad de origen o su código (búsqueda parcial, sin
+                distinguir tildes ni mayúsculas)
+            destino: Ciudad de destino o su código (ídem)
             fecha: Fecha de salida (formato YYYY-MM-DD)
             estado: Estado del vuelo (programado, en_curso, etc.)
 
@@ -201,6 +560,206 @@ class VueloService:
         """
         return VueloRepository.filter_vuelos(origen, destino, fecha, estado)
 
+    @staticmethod
+    def buscar_vuelos(
+        origen=None,
+        destino=None,
+        fecha=None,
+        estado=None,
+        posicion=None,
+        cantidad=None,
+        hacia_atras=False,
+    ):
+        """
+        Igual que filter_vuelos, a través de la caché de búsquedas.
+
+        La clave de la caché usa los parámetros normalizados: "Córdoba" y
+        "cordoba " comparten el mismo resultado. Cada página se guarda por
+        separado (ver buscar_proximos_vuelos para posicion, cantidad y
+        hacia_atras).
+
+        Returns:
+            list: Diccionarios con las columnas del listado de vuelos
+
+        Raises:
+            ValueError: Si la posición no corresponde a ORDEN_BUSQUEDA
+        """
+        origen = normalizar_ciudad(origen) or None
+        destino = normalizar_ciudad(destino) or None
+        if fecha is not None and not isinstance(fecha, str):
+            fecha = fecha.isoformat()
+        fecha = (fecha or "").strip() or None
+        estado = estado or None
+        clave = (
+            "filtro",
+            origen,
+            destino,
+            fecha,
+            estado,
+            *VueloService._clave_pagina(posicion, cantidad, hacia_atras),
+        )
+
+        def calcular():
+            filas = VueloService._filas_busqueda(
+                VueloService.filter_vuelos(origen, destino, fecha, estado),
+                posicion,
+                cantidad,
+                hacia_atras,
+            )
+            # Además de los vuelos del resultado, los criterios por los que
+            # otro vuelo podría empezar a aparecer
+            etiquetas = {("vuelo", fila[0]) for fila in filas}
+            if origen:
+                etiquetas.update(
+                    ("origen", aeropuerto_id)
+                    for aeropuerto_id in AeropuertoRepository.get_ids_por_texto(origen)
+                )
+            else:
+                etiquetas.add(("origen", TODOS))
+            if origen or destino:
+                etiquetas.add(("aeropuertos",))
+            if estado:
+                etiquetas.add(("estado", estado))
+            return filas, etiquetas
+
+        return [
+            VueloService._fila_busqueda(fila) for fila in cache_busquedas.obtener(clave, calcular)
+        ]
+
+    @staticmethod
+    def buscar_conexiones(
+        origen,
+        destino,
+        fecha,
+        max_escalas=MAX_ESCALAS,
+        conexion_min=None,
+        conexion_max=None,
+        pasajeros=1,
+    ):
+        """
+        Buscar itinerarios de hasta dos escalas entre dos ciudades.
+
+        Usa el grafo en memoria de los próximos vuelos (ver
+        airline.utils.grafo_rutas), que se pone al día con los vuelos que
+        cambiaron antes de cada búsqueda.
+
+        Args:
+            origen: Ciudad de origen o su código
+            destino: Ciudad de destino o su código
+            fecha: Fecha de salida del primer tramo (YYYY-MM-DD)
+            max_escalas: Escalas permitidas (0 a MAX_ESCALAS)
+            conexion_min: Minutos mínimos entre la llegada de un tramo y la
+                salida del siguiente (por defecto CONEXION_MINIMA_MINUTOS)
+            conexion_max: Minutos máximos de conexión (por defecto
+                CONEXION_MAXIMA_MINUTOS)
+            pasajeros: Asientos libres necesarios en cada tramo
+
+        Returns:
+            list: Hasta MAX_ITINERARIOS diccionarios con salida, llegada,
+                duracion, escalas, precio_total y tramos, de la llegada más
+                temprana a la más tardía
+
+        Raises:
+            ValidationError: Si falta un parámetro o no es válido
+        """
+        errores = {}
+        if not (origen or "").strip():
+            errores["origen"] = "Este parámetro es requerido."
+        if not (destino or "").strip():
+            errores["destino"] = "Este parámetro es requerido."
+        if isinstance(fecha, str):
+            try:
+                fecha = datetime.strptime(fecha.strip(), "%Y-%m-%d").date()
+            except ValueError:
+                errores["fecha"] = "Formato de fecha inválido (YYYY-MM-DD)."
+        elif fecha is None:
+            errores["fecha"] = "Este parámetro es requerido."
+
+        def entero(nombre, valor, minimo, maximo=None):
+            try:
+                valor = int(valor)
+            except (TypeError, ValueError):
+                errores[nombre] = "Debe ser un número entero."
+                return None
+            if valor < minimo or (maximo is not None and valor > maximo):
+                errores[nombre] = (
+                    f"Debe estar entre {minimo} y {maximo}."
+                    if maximo is not None
+                    else f"Debe ser al menos {minimo}."
+                )
+                return None
+            return valor
+
+        max_escalas = entero("max_escalas", max_escalas, 0, MAX_ESCALAS)
+        conexion_min = entero(
+            "conexion_min",
+            settings.CONEXION_MINIMA_MINUTOS if conexion_min is None else conexion_min,
+            0,
+        )
+        conexion_max = entero(
+            "conexion_max",
+            settings.CONEXION_MAXIMA_MINUTOS if conexion_max is None else conexion_max,
+            1,
+        )
+        pasajeros = entero("pasajeros", pasajeros, 1)
+        if conexion_min is not None and conexion_max is not None and conexion_max <= conexion_min:
+            errores["conexion_max"] = "Debe ser mayor que conexion_min."
+        if errores:
+            raise ValidationError(errores)
+
+        origen_ids = AeropuertoRepository.get_ids_por_texto(origen)
+        destino_ids = AeropuertoRepository.get_ids_por_texto(destino)
+        if not origen_ids or not destino_ids:
+            return []
+        desde, hasta = rango_del_dia(fecha)
+        desde = max(desde, timezone.now())
+        if desde >= hasta:
+            return []
+
+        grafo_rutas.sincronizar(VueloRepository.get_tramos)
+        itinerarios = grafo_rutas.buscar(
+            origen_ids,
+            destino_ids,
+            desde,
+            hasta,
+            max_escalas=max_escalas,
+            conexion_min=timedelta(minutes=conexion_min),
+            conexion_max=timedelta(minutes=conexion_max),
+            min_libres=pasajeros,
+            limite=MAX_ITINERARIOS,
+        )
+        return [
+            {
+                "salida": tramos[0].salida,
+                "llegada": tramos[-1].llegada,
+                "duracion": tramos[-1].llegada - tramos[0].salida,
+                "escalas": len(tramos) - 1,
+                "precio_total": sum(tramo.precio for tramo in tramos),
+                "tramos": [tramo._asdict() for tramo in tramos],
+            }
+            for tramos in itinerarios
+        ]
+
+    @staticmethod
+    def _clave_pagina(posicion, cantidad, hacia_atras):
+        """Parte de la clave de la caché que identifica la página"""
+        return (tuple(posicion) if posicion is not None else None, cantidad, bool(hacia_atras))
+
+    @staticmethod
+    def _filas_busqueda(vuelos, posicion, cantidad, hacia_atras):
+        """Filas de una página de búsqueda, como tuplas de COLUMNAS_BUSQUEDA"""
+        filas = filtrar_desde(vuelos, ORDEN_BUSQUEDA, posicion, hacia_atras).values_list(
+            *COLUMNAS_BUSQUEDA
+        )
+        return tuple(filas if cantidad is None else filas[:cantidad])
+
+    @staticmethod
+    def _fila_busqueda(fila):
+        """Convertir una fila de la caché en el diccionario que usa el listado"""
+        datos = dict(zip(COLUMNAS_BUSQUEDA, fila))
+        datos["avion"] = {"modelo": datos.pop("avion__modelo")}
+        return datos
+
     @staticmethod
     def create_vuelo(*, origen, destino, fecha_salida, fecha_llegada, precio_base, estado, avion_id):
         """
@@ -237,7 +796,19 @@ class VueloService:
 
     @staticmethod
     def update_vuelo(*, vuelo_id, origen=None, destino=None, fecha_salida=None, fecha_llegada=None,
-                 precio_base=None, estado=None, avion_id=None):
+                 precio_base=None, estado=None, avion_id=None, version=None):
+        """
+        Actualizar un vuelo con control de concurrencia optimista.
+
+        Args:
+            vuelo_id: ID del vuelo
+            version: Versión que el cliente leyó (opcional); si el vuelo ya
+                no está en esa versión no se guarda nada
+
+        Raises:
+            NotFound: Si el vuelo no existe
+            ConflictoVersion: Si otra operación modificó el vuelo entretanto
+        """
         data = {}
         if origen is not None: data["origen"] = origen
         if destino is not None: data["destino"] = destino
@@ -250,6 +821,8 @@ class VueloService:
         vuelo_actual = VueloRepository.get_by_id(vuelo_id)
         if not vuelo_actual:
             raise NotFound("Vuelo no encontrado")
+        if version is not None and version != vuelo_actual.version:
+            raise ConflictoVersion(f"El vuelo {vuelo_id} cambió desde la versión {version}")
 
         fs = data.get("fecha_salida", vuelo_actual.fecha_salida)
         fl = data.get("fecha_llegada", vuelo_actual.fecha_llegada)
@@ -258,8 +831,8 @@ class VueloService:
                 raise ValueError("fecha_llegada debe ser posterior a fecha_salida")
             data["duracion"] = fl - fs
 
-        # Delegar al repo
-        return VueloRepository.update(vuelo_id, data) 
+        # El UPDATE es condicional a la versión leída acá
+        return VueloRepository.update(vuelo_id, data, version=vuelo_actual.version)
 
     @staticmethod
     def delete_vuelo(vuelo_id):
@@ -291,6 +864,111 @@ class VueloService:
             raise NotFound("Vuelo no encontrado")
         return success
 
+    @staticmethod
+    @transaction.atomic
+    def cancelar_vuelo(vuelo_id):
+        """
+        Cancelar un vuelo completo.
+
+        Marca el vuelo como cancelado, cancela todas sus reservas activas,
+        anula sus boletos, retira su lista de espera y libera su inventario
+        con unos pocos UPDATEs en una transacción, sin importar cuántas
+        reservas tenga. Volver a cancelarlo no cambia nada.
+
+        Args:
+            vuelo_id: ID del vuelo
+
+        Returns:
+            Diccionario con la cantidad de reservas canceladas, boletos
+            anulados, entradas de espera retiradas y asientos liberados
+
+        Raises:
+            NotFound: Si el vuelo no existe
+        """
+        from airline.repositories import (
+            BoletoRepository,
+            ListaEsperaRepository,
+            ReservaRepository,
+        )
+
+        # Primero el vuelo: el UPDATE lo bloquea, igual que cualquier cambio
+        # de inventario, así nadie reserva mientras se cancela
+        if not VueloRepository.marcar_cancelado(vuelo_id):
+            raise NotFound("Vuelo no encontrado")
+        CupoRepository.vaciar_vuelo(vuelo_id)
+
+        return {
+            "vuelo": vuelo_id,
+            "boletos_anulados": BoletoRepository.anular_por_vuelo(vuelo_id),
+            "reservas_canceladas": ReservaRepository.cancelar_por_vuelo(vuelo_id),
+            "esperas_retiradas": ListaEsperaRepository.retirar_por_vuelo(vuelo_id),
+            "asientos_liberados": AsientoRepository.liberar_vuelo(vuelo_id),
+        }
+
+    @staticmethod
+    def get_cupos(vuelo_id):
+        """
+        Obtener la disponibilidad por clase de un vuelo.
+        Se lee de los cupos del vuelo (una fila por clase), sin recorrer
+        los asientos.
+
+        Args:
+            vuelo_id: ID del vuelo
+
+        Returns:
+            Lista de diccionarios con clase, capacidad, sobreventa, vendidos,
+            retenidos y disponibles, en el orden de las clases
+
+        Raises:
+            NotFound: Si el vuelo no existe
+        """
+        cupos = CupoRepository.get_por_vuelo(vuelo_id)
+        if not cupos and not VueloRepository.get_by_id(vuelo_id):
+            raise NotFound("Vuelo no encontrado")
+        return [
+            {
+                "clase": tipo,
+                "capacidad": cupos[tipo].capacidad,
+                "sobreventa": cupos[tipo].sobreventa,
+                "vendidos": cupos[tipo].vendidos,
+                "retenidos": cupos[tipo].retenidos,
+                "disponibles": cupos[tipo].disponibles,
+            }
+            for tipo, _ in Asiento.tipo_choices
+            if tipo in cupos
+        ]
+
+    @staticmethod
+    def configurar_sobreventa(vuelo_id, clase, cantidad):
+        """
+        Fijar cuántos lugares de una clase se pueden vender por encima de
+        su capacidad.
+
+        Args:
+            vuelo_id: ID del vuelo
+            clase: Tipo de asiento
+            cantidad: Lugares de sobreventa (0 para desactivarla)
+
+        Returns:
+            Disponibilidad por clase actualizada (ver get_cupos)
+
+        Raises:
+            NotFound: Si el vuelo no existe
+            ValidationError: Si la cantidad no es válida o el vuelo no tiene
+                asientos de esa clase
+        """
+        try:
+            cantidad = int(cantidad)
+        except (TypeError, ValueError):
+            raise ValidationError({"sobreventa": "Debe ser un número entero."})
+        if cantidad < 0:
+            raise ValidationError({"sobreventa": "No puede ser negativa."})
+        if not CupoRepository.set_sobreventa(vuelo_id, clase, cantidad):
+            if not VueloRepository.get_by_id(vuelo_id):
+                raise NotFound("Vuelo no encontrado")
+            raise ValidationError({"clase": "El vuelo no tiene asientos de esa clase."})
+        return VueloService.get_cupos(vuelo_id)
+
     @staticmethod
     def get_asientos_disponibles(vuelo_id):
         """
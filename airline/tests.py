@@ -3,15 +3,69 @@ Tests para la aplicación airline.
 Incluye tests para modelos, services, repositories y vistas.
 """
 
-from django.test import TestCase, Client
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, Client
+from django.core.management import call_command
 from django.contrib.auth.models import User
+from django.utils import timezone
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.db.models.signals import post_save
+from django.apps import apps as django_apps
+from django.core.exceptions import ValidationError
+from django.test.utils import CaptureQueriesContext
+from django.core.cache.backends.locmem import LocMemCache
 from datetime import datetime, timedelta
+from io import StringIO
+from unittest import mock
+import importlib
 from decimal import Decimal
 
-from airline.models import Avion, Vuelo, Pasajero, Reserva, Boleto, Asiento
-from airline.services.vuelo_service import VueloService
+from airline.models import (
+    Avion,
+    Aeropuerto,
+    Vuelo,
+    Pasajero,
+    Reserva,
+    Boleto,
+    Asiento,
+    AsientoVuelo,
+    SecuenciaCodigo,
+    CupoClase,
+    ListaEspera,
+    ConflictoVersion,
+    AsientoNoDisponible,
+    EventoReserva,
+    ResumenEstado,
+    generador_codigos_reserva,
+)
+from airline.services.vuelo_service import VueloService, AsientoService
 from airline.services.pasajero_service import PasajeroService
-from airline.services.reserva_service import ReservaService
+from airline.services.reserva_service import ReservaService, BoletoService
+from airline.services.evento_service import EventoService
+from airline.repositories import (
+    VueloRepository,
+    ReservaRepository,
+    AeropuertoRepository,
+    AsientoRepository,
+    ListaEsperaRepository,
+)
+from rest_framework.exceptions import NotFound, ValidationError as DRFValidationError
+from airline.utils.plantillas_asientos import (
+    PLANTILLAS,
+    PlantillaAsientos,
+    ZonaCabina,
+)
+from airline.utils.publicador_asientos import Suscripcion, publicador_asientos
+from airline.utils.asignacion_asientos import buscar_bloque, estructura_cabina
+from airline.utils.aeropuertos import generar_codigo, normalizar_ciudad
+from airline.utils.cache_busquedas import CacheBusquedas, cache_busquedas
+from airline.utils.grafo_rutas import GrafoRutas, grafo_rutas
+from airline.utils.codigos_reserva import (
+    ALFABETO_CODIGOS,
+    CANTIDAD_CODIGOS,
+    TAMANO_BLOQUE,
+    codificar_numero,
+)
 
 
 class AvionModelTest(TestCase):
@@ -195,3 +249,2019 @@ class VueloViewTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, "Santiago")
         self.assertContains(response, "Lima")
+
+
+class DatosReservaMixin:
+    """
+    Avión, vuelo y pasajeros de prueba para los tests de inventario y
+    reservas.
+    """
+
+    def crear_vuelo_de_prueba(
+        self,
+        origen="Buenos Aires",
+        destino="Córdoba",
+        salida=None,
+        dias=3,
+        horas=2,
+        precio="150.00",
+        avion=None,
+        filas=10,
+        columnas=6,
+        modelo="Boeing 737",
+    ):
+        """Programa un vuelo (con su inventario); sin avión, crea uno"""
+        if avion is None:
+            avion = Avion.objects.create(modelo=modelo, filas=filas, columnas=columnas)
+        if salida is None:
+            salida = timezone.now() + timedelta(days=dias)
+        return Vuelo.objects.create(
+            avion=avion,
+            origen=origen,
+            destino=destino,
+            fecha_salida=salida,
+            fecha_llegada=salida + timedelta(hours=horas),
+            duracion=timedelta(hours=horas),
+            precio_base=Decimal(precio),
+        )
+
+    def crear_pasajeros(self, cantidad, apellido="Test"):
+        """Crea pasajeros con nombre, documento y email únicos dentro del test"""
+        inicio = getattr(self, "_pasajeros_creados", 0)
+        self._pasajeros_creados = inicio + cantidad
+        return [
+            Pasajero.objects.create(
+                nombre=f"Pasajero{i}",
+                apellido=apellido,
+                tipo_documento="DNI",
+                documento=f"6{i:07d}",
+                email=f"pasajero.prueba{i}@example.com",
+            )
+            for i in range(inicio, inicio + cantidad)
+        ]
+
+
+class MapaAsientosTest(DatosReservaMixin, TestCase):
+    """Tests para el mapa de asientos por vuelo"""
+
+    def setUp(self):
+        self.vuelo = self.crear_vuelo_de_prueba(
+            "Buenos Aires",
+            "Madrid",
+            dias=2,
+            horas=12,
+            precio="900.00",
+            filas=40,
+            columnas=10,
+            modelo="Boeing 777",
+        )
+        self.avion = self.vuelo.avion
+        asientos = list(self.avion.asiento_set.all()[:3])
+        for i, (asiento, pasajero) in enumerate(zip(asientos, self.crear_pasajeros(3))):
+            Reserva.objects.create(
+                vuelo=self.vuelo,
+                pasajero=pasajero,
+                asiento=asiento,
+                precio=Decimal("900.00"),
+                estado="confirmada" if i < 2 else "pendiente",
+            )
+
+    def test_mapa_con_cantidad_constante_de_consultas(self):
+        """El mapa completo de un 40x10 se arma con 3 consultas"""
+        with self.assertNumQueries(3):
+            mapa = VueloRepository.get_asientos_con_disponibilidad(self.vuelo.id)
+            pasajeros = [info["pasajero"] for info in mapa if info["pasajero"]]
+            nombres = [p.nombre for p in pasajeros]
+
+        self.assertEqual(len(mapa), 400)
+        self.assertEqual(nombres, ["Pasajero0", "Pasajero1"])
+        ocupados = [info for info in mapa if info["estado_vuelo"] == "ocupado"]
+        self.assertEqual(len(ocupados), 2)
+        self.assertEqual(mapa[2]["estado_vuelo"], "disponible")
+        self.assertIsNone(mapa[2]["reserva"])
+
+
+class PlantillaAsientosTest(TestCase):
+    """Tests para la generación de asientos a partir de plantillas"""
+
+    def test_creacion_en_lote(self):
+        """Un avión de 400 asientos no hace un INSERT por asiento"""
+        with CaptureQueriesContext(connection) as ctx:
+            avion = Avion.objects.create(modelo="Boeing 777", filas=40, columnas=10)
+
+        self.assertLess(len(ctx.captured_queries), 10)
+        self.assertEqual(avion.asiento_set.count(), 400)
+        self.assertEqual(avion.asiento_set.get(numero="3J").tipo, "primera")
+        self.assertEqual(avion.asiento_set.get(numero="10A").tipo, "ejecutivo")
+        self.assertEqual(avion.asiento_set.get(numero="11A").tipo, "economico")
+
+    def test_plantilla_con_zonas_y_bloqueados(self):
+        """Las zonas y asientos bloqueados salen de la plantilla del modelo"""
+        PLANTILLAS["Embraer 190"] = PlantillaAsientos(
+            nombre="Embraer 190 (2-2)",
+            zonas=(ZonaCabina("ejecutivo", 1, 2), ZonaCabina("economico", 3)),
+            pasillos=(1,),
+            bloqueados=frozenset({"12A", "12D"}),
+        )
+        self.addCleanup(PLANTILLAS.pop, "Embraer 190")
+
+        avion = Avion.objects.create(modelo="Embraer 190", filas=25, columnas=4)
+
+        self.assertEqual(avion.asiento_set.filter(tipo="ejecutivo").count(), 8)
+        self.assertEqual(
+            sorted(avion.asiento_set.filter(estado="mantenimiento").values_list("numero", flat=True)),
+            ["12A", "12D"],
+        )
+        self.assertEqual(avion.get_plantilla().pasillos_para(avion.columnas), (1,))
+
+
+class InventarioVueloTest(DatosReservaMixin, TestCase):
+    """Tests para el inventario de asientos por vuelo"""
+
+    def setUp(self):
+        self.vuelo = self.crear_vuelo_de_prueba(
+            "Córdoba", "Salta", filas=20, modelo="Airbus A320"
+        )
+        self.avion = self.vuelo.avion
+        salida = self.vuelo.fecha_salida
+        self.otro_vuelo = self.crear_vuelo_de_prueba("Córdoba", "Salta", salida, avion=self.avion)
+        self.asiento = self.avion.asiento_set.get(numero="5C")
+        self.pasajeros = self.crear_pasajeros(2)
+
+    def test_inventario_creado_al_programar_vuelo(self):
+        self.assertEqual(self.vuelo.inventario.count(), 120)
+        self.assertEqual(self.otro_vuelo.inventario.count(), 120)
+
+    def test_reserva_confirmada_solo_ocupa_su_vuelo(self):
+        reserva = ReservaService.create_reserva(
+            vuelo=self.vuelo,
+            pasajero=self.pasajeros[0],
+            asiento=self.asiento,
+            estado="confirmada",
+        )
+
+        self.assertFalse(AsientoRepository.check_disponibilidad(self.asiento.id, self.vuelo.id))
+        self.assertTrue(AsientoRepository.check_disponibilidad(self.asiento.id, self.otro_vuelo.id))
+        self.asiento.refresh_from_db()
+        self.assertEqual(self.asiento.estado, "disponible")
+
+        with self.assertRaises(DRFValidationError):
+            ReservaService.create_reserva(
+                vuelo=self.vuelo, pasajero=self.pasajeros[1], asiento=self.asiento
+            )
+
+        reserva.estado = "cancelada"
+        reserva.save()
+        self.assertTrue(AsientoRepository.check_disponibilidad(self.asiento.id, self.vuelo.id))
+
+    def test_asiento_de_otro_avion_rechazado(self):
+        otro_avion = Avion.objects.create(modelo="Boeing 737", filas=2, columnas=2)
+        with self.assertRaises(DRFValidationError):
+            ReservaService.create_reserva(
+                vuelo=self.vuelo,
+                pasajero=self.pasajeros[0],
+                asiento=otro_avion.asiento_set.first(),
+            )
+
+
+class ContadoresDisponibilidadTest(DatosReservaMixin, TestCase):
+    """Tests para los contadores de asientos libres por vuelo"""
+
+    def setUp(self):
+        self.vuelo = self.crear_vuelo_de_prueba(
+            "Mendoza", "Ushuaia", horas=4, precio="300.00", filas=12, modelo="Airbus A320"
+        )
+        self.avion = self.vuelo.avion
+        self.pasajero = self.crear_pasajeros(1)[0]
+
+    def test_contadores_iniciales_por_clase(self):
+        self.assertEqual(self.vuelo.asientos_libres, 72)
+        self.assertEqual(self.vuelo.libres_primera, 18)
+        self.assertEqual(self.vuelo.libres_ejecutivo, 42)
+        self.assertEqual(self.vuelo.libres_economico, 12)
+
+    def test_confirmar_y_cancelar_actualizan_contadores(self):
+        asiento = self.avion.asiento_set.get(numero="2B")
+        reserva = ReservaService.create_reserva(
+            vuelo=self.vuelo, pasajero=self.pasajero, asiento=asiento, estado="confirmada"
+        )
+        self.vuelo.refresh_from_db()
+        self.assertEqual(self.vuelo.asientos_libres, 71)
+        self.assertEqual(self.vuelo.libres_primera, 17)
+
+        # Guardar de nuevo la misma reserva no descuenta otra vez
+        reserva.save()
+        self.vuelo.refresh_from_db()
+        self.assertEqual(self.vuelo.asientos_libres, 71)
+
+        reserva.estado = "cancelada"
+        reserva.save()
+        self.vuelo.refresh_from_db()
+        self.assertEqual(self.vuelo.asientos_libres, 72)
+        self.assertEqual(self.vuelo.libres_primera, 18)
+
+    def test_guardar_vuelo_no_pisa_contadores(self):
+        vuelo_viejo = Vuelo.objects.get(pk=self.vuelo.pk)
+        ReservaService.create_reserva(
+            vuelo=self.vuelo,
+            pasajero=self.pasajero,
+            asiento=self.avion.asiento_set.get(numero="2B"),
+            estado="confirmada",
+        )
+
+        vuelo_viejo.precio_base = Decimal("350.00")
+        vuelo_viejo.save()
+
+        self.vuelo.refresh_from_db()
+        self.assertEqual(self.vuelo.asientos_libres, 71)
+        self.assertEqual(self.vuelo.precio_base, Decimal("350.00"))
+
+    def test_comando_recalcular(self):
+        Vuelo.objects.filter(pk=self.vuelo.pk).update(asientos_libres=0, libres_primera=0)
+        AsientoVuelo.objects.filter(vuelo=self.vuelo, asiento__numero="12A").update(
+            estado="bloqueado"
+        )
+
+        call_command("recalcular_disponibilidad", vuelos=[self.vuelo.pk], stdout=StringIO())
+
+        self.vuelo.refresh_from_db()
+        self.assertEqual(self.vuelo.asientos_libres, 71)
+        self.assertEqual(self.vuelo.libres_primera, 18)
+        self.assertEqual(self.vuelo.libres_economico, 11)
+
+
+class RetencionAsientosTest(DatosReservaMixin, TestCase):
+    """Tests para las retenciones de asientos de reservas pendientes"""
+
+    def setUp(self):
+        self.vuelo = self.crear_vuelo_de_prueba("Tucumán", "Buenos Aires", dias=1, precio="120.00")
+        self.avion = self.vuelo.avion
+        self.asiento = self.avion.asiento_set.get(numero="4D")
+        self.pasajeros = self.crear_pasajeros(2)
+
+    def _vencer(self, reserva):
+        pasado = timezone.now() - timedelta(minutes=1)
+        Reserva.objects.filter(pk=reserva.pk).update(expira_en=pasado)
+        AsientoVuelo.objects.filter(reserva=reserva).update(retenido_hasta=pasado)
+
+    def test_reserva_pendiente_retiene_el_asiento(self):
+        reserva = ReservaService.create_reserva(
+            vuelo=self.vuelo, pasajero=self.pasajeros[0], asiento=self.asiento
+        )
+
+        fila = AsientoVuelo.objects.get(vuelo=self.vuelo, asiento=self.asiento)
+        self.assertEqual(fila.estado, "retenido")
+        self.assertEqual(fila.reserva_id, reserva.id)
+        self.assertFalse(AsientoRepository.check_disponibilidad(self.asiento.id, self.vuelo.id))
+
+        mapa = {i["asiento"].numero: i for i in self.vuelo.get_asientos_con_estado_para_vuelo()}
+        self.assertEqual(mapa["4D"]["estado_vuelo"], "retenido")
+        self.assertIsNone(mapa["4D"]["pasajero"])
+
+        with self.assertRaises(DRFValidationError):
+            ReservaService.create_reserva(
+                vuelo=self.vuelo, pasajero=self.pasajeros[1], asiento=self.asiento
+            )
+
+        ReservaService.confirmar_reserva(reserva.id)
+        fila.refresh_from_db()
+        self.assertEqual(fila.estado, "ocupado")
+        self.assertIsNone(fila.retenido_hasta)
+
+    def test_retencion_vencida_queda_libre(self):
+        primera = ReservaService.create_reserva(
+            vuelo=self.vuelo, pasajero=self.pasajeros[0], asiento=self.asiento
+        )
+        self._vencer(primera)
+
+        segunda = ReservaService.create_reserva(
+            vuelo=self.vuelo, pasajero=self.pasajeros[1], asiento=self.asiento
+        )
+        self.assertEqual(
+            AsientoVuelo.objects.get(vuelo=self.vuelo, asiento=self.asiento).reserva_id,
+            segunda.id,
+        )
+        with self.assertRaises(DRFValidationError):
+            ReservaService.confirmar_reserva(primera.id)
+
+    def test_barrido_libera_retenciones_vencidas(self):
+        reserva = ReservaService.create_reserva(
+            vuelo=self.vuelo, pasajero=self.pasajeros[0], asiento=self.asiento
+        )
+        self._vencer(reserva)
+
+        salida = StringIO()
+        call_command("liberar_retenciones", lote=1, stdout=salida)
+
+        reserva.refresh_from_db()
+        self.assertEqual(reserva.estado, "cancelada")
+        fila = AsientoVuelo.objects.get(vuelo=self.vuelo, asiento=self.asiento)
+        self.assertEqual(fila.estado, "disponible")
+        self.assertIsNone(fila.reserva_id)
+        self.assertIn("Reservas canceladas: 1", salida.getvalue())
+
+    def test_cambio_de_asiento_respeta_las_retenciones(self):
+        retenida = ReservaService.create_reserva(
+            vuelo=self.vuelo, pasajero=self.pasajeros[0], asiento=self.asiento
+        )
+        confirmada = ReservaService.create_reserva(
+            vuelo=self.vuelo,
+            pasajero=self.pasajeros[1],
+            asiento=self.avion.asiento_set.get(numero="5A"),
+            estado="confirmada",
+        )
+
+        with self.assertRaises(DRFValidationError):
+            ReservaService.update_reserva(reserva_id=confirmada.id, asiento_id=self.asiento.id)
+        fila = AsientoVuelo.objects.get(vuelo=self.vuelo, asiento=self.asiento)
+        self.assertEqual((fila.estado, fila.reserva_id), ("retenido", retenida.id))
+
+        # Vencida la retención, el asiento se puede tomar
+        self._vencer(retenida)
+        ReservaService.update_reserva(reserva_id=confirmada.id, asiento_id=self.asiento.id)
+        fila.refresh_from_db()
+        self.assertEqual((fila.estado, fila.reserva_id), ("ocupado", confirmada.id))
+        self.assertEqual(
+            AsientoVuelo.objects.get(vuelo=self.vuelo, asiento__numero="5A").estado, "disponible"
+        )
+
+
+    def test_pendiente_retiene_el_asiento_nuevo(self):
+        reserva = ReservaService.create_reserva(
+            vuelo=self.vuelo, pasajero=self.pasajeros[0], asiento=self.asiento
+        )
+        reserva.asiento = self.avion.asiento_set.get(numero="6F")
+        reserva.save(update_fields=["asiento"])
+
+        nueva = AsientoVuelo.objects.get(vuelo=self.vuelo, asiento__numero="6F")
+        self.assertEqual((nueva.estado, nueva.reserva_id), ("retenido", reserva.id))
+        self.assertEqual(nueva.retenido_hasta, reserva.expira_en)
+        self.assertEqual(
+            AsientoVuelo.objects.get(vuelo=self.vuelo, asiento=self.asiento).estado, "disponible"
+        )
+
+    def test_no_se_confirma_si_el_asiento_ya_no_esta_libre(self):
+        primera = ReservaService.create_reserva(
+            vuelo=self.vuelo, pasajero=self.pasajeros[0], asiento=self.asiento
+        )
+        self._vencer(primera)
+        segunda = ReservaService.create_reserva(
+            vuelo=self.vuelo,
+            pasajero=self.pasajeros[1],
+            asiento=self.asiento,
+            estado="confirmada",
+        )
+
+        primera.refresh_from_db()
+        primera.estado = "confirmada"
+        with self.assertRaises(AsientoNoDisponible):
+            primera.save()
+
+        primera.refresh_from_db()
+        self.assertEqual(primera.estado, "pendiente")
+        fila = AsientoVuelo.objects.get(vuelo=self.vuelo, asiento=self.asiento)
+        self.assertEqual((fila.estado, fila.reserva_id), ("ocupado", segunda.id))
+        cupo = CupoClase.objects.get(vuelo=self.vuelo, tipo=self.asiento.tipo)
+        self.assertEqual((cupo.vendidos, cupo.retenidos), (1, 1))
+
+class VersionInventarioTest(DatosReservaMixin, TestCase):
+    """Tests para la versión de inventario de los vuelos"""
+
+    def setUp(self):
+        self.vuelo = self.crear_vuelo_de_prueba("Neuquén", "Tucumán", precio="200.00", filas=5)
+        self.avion = self.vuelo.avion
+        self.pasajero = self.crear_pasajeros(1)[0]
+        self.asiento = self.avion.asiento_set.get(numero="1A")
+
+    def version(self):
+        self.vuelo.refresh_from_db()
+        return self.vuelo.version_inventario
+
+    def fila(self):
+        return AsientoVuelo.objects.get(vuelo=self.vuelo, asiento=self.asiento)
+
+    def test_cada_transicion_incrementa_la_version(self):
+        self.assertEqual(self.version(), 0)
+
+        reserva = ReservaService.create_reserva(
+            vuelo=self.vuelo, pasajero=self.pasajero, asiento=self.asiento
+        )
+        v_retenido = self.version()
+        self.assertGreater(v_retenido, 0)
+        self.assertEqual(self.fila().version, v_retenido)
+
+        ReservaService.confirmar_reserva(reserva.id)
+        v_ocupado = self.version()
+        self.assertGreater(v_ocupado, v_retenido)
+        self.assertEqual(self.fila().version, v_ocupado)
+
+        reserva.delete()
+        self.assertGreater(self.version(), v_ocupado)
+        self.assertEqual(self.fila().estado, "disponible")
+        self.assertEqual(self.fila().version, self.version())
+
+    def test_liberar_retenciones_vencidas_incrementa_la_version(self):
+        reserva = ReservaService.create_reserva(
+            vuelo=self.vuelo, pasajero=self.pasajero, asiento=self.asiento
+        )
+        AsientoVuelo.objects.filter(reserva=reserva).update(
+            retenido_hasta=timezone.now() - timedelta(minutes=1)
+        )
+        antes = self.version()
+
+        AsientoRepository.liberar_retenciones_vencidas(timezone.now())
+
+        self.assertEqual(self.version(), antes + 1)
+        self.assertEqual(self.fila().version, antes + 1)
+
+    def test_transicion_sin_filas_no_incrementa_la_version(self):
+        reserva = ReservaService.create_reserva(
+            vuelo=self.vuelo, pasajero=self.pasajero, asiento=self.asiento
+        )
+        otra = ReservaService.create_reserva(
+            vuelo=self.vuelo,
+            pasajero=self.crear_pasajeros(1)[0],
+            asiento=self.avion.asiento_set.get(numero="1B"),
+        )
+        otra.asiento = self.asiento
+        antes = self.version()
+
+        self.assertFalse(AsientoVuelo.retener(otra, timezone.now() + timedelta(minutes=5)))
+
+        self.assertEqual(self.version(), antes)
+        self.assertEqual(self.fila().reserva_id, reserva.id)
+
+    def test_cambios_desde_version(self):
+        ReservaService.create_reserva(
+            vuelo=self.vuelo, pasajero=self.pasajero, asiento=self.asiento
+        )
+        cambios = VueloService.get_cambios_mapa(self.vuelo.id, 0)
+        self.assertEqual([i["asiento"].numero for i in cambios["asientos"]], ["1A"])
+        self.assertEqual(cambios["asientos"][0]["estado_vuelo"], "retenido")
+
+        cambios = VueloService.get_cambios_mapa(
+            self.vuelo.id, cambios["version_inventario"]
+        )
+        self.assertEqual(cambios["asientos"], [])
+
+
+class PublicadorAsientosTest(DatosReservaMixin, TestCase):
+    """Tests para la publicación de cambios de asientos en tiempo real"""
+
+    def setUp(self):
+        self.vuelo = self.crear_vuelo_de_prueba(
+            "Jujuy", "La Plata", horas=3, precio="180.00", filas=5
+        )
+        self.avion = self.vuelo.avion
+        self.pasajero = self.crear_pasajeros(1)[0]
+        self.suscripcion = publicador_asientos.suscribir(self.vuelo.id)
+        self.addCleanup(publicador_asientos.desuscribir, self.suscripcion)
+
+    def recibir(self):
+        return self.suscripcion.cola.get(timeout=1)
+
+    def test_publica_al_confirmar_la_transaccion(self):
+        asiento = self.avion.asiento_set.get(numero="3C")
+        with self.captureOnCommitCallbacks(execute=True):
+            reserva = ReservaService.create_reserva(
+                vuelo=self.vuelo, pasajero=self.pasajero, asiento=asiento
+            )
+            self.assertTrue(self.suscripcion.cola.empty())
+
+        evento = self.recibir()
+        self.vuelo.refresh_from_db()
+        self.assertEqual(evento["vuelo"], self.vuelo.id)
+        self.assertEqual(evento["version"], self.vuelo.version_inventario)
+        self.assertEqual(len(evento["asientos"]), 1)
+        self.assertEqual(evento["asientos"][0]["numero"], "3C")
+        self.assertEqual(evento["asientos"][0]["estado"], "retenido")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reserva.estado = "cancelada"
+            reserva.save()
+        self.assertEqual(self.recibir()["asientos"][0]["estado"], "disponible")
+
+    def test_sin_suscriptores_no_consulta_la_base(self):
+        publicador_asientos.desuscribir(self.suscripcion)
+        fila = AsientoVuelo.objects.filter(vuelo=self.vuelo).first()
+        # Bloqueo de las filas, versión del vuelo y UPDATE del inventario
+        with self.assertNumQueries(3):
+            AsientoVuelo.transicionar(
+                AsientoVuelo.objects.filter(pk=fila.pk),
+                [self.vuelo.id],
+                estado="bloqueado",
+            )
+
+    def test_suscripcion_desbordada(self):
+        suscripcion = Suscripcion(self.vuelo.id, maximo=1)
+        suscripcion.entregar({"vuelo": self.vuelo.id})
+        suscripcion.entregar({"vuelo": self.vuelo.id})
+        self.assertTrue(suscripcion.desbordada)
+
+        suscripcion.descartar_pendientes()
+        self.assertTrue(suscripcion.cola.empty())
+        self.assertFalse(suscripcion.desbordada)
+
+
+class AsignacionAsientosTest(DatosReservaMixin, TestCase):
+    """Tests para la asignación automática de asientos a grupos"""
+
+    def setUp(self):
+        # Boeing 737: 3-3 con pasillo entre C y D; filas 11-14 económico
+        self.vuelo = self.crear_vuelo_de_prueba("Rosario", "Posadas", precio="120.00", filas=14)
+        self.avion = self.vuelo.avion
+
+    def ocupar(self, *numeros):
+        AsientoVuelo.objects.filter(
+            vuelo=self.vuelo, asiento__numero__in=numeros
+        ).update(estado="ocupado")
+
+    def numeros(self, asientos):
+        return [a["numero"] for a in asientos]
+
+    def test_misma_fila_sin_cruzar_el_pasillo(self):
+        self.ocupar("11A")
+        asientos = AsientoService.asignar_asientos(self.vuelo.id, "economico", 3)
+        self.assertEqual(self.numeros(asientos), ["11D", "11E", "11F"])
+
+    def test_prefiere_filas_vecinas_a_asientos_separados(self):
+        self.ocupar("11B", "11E", "12B", "12E", "13B", "13E", "14B", "14E")
+        asientos = AsientoService.asignar_asientos(self.vuelo.id, "economico", 4)
+        self.assertEqual(self.numeros(asientos), ["11C", "11D", "12C", "12D"])
+
+    def test_usa_pocas_consultas(self):
+        with self.assertNumQueries(2):
+            AsientoService.asignar_asientos(self.vuelo.id, "primera", 2)
+
+    def test_sin_lugar_suficiente(self):
+        with self.assertRaises(DRFValidationError):
+            AsientoService.asignar_asientos(self.vuelo.id, "economico", 25)
+        with self.assertRaises(DRFValidationError):
+            AsientoService.asignar_asientos(self.vuelo.id, "turista", 2)
+
+    def test_buscar_bloque_en_memoria(self):
+        plantilla = PLANTILLAS["Boeing 737"]
+        estructura = estructura_cabina(plantilla, 14, 6)
+        self.assertIs(estructura, estructura_cabina(plantilla, 14, 6))
+        self.assertEqual(estructura.filas_por_tipo["primera"], (1, 2, 3))
+
+        libres = {(1, 0), (1, 1), (2, 0), (2, 1), (3, 5)}
+        self.assertEqual(
+            buscar_bloque(estructura, "primera", libres, 4),
+            [(1, 0), (1, 1), (2, 0), (2, 1)],
+        )
+
+
+class ReservaGrupoTest(DatosReservaMixin, TestCase):
+    """Tests para la creación de reservas grupales"""
+
+    def setUp(self):
+        self.vuelo = self.crear_vuelo_de_prueba("Córdoba", "Bariloche", precio="210.00", filas=14)
+        self.avion = self.vuelo.avion
+        self.pasajeros = self.crear_pasajeros(20, apellido="Grupo")
+
+    def asiento(self, numero):
+        return self.avion.asiento_set.get(numero=numero).id
+
+    def test_cantidad_fija_de_consultas(self):
+        def reservar(pasajeros, numeros):
+            asiento_ids = [self.asiento(n) for n in numeros]
+            # El bloque de códigos de reserva se pide una vez cada mil códigos
+            Reserva.generar_codigos(1)
+            with CaptureQueriesContext(connection) as consultas:
+                ReservaService.create_reservas_grupo(
+                    vuelo_id=self.vuelo.id,
+                    pasajeros=[
+                        {"pasajero": p.id, "asiento": a}
+                        for p, a in zip(pasajeros, asiento_ids)
+                    ],
+                    estado="confirmada",
+                )
+            return len(consultas)
+
+        chico = reservar(self.pasajeros[:2], ["11A", "11B"])
+        grande = reservar(
+            self.pasajeros[2:],
+            [f"{fila}{col}" for fila in (12, 13, 14) for col in "ABCDEF"],
+        )
+        self.assertEqual(chico, grande)
+        # Incluye el INSERT de los eventos de creación del lote y el bloqueo
+        # de las filas del inventario antes de asignarlas
+        self.assertLessEqual(grande, 14)
+
+        self.vuelo.refresh_from_db()
+        self.assertEqual(self.vuelo.libres_economico, 24 - 20)
+        self.assertEqual(
+            AsientoVuelo.objects.filter(vuelo=self.vuelo, estado="ocupado").count(), 20
+        )
+
+    def test_todo_o_nada(self):
+        Reserva.objects.create(
+            vuelo=self.vuelo,
+            pasajero=self.pasajeros[0],
+            asiento=self.avion.asiento_set.get(numero="11C"),
+            precio=Decimal("210.00"),
+            estado="confirmada",
+        )
+        with self.assertRaises(DRFValidationError):
+            ReservaService.create_reservas_grupo(
+                vuelo_id=self.vuelo.id,
+                pasajeros=[
+                    {"pasajero": self.pasajeros[1].id, "asiento": self.asiento("11A")},
+                    {"pasajero": self.pasajeros[2].id, "asiento": self.asiento("11C")},
+                ],
+            )
+        self.assertEqual(Reserva.objects.filter(vuelo=self.vuelo).count(), 1)
+        self.assertEqual(
+            AsientoVuelo.objects.filter(vuelo=self.vuelo, estado="retenido").count(), 0
+        )
+
+    def test_asigna_asientos_contiguos_y_retiene(self):
+        reservas = ReservaService.create_reservas_grupo(
+            vuelo_id=self.vuelo.id,
+            pasajeros=[{"pasajero": p.id} for p in self.pasajeros[:3]],
+            clase="primera",
+        )
+        self.assertEqual(
+            sorted(r.asiento.numero for r in reservas), ["1A", "1B", "1C"]
+        )
+        self.assertEqual(len({r.codigo_reserva for r in reservas}), 3)
+        filas = AsientoVuelo.objects.filter(vuelo=self.vuelo, estado="retenido")
+        self.assertEqual(
+            {(f.asiento_id, f.reserva_id) for f in filas},
+            {(r.asiento_id, r.id) for r in reservas},
+        )
+        self.assertTrue(all(f.retenido_hasta for f in filas))
+
+    def test_pasajero_con_reserva_previa(self):
+        ReservaService.create_reservas_grupo(
+            vuelo_id=self.vuelo.id,
+            pasajeros=[{"pasajero": self.pasajeros[0].id, "asiento": self.asiento("2A")}],
+        )
+        with self.assertRaises(DRFValidationError):
+            ReservaService.create_reservas_grupo(
+                vuelo_id=self.vuelo.id,
+                pasajeros=[
+                    {"pasajero": self.pasajeros[0].id, "asiento": self.asiento("2B")}
+                ],
+            )
+
+
+class CodigosReservaTest(DatosReservaMixin, TestCase):
+    """Tests para la generación de códigos de reserva por bloques"""
+
+    def setUp(self):
+        generador_codigos_reserva.reiniciar()
+        self.vuelo = self.crear_vuelo_de_prueba(
+            "Salta",
+            "Buenos Aires",
+            dias=4,
+            precio="180.00",
+            filas=5,
+            columnas=4,
+            modelo="Embraer 190",
+        )
+        self.avion = self.vuelo.avion
+        self.pasajero = self.crear_pasajeros(1)[0]
+
+    def test_codificacion_sin_colisiones(self):
+        clave = b"clave-de-prueba"
+        numeros = list(range(20000)) + list(range(CANTIDAD_CODIGOS - 2000, CANTIDAD_CODIGOS))
+        codigos = {codificar_numero(n, clave) for n in numeros}
+        self.assertEqual(len(codigos), len(numeros))
+        self.assertTrue(
+            all(len(c) == 8 and set(c) <= set(ALFABETO_CODIGOS) for c in codigos)
+        )
+        with self.assertRaises(ValueError):
+            codificar_numero(CANTIDAD_CODIGOS, clave)
+
+    def test_no_consulta_reservas_y_pide_bloques(self):
+        with CaptureQueriesContext(connection) as consultas:
+            codigos = Reserva.generar_codigos(300)
+            codigos += [Reserva.generar_codigos(1)[0] for _ in range(200)]
+        self.assertEqual(len(set(codigos)), 500)
+        self.assertFalse(any("airline_reserva" in c["sql"] for c in consultas))
+        # Un solo bloque alcanza para el lote y para los códigos sueltos
+        self.assertEqual(
+            SecuenciaCodigo.objects.get(nombre="reserva").siguiente, TAMANO_BLOQUE
+        )
+
+        # Un lote más grande que un bloque se pide entero de una vez
+        codigos += Reserva.generar_codigos(TAMANO_BLOQUE + 500)
+        self.assertEqual(len(set(codigos)), TAMANO_BLOQUE + 1000)
+
+    def test_bloque_revertido_no_se_reutiliza(self):
+        try:
+            with transaction.atomic():
+                revertido = Reserva.generar_codigos(1)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        # La secuencia volvió atrás: el número se vuelve a emitir una sola vez
+        codigos = Reserva.generar_codigos(10)
+        self.assertEqual(codigos[0], revertido[0])
+        self.assertEqual(len(set(codigos)), 10)
+
+    def test_bloque_de_un_savepoint_confirmado_sigue_en_uso(self):
+        with transaction.atomic():
+            primero = Reserva.generar_codigos(1)
+        # Un savepoint posterior que se revierte no afecta al bloque anterior
+        try:
+            with transaction.atomic():
+                Reserva.generar_codigos(1)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        with CaptureQueriesContext(connection) as consultas:
+            siguientes = Reserva.generar_codigos(5)
+        self.assertEqual(len(consultas), 0)
+        self.assertEqual(len(set(primero + siguientes)), 6)
+        self.assertEqual(
+            SecuenciaCodigo.objects.get(nombre="reserva").siguiente, TAMANO_BLOQUE
+        )
+
+    def test_bloque_confirmado_se_comparte(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            primero = Reserva.generar_codigos(1)
+        with CaptureQueriesContext(connection) as consultas:
+            siguientes = Reserva.generar_codigos(5)
+        self.assertEqual(len(consultas), 0)
+        self.assertEqual(len(set(primero + siguientes)), 6)
+
+    def test_reserva_recibe_codigo(self):
+        reserva = Reserva.objects.create(
+            vuelo=self.vuelo,
+            pasajero=self.pasajero,
+            asiento=self.avion.asiento_set.first(),
+            precio=Decimal("180.00"),
+        )
+        self.assertEqual(len(reserva.codigo_reserva), 8)
+
+
+class TransicionesReservaTest(DatosReservaMixin, TestCase):
+    """Tests para las transiciones de estado de las reservas"""
+
+    def setUp(self):
+        self.vuelo = self.crear_vuelo_de_prueba("Rosario", "Iguazú", dias=6, modelo="Airbus A320")
+        self.avion = self.vuelo.avion
+        self.pasajeros = self.crear_pasajeros(8, apellido="Estado")
+
+    def reservar(self, indices, estado="pendiente"):
+        return [
+            ReservaService.create_reserva(
+                vuelo=self.vuelo,
+                pasajero=self.pasajeros[i],
+                asiento=self.avion.asiento_set.get(numero=f"{8 + i // 6}{'ABCDEF'[i % 6]}"),
+                estado=estado,
+            )
+            for i in indices
+        ]
+
+    def test_guardar_sin_cambio_de_estado_no_toca_inventario(self):
+        (reserva,) = self.reservar([0], estado="confirmada")
+        reserva = Reserva.objects.get(pk=reserva.pk)
+        self.vuelo.refresh_from_db()
+        version = self.vuelo.version_inventario
+
+        reserva.precio = Decimal("99.00")
+        with CaptureQueriesContext(connection) as consultas:
+            reserva.save()
+        self.assertFalse(any("airline_asiento" in c["sql"] for c in consultas))
+        self.vuelo.refresh_from_db()
+        self.assertEqual(self.vuelo.version_inventario, version)
+
+    def test_cambiar_estado_guarda_solo_el_estado(self):
+        (reserva,) = self.reservar([0])
+        reserva = Reserva.objects.get(pk=reserva.pk)
+        with CaptureQueriesContext(connection) as consultas:
+            reserva.cambiar_estado("confirmada")
+        update = next(c["sql"] for c in consultas if c["sql"].startswith('UPDATE "airline_reserva"'))
+        self.assertNotIn("precio", update)
+        self.assertIsNone(Reserva.objects.get(pk=reserva.pk).expira_en)
+        self.assertEqual(
+            AsientoVuelo.objects.get(vuelo=self.vuelo, reserva=reserva).estado, "ocupado"
+        )
+
+        reserva.cambiar_estado("cancelada")
+        with self.assertRaises(ValidationError):
+            reserva.cambiar_estado("confirmada")
+
+    def test_confirmar_en_lote(self):
+        self.vuelo.refresh_from_db()
+        libres = self.vuelo.asientos_libres
+        reservas = self.reservar(range(6))
+        # La primera perdió su retención: queda pendiente
+        AsientoVuelo.objects.filter(reserva=reservas[0]).update(
+            estado="disponible", reserva=None, retenido_hasta=None
+        )
+        ids = [r.id for r in reservas]
+
+        with CaptureQueriesContext(connection) as consultas:
+            resultado = ReservaService.confirmar_reservas(ids[:3])
+        pocas = len(consultas)
+        with CaptureQueriesContext(connection) as consultas:
+            ReservaService.confirmar_reservas(ids[3:])
+        self.assertEqual(len(consultas), pocas)
+
+        self.assertEqual(resultado["reservas_confirmadas"], 2)
+        self.assertEqual(resultado["sin_cambios"], [ids[0]])
+        self.assertEqual(
+            Reserva.objects.filter(id__in=ids, estado="confirmada").count(), 5
+        )
+        self.assertEqual(
+            AsientoVuelo.objects.filter(vuelo=self.vuelo, estado="ocupado").count(), 5
+        )
+        self.vuelo.refresh_from_db()
+        # La que quedó pendiente sigue reteniendo su lugar en el cupo
+        self.assertEqual(self.vuelo.asientos_libres, libres - 6)
+
+    def test_cancelar_en_lote(self):
+        self.vuelo.refresh_from_db()
+        libres = self.vuelo.asientos_libres
+        confirmadas = self.reservar(range(3), estado="confirmada")
+        pendientes = self.reservar(range(3, 5))
+        Boleto.objects.create(reserva=confirmadas[0])
+        ids = [r.id for r in confirmadas + pendientes]
+
+        resultado = ReservaService.cancelar_reservas(ids)
+        self.assertEqual(resultado, {"reservas_canceladas": 5, "boletos_anulados": 1})
+        self.assertEqual(Boleto.objects.get(reserva=confirmadas[0]).estado, "anulado")
+        self.assertFalse(
+            AsientoVuelo.objects.filter(vuelo=self.vuelo, reserva__isnull=False).exists()
+        )
+        self.vuelo.refresh_from_db()
+        self.assertEqual(self.vuelo.asientos_libres, libres)
+
+        # Las ya canceladas se ignoran
+        self.assertEqual(ReservaService.cancelar_reservas(ids)["reservas_canceladas"], 0)
+
+
+class CancelacionVueloTest(DatosReservaMixin, TestCase):
+    """Tests para la cancelación de un vuelo completo"""
+
+    def setUp(self):
+        self.avion = Avion.objects.create(modelo="Boeing 737", filas=10, columnas=6)
+        self.pasajeros = self.crear_pasajeros(12, apellido="Cancelado")
+
+    def crear_vuelo(self, confirmadas, pendientes):
+        vuelo = self.crear_vuelo_de_prueba(
+            "Neuquén", "Buenos Aires", dias=8, precio="170.00", avion=self.avion
+        )
+        asientos = iter(self.avion.asiento_set.order_by("id"))
+        pasajeros = iter(self.pasajeros)
+        reservas = [
+            ReservaService.create_reserva(
+                vuelo=vuelo, pasajero=next(pasajeros), asiento=next(asientos), estado=estado
+            )
+            for estado in ["confirmada"] * confirmadas + ["pendiente"] * pendientes
+        ]
+        for reserva in reservas[:confirmadas]:
+            Boleto.objects.create(reserva=reserva)
+        return vuelo
+
+    def test_cancela_reservas_boletos_e_inventario(self):
+        vuelo = self.crear_vuelo(confirmadas=3, pendientes=2)
+        libres_iniciales = Vuelo.objects.get(pk=vuelo.pk).asientos_libres + 5
+        version = Vuelo.objects.get(pk=vuelo.pk).version_inventario
+
+        resultado = VueloService.cancelar_vuelo(vuelo.id)
+        self.assertEqual(
+            resultado,
+            {
+                "vuelo": vuelo.id,
+                "boletos_anulados": 3,
+                "reservas_canceladas": 5,
+                "esperas_retiradas": 0,
+                "asientos_liberados": 5,
+            },
+        )
+        vuelo.refresh_from_db()
+        self.assertEqual(vuelo.estado, "cancelado")
+        self.assertEqual(vuelo.asientos_libres, libres_iniciales)
+        self.assertGreater(vuelo.version_inventario, version)
+        self.assertFalse(Reserva.objects.filter(vuelo=vuelo).exclude(estado="cancelada").exists())
+        self.assertFalse(Boleto.objects.filter(reserva__vuelo=vuelo).exclude(estado="anulado").exists())
+        self.assertFalse(AsientoVuelo.objects.filter(vuelo=vuelo, reserva__isnull=False).exists())
+
+        # Volver a cancelar no cambia nada, y no se puede reservar
+        self.assertEqual(VueloService.cancelar_vuelo(vuelo.id)["reservas_canceladas"], 0)
+        with self.assertRaises(DRFValidationError):
+            ReservaService.create_reserva(
+                vuelo=vuelo,
+                pasajero=self.pasajeros[-1],
+                asiento=self.avion.asiento_set.last(),
+            )
+
+    def test_cantidad_fija_de_consultas(self):
+        chico = self.crear_vuelo(confirmadas=1, pendientes=1)
+        grande = self.crear_vuelo(confirmadas=6, pendientes=5)
+
+        consultas = []
+        for vuelo in (chico, grande):
+            with CaptureQueriesContext(connection) as capturadas:
+                VueloService.cancelar_vuelo(vuelo.id)
+            consultas.append(len(capturadas))
+        self.assertEqual(consultas[0], consultas[1])
+        # Incluye el UPDATE que vacía los cupos por clase del vuelo y los
+        # INSERT ... SELECT de los eventos de reservas y boletos, el UPDATE
+        # de la lista de espera, el bloqueo de las filas del inventario y
+        # el recálculo de los libres del vuelo desde sus cupos
+        self.assertLessEqual(consultas[1], 15)
+
+    def test_retira_la_lista_de_espera(self):
+        vuelo = self.crear_vuelo(confirmadas=1, pendientes=0)
+        otro = self.crear_vuelo(confirmadas=0, pendientes=0)
+        esperando = [
+            ListaEspera.objects.create(vuelo=vuelo, pasajero=pasajero, clase="economico")
+            for pasajero in self.pasajeros[-2:]
+        ]
+        promovida = ListaEspera.objects.create(
+            vuelo=vuelo, pasajero=self.pasajeros[-3], clase="economico", estado="promovida"
+        )
+        ajena = ListaEspera.objects.create(
+            vuelo=otro, pasajero=self.pasajeros[-1], clase="economico"
+        )
+
+        self.assertEqual(VueloService.cancelar_vuelo(vuelo.id)["esperas_retiradas"], 2)
+
+        for entrada in esperando:
+            entrada.refresh_from_db()
+            self.assertEqual(entrada.estado, "retirada")
+        promovida.refresh_from_db()
+        self.assertEqual(promovida.estado, "promovida")
+        ajena.refresh_from_db()
+        self.assertEqual(ajena.estado, "esperando")
+
+    def test_vuelo_inexistente(self):
+        with self.assertRaises(NotFound):
+            VueloService.cancelar_vuelo(999999)
+
+
+class CupoClaseTest(DatosReservaMixin, TestCase):
+    """Tests para los cupos de venta por clase y la sobreventa"""
+
+    def setUp(self):
+        self.vuelo = self.crear_vuelo_de_prueba("Tucumán", "Buenos Aires", dias=9, filas=30)
+        self.pasajeros = self.crear_pasajeros(5, apellido="Cupo")
+
+    def cupo(self, tipo="economico"):
+        return CupoClase.objects.get(vuelo=self.vuelo, tipo=tipo)
+
+    def vender(self, pasajero, estado="confirmada", **kwargs):
+        kwargs.setdefault("clase", "economico")
+        return ReservaService.create_reserva(
+            vuelo=self.vuelo, pasajero=pasajero, estado=estado, **kwargs
+        )
+
+    def assertLibresDelVuelo(self, economico):
+        """Los contadores del vuelo son los disponibles de sus cupos"""
+        self.vuelo.refresh_from_db()
+        cupos = {cupo.tipo: cupo.disponibles for cupo in CupoClase.objects.filter(vuelo=self.vuelo)}
+        self.assertEqual(cupos["economico"], economico)
+        self.assertEqual(self.vuelo.libres_economico, economico)
+        for tipo, campo in Vuelo.CAMPOS_LIBRES_POR_TIPO.items():
+            self.assertEqual(getattr(self.vuelo, campo), cupos.get(tipo, 0))
+        self.assertEqual(self.vuelo.asientos_libres, sum(cupos.values()))
+
+    def test_capacidad_desde_el_inventario(self):
+        capacidades = {
+            tipo: AsientoVuelo.objects.filter(vuelo=self.vuelo, tipo=tipo).count()
+            for tipo in ("economico", "ejecutivo", "primera")
+        }
+        for cupo in CupoClase.objects.filter(vuelo=self.vuelo):
+            self.assertEqual(cupo.capacidad, capacidades[cupo.tipo])
+            self.assertEqual(cupo.disponibles, cupo.capacidad)
+
+    def test_reserva_con_asiento_mueve_contadores(self):
+        capacidad = self.cupo().capacidad
+        asiento = self.vuelo.avion.asiento_set.filter(tipo="economico").first()
+        reserva = self.vender(self.pasajeros[0], estado="pendiente", asiento=asiento)
+        self.assertEqual((self.cupo().retenidos, self.cupo().vendidos), (1, 0))
+        self.assertLibresDelVuelo(capacidad - 1)
+
+        ReservaService.confirmar_reserva(reserva.id)
+        self.assertEqual((self.cupo().retenidos, self.cupo().vendidos), (0, 1))
+        self.assertLibresDelVuelo(capacidad - 1)
+
+        ReservaService.cancelar_reserva(reserva.id)
+        self.assertEqual((self.cupo().retenidos, self.cupo().vendidos), (0, 0))
+        self.assertLibresDelVuelo(capacidad)
+
+    def test_venta_sin_asiento_descuenta_los_libres_del_vuelo(self):
+        capacidad = self.cupo().capacidad
+        self.vender(self.pasajeros[0])
+        self.vender(self.pasajeros[1], estado="pendiente")
+        self.assertLibresDelVuelo(capacidad - 2)
+
+        # Los listados filtran por esos contadores
+        vuelos = VueloService.get_upcoming_flights(min_asientos=capacidad - 1, clase="economico")
+        self.assertNotIn(self.vuelo, vuelos)
+        vuelos = VueloService.get_upcoming_flights(min_asientos=capacidad - 2, clase="economico")
+        self.assertIn(self.vuelo, vuelos)
+
+    def test_sobreventa_sin_asiento(self):
+        CupoClase.objects.filter(vuelo=self.vuelo, tipo="economico").update(capacidad=2)
+        Vuelo.recalcular_disponibles([self.vuelo.id])
+        VueloService.configurar_sobreventa(self.vuelo.id, "economico", 1)
+        self.assertLibresDelVuelo(3)
+
+        for pasajero in self.pasajeros[:3]:
+            self.vender(pasajero)
+        self.assertLibresDelVuelo(0)
+        with self.assertRaises(DRFValidationError):
+            self.vender(self.pasajeros[3])
+        self.assertEqual(self.cupo().vendidos, 3)
+        self.assertEqual(self.cupo().disponibles, 0)
+        self.assertFalse(Reserva.objects.filter(pasajero=self.pasajeros[3]).exists())
+
+    def test_asiento_sin_cupo(self):
+        """Si la sobreventa agotó el cupo, los asientos libres no se venden"""
+        CupoClase.objects.filter(vuelo=self.vuelo, tipo="economico").update(capacidad=1)
+        self.vender(self.pasajeros[0])
+        with self.assertRaises(DRFValidationError):
+            self.vender(
+                self.pasajeros[1],
+                asiento=self.vuelo.avion.asiento_set.filter(tipo="economico").first(),
+            )
+
+    def test_tomar_no_recorre_asientos(self):
+        # Un UPDATE condicional del cupo y otro de los contadores del vuelo
+        with self.assertNumQueries(2):
+            self.assertTrue(CupoClase.tomar(self.vuelo.id, "primera", "confirmada", 2))
+        self.assertEqual(self.cupo("primera").vendidos, 2)
+        self.vuelo.refresh_from_db()
+        self.assertEqual(self.vuelo.libres_primera, self.cupo("primera").disponibles)
+
+    def test_check_in_asigna_asiento_de_la_clase(self):
+        reserva = self.vender(self.pasajeros[0], clase="ejecutivo")
+        self.assertIsNone(reserva.asiento_id)
+
+        reserva = ReservaService.asignar_asiento(reserva.id)
+        self.assertEqual(reserva.asiento.tipo, "ejecutivo")
+        self.assertEqual(
+            AsientoVuelo.objects.get(vuelo=self.vuelo, asiento=reserva.asiento).estado,
+            "ocupado",
+        )
+        self.assertEqual(self.cupo("ejecutivo").vendidos, 1)
+        with self.assertRaises(DRFValidationError):
+            ReservaService.asignar_asiento(reserva.id)
+
+    def test_check_in_rechaza_otra_clase(self):
+        reserva = self.vender(self.pasajeros[0], clase="ejecutivo")
+        economico = self.vuelo.avion.asiento_set.filter(tipo="economico").first()
+        with self.assertRaises(DRFValidationError):
+            ReservaService.asignar_asiento(reserva.id, economico.id)
+
+    def test_lotes_y_vencimientos(self):
+        pendientes = [self.vender(p, estado="pendiente") for p in self.pasajeros[:3]]
+        ReservaService.confirmar_reservas([pendientes[0].id])
+        self.assertEqual((self.cupo().retenidos, self.cupo().vendidos), (2, 1))
+
+        Reserva.objects.filter(pk=pendientes[1].pk).update(
+            expira_en=timezone.now() - timedelta(minutes=1)
+        )
+        ReservaService.expirar_reservas_pendientes()
+        self.assertEqual((self.cupo().retenidos, self.cupo().vendidos), (1, 1))
+
+        self.assertLibresDelVuelo(self.cupo().capacidad - 2)
+
+        ReservaService.cancelar_reservas([pendientes[0].id, pendientes[2].id])
+        self.assertEqual((self.cupo().retenidos, self.cupo().vendidos), (0, 0))
+        self.assertLibresDelVuelo(self.cupo().capacidad)
+
+    def test_grupo_y_cancelacion_de_vuelo(self):
+        ReservaService.create_reservas_grupo(
+            vuelo_id=self.vuelo.id,
+            pasajeros=[{"pasajero": p.id} for p in self.pasajeros[:3]],
+            clase="economico",
+            estado="confirmada",
+        )
+        self.assertEqual(self.cupo().vendidos, 3)
+
+        self.assertLibresDelVuelo(self.cupo().capacidad - 3)
+
+        VueloService.cancelar_vuelo(self.vuelo.id)
+        self.assertEqual(self.cupo().vendidos, 0)
+        self.assertLibresDelVuelo(self.cupo().capacidad)
+
+    def test_recalcular(self):
+        self.vender(self.pasajeros[0])
+        self.vender(self.pasajeros[1], estado="pendiente", clase="primera")
+        esperado = list(CupoClase.objects.filter(vuelo=self.vuelo).values())
+        CupoClase.objects.filter(vuelo=self.vuelo).update(vendidos=40, retenidos=7)
+
+        Vuelo.objects.filter(pk=self.vuelo.pk).update(asientos_libres=0, libres_economico=0)
+
+        call_command("recalcular_disponibilidad", vuelos=[self.vuelo.pk], stdout=StringIO())
+        self.assertEqual(list(CupoClase.objects.filter(vuelo=self.vuelo).values()), esperado)
+        self.assertLibresDelVuelo(self.cupo().capacidad - 1)
+
+
+class ListaEsperaTest(DatosReservaMixin, TestCase):
+    """Tests para la lista de espera y la promoción al cancelar"""
+
+    def setUp(self):
+        self.vuelo = self.crear_vuelo_de_prueba(
+            "Bariloche", "Córdoba", dias=10, precio="190.00", filas=30
+        )
+        self.pasajeros = self.crear_pasajeros(4, apellido="Espera")
+        # Clase económica con un solo lugar, ya vendido
+        CupoClase.objects.filter(vuelo=self.vuelo, tipo="economico").update(capacidad=1)
+        self.asiento = self.vuelo.avion.asiento_set.filter(tipo="economico").first()
+        self.vendida = ReservaService.create_reserva(
+            vuelo=self.vuelo, pasajero=self.pasajeros[0], asiento=self.asiento, estado="confirmada"
+        )
+
+    def esperar(self, pasajero, clase="economico"):
+        return ReservaService.agregar_lista_espera(
+            vuelo_id=self.vuelo.id, pasajero_id=pasajero.id, clase=clase
+        )
+
+    def test_solo_con_la_clase_completa(self):
+        with self.assertRaises(DRFValidationError):
+            self.esperar(self.pasajeros[1], clase="ejecutivo")
+        with self.assertRaises(DRFValidationError):
+            self.esperar(self.pasajeros[0])
+
+        self.esperar(self.pasajeros[1])
+        with self.assertRaises(DRFValidationError):
+            self.esperar(self.pasajeros[1])
+
+    def test_cancelar_promueve_al_primero(self):
+        primera = self.esperar(self.pasajeros[1])
+        segunda = self.esperar(self.pasajeros[2])
+        self.assertEqual(ReservaService.get_posicion_lista_espera(segunda), 2)
+
+        ReservaService.cancelar_reserva(self.vendida.id)
+
+        primera.refresh_from_db()
+        self.assertEqual(primera.estado, "promovida")
+        self.assertEqual(primera.reserva.pasajero, self.pasajeros[1])
+        self.assertEqual(primera.reserva.estado, "pendiente")
+        self.assertEqual(primera.reserva.asiento, self.asiento)
+        inventario = AsientoVuelo.objects.get(vuelo=self.vuelo, asiento=self.asiento)
+        self.assertEqual((inventario.estado, inventario.reserva_id), ("retenido", primera.reserva_id))
+        self.assertEqual(CupoClase.objects.get(vuelo=self.vuelo, tipo="economico").retenidos, 1)
+
+        segunda.refresh_from_db()
+        self.assertEqual(ReservaService.get_posicion_lista_espera(segunda), 1)
+
+    def test_sin_espera_no_promueve(self):
+        ReservaService.cancelar_reserva(self.vendida.id)
+        self.assertEqual(Reserva.objects.filter(vuelo=self.vuelo).count(), 1)
+
+    def test_saltea_a_quien_ya_reservo(self):
+        primera = self.esperar(self.pasajeros[1])
+        segunda = self.esperar(self.pasajeros[2])
+        ReservaService.create_reserva(
+            vuelo=self.vuelo, pasajero=self.pasajeros[1], clase="ejecutivo"
+        )
+
+        ReservaService.cancelar_reserva(self.vendida.id)
+        primera.refresh_from_db()
+        segunda.refresh_from_db()
+        self.assertEqual(primera.estado, "retirada")
+        self.assertEqual(segunda.estado, "promovida")
+
+    def test_retirada_no_se_promueve(self):
+        entrada = self.esperar(self.pasajeros[1])
+        ReservaService.retirar_lista_espera(entrada.id)
+        ReservaService.cancelar_reserva(self.vendida.id)
+        self.assertFalse(Reserva.objects.filter(pasajero=self.pasajeros[1]).exists())
+
+    def test_cancelar_desde_la_web_promueve(self):
+        usuario = User.objects.create_user(username="vera", password="testpass123")
+        Pasajero.objects.filter(pk=self.pasajeros[0].pk).update(usuario=usuario)
+        boleto = BoletoService.create_boleto(self.vendida.id)
+        entrada = self.esperar(self.pasajeros[1])
+        self.client.force_login(usuario)
+
+        self.client.post(f"/reservas/cancelar/{self.vendida.id}/")
+
+        boleto.refresh_from_db()
+        entrada.refresh_from_db()
+        self.assertEqual(boleto.estado, "anulado")
+        self.assertEqual(entrada.estado, "promovida")
+        self.assertEqual(entrada.reserva.asiento, self.asiento)
+
+    def test_cancelar_varias_promueve_por_lugar(self):
+        CupoClase.objects.filter(vuelo=self.vuelo, tipo="economico").update(capacidad=2)
+        otra = ReservaService.create_reserva(
+            vuelo=self.vuelo, pasajero=self.pasajeros[3], clase="economico", estado="confirmada"
+        )
+        primera = self.esperar(self.pasajeros[1])
+        segunda = self.esperar(self.pasajeros[2])
+
+        ReservaService.cancelar_reservas([self.vendida.id, otra.id])
+
+        primera.refresh_from_db()
+        segunda.refresh_from_db()
+        self.assertEqual((primera.estado, segunda.estado), ("promovida", "promovida"))
+        self.assertEqual(primera.reserva.asiento, self.asiento)
+        self.assertIsNone(segunda.reserva.asiento)
+        self.assertEqual(CupoClase.objects.get(vuelo=self.vuelo, tipo="economico").retenidos, 2)
+
+    def test_expirar_promueve(self):
+        CupoClase.objects.filter(vuelo=self.vuelo, tipo="economico").update(capacidad=2)
+        asiento = self.vuelo.avion.asiento_set.filter(tipo="economico").last()
+        vencida = ReservaService.create_reserva(
+            vuelo=self.vuelo, pasajero=self.pasajeros[3], asiento=asiento
+        )
+        Reserva.objects.filter(pk=vencida.pk).update(expira_en=timezone.now() - timedelta(minutes=1))
+        entrada = self.esperar(self.pasajeros[1])
+
+        resultado = ReservaService.expirar_reservas_pendientes()
+
+        self.assertEqual(resultado["reservas_canceladas"], 1)
+        entrada.refresh_from_db()
+        self.assertEqual(entrada.estado, "promovida")
+        self.assertEqual(entrada.reserva.asiento, asiento)
+        inventario = AsientoVuelo.objects.get(vuelo=self.vuelo, asiento=asiento)
+        self.assertEqual((inventario.estado, inventario.reserva_id), ("retenido", entrada.reserva_id))
+
+    def test_eliminar_promueve(self):
+        entrada = self.esperar(self.pasajeros[1])
+        ReservaService.eliminar_reserva(self.vendida.id)
+        entrada.refresh_from_db()
+        self.assertEqual(entrada.estado, "promovida")
+        self.assertFalse(Reserva.objects.filter(pk=self.vendida.pk).exists())
+
+    def test_tomar_siguiente_es_una_consulta(self):
+        for pasajero in self.pasajeros[1:]:
+            self.esperar(pasajero)
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as consultas:
+                entrada = ListaEsperaRepository.tomar_siguiente(self.vuelo.id, "economico")
+        self.assertEqual(entrada.pasajero, self.pasajeros[1])
+        self.assertEqual(len(consultas), 1)
+        self.assertIn("LIMIT 1", consultas[0]["sql"])
+
+
+class ConcurrenciaOptimistaTest(DatosReservaMixin, TestCase):
+    """Tests para el control de versión de reservas y vuelos"""
+
+    def setUp(self):
+        self.vuelo = self.crear_vuelo_de_prueba("Salta", "Rosario", dias=6, precio="140.00")
+        self.reserva = ReservaService.create_reserva(
+            vuelo=self.vuelo,
+            pasajero=self.crear_pasajeros(1, apellido="Version")[0],
+            asiento=self.vuelo.avion.asiento_set.get(numero="3B"),
+        )
+
+    def test_guardar_copia_vieja_falla(self):
+        primera = Reserva.objects.get(pk=self.reserva.pk)
+        segunda = Reserva.objects.get(pk=self.reserva.pk)
+
+        primera.precio = Decimal("150.00")
+        primera.save()
+        self.assertEqual(primera.version, 2)
+
+        segunda.precio = Decimal("160.00")
+        with self.assertRaises(ConflictoVersion):
+            segunda.save()
+        self.assertEqual(Reserva.objects.get(pk=self.reserva.pk).precio, Decimal("150.00"))
+
+    def test_servicios_validan_version(self):
+        with self.assertRaises(ConflictoVersion):
+            ReservaService.update_reserva(
+                reserva_id=self.reserva.id, precio=Decimal("10.00"), version=5
+            )
+        with self.assertRaises(ConflictoVersion):
+            VueloService.update_vuelo(vuelo_id=self.vuelo.id, origen="Jujuy", version=5)
+
+        reserva = ReservaService.update_reserva(
+            reserva_id=self.reserva.id, precio=Decimal("10.00"), version=1
+        )
+        self.assertEqual(reserva.version, 2)
+
+    def test_cancelar_desde_la_web_con_conflicto(self):
+        usuario = User.objects.create_user(username="eva", password="testpass123")
+        Pasajero.objects.filter(pk=self.reserva.pasajero_id).update(usuario=usuario)
+        self.client.force_login(usuario)
+
+        # Otra operación modificó la reserva entre la lectura y el guardado
+        with mock.patch.object(Reserva, "save", side_effect=ConflictoVersion("cambió")):
+            response = self.client.post(f"/reservas/cancelar/{self.reserva.id}/")
+
+        self.assertRedirects(response, "/reservas/mis-reservas/", fetch_redirect_response=False)
+        self.assertEqual(Reserva.objects.get(pk=self.reserva.pk).estado, "pendiente")
+
+    def test_guardado_versionado_envia_senales(self):
+        recibidas = []
+
+        def receptor(sender, instance, created, update_fields, **kwargs):
+            recibidas.append((instance.version, created, update_fields))
+
+        post_save.connect(receptor, sender=Reserva)
+        self.addCleanup(post_save.disconnect, receptor, sender=Reserva)
+        self.reserva.precio = Decimal("150.00")
+        self.reserva.save(update_fields=["precio"])
+        self.assertEqual(recibidas, [(2, False, frozenset({"precio"}))])
+
+    def test_actualizaciones_masivas_incrementan_version(self):
+        ReservaService.confirmar_reservas([self.reserva.id])
+        self.assertEqual(Reserva.objects.get(pk=self.reserva.pk).version, 2)
+
+        VueloService.cancelar_vuelo(self.vuelo.id)
+        self.assertEqual(Reserva.objects.get(pk=self.reserva.pk).version, 3)
+        self.assertEqual(Vuelo.objects.get(pk=self.vuelo.pk).version, 2)
+
+
+class RegistroEventosTest(DatosReservaMixin, TestCase):
+    """Tests para el registro de eventos de reservas y su resumen"""
+
+    def setUp(self):
+        self.vuelo = self.crear_vuelo_de_prueba("Salta", "Córdoba", dias=6, precio="140.00")
+        self.avion = self.vuelo.avion
+        self.pasajeros = self.crear_pasajeros(6, apellido="Evento")
+        self.asientos = list(self.avion.asiento_set.order_by("id"))
+
+    def reservar(self, i, estado="pendiente"):
+        return ReservaService.create_reserva(
+            vuelo=self.vuelo, pasajero=self.pasajeros[i], asiento=self.asientos[i], estado=estado
+        )
+
+    def eventos(self, entidad="reserva"):
+        return list(
+            EventoReserva.objects.filter(entidad=entidad).values_list(
+                "objeto_id", "estado_anterior", "estado_nuevo"
+            )
+        )
+
+    def conteo_actual(self):
+        """Cantidades por clase y estado calculadas desde las tablas vivas"""
+        filas = [
+            {"entidad": "reserva", "clase": clase, "estado": estado, "cantidad": cantidad}
+            for clase, estado, cantidad in Reserva.objects.filter(vuelo=self.vuelo)
+            .order_by()
+            .values_list("clase", "estado")
+            .annotate(cantidad=Count("id"))
+        ] + [
+            {"entidad": "boleto", "clase": clase, "estado": estado, "cantidad": cantidad}
+            for clase, estado, cantidad in Boleto.objects.filter(reserva__vuelo=self.vuelo)
+            .order_by()
+            .values_list("reserva__clase", "estado")
+            .annotate(cantidad=Count("id"))
+        ]
+        return sorted(filas, key=lambda fila: (fila["entidad"], fila["clase"], fila["estado"]))
+
+    def test_registra_cambios_individuales(self):
+        reserva = self.reservar(0)
+        ReservaService.confirmar_reserva(reserva.id)
+        reserva.refresh_from_db()
+        reserva.precio = Decimal("99.00")
+        reserva.save()
+        self.assertEqual(
+            self.eventos(),
+            [(reserva.id, "", "pendiente"), (reserva.id, "pendiente", "confirmada")],
+        )
+
+        boleto = Boleto.objects.create(reserva=reserva)
+        BoletoService.marcar_boleto_usado(boleto.id)
+        self.assertEqual(
+            self.eventos("boleto"), [(boleto.id, "", "emitido"), (boleto.id, "emitido", "usado")]
+        )
+        evento = EventoReserva.objects.filter(entidad="boleto").last()
+        self.assertEqual((evento.vuelo_id, evento.clase), (self.vuelo.id, reserva.clase))
+
+    def test_eventos_de_solo_agregado(self):
+        self.reservar(0)
+        evento = EventoReserva.objects.get()
+        evento.estado_nuevo = "confirmada"
+        with self.assertRaises(ValueError):
+            evento.save()
+        with self.assertRaises(ValueError):
+            evento.delete()
+
+    def test_cambio_revertido_no_deja_evento(self):
+        reserva = self.reservar(0)
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                reserva.cambiar_estado("confirmada")
+                raise RuntimeError
+        self.assertEqual(self.eventos(), [(reserva.id, "", "pendiente")])
+
+    def test_operaciones_por_lote_registran_un_evento_por_fila(self):
+        reservas = [self.reservar(i) for i in range(3)]
+        ids = [reserva.id for reserva in reservas]
+        ReservaService.confirmar_reservas(ids[:2])
+        for reserva in reservas[:2]:
+            Boleto.objects.create(reserva=reserva)
+        VueloService.cancelar_vuelo(self.vuelo.id)
+
+        self.assertEqual(
+            sorted(self.eventos()),
+            sorted(
+                [(id_, "", "pendiente") for id_ in ids]
+                + [(id_, "pendiente", "confirmada") for id_ in ids[:2]]
+                + [(ids[0], "confirmada", "cancelada"), (ids[1], "confirmada", "cancelada")]
+                + [(ids[2], "pendiente", "cancelada")]
+            ),
+        )
+        self.assertEqual(
+            [evento[1:] for evento in self.eventos("boleto")],
+            [("", "emitido")] * 2 + [("emitido", "anulado")] * 2,
+        )
+
+        # Volver a cancelar no registra nada
+        total = EventoReserva.objects.count()
+        VueloService.cancelar_vuelo(self.vuelo.id)
+        self.assertEqual(EventoReserva.objects.count(), total)
+
+    def test_consolidacion_incremental(self):
+        reservas = [self.reservar(i) for i in range(3)]
+        ReservaService.confirmar_reserva(reservas[0].id)
+        Boleto.objects.create(reserva=Reserva.objects.get(pk=reservas[0].id))
+
+        resultado = EventoService.consolidar(lote=2, margen_segundos=0)
+        self.assertEqual(resultado["eventos_procesados"], 5)
+        self.assertEqual(resultado["ultimo_evento"], EventoReserva.objects.last().id)
+        self.assertEqual(EventoService.get_resumen_vuelo(self.vuelo.id), self.conteo_actual())
+
+        # Solo se procesan los eventos nuevos; el resumen se completa con
+        # los que todavía no se consolidaron
+        ReservaService.cancelar_reserva(reservas[1].id)
+        self.assertEqual(EventoService.get_resumen_vuelo(self.vuelo.id), self.conteo_actual())
+        self.assertEqual(
+            EventoService.consolidar(margen_segundos=0)["eventos_procesados"], 1
+        )
+        self.assertEqual(EventoService.consolidar(margen_segundos=0)["eventos_procesados"], 0)
+        self.assertEqual(EventoService.get_resumen_vuelo(self.vuelo.id), self.conteo_actual())
+        self.assertEqual(
+            ResumenEstado.objects.get(
+                vuelo_id=self.vuelo.id, entidad="reserva", estado="pendiente"
+            ).cantidad,
+            1,
+        )
+
+    def test_margen_deja_eventos_recientes(self):
+        self.reservar(0)
+        self.assertEqual(EventoService.consolidar()["eventos_procesados"], 0)
+        self.assertFalse(ResumenEstado.objects.exists())
+
+    def test_margen_corta_en_el_primer_evento_reciente(self):
+        for i in range(3):
+            self.reservar(i)
+        primero, medio, ultimo = EventoReserva.objects.order_by("id")
+        # El evento del medio se confirmó después que el último
+        EventoReserva.objects.filter(pk__in=[primero.pk, ultimo.pk]).update(
+            creado=timezone.now() - timedelta(hours=1)
+        )
+
+        resultado = EventoService.consolidar()
+        self.assertEqual(resultado["eventos_procesados"], 1)
+        self.assertEqual(resultado["ultimo_evento"], primero.pk)
+
+        EventoReserva.objects.filter(pk=medio.pk).update(
+            creado=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(EventoService.consolidar()["eventos_procesados"], 2)
+        self.assertEqual(EventoService.get_resumen_vuelo(self.vuelo.id), self.conteo_actual())
+
+    def test_compactar_solo_elimina_eventos_consolidados(self):
+        reserva = self.reservar(0)
+        EventoService.consolidar(margen_segundos=0)
+        reserva.cambiar_estado("confirmada")
+
+        # Los eventos de hoy se conservan con cualquier antigüedad positiva
+        self.assertEqual(EventoService.compactar(1), 0)
+        self.assertEqual(EventoService.compactar(0), 1)
+        self.assertEqual(self.eventos(), [(reserva.id, "pendiente", "confirmada")])
+        self.assertEqual(EventoService.get_resumen_vuelo(self.vuelo.id), self.conteo_actual())
+
+    def test_comando_compactar_eventos(self):
+        self.reservar(0)
+        salida = StringIO()
+        call_command(
+            "compactar_eventos", margen_segundos=0, conservar_dias=0, stdout=salida
+        )
+        self.assertIn("Eventos acumulados: 1", salida.getvalue())
+        self.assertIn("eventos eliminados: 1", salida.getvalue())
+        self.assertFalse(EventoReserva.objects.exists())
+
+
+class AeropuertoTest(DatosReservaMixin, TestCase):
+    """Tests para la tabla de aeropuertos y la búsqueda de vuelos por ruta"""
+
+    def setUp(self):
+        self.avion = Avion.objects.create(modelo="Boeing 737", filas=10, columnas=6)
+        self.vuelos = [
+            self.crear_vuelo("Córdoba", "Buenos Aires"),
+            self.crear_vuelo("cordoba ", "Neuquén"),
+            self.crear_vuelo("Buenos Aires", "Corrientes"),
+        ]
+
+    def crear_vuelo(self, origen, destino):
+        return self.crear_vuelo_de_prueba(
+            origen, destino, dias=4, precio="120.00", avion=self.avion
+        )
+
+    def test_normalizacion_y_codigos(self):
+        self.assertEqual(normalizar_ciudad("  NEUQUÉN "), "neuquen")
+        self.assertEqual(generar_codigo("cordoba"), "COR")
+        self.assertEqual(generar_codigo("cordoba", {"COR"}), "COR2")
+        self.assertEqual(generar_codigo("la rioja"), "LAR")
+
+    def test_vuelos_comparten_aeropuerto_por_ciudad(self):
+        cordoba, neuquen = (
+            Aeropuerto.objects.get(clave="cordoba"),
+            Aeropuerto.objects.get(clave="neuquen"),
+        )
+        self.assertEqual(cordoba.codigo, "COR")
+        self.assertEqual(
+            {vuelo.aeropuerto_origen_id for vuelo in self.vuelos[:2]}, {cordoba.id}
+        )
+        self.assertEqual(self.vuelos[1].aeropuerto_destino, neuquen)
+        # Corrientes no tiene código conocido y el suyo no pisa el de Córdoba
+        self.assertEqual(Aeropuerto.objects.get(clave="corrientes").codigo, "COR2")
+        self.assertEqual(Aeropuerto.objects.count(), 4)
+
+    def test_cambiar_ciudad_reasigna_aeropuerto(self):
+        vuelo = Vuelo.objects.get(pk=self.vuelos[0].pk)
+        vuelo.destino = "Mendoza"
+        vuelo.save()
+        self.assertEqual(Vuelo.objects.get(pk=vuelo.pk).aeropuerto_destino.codigo, "MDZ")
+
+        # Guardar sin cambiar las ciudades no vuelve a resolverlas
+        with CaptureQueriesContext(connection) as consultas:
+            vuelo.precio_base = Decimal("130.00")
+            vuelo.save()
+        self.assertFalse(
+            any("airline_aeropuerto" in consulta["sql"] for consulta in consultas.captured_queries)
+        )
+
+    def test_busqueda_sin_tildes_ni_mayusculas_y_por_codigo(self):
+        def buscar(**filtros):
+            return set(VueloService.filter_vuelos(**filtros).values_list("id", flat=True))
+
+        ids = [vuelo.id for vuelo in self.vuelos]
+        self.assertEqual(buscar(origen="CÓRDOBA"), set(ids[:2]))
+        self.assertEqual(buscar(origen="cord", destino="neuquen"), {ids[1]})
+        self.assertEqual(buscar(destino="bue"), {ids[0]})
+        self.assertEqual(buscar(origen="BUE"), {ids[2]})
+        self.assertEqual(buscar(origen="Ushuaia"), set())
+        self.assertEqual(AeropuertoRepository.get_ids_por_texto("xyz"), [])
+
+    def test_busqueda_no_recorre_vuelos_por_texto(self):
+        with CaptureQueriesContext(connection) as consultas:
+            list(VueloService.filter_vuelos(origen="Córdoba", destino="Buenos Aires"))
+        sql_vuelos = consultas.captured_queries[-1]["sql"]
+        self.assertNotIn("LIKE", sql_vuelos)
+        self.assertIn("aeropuerto_origen_id", sql_vuelos)
+
+    def test_migracion_completa_vuelos_existentes(self):
+        migracion = importlib.import_module("airline.migrations.0015_aeropuertos")
+        Vuelo.objects.update(aeropuerto_origen=None, aeropuerto_destino=None)
+        Aeropuerto.objects.filter(clave="corrientes").delete()
+
+        migracion.poblar_aeropuertos(django_apps, None)
+
+        self.assertFalse(
+            Vuelo.objects.filter(
+                Q(aeropuerto_origen__isnull=True) | Q(aeropuerto_destino__isnull=True)
+            ).exists()
+        )
+        self.assertEqual(
+            Vuelo.objects.get(pk=self.vuelos[2].pk).aeropuerto_destino.clave, "corrientes"
+        )
+        self.assertEqual(Aeropuerto.objects.count(), 4)
+
+
+class PlanesConsultaTest(DatosReservaMixin, TestCase):
+    """
+    Tests de los planes de ejecución (EXPLAIN) de las consultas frecuentes.
+
+    Verifican que cada consulta use el índice pensado para ella (buscado por
+    nombre entre los índices del modelo) y no recorra la tabla completa.
+    Corren en SQLite y en PostgreSQL (con DATABASE_URL); en PostgreSQL se
+    desalientan los recorridos secuenciales, que con tablas de prueba tan
+    chicas serían más baratos.
+    """
+
+    def setUp(self):
+        self.salida = timezone.now() + timedelta(days=9)
+        self.vuelo = self.crear_vuelo_de_prueba(
+            "Mendoza", "Salta", self.salida, precio="160.00"
+        )
+        self.pasajero = self.crear_pasajeros(1, apellido="Consulta")[0]
+        self.reserva = ReservaService.create_reserva(
+            vuelo=self.vuelo,
+            pasajero=self.pasajero,
+            asiento=self.vuelo.avion.asiento_set.first(),
+        )
+
+    def plan(self, queryset):
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def indice(self, modelo, nombre):
+        """Índice declarado en el modelo con ese nombre"""
+        indices = {indice.name: indice for indice in modelo._meta.indexes}
+        self.assertIn(nombre, indices, f"{modelo.__name__} no declara el índice {nombre}")
+        return indices[nombre]
+
+    def assertUsaIndice(self, queryset, nombre):
+        self.indice(queryset.model, nombre)
+        plan = self.assertSinRecorridoCompleto(queryset, queryset.model._meta.db_table)
+        self.assertIn(nombre, plan, f"No usa {nombre}:\n{plan}")
+
+    def assertSinRecorridoCompleto(self, queryset, tabla):
+        """La tabla se lee por un índice (los únicos implícitos no tienen nombre fijo)"""
+        plan = self.plan(queryset)
+        self.assertNotRegex(plan, rf"(?m)SCAN {tabla}\s*$|Seq Scan on {tabla}\b", plan)
+        self.assertRegex(plan, rf"{tabla} USING (COVERING )?INDEX|Index.* on {tabla}\b", plan)
+        return plan
+
+    def test_filtro_por_fecha_sin_funciones_sobre_la_columna(self):
+        vuelos = VueloRepository.filter_vuelos(fecha=self.salida.date().isoformat())
+        sql = str(vuelos.query).lower()
+        self.assertNotIn("cast_date", sql)
+        self.assertNotIn("::date", sql)
+        self.assertUsaIndice(vuelos, "vuelo_salida_libres")
+
+        # El rango cubre el día local completo y nada más
+        local = timezone.localtime(self.salida).date()
+        self.assertEqual(list(VueloRepository.filter_vuelos(fecha=local)), [self.vuelo])
+        self.assertFalse(VueloRepository.filter_vuelos(fecha=local + timedelta(days=1)).exists())
+        self.assertFalse(VueloRepository.filter_vuelos(fecha="no-es-fecha").exists())
+
+    def test_ruta_y_fecha(self):
+        self.assertUsaIndice(
+            VueloRepository.filter_vuelos(
+                origen="Mendoza", destino="Salta", fecha=self.salida.date()
+            ),
+            "vuelo_ruta_fecha",
+        )
+
+    def test_estado_y_fecha(self):
+        self.assertUsaIndice(
+            VueloRepository.filter_vuelos(estado="programado", fecha=self.salida.date()),
+            "vuelo_estado_salida",
+        )
+
+    def test_reservas_de_vuelo_por_estado(self):
+        self.assertUsaIndice(
+            Reserva.objects.filter(vuelo_id=self.vuelo.id, estado__in=("pendiente", "confirmada")),
+            "reserva_vuelo_estado",
+        )
+
+    def test_reservas_de_pasajero_por_estado(self):
+        self.assertUsaIndice(
+            Reserva.objects.filter(pasajero_id=self.pasajero.id, estado="confirmada"),
+            "reserva_pasajero_estado",
+        )
+        self.assertSinRecorridoCompleto(
+            ReservaRepository.get_by_pasajero(self.pasajero.id), "airline_reserva"
+        )
+
+    def test_boleto_de_reserva(self):
+        self.assertSinRecorridoCompleto(
+            Boleto.objects.filter(reserva_id=self.reserva.id), "airline_boleto"
+        )
+
+
+class CacheBusquedasTest(SimpleTestCase):
+    """Tests para la caché LRU/TTL de búsquedas"""
+
+    def setUp(self):
+        self.ahora = 0
+        self.cache = CacheBusquedas(maximo=2, ttl=10, reloj=lambda: self.ahora)
+        self.calculos = 0
+
+    def obtener(self, clave, etiquetas=()):
+        def calcular():
+            self.calculos += 1
+            return (clave, self.calculos), etiquetas
+
+        return self.cache.obtener(clave, calcular)
+
+    def test_reutiliza_y_vence(self):
+        self.assertEqual(self.obtener("a"), ("a", 1))
+        self.assertEqual(self.obtener("a"), ("a", 1))
+        self.ahora = 10
+        self.assertEqual(self.obtener("a"), ("a", 2))
+
+    def test_expulsa_la_menos_usada(self):
+        self.obtener("a")
+        self.obtener("b")
+        self.obtener("a")
+        self.obtener("c")
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.obtener("a"), ("a", 1))
+        self.assertEqual(self.obtener("b"), ("b", 4))
+
+    def test_invalida_solo_las_etiquetas_indicadas(self):
+        self.obtener("a", {("vuelo", 1)})
+        self.obtener("b", {("vuelo", 2)})
+        self.cache.invalidar([("vuelo", 1)])
+        self.assertEqual(self.obtener("a", {("vuelo", 1)}), ("a", 3))
+        self.assertEqual(self.obtener("b", {("vuelo", 2)}), ("b", 2))
+
+    def test_no_guarda_resultados_calculados_durante_una_invalidacion(self):
+        def calcular():
+            self.cache.invalidar([("vuelo", 1)])
+            return "viejo", {("vuelo", 1)}
+
+        self.assertEqual(self.cache.obtener("a", calcular), "viejo")
+        self.assertEqual(len(self.cache), 0)
+
+    def test_invalidacion_ajena_no_impide_guardar(self):
+        def calcular():
+            self.cache.invalidar([("vuelo", 2)])
+            return "nuevo", {("vuelo", 1)}
+
+        self.assertEqual(self.cache.obtener("a", calcular), "nuevo")
+        self.assertEqual(len(self.cache), 1)
+        self.assertEqual(self.obtener("a"), "nuevo")
+
+
+    def test_invalidacion_de_otro_proceso(self):
+        compartida = LocMemCache("busquedas-test", {})
+        self.addCleanup(compartida.clear)
+        self.cache = CacheBusquedas(maximo=2, ttl=10, reloj=lambda: 0, compartida=compartida)
+        otro_proceso = CacheBusquedas(maximo=2, ttl=10, reloj=lambda: 0, compartida=compartida)
+
+        self.assertEqual(self.obtener("a", {("vuelo", 1)}), ("a", 1))
+        self.assertEqual(self.obtener("b", {("vuelo", 2)}), ("b", 2))
+        otro_proceso.invalidar([("vuelo", 1)])
+        self.assertEqual(self.obtener("a", {("vuelo", 1)}), ("a", 1))
+
+        # Solo las invalidaciones confirmadas se publican
+        otro_proceso.invalidar([("vuelo", 1)], compartir=True)
+        self.assertEqual(self.obtener("a", {("vuelo", 1)}), ("a", 3))
+        self.assertEqual(self.obtener("a", {("vuelo", 1)}), ("a", 3))
+        self.assertEqual(self.obtener("b", {("vuelo", 2)}), ("b", 2))
+
+class BusquedaVuelosCacheTest(DatosReservaMixin, TransactionTestCase):
+    """Tests para las búsquedas de vuelos a través de la caché"""
+
+    def setUp(self):
+        cache_busquedas.limpiar()
+        self.addCleanup(cache_busquedas.limpiar)
+        self.avion = Avion.objects.create(modelo="Boeing 737", filas=10, columnas=6)
+        self.pasajero = self.crear_pasajeros(1, apellido="Busqueda")[0]
+        self.vuelo = self.crear_vuelo("Córdoba", "Salta")
+
+    def crear_vuelo(self, origen, destino, dias=5):
+        return self.crear_vuelo_de_prueba(origen, destino, dias=dias, avion=self.avion)
+
+    def ids(self, filas):
+        return [fila["id"] for fila in filas]
+
+    def test_repite_busquedas_normalizadas_sin_consultar(self):
+        filas = VueloService.buscar_vuelos(origen="Córdoba")
+        self.assertEqual(self.ids(filas), [self.vuelo.id])
+        self.assertEqual(filas[0]["avion"], {"modelo": "Boeing 737"})
+        with self.assertNumQueries(0):
+            self.assertEqual(VueloService.buscar_vuelos(origen=" CORDOBA"), filas)
+
+    def test_escrituras_de_vuelos_invalidan_solo_lo_afectado(self):
+        VueloService.buscar_vuelos(origen="cordoba")
+        VueloService.buscar_vuelos(origen="salta")
+
+        # Un vuelo desde otra ciudad existente no toca la búsqueda de Córdoba
+        self.crear_vuelo("Salta", "Córdoba")
+        with self.assertNumQueries(0):
+            VueloService.buscar_vuelos(origen="cordoba")
+        self.assertEqual(len(VueloService.buscar_vuelos(origen="salta")), 1)
+
+        otro = self.crear_vuelo("Córdoba", "Salta", dias=6)
+        self.assertEqual(
+            self.ids(VueloService.buscar_vuelos(origen="cordoba")), [self.vuelo.id, otro.id]
+        )
+
+        otro.precio_base = Decimal("99.00")
+        otro.save()
+        self.assertEqual(
+            VueloService.buscar_vuelos(origen="cordoba")[1]["precio_base"], Decimal("99.00")
+        )
+
+    def test_inventario_actualiza_disponibilidad(self):
+        self.assertEqual(VueloService.buscar_vuelos(origen="cordoba")[0]["asientos_libres"], 60)
+        self.assertEqual(len(VueloService.buscar_proximos_vuelos(min_asientos=60)), 1)
+
+        ReservaService.create_reserva(
+            vuelo=self.vuelo,
+            pasajero=self.pasajero,
+            asiento=self.avion.asiento_set.first(),
+            estado="confirmada",
+        )
+        self.assertEqual(VueloService.buscar_vuelos(origen="cordoba")[0]["asientos_libres"], 59)
+        self.assertEqual(VueloService.buscar_proximos_vuelos(min_asientos=60), [])
+
+    def test_cancelar_vuelo_invalida_busquedas_por_estado(self):
+        self.assertEqual(VueloService.buscar_vuelos(estado="cancelado"), [])
+        VueloService.cancelar_vuelo(self.vuelo.id)
+        self.assertEqual(self.ids(VueloService.buscar_vuelos(estado="cancelado")), [self.vuelo.id])
+
+    def test_dentro_de_una_transaccion_no_usa_la_cache(self):
+        with transaction.atomic():
+            VueloService.buscar_vuelos(origen="cordoba")
+        self.assertEqual(len(cache_busquedas), 0)
+
+
+class PruebaCargaReservasTest(TransactionTestCase):
+    """Tests para el comando prueba_carga_reservas"""
+
+    def test_informa_y_limpia(self):
+        salida = StringIO()
+        call_command(
+            "prueba_carga_reservas",
+            intentos=6,
+            hilos=1,
+            asientos=2,
+            semilla=1,
+            stdout=salida,
+        )
+        informe = salida.getvalue()
+        self.assertIn("Latencia (ms): p50=", informe)
+        self.assertIn("2 reservadas, 4 rechazadas", informe)
+        self.assertIn("Sin reservas dobles", informe)
+        self.assertFalse(Vuelo.objects.exists())
+        self.assertFalse(Pasajero.objects.exists())
+
+
+class GrafoRutasTest(SimpleTestCase):
+    """Tests para el grafo en memoria de rutas y la búsqueda de conexiones"""
+
+    def setUp(self):
+        self.base = timezone.now() + timedelta(days=2)
+        self.grafo = GrafoRutas(recarga=300)
+        # Aeropuertos: 1 origen, 2 y 3 escalas, 4 destino
+        self.grafo.cargar(
+            [
+                self.fila(1, 1, 4, 0, 3),  # directo
+                self.fila(2, 1, 2, 0, 1),
+                self.fila(3, 2, 4, 2, 4),  # conecta con 2 (1 h)
+                self.fila(4, 2, 4, 1.5, 3.5),  # conexión de 30 min
+                self.fila(5, 2, 3, 2, 2.5),
+                self.fila(6, 3, 4, 3.5, 4.5),  # 2 -> 3 -> 4
+                self.fila(7, 2, 1, 2, 3),  # vuelve al origen
+                self.fila(8, 2, 4, 9, 10),  # conexión de 8 h
+            ]
+        )
+
+    def fila(self, vuelo_id, origen, destino, sale, llega, libres=10):
+        return (
+            vuelo_id,
+            origen,
+            destino,
+            f"Ciudad {origen}",
+            f"Ciudad {destino}",
+            self.base + timedelta(hours=sale),
+            self.base + timedelta(hours=llega),
+            Decimal("100.00"),
+            libres,
+        )
+
+    def buscar(self, **opciones):
+        itinerarios = self.grafo.buscar(
+            [1], [4], self.base, self.base + timedelta(days=1), **opciones
+        )
+        return [[tramo.id for tramo in itinerario] for itinerario in itinerarios]
+
+    def test_conexiones_dentro_de_la_ventana(self):
+        self.assertEqual(self.buscar(), [[1], [2, 3], [2, 5, 6]])
+        self.assertEqual(self.buscar(max_escalas=1), [[1], [2, 3]])
+        self.assertEqual(self.buscar(max_escalas=0), [[1]])
+        self.assertEqual(
+            self.buscar(conexion_max=timedelta(hours=9)), [[1], [2, 3], [2, 5, 6], [2, 8]]
+        )
+        self.assertEqual(
+            self.buscar(conexion_min=timedelta(minutes=15)), [[1], [2, 4], [2, 3], [2, 5, 6]]
+        )
+
+    def test_asientos_libres_en_cada_tramo(self):
+        self.grafo.actualizar(
+            [1, 5], [self.fila(1, 1, 4, 0, 3, libres=1), self.fila(5, 2, 3, 2, 2.5, libres=1)]
+        )
+        self.assertEqual(self.buscar(min_libres=2), [[2, 3]])
+
+    def test_actualizar_y_quitar_tramos(self):
+        # El vuelo 3 se demora y el 6 se cancela (no vuelve en las filas)
+        self.grafo.actualizar([3, 6], [self.fila(3, 2, 4, 5, 7)])
+        self.assertEqual(self.buscar(), [[1], [2, 3]])
+        self.assertEqual(self.buscar(conexion_max=timedelta(hours=3)), [[1]])
+        self.assertEqual(len(self.grafo), 7)
+
+    def test_descarta_los_tramos_que_salieron(self):
+        grafo = GrafoRutas(recarga=300)
+        # Sale una hora antes de ahora
+        salido = self.fila(1, 1, 2, -49, -47)
+        grafo.sincronizar(lambda vuelo_ids: [salido, self.fila(2, 1, 4, 0, 3)])
+        self.assertEqual(len(grafo), 1)
+        self.assertEqual(list(grafo._rutas), [(1, 4)])
+        self.assertEqual(grafo._primera_salida, self.base)
+
+    def test_recarga_en_segundo_plano(self):
+        ahora = [0]
+        recargas = []
+        grafo = GrafoRutas(recarga=300, reloj=lambda: ahora[0], lanzar=recargas.append)
+        filas = {1: self.fila(1, 1, 4, 0, 3), 2: self.fila(2, 1, 2, 0, 1)}
+        lecturas = []
+
+        def leer(vuelo_ids):
+            lecturas.append(vuelo_ids)
+            ids = filas if vuelo_ids is None else vuelo_ids
+            return [filas[vuelo_id] for vuelo_id in ids if vuelo_id in filas]
+
+        grafo.sincronizar(leer)
+        self.assertEqual(lecturas, [None])
+
+        # Vencido el intervalo, la búsqueda sigue con el grafo actual
+        ahora[0] = 300
+        filas[3] = self.fila(3, 2, 4, 2, 4)
+        grafo.sincronizar(leer)
+        grafo.sincronizar(leer)
+        self.assertEqual(len(recargas), 1)
+        self.assertEqual(lecturas, [None])
+        self.assertEqual(len(grafo), 2)
+
+        # Un vuelo que cambia durante la recarga se vuelve a leer después
+        filas[1] = self.fila(1, 1, 4, 0, 3, libres=0)
+        grafo.marcar([1])
+        grafo.sincronizar(leer)
+        self.assertEqual(lecturas, [None, [1]])
+
+        recargas[0]()
+        self.assertTrue(grafo.esperar_recarga(0))
+        self.assertEqual(len(grafo), 3)
+        grafo.sincronizar(leer)
+        self.assertEqual(lecturas, [None, [1], None, [1]])
+        self.assertEqual(grafo._tramos[1].libres, 0)
+
+        # El próximo vencimiento se cuenta desde el comienzo de la recarga
+        ahora[0] = 599
+        grafo.sincronizar(leer)
+        self.assertEqual(len(recargas), 1)
+
+
+class BuscarConexionesTest(DatosReservaMixin, TransactionTestCase):
+    """Tests para VueloService.buscar_conexiones sobre el grafo de rutas"""
+
+    def setUp(self):
+        grafo_rutas.limpiar()
+        self.addCleanup(grafo_rutas.limpiar)
+        self.avion = Avion.objects.create(modelo="Boeing 737", filas=10, columnas=6)
+        self.dia = (timezone.localtime() + timedelta(days=3)).date()
+        self.base = timezone.make_aware(datetime.combine(self.dia, datetime.min.time()))
+        self.base += timedelta(hours=8)
+        self.ida = self.crear_vuelo("Córdoba", "Mendoza", 0)
+        self.conexion = self.crear_vuelo("Mendoza", "Santiago", 3)
+
+    def crear_vuelo(self, origen, destino, horas):
+        return self.crear_vuelo_de_prueba(
+            origen,
+            destino,
+            self.base + timedelta(hours=horas),
+            precio="120.00",
+            avion=self.avion,
+        )
+
+    def buscar(self, **opciones):
+        itinerarios = VueloService.buscar_conexiones(
+            "cordoba", "SCL", self.dia.isoformat(), **opciones
+        )
+        return [[tramo["id"] for tramo in itinerario["tramos"]] for itinerario in itinerarios]
+
+    def test_itinerario_con_escala(self):
+        itinerarios = VueloService.buscar_conexiones("cordoba", "santiago", self.dia)
+        self.assertEqual(len(itinerarios), 1)
+        self.assertEqual(itinerarios[0]["escalas"], 1)
+        self.assertEqual(itinerarios[0]["precio_total"], Decimal("240.00"))
+        self.assertEqual(itinerarios[0]["duracion"], timedelta(hours=5))
+        self.assertEqual(self.buscar(conexion_min=90), [])
+
+    def test_lee_solo_los_vuelos_que_cambiaron(self):
+        self.assertEqual(self.buscar(), [[self.ida.id, self.conexion.id]])
+        directo = self.crear_vuelo("Córdoba", "Santiago", 1)
+        with self.assertNumQueries(3):
+            # Aeropuertos de origen y destino y solo el vuelo nuevo
+            self.assertEqual(
+                self.buscar(), [[directo.id], [self.ida.id, self.conexion.id]]
+            )
+
+        VueloRepository.marcar_cancelado(self.conexion.id)
+        self.assertEqual(self.buscar(), [[directo.id]])
+
+    def test_recarga_completa_en_otro_hilo(self):
+        self.assertEqual(self.buscar(), [[self.ida.id, self.conexion.id]])
+        # Un cambio que el proceso no marcó (por ejemplo, de otro worker)
+        Vuelo.objects.filter(pk=self.conexion.id).update(estado="cancelado")
+
+        with mock.patch.object(grafo_rutas, "recarga", 0):
+            self.buscar()
+            self.assertTrue(grafo_rutas.esperar_recarga(5))
+        self.assertEqual(self.buscar(), [])
+
+    def test_parametros_invalidos(self):
+        with self.assertRaises(DRFValidationError) as contexto:
+            VueloService.buscar_conexiones("", "santiago", "2025-13-01", max_escalas=3)
+        self.assertEqual(
+            set(contexto.exception.detail), {"origen", "fecha", "max_escalas"}
+        )
+        with self.assertRaises(DRFValidationError):
+            self.buscar(conexion_min=120, conexion_max=60)
+        self.assertEqual(VueloService.buscar_conexiones("atlantida", "santiago", self.dia), [])
@@ -36,4 +36,9 @@ urlpatterns = [
         name="detalle_reserva",
     ),
     path("reservas/mis-reservas/", home_views.mis_reservas, name="mis_reservas"),
+    path(
+        "reservas/cancelar/<int:reserva_id>/",
+        home_views.cancelar_reserva,
+        name="cancelar_reserva",
+    ),
 ]
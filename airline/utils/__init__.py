@@ -4,3 +4,5 @@ Utilidades generales para la aplicación airline.
 
 from .validators import *
 from .helpers import *
+from .mapa_asientos import *
+from .publicador_asientos import *
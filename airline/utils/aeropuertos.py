@@ -0,0 +1,98 @@
+"""
+Normalización de nombres de ciudades y códigos de aeropuerto.
+
+La clave de búsqueda de una ciudad se escribe sin tildes, en minúsculas y con
+los espacios colapsados, de modo que "Córdoba", "cordoba" y " CORDOBA " den
+la misma clave. Los códigos se toman de CODIGOS_CONOCIDOS cuando la ciudad
+está ahí y, si no, se derivan de la clave.
+"""
+
+import unicodedata
+
+# Códigos IATA de ciudad para los destinos habituales, por clave normalizada
+CODIGOS_CONOCIDOS = {
+    "buenos aires": "BUE",
+    "cordoba": "COR",
+    "rosario": "ROS",
+    "mendoza": "MDZ",
+    "tucuman": "TUC",
+    "salta": "SLA",
+    "bariloche": "BRC",
+    "ushuaia": "USH",
+    "neuquen": "NQN",
+    "mar del plata": "MDQ",
+    "iguazu": "IGR",
+    "montevideo": "MVD",
+    "santiago": "SCL",
+    "sao paulo": "SAO",
+    "rio de janeiro": "RIO",
+    "lima": "LIM",
+    "madrid": "MAD",
+    "miami": "MIA",
+}
+
+LARGO_CODIGO_BASE = 3
+
+
+def normalizar_ciudad(texto):
+    """
+    Clave de búsqueda de una ciudad: sin tildes, en minúsculas y con los
+    espacios colapsados.
+
+    Args:
+        texto (str): Nombre de la ciudad tal como lo escribió el usuario
+
+    Returns:
+        str: Clave normalizada
+
+    Example:
+        >>> normalizar_ciudad("  San Carlos de  BARILOCHE ")
+        'san carlos de bariloche'
+        >>> normalizar_ciudad("Neuquén")
+        'neuquen'
+    """
+    descompuesto = unicodedata.normalize("NFKD", texto or "")
+    sin_tildes = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(sin_tildes.casefold().split())
+
+
+def codigo_base(clave):
+    """
+    Primeras letras de la clave, que forman el código de las ciudades que
+    no están en CODIGOS_CONOCIDOS.
+
+    Example:
+        >>> codigo_base("la rioja")
+        'LAR'
+    """
+    letras = "".join(c for c in clave.upper() if "A" <= c <= "Z")
+    return letras[:LARGO_CODIGO_BASE].ljust(LARGO_CODIGO_BASE, "X")
+
+
+def generar_codigo(clave, ocupados=()):
+    """
+    Código para una ciudad nueva.
+
+    Args:
+        clave (str): Clave normalizada de la ciudad
+        ocupados: Códigos ya usados por otras ciudades
+
+    Returns:
+        str: Código conocido de la ciudad o, si no lo hay, las primeras
+            letras de la clave con un número si ya están ocupadas
+
+    Example:
+        >>> generar_codigo("cordoba")
+        'COR'
+        >>> generar_codigo("corrientes", ocupados={"COR"})
+        'COR2'
+    """
+    conocido = CODIGOS_CONOCIDOS.get(clave)
+    if conocido and conocido not in ocupados:
+        return conocido
+    base = codigo_base(clave)
+    codigo, numero = base, 1
+    while codigo in ocupados:
+        numero += 1
+        codigo = f"{base}{numero}"
+    return codigo
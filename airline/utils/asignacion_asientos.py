@@ -0,0 +1,152 @@
+"""
+Asignación automática de asientos para una o varias personas.
+
+La estructura de cabina (filas de cada clase, columnas y pasillos) se
+precalcula una sola vez por (plantilla, filas, columnas), igual que la
+distribución de asientos, y la búsqueda del mejor bloque trabaja en memoria
+sobre el conjunto de asientos libres del vuelo.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+
+
+@dataclass(frozen=True)
+class EstructuraCabina:
+    """
+    Filas y columnas de un avión, agrupadas por clase.
+
+    Attributes:
+        filas_por_tipo (dict): Tipo de asiento -> tupla de filas (en orden)
+        columnas (int): Cantidad de columnas del avión
+        pasillos (tuple): Índices de columna (desde 0) seguidos de un pasillo
+    """
+
+    filas_por_tipo: dict
+    columnas: int
+    pasillos: tuple
+
+    def pasillos_entre(self, desde, hasta):
+        """Cantidad de pasillos entre las columnas desde y hasta (inclusive)"""
+        return sum(1 for p in self.pasillos if desde <= p < hasta)
+
+
+@lru_cache(maxsize=128)
+def estructura_cabina(plantilla, filas, columnas):
+    """
+    Precalcula la estructura de cabina de un avión.
+
+    Args:
+        plantilla (PlantillaAsientos): Plantilla de distribución del avión
+        filas (int): Cantidad de filas
+        columnas (int): Cantidad de columnas
+
+    Returns:
+        EstructuraCabina: Estructura compartida por todos los aviones iguales
+    """
+    filas_por_tipo = {}
+    for fila in range(1, filas + 1):
+        filas_por_tipo.setdefault(plantilla.tipo_para_fila(fila), []).append(fila)
+    return EstructuraCabina(
+        filas_por_tipo={tipo: tuple(f) for tipo, f in filas_por_tipo.items()},
+        columnas=columnas,
+        pasillos=plantilla.pasillos_para(columnas),
+    )
+
+
+def buscar_bloque(estructura, tipo, libres, cantidad):
+    """
+    Busca el mejor bloque de asientos libres contiguos para un grupo.
+
+    Se prueban ventanas de filas consecutivas y rangos de columnas, y se
+    elige la de menor costo, en este orden de prioridad:
+
+    1. Que los asientos de cada fila queden juntos (sin asientos ocupados
+       o bloqueados en el medio).
+    2. La menor cantidad de filas (primero la misma fila, después filas
+       vecinas).
+    3. La menor cantidad de pasillos en el medio.
+    4. El rango de columnas más angosto.
+    5. Las filas más adelante y las columnas más a la izquierda.
+
+    Args:
+        estructura (EstructuraCabina): Estructura de cabina del avión
+        tipo (str): Clase en la que se buscan los asientos
+        libres (set): Asientos libres del vuelo como tuplas (fila, columna),
+            con la columna como índice desde 0
+        cantidad (int): Cantidad de asientos a asignar
+
+    Returns:
+        list: Tuplas (fila, columna) del bloque elegido, o una lista vacía si
+        no hay suficientes asientos libres en la clase
+
+    Example:
+        >>> est = EstructuraCabina({"economico": (1,)}, 4, (1,))
+        >>> buscar_bloque(est, "economico", {(1, 0), (1, 2), (1, 3)}, 2)
+        [(1, 2), (1, 3)]
+    """
+    filas = estructura.filas_por_tipo.get(tipo, ())
+    libres_por_fila = {
+        fila: [col for col in range(estructura.columnas) if (fila, col) in libres]
+        for fila in filas
+    }
+    if cantidad < 1 or sum(map(len, libres_por_fila.values())) < cantidad:
+        return []
+
+    mejor = None
+    mejor_costo = None
+    # Un bloque nunca necesita más filas que personas
+    for cant_filas in range(1, min(len(filas), cantidad) + 1):
+        # Con un bloque ya contiguo, más filas nunca mejoran el costo
+        if mejor_costo is not None and mejor_costo[0] == 0:
+            break
+        for inicio in range(len(filas) - cant_filas + 1):
+            ventana = filas[inicio : inicio + cant_filas]
+            # Solo filas realmente vecinas (la clase puede no ser continua)
+            if ventana[-1] - ventana[0] != cant_filas - 1:
+                continue
+            if sum(len(libres_por_fila[f]) for f in ventana) < cantidad:
+                continue
+            for desde in range(estructura.columnas):
+                for hasta in range(desde, estructura.columnas):
+                    elegidos = _elegir(ventana, libres_por_fila, desde, hasta, cantidad)
+                    if elegidos is None:
+                        continue
+                    costo = (
+                        _huecos(elegidos, libres),
+                        cant_filas,
+                        estructura.pasillos_entre(desde, hasta),
+                        hasta - desde,
+                        ventana[0],
+                        desde,
+                    )
+                    if mejor_costo is None or costo < mejor_costo:
+                        mejor, mejor_costo = elegidos, costo
+                    # Ensanchar el rango ya no mejora esta ventana
+                    break
+    return mejor or []
+
+
+def _elegir(ventana, libres_por_fila, desde, hasta, cantidad):
+    """Primeros asientos libres de la ventana dentro del rango de columnas"""
+    elegidos = []
+    for fila in ventana:
+        for col in libres_por_fila[fila]:
+            if desde <= col <= hasta:
+                elegidos.append((fila, col))
+                if len(elegidos) == cantidad:
+                    return elegidos
+    return None
+
+
+def _huecos(elegidos, libres):
+    """Asientos no libres que quedan entre los elegidos de una misma fila"""
+    por_fila = {}
+    for fila, col in elegidos:
+        por_fila.setdefault(fila, []).append(col)
+    return sum(
+        1
+        for fila, cols in por_fila.items()
+        for col in range(min(cols), max(cols) + 1)
+        if (fila, col) not in libres
+    )
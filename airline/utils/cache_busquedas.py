@@ -0,0 +1,291 @@
+"""
+Caché en memoria de los resultados de búsqueda de vuelos.
+
+Las búsquedas de /api/flightFilter/ y /api/flightAvailable/ se repiten mucho
+más de lo que cambian los vuelos, así que cada proceso guarda sus resultados
+como tuplas de valores (no instancias de modelos), con expulsión LRU y un
+vencimiento (TTL).
+
+Cada entrada se guarda con etiquetas que describen de qué depende: los vuelos
+que aparecen en el resultado y los criterios por los que otro vuelo podría
+empezar a aparecer (origen, estado, disponibilidad). Las escrituras de vuelos
+y de inventario invalidan solo las etiquetas que tocan, en el momento y otra
+vez al confirmarse la transacción; un resultado que depende de ellas y se
+calculó mientras tanto no se guarda.
+
+Para que los demás procesos (otros workers) también dejen de usar lo que
+cambió, al confirmarse la transacción cada invalidación se publica en la
+caché compartida de Django (BUSQUEDAS_CACHE_COMPARTIDA, por ejemplo Redis o
+Memcached): un contador de generación y, por cada etiqueta, la generación en
+que se invalidó por última vez. Cada entrada recuerda la generación en que
+empezó a calcularse y, antes de devolverla, se leen con un solo get_many las
+marcas de sus etiquetas; si alguna es posterior, se vuelve a calcular. Si la
+caché de Django es la de memoria (también por proceso) no se publica nada y
+el TTL (BUSQUEDAS_CACHE_TTL_SEGUNDOS) acota cuánto tarda otro proceso en ver
+un cambio.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection, transaction
+
+from airline.utils.grafo_rutas import grafo_rutas
+
+# Etiqueta de las búsquedas sin filtro de origen o estado
+TODOS = "*"
+
+# Clave del contador de generación en la caché compartida
+CLAVE_GENERACION = "busquedas:generacion"
+
+
+class CacheBusquedas:
+    """
+    Caché LRU con vencimiento e invalidación por etiquetas.
+
+    Es seguro usarla desde varios hilos.
+
+    Args:
+        maximo (int): Cantidad máxima de entradas
+        ttl (float): Segundos de vida de cada entrada
+        reloj (callable): Fuente del tiempo (monotónica)
+        compartida: Caché de Django compartida entre procesos donde se
+            publican las invalidaciones (None: solo este proceso)
+    """
+
+    def __init__(self, maximo, ttl, reloj=time.monotonic, compartida=None):
+        self.maximo = maximo
+        self.ttl = ttl
+        self.compartida = compartida
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        # clave -> (vence, etiquetas, valor, generación compartida al
+        # empezar a calcularla), de la menos a la más usada
+        self._entradas = OrderedDict()
+        # etiqueta -> claves que dependen de ella
+        self._por_etiqueta = {}
+        # Crece con cada invalidación; un resultado calculado mientras se
+        # invalidó alguna de sus etiquetas puede estar desactualizado y no
+        # se guarda
+        self._generacion = 0
+        # Cálculos en curso y, mientras haya alguno, generación de la última
+        # invalidación de cada etiqueta
+        self._calculando = 0
+        self._invalidadas = {}
+        self._limpiada = 0
+
+    def obtener(self, clave, calcular, vigencia=None):
+        """
+        Devuelve el valor guardado para la clave o lo calcula y lo guarda.
+
+        Dentro de una transacción no se lee ni se guarda nada: el resultado
+        podría incluir cambios todavía no confirmados. Con caché compartida,
+        una entrada cuyas etiquetas otro proceso invalidó después de
+        calcularla se descarta.
+
+        Args:
+            clave: Clave de la búsqueda (hashable)
+            calcular (callable): Devuelve (valor, etiquetas)
+            vigencia (callable): Recibe el valor y devuelve los segundos
+                que sigue siendo válido, si es menos que el TTL (o None)
+
+        Returns:
+            El valor guardado o recién calculado
+        """
+        if self.ttl <= 0 or connection.in_atomic_block:
+            return calcular()[0]
+
+        ahora = self._reloj()
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                if entrada[0] > ahora:
+                    self._entradas.move_to_end(clave)
+                else:
+                    self._quitar(clave)
+                    entrada = None
+        # La caché compartida se consulta fuera del lock
+        if entrada is not None and self._vigente_en_otros(entrada):
+            return entrada[2]
+
+        with self._lock:
+            if entrada is not None and self._entradas.get(clave) is entrada:
+                self._quitar(clave)
+            generacion = self._generacion
+            self._calculando += 1
+
+        try:
+            compartida = self._generacion_compartida()
+            valor, etiquetas = calcular()
+            vida = self.ttl
+            if vigencia is not None:
+                limite = vigencia(valor)
+                if limite is not None:
+                    vida = min(vida, limite)
+        except BaseException:
+            with self._lock:
+                self._terminar_calculo()
+            raise
+
+        with self._lock:
+            vigente = vida > 0 and not self._invalidado_desde(generacion, etiquetas)
+            self._terminar_calculo()
+            if vigente:
+                self._quitar(clave)
+                self._entradas[clave] = (ahora + vida, frozenset(etiquetas), valor, compartida)
+                for etiqueta in etiquetas:
+                    self._por_etiqueta.setdefault(etiqueta, set()).add(clave)
+                while len(self._entradas) > self.maximo:
+                    self._quitar(next(iter(self._entradas)))
+        return valor
+
+    def invalidar(self, etiquetas, compartir=False):
+        """
+        Elimina las entradas que dependen de alguna de las etiquetas.
+
+        Args:
+            etiquetas: Etiquetas invalidadas
+            compartir (bool): Publicar la invalidación para los demás
+                procesos (solo con los cambios ya confirmados)
+        """
+        etiquetas = list(etiquetas)
+        with self._lock:
+            self._generacion += 1
+            for etiqueta in etiquetas:
+                if self._calculando:
+                    self._invalidadas[etiqueta] = self._generacion
+                for clave in self._por_etiqueta.pop(etiqueta, ()):
+                    self._quitar(clave)
+        if compartir and self.compartida is not None and etiquetas and self.ttl > 0:
+            generacion = self._incrementar_generacion_compartida()
+            # Las marcas duran más que cualquier entrada que dependa de ellas
+            self.compartida.set_many(
+                {self._clave_compartida(etiqueta): generacion for etiqueta in etiquetas},
+                timeout=2 * self.ttl,
+            )
+
+    def limpiar(self):
+        """Elimina todas las entradas (por ejemplo, entre tests)"""
+        with self._lock:
+            self._generacion += 1
+            self._limpiada = self._generacion
+            self._entradas.clear()
+            self._por_etiqueta.clear()
+
+    def __len__(self):
+        return len(self._entradas)
+
+    @staticmethod
+    def _clave_compartida(etiqueta):
+        return "busquedas:" + ":".join(str(parte) for parte in etiqueta)
+
+    def _generacion_compartida(self):
+        if self.compartida is None:
+            return 0
+        return self.compartida.get(CLAVE_GENERACION, 0)
+
+    def _incrementar_generacion_compartida(self):
+        # Si el contador se perdió (expulsado de la caché) vuelve a empezar
+        # desde el reloj, por encima de cualquier generación anterior
+        self.compartida.add(CLAVE_GENERACION, time.time_ns(), timeout=None)
+        try:
+            return self.compartida.incr(CLAVE_GENERACION)
+        except ValueError:
+            self.compartida.add(CLAVE_GENERACION, time.time_ns(), timeout=None)
+            return self.compartida.incr(CLAVE_GENERACION)
+
+    def _vigente_en_otros(self, entrada):
+        """Si ningún proceso invalidó las etiquetas de la entrada después de calcularla"""
+        if self.compartida is None or not entrada[1]:
+            return True
+        marcas = self.compartida.get_many(
+            [self._clave_compartida(etiqueta) for etiqueta in entrada[1]]
+        )
+        return all(marca <= entrada[3] for marca in marcas.values())
+
+    def _invalidado_desde(self, generacion, etiquetas):
+        """Si se invalidó alguna de las etiquetas después de esa generación"""
+        if self._limpiada > generacion:
+            return True
+        return any(self._invalidadas.get(etiqueta, 0) > generacion for etiqueta in etiquetas)
+
+    def _terminar_calculo(self):
+        self._calculando -= 1
+        if not self._calculando:
+            # Ningún cálculo empezó antes de las invalidaciones registradas
+            self._invalidadas.clear()
+
+    def _quitar(self, clave):
+        entrada = self._entradas.pop(clave, None)
+        if entrada is None:
+            return
+        for etiqueta in entrada[1]:
+            claves = self._por_etiqueta.get(etiqueta)
+            if claves is not None:
+                claves.discard(clave)
+                if not claves:
+                    del self._por_etiqueta[etiqueta]
+
+
+def _get_cache_compartida():
+    """Caché de Django donde se publican las invalidaciones, o None"""
+    alias = getattr(settings, "BUSQUEDAS_CACHE_COMPARTIDA", "default")
+    if not alias:
+        return None
+    compartida = caches[alias]
+    # La caché en memoria de Django también es por proceso
+    if isinstance(compartida, LocMemCache):
+        return None
+    return compartida
+
+
+cache_busquedas = CacheBusquedas(
+    maximo=getattr(settings, "BUSQUEDAS_CACHE_MAXIMO", 2048),
+    ttl=getattr(settings, "BUSQUEDAS_CACHE_TTL_SEGUNDOS", 300),
+    compartida=_get_cache_compartida(),
+)
+
+
+def _invalidar(etiquetas):
+    """
+    Invalida ahora y otra vez cuando se confirma la transacción en curso;
+    esta segunda vez también para los demás procesos.
+    """
+    etiquetas = list(etiquetas)
+    cache_busquedas.invalidar(etiquetas)
+    transaction.on_commit(lambda: cache_busquedas.invalidar(etiquetas, compartir=True))
+
+
+def invalidar_vuelos(vuelo_ids, origenes=None, estados=(), disponibilidad=False):
+    """
+    Invalida las búsquedas afectadas por la escritura de vuelos.
+
+    Args:
+        vuelo_ids: Vuelos modificados (invalida los resultados que los incluyen)
+        origenes: Aeropuertos de origen de los vuelos, si pudieron cambiar los
+            datos por los que se buscan; None si solo cambió su inventario o
+            su estado
+        estados: Estados nuevos de los vuelos, si cambiaron
+        disponibilidad (bool): True si cambiaron los asientos libres
+
+    Además marca los vuelos para que el grafo de rutas vuelva a leerlos.
+    """
+    vuelo_ids = list(vuelo_ids)
+    grafo_rutas.marcar(vuelo_ids)
+    transaction.on_commit(lambda: grafo_rutas.marcar(vuelo_ids))
+    etiquetas = [("vuelo", vuelo_id) for vuelo_id in vuelo_ids]
+    if origenes is not None:
+        etiquetas += [("origen", TODOS)] + [("origen", origen) for origen in origenes]
+    etiquetas += [("estado", estado) for estado in estados]
+    if disponibilidad:
+        etiquetas.append(("disponibilidad",))
+    _invalidar(etiquetas)
+
+
+def invalidar_aeropuertos():
+    """Invalida las búsquedas por texto: una ciudad nueva puede coincidir con ellas"""
+    _invalidar([("aeropuertos",)])
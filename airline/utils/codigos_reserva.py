@@ -0,0 +1,200 @@
+"""
+Generación de códigos de reserva sin consultar la tabla de reservas.
+
+Cada código sale de un número de secuencia distinto: los números se reservan
+en la base de a bloques (un UPDATE cada TAMANO_BLOQUE códigos) y se reparten
+en memoria. Cada número se transforma con una permutación con clave del
+espacio de 36^8 valores y se escribe con 8 caracteres de A-Z0-9, así que dos
+números distintos nunca dan el mismo código y no hace falta verificar
+colisiones: el costo por código es el mismo con 100 o con 10 millones de
+reservas.
+
+Los números de un bloque reservado dentro de una transacción solo se
+comparten con otros hilos cuando esa transacción confirma; si se revierte,
+la secuencia vuelve atrás y el resto del bloque se descarta.
+
+Para saber si un bloque de la transacción en curso sigue siendo válido no se
+lee el estado interno de Django: el bloque se publica con un callback de
+transaction.on_commit y el generador guarda solo una referencia débil a ese
+callback. Mientras la transacción (o el savepoint) siga abierta, Django
+conserva el callback; si confirma, lo ejecuta y lo suelta, y si se revierte,
+lo descarta sin ejecutarlo. En ambos casos la referencia muere y el bloque
+deja de usarse como propio de la transacción.
+"""
+
+import hashlib
+import string
+import threading
+import weakref
+
+from django.conf import settings
+from django.db import transaction
+
+ALFABETO_CODIGOS = string.ascii_uppercase + string.digits
+LARGO_CODIGO = 8
+CANTIDAD_CODIGOS = len(ALFABETO_CODIGOS) ** LARGO_CODIGO
+
+# Números de secuencia que se reservan por cada UPDATE
+TAMANO_BLOQUE = 1000
+
+# La permutación trabaja sobre 42 bits (2^42 > 36^8) y descarta los valores
+# fuera de rango volviendo a permutarlos
+_BITS_MITAD = 21
+_MASCARA_MITAD = (1 << _BITS_MITAD) - 1
+_RONDAS = 4
+
+
+def codificar_numero(numero, clave):
+    """
+    Convierte un número de secuencia en un código de reserva.
+
+    Args:
+        numero (int): Número de secuencia, entre 0 y CANTIDAD_CODIGOS - 1
+        clave (bytes): Clave de la permutación
+
+    Returns:
+        str: Código de 8 caracteres (A-Z0-9), distinto para cada número
+
+    Example:
+        >>> codificar_numero(1, b"clave") != codificar_numero(2, b"clave")
+        True
+    """
+    if not 0 <= numero < CANTIDAD_CODIGOS:
+        raise ValueError("Se agotaron los códigos de reserva de 8 caracteres")
+    valor = _permutar(numero, clave)
+    # Los valores fuera del rango se vuelven a permutar hasta caer adentro,
+    # lo que mantiene la biyección sobre [0, CANTIDAD_CODIGOS)
+    while valor >= CANTIDAD_CODIGOS:
+        valor = _permutar(valor, clave)
+
+    caracteres = []
+    for _ in range(LARGO_CODIGO):
+        valor, resto = divmod(valor, len(ALFABETO_CODIGOS))
+        caracteres.append(ALFABETO_CODIGOS[resto])
+    return "".join(reversed(caracteres))
+
+
+def _permutar(valor, clave):
+    """Red de Feistel de 4 rondas sobre 42 bits"""
+    izquierda, derecha = valor >> _BITS_MITAD, valor & _MASCARA_MITAD
+    for ronda in range(_RONDAS):
+        resumen = hashlib.blake2b(
+            derecha.to_bytes(3, "big") + bytes([ronda]), key=clave, digest_size=4
+        ).digest()
+        izquierda, derecha = derecha, izquierda ^ (
+            int.from_bytes(resumen, "big") & _MASCARA_MITAD
+        )
+    return (izquierda << _BITS_MITAD) | derecha
+
+
+class _Bloque:
+    """Números todavía sin usar de un bloque reservado"""
+
+    def __init__(self, rango):
+        self.rango = rango
+
+    def tomar(self, cantidad):
+        tomados, self.rango = self.rango[:cantidad], self.rango[cantidad:]
+        return tomados
+
+
+class GeneradorCodigos:
+    """
+    Reparte códigos de reserva a partir de bloques de números de secuencia.
+
+    Se crea una sola instancia por proceso y es seguro usarla desde varios
+    hilos.
+
+    Args:
+        reservar_bloque (callable): Recibe una cantidad, reserva esa cantidad
+            de números en la base y devuelve el primero
+        tamano_bloque (int): Números a reservar por cada consulta
+    """
+
+    def __init__(self, reservar_bloque, tamano_bloque=TAMANO_BLOQUE):
+        self._reservar_bloque = reservar_bloque
+        self.tamano_bloque = tamano_bloque
+        self._lock = threading.Lock()
+        # Bloques confirmados, disponibles para cualquier hilo
+        self._libres = []
+        # Bloques reservados por la transacción en curso de cada hilo
+        self._local = threading.local()
+
+    def generar(self, cantidad):
+        """
+        Genera códigos de reserva únicos.
+
+        Args:
+            cantidad (int): Cantidad de códigos a generar
+
+        Returns:
+            list: Códigos de 8 caracteres, sin repetir
+        """
+        numeros = []
+        for bloque in self._bloques_de_la_transaccion():
+            numeros.extend(bloque.tomar(cantidad - len(numeros)))
+
+        if len(numeros) < cantidad:
+            with self._lock:
+                while self._libres and len(numeros) < cantidad:
+                    numeros.extend(self._libres[0].tomar(cantidad - len(numeros)))
+                    if not self._libres[0].rango:
+                        self._libres.pop(0)
+
+        if len(numeros) < cantidad:
+            tamano = max(self.tamano_bloque, cantidad - len(numeros))
+            primero = self._reservar_bloque(tamano)
+            bloque = _Bloque(range(primero, primero + tamano))
+            numeros.extend(bloque.tomar(cantidad - len(numeros)))
+            self._guardar(bloque)
+
+        clave = self.clave()
+        return [codificar_numero(numero, clave) for numero in numeros]
+
+    @staticmethod
+    def clave():
+        return settings.CODIGOS_RESERVA_CLAVE.encode()
+
+    def _guardar(self, bloque):
+        """Guarda el resto de un bloque recién reservado"""
+        if not bloque.rango:
+            return
+
+        # Dentro de una transacción el bloque queda para este hilo hasta que
+        # confirme; recién entonces se comparte con el resto del proceso.
+        # Fuera de una, on_commit lo publica en el momento
+        def publicar():
+            if bloque.rango:
+                with self._lock:
+                    self._libres.append(bloque)
+
+        transaction.on_commit(publicar)
+        pendientes = getattr(self._local, "pendientes", [])
+        pendientes.append((weakref.ref(publicar), bloque))
+        self._local.pendientes = pendientes
+
+    def _bloques_de_la_transaccion(self):
+        """
+        Bloques reservados por la transacción en curso de este hilo.
+
+        Un bloque sigue siendo válido mientras Django conserve su callback
+        de on_commit: lo suelta al confirmar la transacción (el bloque pasa a
+        la lista compartida) y al revertir la transacción o el savepoint en
+        que se reservó (el bloque se descarta).
+        """
+        pendientes = getattr(self._local, "pendientes", None)
+        if not pendientes:
+            return []
+        pendientes = [
+            (publicar, bloque)
+            for publicar, bloque in pendientes
+            if bloque.rango and publicar() is not None
+        ]
+        self._local.pendientes = pendientes
+        return [bloque for _, bloque in pendientes]
+
+    def reiniciar(self):
+        """Descarta los bloques en memoria (por ejemplo, entre tests)"""
+        with self._lock:
+            self._libres = []
+        self._local.pendientes = []
@@ -0,0 +1,390 @@
+"""
+Grafo en memoria de las rutas de los próximos vuelos, para buscar conexiones.
+
+Cada aeropuerto y cada ruta (par origen-destino) guardan sus salidas
+ordenadas por hora, así que las salidas dentro de una ventana (el día pedido
+o el tiempo de conexión después de una llegada) se ubican con una búsqueda
+binaria sin recorrer el resto. Los itinerarios se arman extendiendo cada
+tramo con las salidas de su aeropuerto de llegada dentro de la ventana de
+conexión, sin pasar dos veces por el mismo aeropuerto. El último tramo
+posible se busca directamente en las rutas hacia el destino, una escala solo
+se considera si le quedan tramos suficientes para llegar y, una vez
+encontrados suficientes itinerarios, se descartan los caminos que ya llegan
+más tarde que todos ellos.
+
+El grafo se carga completo la primera vez que se usa y después se actualiza
+solo con los vuelos que cambiaron: invalidar_vuelos (ver cache_busquedas)
+los marca como pendientes y la próxima búsqueda vuelve a leer esos vuelos.
+Como las marcas son locales al proceso, además se recarga completo cada
+GRAFO_RUTAS_RECARGA_SEGUNDOS. Esa recarga se arma en un hilo aparte: las
+búsquedas siguen usando el grafo anterior hasta que el nuevo está listo.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Un vuelo del grafo; las columnas en el orden en que se leen de la base
+Tramo = namedtuple(
+    "Tramo",
+    "id origen_id destino_id origen destino salida llegada precio libres",
+)
+
+
+def _en_hilo(tarea):
+    """Corre la tarea en un hilo aparte, que cierra su conexión al terminar"""
+
+    def correr():
+        try:
+            tarea()
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=correr, name="recarga-grafo-rutas", daemon=True).start()
+
+
+class GrafoRutas:
+    """
+    Salidas de los próximos vuelos por aeropuerto, ordenadas por hora.
+
+    Es seguro usarlo desde varios hilos.
+
+    Args:
+        recarga (float): Segundos entre recargas completas
+        reloj (callable): Fuente del tiempo (monotónica)
+        lanzar (callable): Recibe la tarea de una recarga completa y la
+            corre en segundo plano
+    """
+
+    def __init__(self, recarga, reloj=time.monotonic, lanzar=_en_hilo):
+        self.recarga = recarga
+        self._reloj = reloj
+        self._lanzar = lanzar
+        self._lock = threading.Lock()
+        # vuelo_id -> Tramo
+        self._tramos = {}
+        # aeropuerto_id -> [(salida, vuelo_id)] ordenada
+        self._salidas = {}
+        # (origen_id, destino_id) -> [(salida, vuelo_id)] ordenada
+        self._rutas = {}
+        # Vuelos que cambiaron desde que se leyeron
+        self._pendientes = set()
+        self._cargado_en = None
+        # Salida más temprana del grafo (o anterior): antes no hay nada que purgar
+        self._primera_salida = None
+        # Recarga completa en curso y vuelos marcados desde que empezó, que
+        # la lectura de la recarga pudo no ver
+        self._recargando = False
+        self._marcados_en_recarga = set()
+        self._sin_recarga = threading.Event()
+        self._sin_recarga.set()
+        # Crece con cada limpiar(): una recarga empezada antes se descarta
+        self._limpiezas = 0
+
+    def __len__(self):
+        return len(self._tramos)
+
+    def marcar(self, vuelo_ids):
+        """Marca vuelos para volver a leerlos en la próxima sincronización"""
+        with self._lock:
+            self._pendientes.update(vuelo_ids)
+            if self._recargando:
+                self._marcados_en_recarga.update(vuelo_ids)
+
+    def limpiar(self):
+        """Descarta todo: la próxima sincronización recarga completo"""
+        with self._lock:
+            self._tramos, self._salidas, self._rutas = {}, {}, {}
+            self._primera_salida = None
+            self._pendientes.clear()
+            self._cargado_en = None
+            self._limpiezas += 1
+
+    def esperar_recarga(self, timeout=None):
+        """Espera a que termine la recarga completa en curso, si hay una"""
+        return self._sin_recarga.wait(timeout)
+
+    @staticmethod
+    def _construir(filas):
+        """Índices del grafo armados con los tramos de las filas"""
+        tramos = {}
+        salidas = {}
+        rutas = {}
+        for fila in filas:
+            tramo = Tramo(*fila)
+            tramos[tramo.id] = tramo
+            clave = (tramo.salida, tramo.id)
+            salidas.setdefault(tramo.origen_id, []).append(clave)
+            rutas.setdefault((tramo.origen_id, tramo.destino_id), []).append(clave)
+        for lista in (*salidas.values(), *rutas.values()):
+            lista.sort()
+        return tramos, salidas, rutas
+
+    def cargar(self, filas):
+        """Reemplaza el grafo por los tramos de las filas"""
+        indices = self._construir(filas)
+        with self._lock:
+            self._tramos, self._salidas, self._rutas = indices
+            self._calcular_primera_salida()
+
+    def actualizar(self, vuelo_ids, filas):
+        """
+        Reemplaza los tramos de algunos vuelos.
+
+        Args:
+            vuelo_ids: Vuelos a actualizar
+            filas: Filas actuales de esos vuelos; los que no aparecen ya no
+                pertenecen al grafo (salieron, se cancelaron o se borraron)
+        """
+        with self._lock:
+            for vuelo_id in vuelo_ids:
+                self._quitar(vuelo_id)
+            for fila in filas:
+                tramo = Tramo(*fila)
+                self._quitar(tramo.id)
+                self._tramos[tramo.id] = tramo
+                clave = (tramo.salida, tramo.id)
+                insort(self._salidas.setdefault(tramo.origen_id, []), clave)
+                insort(self._rutas.setdefault((tramo.origen_id, tramo.destino_id), []), clave)
+                if self._primera_salida is None or tramo.salida < self._primera_salida:
+                    self._primera_salida = tramo.salida
+
+    def sincronizar(self, leer):
+        """
+        Pone el grafo al día antes de una búsqueda.
+
+        La primera vez carga todo y, después, vuelve a leer solo los vuelos
+        pendientes. Cuando pasa el intervalo de recarga lanza una recarga
+        completa en segundo plano y no la espera. Dentro de una transacción
+        los vuelos leídos siguen pendientes (y una carga completa no cuenta
+        como tal): lo leído podría revertirse.
+
+        Args:
+            leer (callable): Recibe una lista de IDs de vuelo (o None para
+                todos los próximos vuelos) y devuelve sus filas
+        """
+        ahora = self._reloj()
+        en_transaccion = connection.in_atomic_block
+        with self._lock:
+            inicial = self._cargado_en is None
+            recargar = (
+                not inicial
+                and not self._recargando
+                and ahora - self._cargado_en >= self.recarga
+            )
+            if recargar:
+                self._recargando = True
+                self._sin_recarga.clear()
+            limpiezas = self._limpiezas
+            pendientes = set(self._pendientes)
+            if not en_transaccion:
+                self._pendientes.clear()
+
+        if recargar:
+            self._lanzar(lambda: self._recargar(leer, ahora, limpiezas))
+
+        try:
+            if inicial:
+                self.cargar(leer(None))
+            elif pendientes:
+                self.actualizar(pendientes, leer(list(pendientes)))
+        except Exception:
+            self.marcar(pendientes)
+            raise
+
+        with self._lock:
+            if inicial and not en_transaccion:
+                self._cargado_en = ahora
+            self._purgar(timezone.now())
+
+    def _recargar(self, leer, inicio, limpiezas):
+        """
+        Arma un grafo nuevo con todos los vuelos y reemplaza al actual.
+
+        Los vuelos marcados mientras tanto quedan pendientes para el grafo
+        nuevo. Si la lectura falla, el grafo actual sigue en uso y la
+        próxima sincronización vuelve a intentarlo.
+        """
+        try:
+            indices = self._construir(leer(None))
+        except Exception:
+            logger.exception("No se pudo recargar el grafo de rutas")
+            indices = None
+
+        with self._lock:
+            if indices is not None and self._limpiezas == limpiezas:
+                self._tramos, self._salidas, self._rutas = indices
+                self._calcular_primera_salida()
+                self._cargado_en = inicio
+                self._pendientes |= self._marcados_en_recarga
+                self._purgar(timezone.now())
+            self._marcados_en_recarga = set()
+            self._recargando = False
+        self._sin_recarga.set()
+
+    def _entre(self, lista, desde, hasta):
+        """Tramos de una lista de salidas que salen en [desde, hasta), por hora"""
+        if not lista:
+            return []
+        inicio = bisect_left(lista, (desde,))
+        fin = bisect_left(lista, (hasta,), inicio)
+        return [self._tramos[vuelo_id] for _, vuelo_id in lista[inicio:fin]]
+
+    def buscar(
+        self,
+        origen_ids,
+        destino_ids,
+        desde,
+        hasta,
+        max_escalas=2,
+        conexion_min=timedelta(minutes=45),
+        conexion_max=timedelta(hours=6),
+        min_libres=1,
+        limite=20,
+    ):
+        """
+        Itinerarios entre dos grupos de aeropuertos.
+
+        Args:
+            origen_ids: Aeropuertos de origen
+            destino_ids: Aeropuertos de destino
+            desde, hasta: Ventana [desde, hasta) de salida del primer tramo
+            max_escalas (int): Escalas permitidas (0: solo vuelos directos)
+            conexion_min, conexion_max (timedelta): Tiempo entre la llegada
+                de un tramo y la salida del siguiente, en [min, max)
+            min_libres (int): Asientos libres necesarios en cada tramo
+            limite (int): Máximo de itinerarios
+
+        Returns:
+            list: Tuplas de Tramo, de la llegada más temprana a la más
+                tardía (y, a igual llegada, con menos escalas, más cortos y
+                más baratos primero)
+        """
+        origenes = set(origen_ids)
+        destinos = set(destino_ids)
+        itinerarios = []
+        # Llegada del peor de los `limite` mejores itinerarios encontrados:
+        # un camino que ya llega más tarde no puede entrar en el resultado
+        cota = None
+
+        def orden(camino):
+            return (
+                camino[-1].llegada,
+                len(camino),
+                camino[-1].llegada - camino[0].salida,
+                sum(tramo.precio for tramo in camino),
+            )
+
+        def agregar(camino):
+            nonlocal cota
+            itinerarios.append(tuple(camino))
+            if len(itinerarios) >= 2 * limite:
+                itinerarios.sort(key=orden)
+                del itinerarios[limite:]
+                cota = itinerarios[-1][-1].llegada
+
+        alcanzables = {}
+
+        def llega(aeropuerto_id, restantes):
+            """Si desde el aeropuerto se puede llegar con `restantes` tramos"""
+            clave = (aeropuerto_id, restantes)
+            if clave not in alcanzables:
+                if restantes == 1:
+                    alcanzables[clave] = any(
+                        (aeropuerto_id, destino_id) in self._rutas for destino_id in destinos
+                    )
+                else:
+                    alcanzables[clave] = restantes > 1 and aeropuerto_id in self._salidas
+            return alcanzables[clave]
+
+        def candidatos(aeropuerto_ids, restantes, desde, hasta):
+            """Tramos que pueden seguir el camino, por hora de salida"""
+            if restantes == 1:
+                # El último tramo posible solo puede ir al destino
+                listas = [
+                    self._rutas.get((aeropuerto_id, destino_id))
+                    for aeropuerto_id in aeropuerto_ids
+                    for destino_id in destinos
+                ]
+            else:
+                listas = [self._salidas.get(aeropuerto_id) for aeropuerto_id in aeropuerto_ids]
+            tramos = [tramo for lista in listas for tramo in self._entre(lista, desde, hasta)]
+            if len(listas) > 1:
+                tramos.sort(key=lambda tramo: tramo.salida)
+            return tramos
+
+        def extender(camino, visitados, desde, hasta):
+            restantes = max_escalas + 1 - len(camino)
+            aeropuerto_ids = [camino[-1].destino_id] if camino else origenes
+            for tramo in candidatos(aeropuerto_ids, restantes, desde, hasta):
+                if cota is not None and tramo.salida > cota:
+                    break
+                if tramo.libres < min_libres or tramo.destino_id in visitados:
+                    continue
+                final = tramo.destino_id in destinos
+                if cota is not None and (
+                    tramo.llegada > cota or (not final and tramo.llegada >= cota)
+                ):
+                    continue
+                if not final and not llega(tramo.destino_id, restantes - 1):
+                    continue
+                camino.append(tramo)
+                if final:
+                    agregar(camino)
+                else:
+                    visitados.add(tramo.destino_id)
+                    extender(
+                        camino,
+                        visitados,
+                        tramo.llegada + conexion_min,
+                        tramo.llegada + conexion_max,
+                    )
+                    visitados.discard(tramo.destino_id)
+                camino.pop()
+
+        with self._lock:
+            extender([], set(origenes), desde, hasta)
+
+        itinerarios.sort(key=orden)
+        return itinerarios[:limite]
+
+    def _quitar(self, vuelo_id):
+        tramo = self._tramos.pop(vuelo_id, None)
+        if tramo is None:
+            return
+        clave = (tramo.salida, tramo.id)
+        for indice, lista_clave in (
+            (self._salidas, tramo.origen_id),
+            (self._rutas, (tramo.origen_id, tramo.destino_id)),
+        ):
+            lista = indice[lista_clave]
+            del lista[bisect_left(lista, clave)]
+            if not lista:
+                del indice[lista_clave]
+
+    def _purgar(self, ahora):
+        """Descarta los tramos que ya salieron"""
+        if self._primera_salida is None or ahora < self._primera_salida:
+            return
+        salidos = [
+            vuelo_id
+            for lista in self._salidas.values()
+            for _, vuelo_id in lista[: bisect_left(lista, (ahora,))]
+        ]
+        for vuelo_id in salidos:
+            self._quitar(vuelo_id)
+        self._calcular_primera_salida()
+
+    def _calcular_primera_salida(self):
+        self._primera_salida = min((lista[0][0] for lista in self._salidas.values()), default=None)
+
+grafo_rutas = GrafoRutas(recarga=getattr(settings, "GRAFO_RUTAS_RECARGA_SEGUNDOS", 300))
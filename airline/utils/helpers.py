@@ -4,9 +4,11 @@ Funciones helper para la aplicación airline.
 
 import random
 import string
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 from decimal import Decimal
 
+from django.utils import timezone
+
 
 def generar_codigo_reserva(length=6):
     """
@@ -46,6 +48,32 @@ def generar_codigo_boleto(reserva_id):
     return f"TKT{reserva_id:06d}{timestamp}"
 
 
+def rango_del_dia(fecha):
+    """
+    Rango semiabierto [inicio, fin) de un día en la zona horaria actual.
+
+    Filtrar con `campo__gte=inicio, campo__lt=fin` en lugar de `campo__date`
+    deja la columna sin funciones alrededor, así que la consulta puede usar
+    un índice sobre ella.
+
+    Args:
+        fecha (date): Día a cubrir
+
+    Returns:
+        tuple: (inicio, fin) como datetimes con zona horaria
+
+    Example:
+        >>> from datetime import date
+        >>> inicio, fin = rango_del_dia(date(2025, 3, 1))
+        >>> (fin - inicio).days
+        1
+    """
+    zona = timezone.get_current_timezone()
+    inicio = timezone.make_aware(datetime.combine(fecha, time.min), zona)
+    fin = timezone.make_aware(datetime.combine(fecha + timedelta(days=1), time.min), zona)
+    return inicio, fin
+
+
 def calcular_duracion_vuelo(fecha_salida, fecha_llegada):
     """
     Calcula la duración de un vuelo en horas y minutos.
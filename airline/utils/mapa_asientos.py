@@ -0,0 +1,51 @@
+"""
+Construcción del mapa de asientos de un vuelo.
+
+El mapa se arma en memoria a partir de los asientos del avión y del
+inventario del vuelo, de modo que el costo en consultas no depende de la
+cantidad de asientos.
+"""
+
+from django.utils import timezone
+
+
+def construir_mapa_asientos(asientos, inventario, ahora=None):
+    """
+    Arma el estado de cada asiento para un vuelo.
+
+    Los asientos retenidos por otra reserva pendiente se informan como
+    "retenido" hasta que vence la retención; solo los ocupados exponen
+    la reserva y el pasajero.
+
+    Args:
+        asientos (iterable): Asientos del avión, en el orden a mostrar
+        inventario (iterable): Filas AsientoVuelo del vuelo (idealmente con
+            la reserva y su pasajero precargados)
+        ahora (datetime): Momento de referencia para las retenciones
+
+    Returns:
+        list: Lista de diccionarios con llaves asiento, estado_vuelo,
+        retenido_hasta (solo en los retenidos), pasajero y reserva
+
+    Example:
+        >>> construir_mapa_asientos([], [])
+        []
+    """
+    ahora = ahora or timezone.now()
+    inventario_por_asiento = {fila.asiento_id: fila for fila in inventario}
+
+    mapa = []
+    for asiento in asientos:
+        fila = inventario_por_asiento.get(asiento.id)
+        estado = fila.estado_actual(ahora) if fila else "disponible"
+        reserva = fila.reserva if estado == "ocupado" else None
+        mapa.append(
+            {
+                "asiento": asiento,
+                "estado_vuelo": estado,
+                "retenido_hasta": fila.retenido_hasta if estado == "retenido" else None,
+                "pasajero": reserva.pasajero if reserva else None,
+                "reserva": reserva,
+            }
+        )
+    return mapa
@@ -0,0 +1,84 @@
+"""
+Paginación por posición (keyset) de querysets.
+
+En lugar de saltear las filas de las páginas anteriores (OFFSET), cada página
+empieza después de la última fila de la anterior: se filtra por los valores
+de sus columnas de orden. Así una página profunda cuesta lo mismo que la
+primera, siempre que el orden termine en una columna única (el id) y sus
+columnas no admitan NULL.
+"""
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+
+
+def _campo(columna):
+    """Nombre del campo y si se ordena de forma descendente"""
+    return columna.lstrip("-"), columna.startswith("-")
+
+
+def valores_orden(fila, orden):
+    """
+    Valores de las columnas de orden de una fila.
+
+    Args:
+        fila: Instancia de modelo o diccionario
+        orden: Columnas de orden, p. ej. ("-fecha_reserva", "id")
+
+    Returns:
+        list: Un valor por columna
+    """
+    campos = [_campo(columna)[0] for columna in orden]
+    if isinstance(fila, dict):
+        return [fila[campo] for campo in campos]
+    return [getattr(fila, campo) for campo in campos]
+
+
+def filtrar_desde(queryset, orden, posicion=None, hacia_atras=False):
+    """
+    Ordena el queryset y deja solo las filas que siguen a una posición.
+
+    Args:
+        queryset: QuerySet a paginar
+        orden: Columnas de orden, la última única (p. ej. ("fecha_salida", "id"))
+        posicion: Valores de orden de la última fila vista, tal como vienen
+            del cursor (None: desde el principio)
+        hacia_atras (bool): Recorrer en el sentido inverso, hacia las filas
+            anteriores a la posición (en orden inverso)
+
+    Returns:
+        QuerySet: Filas posteriores a la posición en el sentido del recorrido
+
+    Raises:
+        ValueError: Si la posición no corresponde a las columnas de orden
+    """
+    columnas = [_campo(columna) for columna in orden]
+    queryset = queryset.order_by(
+        *(("-" if descendente != hacia_atras else "") + campo for campo, descendente in columnas)
+    )
+    if posicion is None:
+        return queryset
+    if len(posicion) != len(columnas):
+        raise ValueError("La posición no corresponde al orden")
+
+    modelo = queryset.model._meta
+    try:
+        valores = [
+            modelo.get_field(campo).to_python(valor)
+            for (campo, _), valor in zip(columnas, posicion)
+        ]
+    except DjangoValidationError as exc:
+        raise ValueError("Posición inválida") from exc
+
+    # (a > x) OR (a = x AND b > y) OR ..., con el sentido de cada columna
+    siguientes = Q()
+    iguales = Q()
+    for (campo, descendente), valor in zip(columnas, valores):
+        operador = "lt" if descendente != hacia_atras else "gt"
+        siguientes |= iguales & Q(**{f"{campo}__{operador}": valor})
+        iguales &= Q(**{campo: valor})
+
+    # La cota sobre la primera columna sola permite recorrer su índice
+    primero, descendente = columnas[0]
+    cota = "lte" if descendente != hacia_atras else "gte"
+    return queryset.filter(Q(**{f"{primero}__{cota}": valores[0]}), siguientes)
@@ -0,0 +1,140 @@
+"""
+Plantillas de distribución de asientos por modelo de avión.
+
+Cada plantilla describe las zonas de cabina (qué filas son primera,
+ejecutivo o económico), los pasillos y los asientos bloqueados. La lista
+de asientos resultante se calcula una sola vez por (plantilla, filas,
+columnas) y se reutiliza para todos los aviones iguales de la flota.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+
+
+@dataclass(frozen=True)
+class ZonaCabina:
+    """
+    Rango de filas que pertenece a un mismo tipo de asiento.
+
+    Attributes:
+        tipo (str): Tipo de asiento (primera, ejecutivo, economico)
+        fila_desde (int): Primera fila de la zona (inclusive)
+        fila_hasta (int|None): Última fila de la zona (inclusive);
+            None significa hasta la última fila del avión
+    """
+
+    tipo: str
+    fila_desde: int
+    fila_hasta: int | None = None
+
+    def contiene(self, fila):
+        return fila >= self.fila_desde and (
+            self.fila_hasta is None or fila <= self.fila_hasta
+        )
+
+
+@dataclass(frozen=True)
+class PlantillaAsientos:
+    """
+    Distribución de asientos de un modelo de avión.
+
+    Attributes:
+        nombre (str): Nombre descriptivo de la plantilla
+        zonas (tuple): Zonas de cabina, en orden de filas
+        pasillos (tuple|None): Índices de columna (desde 0) después de los
+            cuales hay un pasillo; None para un único pasillo central
+        bloqueados (frozenset): Números de asiento que se crean en
+            mantenimiento (por ejemplo, filas de salida de emergencia)
+    """
+
+    nombre: str
+    zonas: tuple
+    pasillos: tuple | None = None
+    bloqueados: frozenset = frozenset()
+
+    def tipo_para_fila(self, fila):
+        """Devuelve el tipo de asiento de una fila según las zonas de cabina"""
+        for zona in self.zonas:
+            if zona.contiene(fila):
+                return zona.tipo
+        return "economico"
+
+    def pasillos_para(self, columnas):
+        """Devuelve los índices de columna seguidos de un pasillo"""
+        if self.pasillos is not None:
+            return tuple(p for p in self.pasillos if p < columnas - 1)
+        if columnas < 2:
+            return ()
+        return ((columnas - 1) // 2,)
+
+
+PLANTILLA_POR_DEFECTO = PlantillaAsientos(
+    nombre="Estándar",
+    zonas=(
+        ZonaCabina("primera", 1, 3),
+        ZonaCabina("ejecutivo", 4, 10),
+        ZonaCabina("economico", 11),
+    ),
+)
+
+PLANTILLAS = {
+    "Boeing 777": PlantillaAsientos(
+        nombre="Boeing 777 (3-4-3)",
+        zonas=PLANTILLA_POR_DEFECTO.zonas,
+        pasillos=(2, 6),
+    ),
+    "Boeing 737": PlantillaAsientos(
+        nombre="Boeing 737 (3-3)",
+        zonas=PLANTILLA_POR_DEFECTO.zonas,
+        pasillos=(2,),
+    ),
+    "Airbus A320": PlantillaAsientos(
+        nombre="Airbus A320 (3-3)",
+        zonas=PLANTILLA_POR_DEFECTO.zonas,
+        pasillos=(2,),
+    ),
+}
+
+
+def get_plantilla(modelo):
+    """
+    Obtiene la plantilla de distribución para un modelo de avión.
+
+    Args:
+        modelo (str): Modelo del avión (ej: "Boeing 777")
+
+    Returns:
+        PlantillaAsientos: Plantilla registrada o la plantilla por defecto
+    """
+    return PLANTILLAS.get(modelo, PLANTILLA_POR_DEFECTO)
+
+
+@lru_cache(maxsize=128)
+def generar_distribucion(plantilla, filas, columnas):
+    """
+    Calcula la lista de asientos de un avión a partir de su plantilla.
+
+    El resultado se cachea, por lo que todos los aviones con la misma
+    plantilla y dimensiones comparten la misma lista precalculada.
+
+    Args:
+        plantilla (PlantillaAsientos): Plantilla de distribución
+        filas (int): Cantidad de filas del avión
+        columnas (int): Cantidad de columnas del avión
+
+    Returns:
+        tuple: Tuplas (numero, fila, columna, tipo, estado)
+
+    Example:
+        >>> generar_distribucion(PLANTILLA_POR_DEFECTO, 1, 2)
+        (('1A', 1, 'A', 'primera', 'disponible'), ('1B', 1, 'B', 'primera', 'disponible'))
+    """
+    distribucion = []
+    for fila in range(1, filas + 1):
+        tipo = plantilla.tipo_para_fila(fila)
+        for col_idx in range(columnas):
+            columna = chr(65 + col_idx)  # A, B, C, D, E, F
+            numero = f"{fila}{columna}"
+            estado = "mantenimiento" if numero in plantilla.bloqueados else "disponible"
+            distribucion.append((numero, fila, columna, tipo, estado))
+    return tuple(distribucion)
@@ -0,0 +1,162 @@
+"""
+Publicación en tiempo real de los cambios de asientos por vuelo.
+
+Cada proceso (worker) tiene un único PublicadorAsientos que reparte los
+cambios entre las conexiones abiertas a /api/flightSeatsStream/<id>/, de modo
+que las pantallas de selección de asientos reciben las novedades sin
+consultar la base. Las conexiones se sirven desde vistas async (ASGI) y
+esperan los eventos en el event loop del worker, sin ocupar un hilo cada una.
+Los cambios llegan al publicador a través de un broker:
+el BrokerMemoria los entrega dentro del mismo proceso (desarrollo y tests);
+con varios workers se configura en ASIENTOS_BROKER un broker compartido que
+llame a publicador.distribuir() en cada proceso.
+"""
+
+import asyncio
+import queue
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Eventos que puede acumular una conexión lenta antes de pedirle que recargue
+EVENTOS_POR_SUSCRIPCION = 100
+
+
+class Suscripcion:
+    """
+    Conexión abierta que escucha los cambios de asientos de un vuelo.
+
+    Attributes:
+        vuelo_id (int): Vuelo al que está suscripta
+        cola (queue.Queue | asyncio.Queue): Eventos pendientes de enviar;
+            es un asyncio.Queue si la conexión los espera desde un event loop
+        desbordada (bool): True si se descartaron eventos por no leerlos a
+            tiempo; el cliente debe volver a pedir el mapa completo
+    """
+
+    def __init__(self, vuelo_id, maximo=EVENTOS_POR_SUSCRIPCION, loop=None):
+        self.vuelo_id = vuelo_id
+        self._loop = loop
+        if loop is None:
+            self.cola = queue.Queue(maxsize=maximo)
+        else:
+            self.cola = asyncio.Queue(maxsize=maximo)
+        self.desbordada = False
+
+    def entregar(self, evento):
+        """Encola un evento sin bloquear a quien lo publica (desde cualquier hilo)"""
+        if self._loop is None:
+            self._encolar(evento)
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._encolar, evento)
+        except RuntimeError:
+            # El loop ya se cerró: la conexión terminó
+            pass
+
+    def _encolar(self, evento):
+        try:
+            self.cola.put_nowait(evento)
+        except (queue.Full, asyncio.QueueFull):
+            self.desbordada = True
+
+    def descartar_pendientes(self):
+        """Vacía la cola después de un desborde"""
+        while True:
+            try:
+                self.cola.get_nowait()
+            except (queue.Empty, asyncio.QueueEmpty):
+                break
+        self.desbordada = False
+
+
+class PublicadorAsientos:
+    """
+    Reparte los eventos de cambios de asientos entre las suscripciones del
+    proceso. Es seguro llamarlo desde cualquier hilo.
+    """
+
+    def __init__(self):
+        self._suscripciones = {}
+        self._lock = threading.Lock()
+
+    def suscribir(self, vuelo_id, loop=None):
+        """
+        Registra una conexión para un vuelo.
+
+        Args:
+            vuelo_id (int): ID del vuelo
+            loop (asyncio.AbstractEventLoop, optional): Event loop desde el
+                que la conexión espera los eventos
+
+        Returns:
+            Suscripcion: Suscripción a cancelar con desuscribir()
+        """
+        suscripcion = Suscripcion(vuelo_id, loop=loop)
+        with self._lock:
+            self._suscripciones.setdefault(vuelo_id, set()).add(suscripcion)
+        return suscripcion
+
+    def desuscribir(self, suscripcion):
+        with self._lock:
+            suscripciones = self._suscripciones.get(suscripcion.vuelo_id)
+            if suscripciones is not None:
+                suscripciones.discard(suscripcion)
+                if not suscripciones:
+                    del self._suscripciones[suscripcion.vuelo_id]
+
+    def hay_suscriptores(self, vuelo_ids):
+        """Indica si alguna conexión del proceso escucha alguno de los vuelos"""
+        with self._lock:
+            return any(vuelo_id in self._suscripciones for vuelo_id in vuelo_ids)
+
+    def distribuir(self, eventos):
+        """
+        Entrega eventos a las suscripciones de sus vuelos.
+
+        Args:
+            eventos (list): Diccionarios con al menos la llave "vuelo"
+        """
+        for evento in eventos:
+            with self._lock:
+                suscripciones = list(self._suscripciones.get(evento["vuelo"], ()))
+            for suscripcion in suscripciones:
+                suscripcion.entregar(evento)
+
+
+class BrokerMemoria:
+    """
+    Broker en memoria: entrega los eventos directamente al publicador del
+    mismo proceso. Solo sirve con un único worker.
+    """
+
+    def __init__(self, publicador):
+        self.publicador = publicador
+
+    def requiere_eventos(self, vuelo_ids):
+        """Evita armar eventos que nadie en el proceso va a escuchar"""
+        return self.publicador.hay_suscriptores(vuelo_ids)
+
+    def publicar(self, eventos):
+        self.publicador.distribuir(eventos)
+
+
+publicador_asientos = PublicadorAsientos()
+_broker = None
+
+
+def get_broker_asientos():
+    """
+    Obtiene el broker configurado en ASIENTOS_BROKER (por defecto, el broker
+    en memoria), creado una sola vez por proceso.
+    """
+    global _broker
+    if _broker is None:
+        ruta = getattr(
+            settings,
+            "ASIENTOS_BROKER",
+            "airline.utils.publicador_asientos.BrokerMemoria",
+        )
+        _broker = import_string(ruta)(publicador_asientos)
+    return _broker
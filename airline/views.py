@@ -9,7 +9,8 @@ from django.contrib import messages
 from django.db.models import Q
 from datetime import datetime
 
-from airline.models import Vuelo, Pasajero, Reserva, Boleto, Avion, Asiento
+from airline.models import Vuelo, Pasajero, Reserva, Boleto, Avion, Asiento, ConflictoVersion
+from airline.services import VueloService, ReservaService
 
 
 def lista_vuelos(request):
@@ -17,19 +18,12 @@ def lista_vuelos(request):
     Vista para listar todos los vuelos disponibles.
     Permite filtrar por origen, destino y fecha.
     """
-    vuelos = Vuelo.objects.all().order_by("fecha_salida")
-
     # Filtros
     origen = request.GET.get("origen")
     destino = request.GET.get("destino")
     fecha = request.GET.get("fecha")
 
-    if origen:
-        vuelos = vuelos.filter(origen__icontains=origen)
-    if destino:
-        vuelos = vuelos.filter(destino__icontains=destino)
-    if fecha:
-        vuelos = vuelos.filter(fecha_salida__date=fecha)
+    vuelos = VueloService.filter_vuelos(origen, destino, fecha)
 
     context = {
         "vuelos": vuelos,
@@ -125,7 +119,7 @@ def reporte_pasajeros_vuelo(request, pk):
     vuelo = get_object_or_404(Vuelo, pk=pk)
     reservas = (
         Reserva.objects.filter(vuelo=vuelo)
-        .select_related("pasajero")
+        .select_related("pasajero", "asiento")
         .order_by("pasajero__id")
     )
     pasajeros = [r.pasajero for r in reservas]
@@ -292,14 +286,20 @@ def cancelar_reserva(request, reserva_id):
         return redirect("mi_perfil")
 
     if request.method == "POST":
-        # Liberar asiento
-        if reserva.asiento:
-            reserva.asiento.disponible = True
-            reserva.asiento.save()
-
-        # Cambiar estado de reserva
-        reserva.estado = "cancelada"
-        reserva.save()
+        if not reserva.puede_pasar_a("cancelada"):
+            messages.error(request, "La reserva ya está cancelada.")
+            return redirect("mi_perfil")
+
+        # Anula el boleto, libera el asiento y promueve la lista de espera
+        try:
+            ReservaService.cancelar_reserva(reserva.id)
+        except ConflictoVersion:
+            messages.error(
+                request,
+                "La reserva fue modificada por otra operación. "
+                "Revisá su estado e intentá de nuevo.",
+            )
+            return redirect("mis_reservas")
 
         messages.success(request, "Reserva cancelada exitosamente.")
         return redirect("mi_perfil")
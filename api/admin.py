@@ -1,3 +1,11 @@
 from django.contrib import admin
 
-# Register your models here.
+from api.models import ClaveIdempotencia
+
+
+@admin.register(ClaveIdempotencia)
+class ClaveIdempotenciaAdmin(admin.ModelAdmin):
+    list_display = ("clave", "endpoint", "usuario", "estado", "codigo_estado", "expira_en")
+    list_filter = ("estado", "endpoint")
+    search_fields = ("clave", "usuario__username")
+    readonly_fields = ("creada", "reclamada_en")
@@ -0,0 +1,42 @@
+"""
+Comando que elimina las claves de idempotencia vencidas.
+
+Las respuestas guardadas para el header Idempotency-Key duran
+IDEMPOTENCIA_TTL_HORAS; este comando las borra por lotes. Pensado para
+ejecutarse periódicamente (cron, scheduler de la plataforma, etc.).
+
+Uso:
+    python manage.py limpiar_idempotencia
+    python manage.py limpiar_idempotencia --lote 5000
+"""
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import ClaveIdempotencia
+
+
+class Command(BaseCommand):
+    help = "Elimina las claves de idempotencia vencidas"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=1000,
+            help="Cantidad máxima de filas por DELETE (default: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        ahora = timezone.now()
+        total = 0
+        while True:
+            ids = list(
+                ClaveIdempotencia.objects.filter(expira_en__lte=ahora).values_list(
+                    "id", flat=True
+                )[: options["lote"]]
+            )
+            if not ids:
+                break
+            total += ClaveIdempotencia.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"Claves eliminadas: {total}"))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:59
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_claves_idempotencia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='claveidempotencia',
+            name='reclamada_en',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -1,4 +1,8 @@
+from django.utils.http import parse_etags, quote_etag
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.response import Response
+
+from airline.models import ConflictoVersion
 
 
 class AuthView:
@@ -25,3 +29,78 @@ class AuthAdminView:
     """
 
     permission_classes = [IsAdminUser]
+
+
+class VersionView:
+    """
+    Mixin de control de concurrencia optimista para ViewSets de modelos con
+    columna version.
+
+    El detalle devuelve la versión en el header ETag. PUT, PATCH y DELETE
+    aceptan If-Match con ese ETag: si el objeto cambió desde entonces
+    responden 409 sin modificar nada. Sin If-Match, el guardado igual es
+    condicional a la versión leída al inicio de la petición.
+
+    Uso:
+        class MiViewSet(AuthAdminView, VersionView, viewsets.ModelViewSet):
+            ...
+    """
+
+    def retrieve(self, request, *args, **kwargs):
+        instancia = self.get_object()
+        response = Response(self.get_serializer(instancia).data)
+        response["ETag"] = quote_etag(str(instancia.version))
+        return response
+
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        response["ETag"] = quote_etag(str(self._version_guardada))
+        return response
+
+    def perform_update(self, serializer):
+        serializer.save(version=self.version_esperada(serializer.instance))
+        self._version_guardada = serializer.instance.version
+
+    def perform_destroy(self, instance):
+        self.version_esperada(instance)
+        super().perform_destroy(instance)
+
+    def version_esperada(self, instancia):
+        """
+        Versión sobre la que se aplica la escritura.
+
+        Raises:
+            ConflictoVersion: Si el If-Match no coincide con la versión actual
+        """
+        if_match = self.request.headers.get("If-Match")
+        if if_match:
+            etags = parse_etags(if_match)
+            if "*" not in etags and quote_etag(str(instancia.version)) not in etags:
+                raise ConflictoVersion(
+                    f"{instancia._meta.verbose_name} {instancia.pk} está en la "
+                    f"versión {instancia.version}"
+                )
+        return instancia.version
+
+
+class BusquedaPaginadaView:
+    """
+    Mixin para listados cuyas páginas arma un service (por ejemplo, a través
+    de la caché de búsquedas) en lugar de filtrar un queryset.
+
+    La vista define buscar_pagina(posicion, cantidad, hacia_atras), que
+    recibe la posición del cursor (ver api.pagination.PaginacionCursor), y
+    orden_cursor con el orden que aplica el service.
+
+    Uso:
+        class MiVista(AuthView, BusquedaPaginadaView, ListAPIView):
+            orden_cursor = ("fecha_salida", "id")
+
+            def buscar_pagina(self, posicion, cantidad, hacia_atras):
+                ...
+    """
+
+    def list(self, request, *args, **kwargs):
+        filas = self.paginator.paginar_busqueda(self.buscar_pagina, request, self)
+        serializer = self.get_serializer(filas, many=True)
+        return self.get_paginated_response(serializer.data)
@@ -1,3 +1,50 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 
-# No models needed - using existing models from other apps
+
+class ClaveIdempotencia(models.Model):
+    """
+    Respuesta guardada para un header Idempotency-Key.
+
+    La primera petición con una clave la reclama (estado "en_curso") y al
+    terminar guarda su respuesta; los reintentos con la misma clave reciben
+    esa respuesta sin volver a ejecutar la operación. Si la petición que la
+    reclamó no termina dentro de IDEMPOTENCIA_PLAZO_SEGUNDOS (por ejemplo,
+    porque se cortó el worker), un reintento puede volver a reclamarla. Las
+    claves vencen
+    según IDEMPOTENCIA_TTL_HORAS y se eliminan con el comando
+    limpiar_idempotencia.
+    """
+
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Método y ruta de la petición: la misma clave en otro endpoint es otra clave
+    endpoint = models.CharField(max_length=255)
+    clave = models.CharField(max_length=255)
+    # Hash del cuerpo de la petición, para detectar una clave reutilizada
+    # con otros datos
+    huella = models.CharField(max_length=64)
+    estado_choices = [
+        ("en_curso", "En curso"),
+        ("completada", "Completada"),
+    ]
+    estado = models.CharField(max_length=20, choices=estado_choices, default="en_curso")
+    codigo_estado = models.PositiveSmallIntegerField(null=True, blank=True)
+    respuesta = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    creada = models.DateTimeField(auto_now_add=True)
+    # Momento en que la petición en curso reclamó la clave
+    reclamada_en = models.DateTimeField(default=timezone.now)
+    expira_en = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = "Clave de idempotencia"
+        verbose_name_plural = "Claves de idempotencia"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["usuario", "endpoint", "clave"], name="clave_idempotencia_unica"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.endpoint} [{self.clave}] ({self.estado})"
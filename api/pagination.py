@@ -0,0 +1,193 @@
+"""
+Paginación de los listados de la API
+
+Todos los listados se paginan por posición (keyset): el cursor de cada link
+guarda los valores de orden de la última fila de la página, y la página
+siguiente empieza después de ella. Así una página profunda cuesta lo mismo
+que la primera, nunca se carga el listado completo y no se cuenta el total.
+"""
+
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from decimal import Decimal
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from airline.utils.paginacion import filtrar_desde, valores_orden
+
+
+def _valor_cursor(valor):
+    """Valor de orden tal como se guarda en el cursor (fechas con microsegundos)"""
+    if hasattr(valor, "isoformat"):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+class PaginacionCursor(BasePagination):
+    """
+    Paginación por cursor opaco sobre un orden estable.
+
+    El orden se toma del atributo `orden_cursor` de la vista (por defecto
+    por id) y reemplaza a cualquier otro: debe terminar en una columna
+    única para que ninguna fila se repita ni se saltee entre páginas.
+
+    Las vistas cuyas páginas arma un service (por ejemplo, a través de la
+    caché de búsquedas) usan paginar_busqueda en lugar de paginate_queryset.
+
+    Uso:
+        class MiVista(ListAPIView):
+            orden_cursor = ("-fecha_reserva", "id")
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    orden = ("id",)
+    invalid_cursor_message = "Cursor inválido."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Página del queryset que indica el cursor de la petición"""
+
+        def buscar(posicion, cantidad, hacia_atras):
+            filas = filtrar_desde(queryset, self.orden_vista, posicion, hacia_atras)
+            return list(filas[:cantidad])
+
+        return self.paginar_busqueda(buscar, request, view)
+
+    def paginar_busqueda(self, buscar, request, view=None):
+        """
+        Página que indica el cursor de la petición, armada por `buscar`.
+
+        Args:
+            buscar (callable): Recibe (posicion, cantidad, hacia_atras) y
+                devuelve hasta `cantidad` filas posteriores a la posición en
+                el sentido del recorrido (ver airline.utils.paginacion)
+            request: Petición
+            view: Vista que lista
+
+        Returns:
+            list: Filas de la página, en el orden del listado
+        """
+        self.request = request
+        self.orden_vista = getattr(view, "orden_cursor", self.orden)
+        self.page_size = self.get_page_size(request)
+        posicion, hacia_atras = self.decodificar_cursor(request)
+
+        try:
+            filas = list(buscar(posicion, self.page_size + 1, hacia_atras))
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+        hay_mas = len(filas) > self.page_size
+        filas = filas[: self.page_size]
+        if hacia_atras:
+            filas.reverse()
+
+        if filas:
+            inicio = valores_orden(filas[0], self.orden_vista)
+            fin = valores_orden(filas[-1], self.orden_vista)
+        else:
+            inicio = fin = posicion
+
+        hay_siguiente = hay_mas if not hacia_atras else posicion is not None
+        hay_anterior = hay_mas if hacia_atras else posicion is not None
+        self.siguiente = (fin, False) if hay_siguiente else None
+        self.anterior = (inicio, True) if hay_anterior else None
+        return filas
+
+    def get_page_size(self, request):
+        """Tamaño pedido en page_size, acotado a max_page_size"""
+        try:
+            tamano = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE
+        if tamano <= 0:
+            return api_settings.PAGE_SIZE
+        return min(tamano, self.max_page_size)
+
+    def decodificar_cursor(self, request):
+        """
+        Posición y sentido del cursor de la petición.
+
+        Returns:
+            tuple: (posicion o None, hacia_atras)
+
+        Raises:
+            NotFound: Si el cursor no es válido
+        """
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            datos = json.loads(urlsafe_b64decode(cursor.encode("ascii") + b"=" * (-len(cursor) % 4)))
+            posicion, hacia_atras = datos["p"], datos["r"]
+        except (ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if (
+            not isinstance(posicion, list)
+            or len(posicion) != len(self.orden_vista)
+            or not all(isinstance(valor, (str, int, float)) for valor in posicion)
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return posicion, bool(hacia_atras)
+
+    def codificar_cursor(self, posicion, hacia_atras):
+        """Link a la página que sigue a la posición en el sentido indicado"""
+        datos = {"p": [_valor_cursor(valor) for valor in posicion], "r": int(hacia_atras)}
+        cursor = urlsafe_b64encode(json.dumps(datos, separators=(",", ":")).encode())
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor.decode().rstrip("="))
+
+    def get_next_link(self):
+        if self.siguiente is None:
+            return None
+        return self.codificar_cursor(*self.siguiente)
+
+    def get_previous_link(self):
+        if self.anterior is None:
+            return None
+        return self.codificar_cursor(*self.anterior)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Cursor de la página (links next y previous)",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": f"Resultados por página (máximo {self.max_page_size})",
+                "schema": {"type": "integer"},
+            },
+        ]
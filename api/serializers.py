@@ -4,7 +4,7 @@ Todos los serializers en un solo archivo siguiendo el patrón de Mile
 """
 
 from rest_framework import serializers
-from airline.models import Vuelo, Avion, Asiento, Pasajero, Reserva, Boleto
+from airline.models import Vuelo, Avion, Asiento, Pasajero, Reserva, ListaEspera, Boleto
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
 from rest_framework.exceptions import AuthenticationFailed
@@ -129,6 +129,26 @@ class AsientoSerializer(serializers.ModelSerializer):
         ]
 
 
+class ConsultaAsientoSerializer(serializers.Serializer):
+    """Un par (vuelo, asiento) dentro de una consulta de disponibilidad en lote"""
+
+    vuelo = serializers.IntegerField(min_value=1)
+    asiento = serializers.CharField(max_length=10)
+
+
+class DisponibilidadLoteSerializer(serializers.Serializer):
+    """
+    Entrada de POST /api/checkSeatsAvailability/.
+    Limita la cantidad de pares para acotar el tamaño de la consulta.
+    """
+
+    MAX_CONSULTAS = 500
+
+    consultas = ConsultaAsientoSerializer(
+        many=True, allow_empty=False, max_length=MAX_CONSULTAS
+    )
+
+
 # ============================================================================
 # SERIALIZERS DE VUELOS
 # ============================================================================
@@ -153,7 +173,43 @@ class VueloListSerializer(serializers.ModelSerializer):
             "precio_base",
             "estado",
             "avion_modelo",
+            "asientos_libres",
+            "libres_economico",
+            "libres_ejecutivo",
+            "libres_primera",
         ]
+        read_only_fields = [
+            "asientos_libres",
+            "libres_economico",
+            "libres_ejecutivo",
+            "libres_primera",
+        ]
+
+
+class TramoSerializer(serializers.Serializer):
+    """Un vuelo dentro de un itinerario con conexiones"""
+
+    id = serializers.IntegerField()
+    origen = serializers.CharField()
+    destino = serializers.CharField()
+    fecha_salida = serializers.DateTimeField(source="salida")
+    fecha_llegada = serializers.DateTimeField(source="llegada")
+    precio_base = serializers.DecimalField(max_digits=10, decimal_places=2, source="precio")
+    asientos_libres = serializers.IntegerField(source="libres")
+
+
+class ItinerarioSerializer(serializers.Serializer):
+    """
+    Salida de GET /api/flightConnections/.
+    Un itinerario de uno a tres tramos, con sus totales.
+    """
+
+    salida = serializers.DateTimeField()
+    llegada = serializers.DateTimeField()
+    duracion = serializers.DurationField()
+    escalas = serializers.IntegerField()
+    precio_total = serializers.DecimalField(max_digits=12, decimal_places=2)
+    tramos = TramoSerializer(many=True)
 
 
 class VueloDetailSerializer(serializers.ModelSerializer):
@@ -164,6 +220,7 @@ class VueloDetailSerializer(serializers.ModelSerializer):
 
     avion = AvionSerializer(read_only=True)
     asientos_disponibles = serializers.SerializerMethodField()
+    cantidad_disponibles = serializers.SerializerMethodField()
     asientos = serializers.SerializerMethodField() 
     class Meta:
         model = Vuelo
@@ -177,30 +234,62 @@ class VueloDetailSerializer(serializers.ModelSerializer):
             "precio_base",
             "estado",
             "avion",
+            "version_inventario",
             "asientos_disponibles",
-            "asientos",        
+            "cantidad_disponibles",
+            "asientos",
         ]
 
+    def _get_mapa_asientos(self, obj):
+        """
+        Calcula el mapa de asientos una sola vez por vuelo y request,
+        compartido por asientos_disponibles, cantidad_disponibles y asientos.
+        """
+        if not hasattr(self, "_mapas_asientos"):
+            self._mapas_asientos = {}
+        if obj.pk not in self._mapas_asientos:
+            self._mapas_asientos[obj.pk] = serializar_mapa_asientos(
+                obj.get_asientos_con_estado_para_vuelo()
+            )
+        return self._mapas_asientos[obj.pk]
+
     def get_asientos_disponibles(self, obj):
-        return VueloService.get_asientos_disponibles(obj.id)
+        """Cada asiento del avión con su disponibilidad en el vuelo"""
+        return self._get_mapa_asientos(obj)
+
+    def get_cantidad_disponibles(self, obj):
+        return sum(
+            1
+            for info in self._get_mapa_asientos(obj)
+            if info["estado_vuelo"] == "disponible"
+        )
 
     def get_asientos(self, obj):
         """
         Serializa la salida de obj.get_asientos_con_estado_para_vuelo(), que
         trae una lista de diccionarios con llaves: asiento, estado_vuelo, pasajero, reserva
         """
-        items = []
-        for info in obj.get_asientos_con_estado_para_vuelo():
-            asiento = info.get("asiento")
-            pasajero = info.get("pasajero")
-            reserva = info.get("reserva")
-            items.append({
-                "asiento": AsientoMiniSerializer(asiento).data if asiento else None,
-                "estado_vuelo": info.get("estado_vuelo"),
-                "pasajero": PasajeroMiniSerializer(pasajero).data if pasajero else None,
-                "reserva": ReservaMiniSerializer(reserva).data if reserva else None,
-            })
-        return items
+        return self._get_mapa_asientos(obj)
+
+
+def serializar_mapa_asientos(mapa):
+    """
+    Serializa un mapa de asientos (lista de diccionarios con llaves asiento,
+    estado_vuelo, pasajero y reserva). Lo comparten el detalle del vuelo y
+    la consulta de cambios por versión.
+    """
+    items = []
+    for info in mapa:
+        asiento = info.get("asiento")
+        pasajero = info.get("pasajero")
+        reserva = info.get("reserva")
+        items.append({
+            "asiento": AsientoMiniSerializer(asiento).data if asiento else None,
+            "estado_vuelo": info.get("estado_vuelo"),
+            "pasajero": PasajeroMiniSerializer(pasajero).data if pasajero else None,
+            "reserva": ReservaMiniSerializer(reserva).data if reserva else None,
+        })
+    return items
 
 
 class VueloSerializer(serializers.ModelSerializer):
@@ -231,8 +320,9 @@ class VueloSerializer(serializers.ModelSerializer):
             "estado",
             "avion",
             "avion_display",
+            "version",
         ]
-        read_only_fields = ["duracion"]
+        read_only_fields = ["duracion", "version"]
 
     def create(self, validated_data):
         """Crea un nuevo vuelo usando la capa de servicio"""
@@ -257,6 +347,7 @@ class VueloSerializer(serializers.ModelSerializer):
             precio_base=validated_data.get("precio_base", instance.precio_base),
             estado=validated_data.get("estado", instance.estado),
             avion_id=validated_data.get("avion", instance.avion).id,
+            version=validated_data.get("version"),
         )
 
 
@@ -331,7 +422,7 @@ class ReservaSerializer(serializers.ModelSerializer):
         queryset=Pasajero.objects.all(), write_only=True
     )
     asiento = serializers.PrimaryKeyRelatedField(
-        queryset=Asiento.objects.all(), write_only=True
+        queryset=Asiento.objects.all(), write_only=True, required=False, allow_null=True
     )
 
     # Para GET -> se muestra la información completa
@@ -353,15 +444,20 @@ class ReservaSerializer(serializers.ModelSerializer):
             "pasajero_display",
             "asiento",
             "asiento_display",
+            "clase",
+            "version",
         ]
+        read_only_fields = ["version"]
+        extra_kwargs = {"clase": {"required": False}}
 
     def create(self, validated_data):
         """Crea una nueva reserva usando la capa de servicio"""
-
+        asiento = validated_data.get("asiento")
         return ReservaService.create_reserva(
             vuelo_id=validated_data["vuelo"].id,
             pasajero_id=validated_data["pasajero"].id,
-            asiento_id=validated_data["asiento"].id,
+            asiento_id=asiento.id if asiento else None,
+            clase=validated_data.get("clase"),
             precio=validated_data.get("precio"),
             codigo_reserva=validated_data.get("codigo_reserva"),
             estado=validated_data.get("estado", "pendiente"),
@@ -373,12 +469,62 @@ class ReservaSerializer(serializers.ModelSerializer):
             reserva_id=instance.id,
             estado=validated_data.get("estado", instance.estado),
             precio=validated_data.get("precio", instance.precio),
-            vuelo_id=(validated_data.get("vuelo", instance.vuelo).id),
-            pasajero_id=(validated_data.get("pasajero", instance.pasajero).id),
-            asiento_id=(validated_data.get("asiento", instance.asiento).id),
+            asiento_id=(
+                validated_data["asiento"].id if validated_data.get("asiento") else None
+            ),
+            version=validated_data.get("version"),
         )
 
 
+class ReservaGrupoItemSerializer(serializers.Serializer):
+    """Un pasajero de una reserva grupal, con su asiento opcional"""
+
+    pasajero = serializers.IntegerField(min_value=1)
+    asiento = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+
+
+class ReservaGrupoSerializer(serializers.Serializer):
+    """
+    Entrada de POST /api/createGroupReservation/.
+    Los pasajeros sin asiento reciben uno del mejor bloque libre de la clase.
+    """
+
+    vuelo = serializers.IntegerField(min_value=1)
+    clase = serializers.ChoiceField(choices=Asiento.tipo_choices, required=False)
+    estado = serializers.ChoiceField(
+        choices=[("pendiente", "Pendiente"), ("confirmada", "Confirmada")],
+        default="pendiente",
+    )
+    pasajeros = ReservaGrupoItemSerializer(
+        many=True, allow_empty=False, max_length=ReservaService.MAX_PASAJEROS_GRUPO
+    )
+
+
+class ListaEsperaCrearSerializer(serializers.Serializer):
+    """Entrada de POST /api/joinWaitlist/"""
+
+    vuelo = serializers.IntegerField(min_value=1)
+    pasajero = serializers.IntegerField(min_value=1)
+    clase = serializers.ChoiceField(choices=Asiento.tipo_choices)
+
+
+class ListaEsperaSerializer(serializers.ModelSerializer):
+    """
+    Serializer (solo lectura) de una entrada de la lista de espera, con su
+    posición en la cola mientras sigue esperando.
+    """
+
+    posicion = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ListaEspera
+        fields = ["id", "vuelo", "pasajero", "clase", "estado", "creada", "reserva", "posicion"]
+        read_only_fields = fields
+
+    def get_posicion(self, obj):
+        return ReservaService.get_posicion_lista_espera(obj)
+
+
 # ============================================================================
 # SERIALIZERS DE BOLETOS
 # ============================================================================
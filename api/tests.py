@@ -1,3 +1,1211 @@
-from django.test import TestCase
+"""
+Tests para la API REST.
+"""
 
-# Create your tests here.
+import hashlib
+import json
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from airline.models import Avion, AsientoVuelo, CupoClase, ListaEspera, Vuelo, Pasajero, Reserva
+from airline.services.reserva_service import ReservaService
+from airline.utils.publicador_asientos import publicador_asientos
+from api.models import ClaveIdempotencia
+from api.views import FlightSeatsStreamView
+
+
+class FlightDetailAPITest(TestCase):
+    """Tests para GET /api/flightDetail/<id>/"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="api", password="testpass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.avion = Avion.objects.create(modelo="Boeing 777", filas=40, columnas=10)
+        salida = timezone.now() + timedelta(days=2)
+        self.vuelo = Vuelo.objects.create(
+            avion=self.avion,
+            origen="Buenos Aires",
+            destino="Madrid",
+            fecha_salida=salida,
+            fecha_llegada=salida + timedelta(hours=12),
+            duracion=timedelta(hours=12),
+            precio_base=Decimal("900.00"),
+        )
+        pasajero = Pasajero.objects.create(
+            nombre="Ana",
+            apellido="López",
+            tipo_documento="DNI",
+            documento="30111222",
+            email="ana@example.com",
+        )
+        self.asiento = self.avion.asiento_set.get(numero="1A")
+        Reserva.objects.create(
+            vuelo=self.vuelo,
+            pasajero=pasajero,
+            asiento=self.asiento,
+            precio=Decimal("900.00"),
+            estado="confirmada",
+        )
+
+    def test_detalle_calcula_el_mapa_una_sola_vez(self):
+        """Vuelo, asientos y reservas se resuelven con 3 consultas"""
+        with self.assertNumQueries(3):
+            response = self.client.get(f"/api/flightDetail/{self.vuelo.id}/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["cantidad_disponibles"], 399)
+        self.assertEqual(response.data["asientos_disponibles"], response.data["asientos"])
+        self.assertEqual(len(response.data["asientos"]), 400)
+        primero = response.data["asientos"][0]
+        self.assertEqual(primero["estado_vuelo"], "ocupado")
+        self.assertEqual(primero["pasajero"]["nombre"], "Ana")
+
+    def test_detalle_vuelo_inexistente(self):
+        response = self.client.get("/api/flightDetail/999999/")
+        self.assertEqual(response.status_code, 404)
+
+
+class FlightAvailableAPITest(TestCase):
+    """Tests para GET /api/flightAvailable/"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="api", password="testpass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        salida = timezone.now() + timedelta(days=5)
+        datos = dict(
+            origen="Rosario",
+            destino="Bariloche",
+            fecha_salida=salida,
+            fecha_llegada=salida + timedelta(hours=3),
+            duracion=timedelta(hours=3),
+            precio_base=Decimal("250.00"),
+        )
+        self.chico = Vuelo.objects.create(
+            avion=Avion.objects.create(modelo="Cessna", filas=1, columnas=2), **datos
+        )
+        self.grande = Vuelo.objects.create(
+            avion=Avion.objects.create(modelo="Airbus A320", filas=12, columnas=6), **datos
+        )
+
+    def test_filtra_por_asientos_libres_sin_n_mas_1(self):
+        # Una sola consulta: el paginador cuenta las filas ya leídas
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/flightAvailable/?min_seats=3")
+
+        self.assertEqual(response.status_code, 200)
+        ids = [v["id"] for v in response.data["results"]]
+        self.assertEqual(ids, [self.grande.id])
+        self.assertEqual(response.data["results"][0]["asientos_libres"], 72)
+
+    def test_filtra_por_clase(self):
+        response = self.client.get("/api/flightAvailable/?min_seats=2&clase=primera")
+        ids = [v["id"] for v in response.data["results"]]
+        self.assertEqual(sorted(ids), sorted([self.chico.id, self.grande.id]))
+
+        response = self.client.get("/api/flightAvailable/?min_seats=20&clase=primera")
+        self.assertEqual(response.data["results"], [])
+
+    def test_parametros_invalidos(self):
+        response = self.client.get("/api/flightAvailable/?min_seats=abc")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get("/api/flightAvailable/?min_seats=1&clase=turista")
+        self.assertEqual(response.status_code, 400)
+
+
+class BatchSeatAvailabilityAPITest(TestCase):
+    """Tests para POST /api/checkSeatsAvailability/ y GET /api/checkSeatAvailability/"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="api", password="testpass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        salida = timezone.now() + timedelta(days=3)
+        datos = dict(
+            origen="Córdoba",
+            destino="Salta",
+            fecha_salida=salida,
+            fecha_llegada=salida + timedelta(hours=2),
+            duracion=timedelta(hours=2),
+            precio_base=Decimal("150.00"),
+        )
+        self.ida = Vuelo.objects.create(
+            avion=Avion.objects.create(modelo="Boeing 737", filas=10, columnas=6), **datos
+        )
+        self.vuelta = Vuelo.objects.create(
+            avion=Avion.objects.create(modelo="Boeing 737", filas=10, columnas=6), **datos
+        )
+        pasajero = Pasajero.objects.create(
+            nombre="Luis",
+            apellido="Pérez",
+            tipo_documento="DNI",
+            documento="28999111",
+            email="luis@example.com",
+        )
+        Reserva.objects.create(
+            vuelo=self.ida,
+            pasajero=pasajero,
+            asiento=self.ida.avion.asiento_set.get(numero="2B"),
+            precio=Decimal("150.00"),
+            estado="confirmada",
+        )
+
+    def test_consulta_fija_sin_importar_la_cantidad(self):
+        consultas = [
+            {"vuelo": vuelo.id, "asiento": f"{fila}{columna}"}
+            for vuelo in (self.ida, self.vuelta)
+            for fila in range(1, 11)
+            for columna in "ABCDEF"
+        ]
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                "/api/checkSeatsAvailability/", {"consultas": consultas}, format="json"
+            )
+
+        self.assertEqual(response.status_code, 200)
+        resultados = response.data["resultados"]
+        self.assertEqual(len(resultados), 120)
+        ocupados = [r for r in resultados if not r["disponible"]]
+        self.assertEqual(len(ocupados), 1)
+        self.assertEqual(ocupados[0]["vuelo"], self.ida.id)
+        self.assertEqual(ocupados[0]["asiento"], "2B")
+        self.assertEqual(ocupados[0]["estado"], "ocupado")
+
+    def test_respeta_el_orden_e_informa_inexistentes(self):
+        consultas = [
+            {"vuelo": self.vuelta.id, "asiento": "2b"},
+            {"vuelo": self.ida.id, "asiento": "99Z"},
+            {"vuelo": 999999, "asiento": "1A"},
+        ]
+        response = self.client.post(
+            "/api/checkSeatsAvailability/", {"consultas": consultas}, format="json"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        primero, segundo, tercero = response.data["resultados"]
+        self.assertEqual(primero["asiento"], "2B")
+        self.assertTrue(primero["disponible"])
+        self.assertFalse(segundo["existe"])
+        self.assertFalse(tercero["existe"])
+        self.assertIsNone(tercero["estado"])
+
+    def test_rechaza_lista_vacia(self):
+        response = self.client.post(
+            "/api/checkSeatsAvailability/", {"consultas": []}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_un_asiento_segun_el_inventario_del_vuelo(self):
+        # El mismo asiento está ocupado en un vuelo y libre en el otro
+        response = self.client.get(f"/api/checkSeatAvailability/{self.ida.id}/2b/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["estado"], "ocupado")
+        self.assertFalse(response.data["disponible"])
+
+        response = self.client.get(f"/api/checkSeatAvailability/{self.vuelta.id}/2B/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["estado"], "disponible")
+
+        # Al reservarlo en el otro vuelo pasa a estar ocupado también ahí
+        Reserva.objects.create(
+            vuelo=self.vuelta,
+            pasajero=Pasajero.objects.get(documento="28999111"),
+            asiento=self.vuelta.avion.asiento_set.get(numero="2B"),
+            precio=Decimal("150.00"),
+            estado="confirmada",
+        )
+        response = self.client.get(f"/api/checkSeatAvailability/{self.vuelta.id}/2B/")
+        self.assertEqual(response.data["estado"], "ocupado")
+
+        response = self.client.get(f"/api/checkSeatAvailability/{self.ida.id}/99Z/")
+        self.assertEqual(response.status_code, 404)
+
+
+class FlightDetailVersionAPITest(TestCase):
+    """Tests para el ETag y la consulta por versión de /api/flightDetail/<id>/"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="api", password="testpass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        salida = timezone.now() + timedelta(days=4)
+        self.vuelo = Vuelo.objects.create(
+            avion=Avion.objects.create(modelo="Boeing 737", filas=10, columnas=6),
+            origen="Mendoza",
+            destino="Ushuaia",
+            fecha_salida=salida,
+            fecha_llegada=salida + timedelta(hours=4),
+            duracion=timedelta(hours=4),
+            precio_base=Decimal("300.00"),
+        )
+        self.url = f"/api/flightDetail/{self.vuelo.id}/"
+
+    def reservar(self, numero, estado="confirmada"):
+        pasajero = Pasajero.objects.create(
+            nombre="Sofía",
+            apellido="Ruiz",
+            tipo_documento="DNI",
+            documento=f"35{numero}",
+            email=f"sofia{numero}@example.com",
+        )
+        return Reserva.objects.create(
+            vuelo=self.vuelo,
+            pasajero=pasajero,
+            asiento=self.vuelo.avion.asiento_set.get(numero=numero),
+            precio=Decimal("300.00"),
+            estado=estado,
+        )
+
+    def test_304_sin_cambios_con_una_consulta(self):
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+        self.assertTrue(etag.startswith('"'))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_etag_cambia_al_reservar(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.reservar("1A")
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_cambia_al_vencer_una_retencion(self):
+        reserva = self.reservar("1A", estado="pendiente")
+        AsientoVuelo.retener(reserva, timezone.now() + timedelta(minutes=5))
+        etag = self.client.get(self.url)["ETag"]
+
+        AsientoVuelo.objects.filter(reserva=reserva).update(
+            retenido_hasta=timezone.now() - timedelta(seconds=1)
+        )
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_since_version_devuelve_solo_los_cambios(self):
+        version = self.client.get(self.url).data["version_inventario"]
+        self.reservar("2C")
+        self.reservar("3D")
+
+        response = self.client.get(self.url, {"since_version": version})
+        self.assertEqual(response.status_code, 200)
+        numeros = [item["asiento"]["numero"] for item in response.data["asientos"]]
+        self.assertEqual(numeros, ["2C", "3D"])
+        self.assertEqual(response.data["asientos"][0]["estado_vuelo"], "ocupado")
+        self.assertGreater(response.data["version_inventario"], version)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                self.url, {"since_version": response.data["version_inventario"]}
+            )
+        self.assertEqual(response.data["asientos"], [])
+
+    def test_since_version_invalida(self):
+        response = self.client.get(self.url, {"since_version": "abc"})
+        self.assertEqual(response.status_code, 400)
+
+
+class FlightSeatsStreamTest(TestCase):
+    """Tests para GET /api/flightSeatsStream/<id>/"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="api", password="testpass123")
+        salida = timezone.now() + timedelta(days=4)
+        self.vuelo = Vuelo.objects.create(
+            avion=Avion.objects.create(modelo="Boeing 737", filas=5, columnas=6),
+            origen="Mendoza",
+            destino="Ushuaia",
+            fecha_salida=salida,
+            fecha_llegada=salida + timedelta(hours=4),
+            duracion=timedelta(hours=4),
+            precio_base=Decimal("300.00"),
+        )
+        self.url = f"/api/flightSeatsStream/{self.vuelo.id}/"
+
+    async def test_requiere_autenticacion(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+    async def test_vuelo_inexistente(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get("/api/flightSeatsStream/999999/")
+        self.assertEqual(response.status_code, 404)
+
+    async def test_acepta_access_token_jwt(self):
+        token = await sync_to_async(RefreshToken.for_user)(self.user)
+        with mock.patch.object(FlightSeatsStreamView, "duracion_maxima", 0):
+            response = await self.async_client.get(
+                self.url, headers={"Authorization": f"Bearer {token.access_token}"}
+            )
+            eventos = [parte async for parte in response.streaming_content]
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(eventos[1].startswith(b"event: version\n"))
+
+    async def test_envia_los_cambios_publicados(self):
+        await self.async_client.aforce_login(self.user)
+        with mock.patch.object(FlightSeatsStreamView, "duracion_maxima", 0.5):
+            response = await self.async_client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+
+            contenido = response.streaming_content
+            self.assertEqual(await anext(contenido), b"retry: 3000\n\n")
+            version = (await anext(contenido)).decode()
+            self.assertTrue(version.startswith("event: version\nid: 0\n"))
+
+            # Se publica desde otro hilo, como lo hace el on_commit de una reserva
+            await sync_to_async(publicador_asientos.distribuir, thread_sensitive=False)(
+                [{"vuelo": self.vuelo.id, "version": 7, "asientos": [{"numero": "1A"}]}]
+            )
+            evento = (await anext(contenido)).decode()
+            self.assertTrue(evento.startswith("event: asientos\nid: 7\n"))
+            self.assertIn('"numero": "1A"', evento)
+            restantes = [parte async for parte in contenido]
+
+        self.assertEqual(restantes, [])
+        self.assertFalse(publicador_asientos.hay_suscriptores([self.vuelo.id]))
+
+    async def test_cierra_la_conexion_al_cumplir_la_duracion_maxima(self):
+        await self.async_client.aforce_login(self.user)
+        with (
+            mock.patch.object(FlightSeatsStreamView, "duracion_maxima", 0.05),
+            mock.patch.object(FlightSeatsStreamView, "intervalo_ping", 0.01),
+        ):
+            response = await self.async_client.get(self.url)
+            eventos = [parte.decode() async for parte in response.streaming_content]
+
+        self.assertEqual(eventos[0], "retry: 3000\n\n")
+        self.assertTrue(eventos[1].startswith("event: version\n"))
+        self.assertTrue(all(evento == ": ping\n\n" for evento in eventos[2:]))
+        self.assertFalse(publicador_asientos.hay_suscriptores([self.vuelo.id]))
+
+    async def test_reconexion_con_last_event_id(self):
+        await self.async_client.aforce_login(self.user)
+        retenido_hasta = await sync_to_async(self._reservar_asientos)()
+
+        with mock.patch.object(FlightSeatsStreamView, "duracion_maxima", 0):
+            response = await self.async_client.get(
+                self.url, headers={"Last-Event-ID": "0"}
+            )
+            contenido = response.streaming_content
+            await anext(contenido)
+            evento = (await anext(contenido)).decode()
+            self.assertEqual([parte async for parte in contenido], [])
+        datos = json.loads(evento.split("data: ", 1)[1])
+        asientos = {asiento["numero"]: asiento for asiento in datos["asientos"]}
+        self.assertEqual(asientos["2B"]["estado"], "ocupado")
+        self.assertIsNone(asientos["2B"]["retenido_hasta"])
+        self.assertEqual(asientos["3C"]["estado"], "retenido")
+        # El JSON lleva la hora con milisegundos
+        self.assertAlmostEqual(
+            parse_datetime(asientos["3C"]["retenido_hasta"]),
+            retenido_hasta,
+            delta=timedelta(milliseconds=1),
+        )
+
+    def _reservar_asientos(self):
+        """Ocupa el 2B y retiene el 3C; devuelve el vencimiento de la retención"""
+        pasajero = Pasajero.objects.create(
+            nombre="Sofía",
+            apellido="Ruiz",
+            tipo_documento="DNI",
+            documento="35000001",
+            email="sofia@example.com",
+        )
+        Reserva.objects.create(
+            vuelo=self.vuelo,
+            pasajero=pasajero,
+            asiento=self.vuelo.avion.asiento_set.get(numero="2B"),
+            precio=Decimal("300.00"),
+            estado="confirmada",
+        )
+        # Reserva pendiente: retiene el asiento hasta que venza el pago
+        ReservaService.create_reserva(
+            vuelo=self.vuelo,
+            pasajero=Pasajero.objects.create(
+                nombre="Tomás",
+                apellido="Ruiz",
+                tipo_documento="DNI",
+                documento="35000002",
+                email="tomas@example.com",
+            ),
+            asiento=self.vuelo.avion.asiento_set.get(numero="3C"),
+        )
+        return AsientoVuelo.objects.get(
+            vuelo=self.vuelo, asiento__numero="3C"
+        ).retenido_hasta
+
+
+class SuggestSeatsAPITest(TestCase):
+    """Tests para GET /api/suggestSeats/<flight_id>/"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="api", password="testpass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        salida = timezone.now() + timedelta(days=4)
+        self.vuelo = Vuelo.objects.create(
+            avion=Avion.objects.create(modelo="Airbus A320", filas=12, columnas=6),
+            origen="Mendoza",
+            destino="Ushuaia",
+            fecha_salida=salida,
+            fecha_llegada=salida + timedelta(hours=4),
+            duracion=timedelta(hours=4),
+            precio_base=Decimal("300.00"),
+        )
+
+    def test_sugiere_bloque(self):
+        response = self.client.get(
+            f"/api/suggestSeats/{self.vuelo.id}/", {"clase": "ejecutivo", "cantidad": 2}
+        )
+        self.assertEqual(response.status_code, 200)
+        numeros = [a["numero"] for a in response.data["asientos"]]
+        self.assertEqual(numeros, ["4A", "4B"])
+
+    def test_parametros_invalidos(self):
+        response = self.client.get(
+            f"/api/suggestSeats/{self.vuelo.id}/", {"clase": "ejecutivo"}
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(
+            "/api/suggestSeats/999999/", {"clase": "primera", "cantidad": 1}
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class CreateGroupReservationAPITest(TestCase):
+    """Tests para POST /api/createGroupReservation/"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username="admin", password="admin123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        salida = timezone.now() + timedelta(days=4)
+        self.vuelo = Vuelo.objects.create(
+            avion=Avion.objects.create(modelo="Airbus A320", filas=12, columnas=6),
+            origen="Mendoza",
+            destino="Ushuaia",
+            fecha_salida=salida,
+            fecha_llegada=salida + timedelta(hours=4),
+            duracion=timedelta(hours=4),
+            precio_base=Decimal("300.00"),
+        )
+        self.pasajeros = [
+            Pasajero.objects.create(
+                nombre="Ana",
+                apellido=f"Grupo{i}",
+                tipo_documento="DNI",
+                documento=f"3300000{i}",
+                email=f"ana{i}@example.com",
+            )
+            for i in range(3)
+        ]
+
+    def test_crea_el_grupo(self):
+        response = self.client.post(
+            "/api/createGroupReservation/",
+            {
+                "vuelo": self.vuelo.id,
+                "clase": "ejecutivo",
+                "estado": "confirmada",
+                "pasajeros": [{"pasajero": p.id} for p in self.pasajeros],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 3)
+        self.assertTrue(all(r["estado"] == "confirmada" for r in response.data))
+
+    def test_requiere_admin(self):
+        self.client.force_authenticate(User.objects.create_user("comun", password="x"))
+        response = self.client.post(
+            "/api/createGroupReservation/", {"vuelo": self.vuelo.id}, format="json"
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class IdempotenciaAPITest(TestCase):
+    """Tests para el header Idempotency-Key"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username="admin", password="admin123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        salida = timezone.now() + timedelta(days=4)
+        self.vuelo = Vuelo.objects.create(
+            avion=Avion.objects.create(modelo="Airbus A320", filas=12, columnas=6),
+            origen="Mendoza",
+            destino="Ushuaia",
+            fecha_salida=salida,
+            fecha_llegada=salida + timedelta(hours=4),
+            duracion=timedelta(hours=4),
+            precio_base=Decimal("300.00"),
+        )
+        self.pasajero = Pasajero.objects.create(
+            nombre="Ana",
+            apellido="Idem",
+            tipo_documento="DNI",
+            documento="31000000",
+            email="idem@example.com",
+        )
+        self.datos = {
+            "vuelo": self.vuelo.id,
+            "pasajero": self.pasajero.id,
+            "asiento": self.vuelo.avion.asiento_set.get(numero="5A").id,
+        }
+
+    def reservar(self, clave, datos=None):
+        return self.client.post(
+            "/api/createReservation/",
+            datos or self.datos,
+            format="json",
+            HTTP_IDEMPOTENCY_KEY=clave,
+        )
+
+    def test_reintento_devuelve_la_misma_respuesta(self):
+        primera = self.reservar("clave-1")
+        self.assertEqual(primera.status_code, 201)
+
+        segunda = self.reservar("clave-1")
+        self.assertEqual(segunda.status_code, 201)
+        self.assertEqual(segunda.data, primera.data)
+        self.assertEqual(segunda["Idempotent-Replayed"], "true")
+        self.assertEqual(Reserva.objects.filter(vuelo=self.vuelo).count(), 1)
+
+    def test_clave_con_otros_datos(self):
+        self.reservar("clave-1")
+        otros = dict(self.datos, asiento=self.vuelo.avion.asiento_set.get(numero="5B").id)
+        response = self.reservar("clave-1", otros)
+        self.assertEqual(response.status_code, 422)
+
+    def test_errores_de_validacion_tambien_se_guardan(self):
+        self.reservar("clave-1")
+        otro_pasajero = Pasajero.objects.create(
+            nombre="Beto",
+            apellido="Idem",
+            tipo_documento="DNI",
+            documento="31000001",
+            email="beto@example.com",
+        )
+        datos = dict(self.datos, pasajero=otro_pasajero.id)
+        self.assertEqual(self.reservar("clave-2", datos).status_code, 400)
+
+        # El reintento se resuelve con una sola consulta, sin tocar la reserva
+        with self.assertNumQueries(1):
+            response = self.reservar("clave-2", datos)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response["Idempotent-Replayed"], "true")
+
+    @override_settings(IDEMPOTENCIA_ESPERA_SEGUNDOS=0)
+    def test_duplicado_concurrente_en_curso(self):
+        ClaveIdempotencia.objects.create(
+            usuario=self.admin,
+            endpoint="POST /api/createReservation/",
+            clave="clave-1",
+            huella=_huella(self.datos),
+            expira_en=timezone.now() + timedelta(hours=1),
+        )
+        response = self.reservar("clave-1")
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Reserva.objects.filter(vuelo=self.vuelo).exists())
+
+    @override_settings(IDEMPOTENCIA_ESPERA_SEGUNDOS=5, IDEMPOTENCIA_PLAZO_SEGUNDOS=15)
+    def test_reintento_reclama_una_clave_en_curso_abandonada(self):
+        # La petición original se cortó sin guardar respuesta ni liberar la clave
+        registro = ClaveIdempotencia.objects.create(
+            usuario=self.admin,
+            endpoint="POST /api/createReservation/",
+            clave="clave-1",
+            huella=_huella(self.datos),
+            reclamada_en=timezone.now() - timedelta(seconds=16),
+            expira_en=timezone.now() + timedelta(hours=1),
+        )
+
+        response = self.reservar("clave-1")
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn("Idempotent-Replayed", response)
+        registro.refresh_from_db()
+        self.assertEqual(registro.estado, "completada")
+
+        # Los siguientes reintentos reciben la respuesta guardada
+        self.assertEqual(self.reservar("clave-1")["Idempotent-Replayed"], "true")
+        self.assertEqual(Reserva.objects.filter(vuelo=self.vuelo).count(), 1)
+
+    @override_settings(IDEMPOTENCIA_ESPERA_SEGUNDOS=5, IDEMPOTENCIA_PLAZO_SEGUNDOS=15)
+    def test_la_espera_no_pasa_el_plazo_de_la_peticion_en_curso(self):
+        ClaveIdempotencia.objects.create(
+            usuario=self.admin,
+            endpoint="POST /api/createReservation/",
+            clave="clave-1",
+            huella=_huella(self.datos),
+            reclamada_en=timezone.now() - timedelta(seconds=14.8),
+            expira_en=timezone.now() + timedelta(hours=1),
+        )
+        inicio = time.monotonic()
+        response = self.reservar("clave-1")
+        self.assertEqual(response.status_code, 409)
+        self.assertLess(time.monotonic() - inicio, 2)
+
+        # Vencido el plazo, el próximo reintento ejecuta la operación
+        self.assertEqual(self.reservar("clave-1").status_code, 201)
+
+    def test_clave_vencida_y_limpieza(self):
+        self.reservar("clave-1")
+        ClaveIdempotencia.objects.update(expira_en=timezone.now() - timedelta(seconds=1))
+
+        call_command("limpiar_idempotencia", stdout=StringIO())
+        self.assertFalse(ClaveIdempotencia.objects.exists())
+
+    def test_generar_boleto(self):
+        reserva = Reserva.objects.create(
+            vuelo=self.vuelo,
+            pasajero=self.pasajero,
+            asiento=self.vuelo.avion.asiento_set.get(numero="6C"),
+            precio=Decimal("300.00"),
+            estado="confirmada",
+        )
+        url = f"/api/generateTicket/{reserva.id}/"
+        primera = self.client.post(url, HTTP_IDEMPOTENCY_KEY="boleto-1")
+        segunda = self.client.post(url, HTTP_IDEMPOTENCY_KEY="boleto-1")
+        self.assertEqual(primera.status_code, 201)
+        self.assertEqual(segunda.status_code, 201)
+        self.assertEqual(segunda.data["codigo_barra"], primera.data["codigo_barra"])
+
+
+def _huella(datos):
+    contenido = json.dumps(datos, sort_keys=True)
+    return hashlib.sha256(contenido.encode()).hexdigest()
+
+
+class ChangeReservationStatusAPITest(TestCase):
+    """Tests para PATCH /api/changeReservationStatus/<id>/"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username="admin", password="admin123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        salida = timezone.now() + timedelta(days=4)
+        self.vuelo = Vuelo.objects.create(
+            avion=Avion.objects.create(modelo="Airbus A320", filas=12, columnas=6),
+            origen="Mendoza",
+            destino="Ushuaia",
+            fecha_salida=salida,
+            fecha_llegada=salida + timedelta(hours=4),
+            duracion=timedelta(hours=4),
+            precio_base=Decimal("300.00"),
+        )
+        self.reserva = Reserva.objects.create(
+            vuelo=self.vuelo,
+            pasajero=Pasajero.objects.create(
+                nombre="Ana",
+                apellido="Estado",
+                tipo_documento="DNI",
+                documento="34000000",
+                email="estado@example.com",
+            ),
+            asiento=self.vuelo.avion.asiento_set.get(numero="6C"),
+            precio=Decimal("300.00"),
+        )
+
+    def cambiar(self, estado):
+        return self.client.patch(
+            f"/api/changeReservationStatus/{self.reserva.id}/",
+            {"estado": estado},
+            format="json",
+        )
+
+    def test_transiciones(self):
+        response = self.cambiar("confirmada")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["estado"], "confirmada")
+        self.assertEqual(
+            AsientoVuelo.objects.get(vuelo=self.vuelo, reserva=self.reserva).estado,
+            "ocupado",
+        )
+
+        self.assertEqual(self.cambiar("cancelada").status_code, 200)
+        self.assertFalse(AsientoVuelo.objects.filter(reserva=self.reserva).exists())
+
+        # Una reserva cancelada no vuelve a confirmarse
+        self.assertEqual(self.cambiar("confirmada").status_code, 400)
+        self.assertEqual(self.cambiar("pendiente").status_code, 400)
+
+
+class CancelFlightAPITest(TestCase):
+    """Tests para POST /api/cancelFlight/<id>/"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username="admin", password="admin123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        salida = timezone.now() + timedelta(days=4)
+        self.vuelo = Vuelo.objects.create(
+            avion=Avion.objects.create(modelo="Airbus A320", filas=12, columnas=6),
+            origen="Mendoza",
+            destino="Ushuaia",
+            fecha_salida=salida,
+            fecha_llegada=salida + timedelta(hours=4),
+            duracion=timedelta(hours=4),
+            precio_base=Decimal("300.00"),
+        )
+        for i, numero in enumerate(["7A", "7B"]):
+            Reserva.objects.create(
+                vuelo=self.vuelo,
+                pasajero=Pasajero.objects.create(
+                    nombre="Ana",
+                    apellido=f"Cancel{i}",
+                    tipo_documento="DNI",
+                    documento=f"3500000{i}",
+                    email=f"cancel{i}@example.com",
+                ),
+                asiento=self.vuelo.avion.asiento_set.get(numero=numero),
+                precio=Decimal("300.00"),
+                estado="confirmada",
+            )
+
+    def test_cancela_el_vuelo(self):
+        response = self.client.post(f"/api/cancelFlight/{self.vuelo.id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["reservas_canceladas"], 2)
+        self.assertEqual(response.data["asientos_liberados"], 2)
+        self.vuelo.refresh_from_db()
+        self.assertEqual(self.vuelo.estado, "cancelado")
+
+    def test_vuelo_inexistente(self):
+        self.assertEqual(self.client.post("/api/cancelFlight/999999/").status_code, 404)
+
+    def test_requiere_admin(self):
+        self.client.force_authenticate(User.objects.create_user("comun", password="x"))
+        response = self.client.post(f"/api/cancelFlight/{self.vuelo.id}/")
+        self.assertEqual(response.status_code, 403)
+
+
+class ControlVersionAPITest(TestCase):
+    """Tests para If-Match/ETag en /api/reserva-vs/ y /api/flight-vs/"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username="admin", password="admin123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        salida = timezone.now() + timedelta(days=5)
+        self.vuelo = Vuelo.objects.create(
+            avion=Avion.objects.create(modelo="Airbus A320", filas=12, columnas=6),
+            origen="Córdoba",
+            destino="Bariloche",
+            fecha_salida=salida,
+            fecha_llegada=salida + timedelta(hours=2),
+            duracion=timedelta(hours=2),
+            precio_base=Decimal("220.00"),
+        )
+        self.reserva = Reserva.objects.create(
+            vuelo=self.vuelo,
+            pasajero=Pasajero.objects.create(
+                nombre="Luis",
+                apellido="Etag",
+                tipo_documento="DNI",
+                documento="35000000",
+                email="etag@example.com",
+            ),
+            asiento=self.vuelo.avion.asiento_set.get(numero="4A"),
+            precio=Decimal("220.00"),
+        )
+        self.url = f"/api/reserva-vs/{self.reserva.id}/"
+
+    def patch(self, url, datos, if_match=None):
+        headers = {"HTTP_IF_MATCH": if_match} if if_match else {}
+        return self.client.patch(url, datos, format="json", **headers)
+
+    def test_etag_en_detalle(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response["ETag"], '"1"')
+        self.assertEqual(response.data["version"], 1)
+
+    def test_if_match_vigente(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.patch(self.url, {"precio": "250.00"}, if_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], '"2"')
+        self.assertEqual(response.data["version"], 2)
+
+    def test_if_match_viejo_da_409(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.assertEqual(self.patch(self.url, {"precio": "250.00"}).status_code, 200)
+
+        response = self.patch(self.url, {"precio": "300.00"}, if_match=etag)
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(response.data["error"])
+        self.reserva.refresh_from_db()
+        self.assertEqual(self.reserva.precio, Decimal("250.00"))
+
+    def test_vuelo_con_if_match_viejo(self):
+        url = f"/api/flight-vs/{self.vuelo.id}/"
+        self.assertEqual(self.patch(url, {"origen": "Rosario"}, if_match='"1"').status_code, 200)
+        self.assertEqual(self.patch(url, {"origen": "Salta"}, if_match='"1"').status_code, 409)
+        self.assertEqual(self.client.delete(url, HTTP_IF_MATCH='"1"').status_code, 409)
+        self.vuelo.refresh_from_db()
+        self.assertEqual(self.vuelo.origen, "Rosario")
+
+
+class CupoClaseAPITest(TestCase):
+    """Tests para la venta sin asiento, el check-in y /api/flightClassAvailability/"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username="admin", password="admin123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        salida = timezone.now() + timedelta(days=6)
+        self.vuelo = Vuelo.objects.create(
+            avion=Avion.objects.create(modelo="Airbus A320", filas=12, columnas=6),
+            origen="Mendoza",
+            destino="Salta",
+            fecha_salida=salida,
+            fecha_llegada=salida + timedelta(hours=2),
+            duracion=timedelta(hours=2),
+            precio_base=Decimal("210.00"),
+        )
+        self.pasajero = Pasajero.objects.create(
+            nombre="Sol",
+            apellido="Cupo",
+            tipo_documento="DNI",
+            documento="36000000",
+            email="cupo@example.com",
+        )
+
+    def disponibilidad(self):
+        response = self.client.get(f"/api/flightClassAvailability/{self.vuelo.id}/")
+        self.assertEqual(response.status_code, 200)
+        return {fila["clase"]: fila for fila in response.data["clases"]}
+
+    def test_reporte_de_pasajeros_con_reserva_sin_asiento(self):
+        ReservaService.create_reserva(
+            vuelo=self.vuelo, pasajero=self.pasajero, clase="ejecutivo", estado="confirmada"
+        )
+        ReservaService.create_reserva(
+            vuelo=self.vuelo,
+            pasajero=Pasajero.objects.create(
+                nombre="Leo",
+                apellido="Cupo",
+                tipo_documento="DNI",
+                documento="36000001",
+                email="leo@example.com",
+            ),
+            asiento=self.vuelo.avion.asiento_set.get(numero="8C"),
+            estado="confirmada",
+        )
+
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/api/reportes/pasajeros-vuelo/{self.vuelo.id}/")
+        self.assertEqual(response.status_code, 200)
+        filas = {fila["documento"]: fila for fila in response.data["pasajeros"]}
+        self.assertEqual(filas["36000000"]["asiento"], "sin asignar")
+        self.assertEqual(filas["36000000"]["clase"], "ejecutivo")
+        self.assertEqual(filas["36000001"]["asiento"], "8C")
+
+    def test_venta_sin_asiento_y_check_in(self):
+        antes = self.disponibilidad()["ejecutivo"]
+        response = self.client.post(
+            "/api/createReservation/",
+            {"vuelo": self.vuelo.id, "pasajero": self.pasajero.id, "clase": "ejecutivo"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(response.data["asiento_display"])
+        self.assertEqual(self.disponibilidad()["ejecutivo"]["retenidos"], antes["retenidos"] + 1)
+        self.assertEqual(
+            self.disponibilidad()["ejecutivo"]["disponibles"], antes["disponibles"] - 1
+        )
+
+        response = self.client.post(f"/api/assignSeat/{response.data['id']}/", format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.data["asiento_display"])
+        self.assertEqual(response.data["clase"], "ejecutivo")
+
+    def test_clase_invalida(self):
+        response = self.client.post(
+            "/api/createReservation/",
+            {"vuelo": self.vuelo.id, "pasajero": self.pasajero.id, "clase": "turista"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_error_del_servicio_con_asiento(self):
+        self.vuelo.estado = "cancelado"
+        self.vuelo.save()
+        response = self.client.post(
+            "/api/createReservation/",
+            {
+                "vuelo": self.vuelo.id,
+                "pasajero": self.pasajero.id,
+                "asiento": self.vuelo.avion.asiento_set.get(numero="1A").id,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["details"], {"vuelo": "El vuelo está cancelado."})
+
+    def test_vuelo_inexistente(self):
+        response = self.client.get("/api/flightClassAvailability/999999/")
+        self.assertEqual(response.status_code, 404)
+
+
+class FlightFilterAPITest(TestCase):
+    """Tests para /api/flightFilter/"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="u", password="p"))
+        salida = timezone.now() + timedelta(days=3)
+        self.vuelo = Vuelo.objects.create(
+            avion=Avion.objects.create(modelo="Boeing 737", filas=10, columnas=6),
+            origen="Tucumán",
+            destino="Bariloche",
+            fecha_salida=salida,
+            fecha_llegada=salida + timedelta(hours=3),
+            duracion=timedelta(hours=3),
+            precio_base=Decimal("210.00"),
+        )
+
+    def test_busca_sin_tildes_y_por_codigo(self):
+        for parametros in ({"origen": "tucuman"}, {"origen": "TUC", "destino": "bari"}):
+            response = self.client.get("/api/flightFilter/", parametros)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([vuelo["id"] for vuelo in response.data["results"]], [self.vuelo.id])
+
+        response = self.client.get("/api/flightFilter/", {"destino": "Salta"})
+        self.assertEqual(response.data["results"], [])
+
+
+class ListaEsperaAPITest(TestCase):
+    """Tests para /api/joinWaitlist/ y /api/leaveWaitlist/<id>/"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username="admin", password="admin123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        salida = timezone.now() + timedelta(days=7)
+        self.vuelo = Vuelo.objects.create(
+            avion=Avion.objects.create(modelo="Airbus A320", filas=12, columnas=6),
+            origen="Rosario",
+            destino="Neuquén",
+            fecha_salida=salida,
+            fecha_llegada=salida + timedelta(hours=2),
+            duracion=timedelta(hours=2),
+            precio_base=Decimal("180.00"),
+        )
+        self.pasajero = Pasajero.objects.create(
+            nombre="Leo",
+            apellido="Espera",
+            tipo_documento="DNI",
+            documento="37000000",
+            email="espera@example.com",
+        )
+
+    def anotar(self):
+        return self.client.post(
+            "/api/joinWaitlist/",
+            {"vuelo": self.vuelo.id, "pasajero": self.pasajero.id, "clase": "ejecutivo"},
+            format="json",
+        )
+
+    def test_clase_con_lugares(self):
+        self.assertEqual(self.anotar().status_code, 400)
+
+    def test_anotar_y_retirar(self):
+        CupoClase.objects.filter(vuelo=self.vuelo, tipo="ejecutivo").update(capacidad=0)
+        response = self.anotar()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["posicion"], 1)
+
+        response = self.client.post(f"/api/leaveWaitlist/{response.data['id']}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["estado"], "retirada")
+        self.assertIsNone(response.data["posicion"])
+
+    def test_eliminar_reserva_promueve(self):
+        CupoClase.objects.filter(vuelo=self.vuelo, tipo="ejecutivo").update(capacidad=1)
+        otro = Pasajero.objects.create(
+            nombre="Ana",
+            apellido="Vendida",
+            tipo_documento="DNI",
+            documento="37000001",
+            email="vendida@example.com",
+        )
+        reserva = ReservaService.create_reserva(
+            vuelo=self.vuelo, pasajero=otro, clase="ejecutivo", estado="confirmada"
+        )
+        entrada_id = self.anotar().data["id"]
+
+        response = self.client.delete(f"/api/reserva-vs/{reserva.id}/")
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(ListaEspera.objects.get(pk=entrada_id).estado, "promovida")
+
+
+class PaginacionCursorAPITest(TestCase):
+    """Tests para la paginación por cursor de los listados"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser(username="admin", password="a"))
+        avion = Avion.objects.create(modelo="Boeing 737", filas=4, columnas=2)
+        base = timezone.now() + timedelta(days=3)
+        # Pares de vuelos con la misma salida: el id desempata
+        self.vuelos = []
+        for numero in range(12):
+            salida = base + timedelta(hours=numero // 2)
+            self.vuelos.append(
+                Vuelo.objects.create(
+                    avion=avion,
+                    origen="Mendoza",
+                    destino="Salta",
+                    fecha_salida=salida,
+                    fecha_llegada=salida + timedelta(hours=2),
+                    duracion=timedelta(hours=2),
+                    precio_base=Decimal("100.00"),
+                )
+            )
+        self.pasajero = Pasajero.objects.create(
+            nombre="Ana",
+            apellido="Cursor",
+            tipo_documento="DNI",
+            documento="39000000",
+            email="cursor@example.com",
+        )
+        self.reservas = []
+        for numero, vuelo in enumerate(self.vuelos[:5]):
+            reserva = Reserva.objects.create(
+                vuelo=vuelo,
+                pasajero=self.pasajero,
+                asiento=avion.asiento_set.get(numero="1A"),
+                precio=Decimal("100.00"),
+                estado="confirmada",
+            )
+            Reserva.objects.filter(pk=reserva.pk).update(
+                fecha_reserva=base - timedelta(days=numero // 2)
+            )
+            self.reservas.append(reserva)
+
+    def recorrer(self, url, **parametros):
+        """Sigue los links next y devuelve los ids de cada página"""
+        paginas = []
+        response = self.client.get(url, parametros)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            paginas.append([fila["id"] for fila in response.data["results"]])
+            if response.data["next"] is None:
+                return paginas, response
+            response = self.client.get(response.data["next"])
+
+    def test_recorre_vuelos_en_orden_sin_repetir(self):
+        paginas, ultima = self.recorrer("/api/flight-vs/", page_size=5)
+        self.assertEqual([len(pagina) for pagina in paginas], [5, 5, 2])
+        self.assertEqual(sum(paginas, []), [vuelo.id for vuelo in self.vuelos])
+
+        # Hacia atrás desde la última página se vuelve a la anterior
+        response = self.client.get(ultima.data["previous"])
+        self.assertEqual([fila["id"] for fila in response.data["results"]], paginas[1])
+        response = self.client.get(response.data["previous"])
+        self.assertEqual([fila["id"] for fila in response.data["results"]], paginas[0])
+        self.assertIsNone(response.data["previous"])
+
+    def test_pagina_profunda_sin_offset_ni_conteo(self):
+        primera = self.client.get("/api/flight-vs/", {"page_size": 2})
+        url = primera.data["next"]
+        for _ in range(4):
+            url = self.client.get(url).data["next"]
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url)
+        self.assertEqual(
+            [fila["id"] for fila in response.data["results"]],
+            [vuelo.id for vuelo in self.vuelos[10:12]],
+        )
+        sql = " ".join(consulta["sql"] for consulta in consultas).upper()
+        self.assertNotIn("OFFSET", sql)
+        self.assertNotIn("COUNT(", sql)
+
+    def test_busquedas_cacheadas_paginadas(self):
+        paginas, _ = self.recorrer("/api/flightFilter/", origen="mendoza", page_size=4)
+        self.assertEqual(sum(paginas, []), [vuelo.id for vuelo in self.vuelos])
+        paginas, _ = self.recorrer("/api/flightAvailable/", page_size=7)
+        self.assertEqual([len(pagina) for pagina in paginas], [7, 5])
+
+    def test_reservas_de_pasajero_de_la_mas_reciente(self):
+        paginas, _ = self.recorrer(
+            f"/api/reservationsByPassenger/{self.pasajero.id}/", page_size=2
+        )
+        # Cada par comparte fecha_reserva y se desempata por id
+        self.assertEqual(paginas, [[r.id for r in self.reservas[i : i + 2]] for i in (0, 2, 4)])
+
+    def test_cursor_invalido(self):
+        for cursor in ("basura", "eyJwIjpbMV19"):
+            response = self.client.get("/api/flight-vs/", {"cursor": cursor})
+            self.assertEqual(response.status_code, 404)
+
+
+class FlightConnectionsAPITest(TestCase):
+    """Tests para /api/flightConnections/"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="u", password="p"))
+        avion = Avion.objects.create(modelo="Boeing 737", filas=10, columnas=6)
+        self.salida = timezone.now() + timedelta(days=4)
+        self.vuelos = [
+            Vuelo.objects.create(
+                avion=avion,
+                origen=origen,
+                destino=destino,
+                fecha_salida=self.salida + timedelta(hours=horas),
+                fecha_llegada=self.salida + timedelta(hours=horas + 2),
+                duracion=timedelta(hours=2),
+                precio_base=Decimal("90.00"),
+            )
+            for origen, destino, horas in (("Rosario", "Lima", 0), ("Lima", "Miami", 3))
+        ]
+
+    def test_itinerario_con_escala(self):
+        response = self.client.get(
+            "/api/flightConnections/",
+            {
+                "origen": "rosario",
+                "destino": "MIA",
+                "fecha": timezone.localdate(self.salida).isoformat(),
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        (itinerario,) = response.data["itinerarios"]
+        self.assertEqual(itinerario["escalas"], 1)
+        self.assertEqual(itinerario["precio_total"], "180.00")
+        self.assertEqual(
+            [tramo["id"] for tramo in itinerario["tramos"]], [vuelo.id for vuelo in self.vuelos]
+        )
+        self.assertEqual(itinerario["tramos"][1]["origen"], "Lima")
+
+    def test_parametros_requeridos(self):
+        response = self.client.get("/api/flightConnections/", {"origen": "rosario"})
+        self.assertEqual(response.status_code, 400)
@@ -17,13 +17,23 @@ Estructura de URLs:
 - /api/boleto-vs/ - Gestión de boletos (ViewSet solo lectura)
 - /api/flightAvailable/ - Listar vuelos disponibles
 - /api/flightDetail/<id>/ - Detalle de un vuelo
+- /api/flightSeatsStream/<id>/ - Cambios de asientos de un vuelo en tiempo real (SSE)
 - /api/flightFilter/ - Filtrar vuelos por origen/destino/fecha
+- /api/flightConnections/ - Buscar itinerarios con hasta dos escalas
+- /api/cancelFlight/<id>/ - Cancelar un vuelo con todas sus reservas y boletos
+- /api/flightClassAvailability/<id>/ - Disponibilidad por clase de un vuelo
 - /api/planeLayout/<id>/ - Layout de asientos de un avión
-- /api/checkSeatAvailability/<plane_id>/<seat_code>/ - Verificar disponibilidad de asiento
+- /api/checkSeatAvailability/<flight_id>/<seat_code>/ - Verificar disponibilidad de asiento en un vuelo
+- /api/checkSeatsAvailability/ - Verificar disponibilidad de muchos asientos (POST)
 - /api/availableSeats/<flight_id>/ - Asientos disponibles de un vuelo
+- /api/suggestSeats/<flight_id>/ - Sugerir asientos contiguos para un grupo
 - /api/passengerDetail/<id>/ - Detalle de un pasajero
 - /api/reservationsByPassenger/<id>/ - Reservas de un pasajero
 - /api/createReservation/ - Crear una reserva
+- /api/createGroupReservation/ - Crear las reservas de un grupo (todo o nada)
+- /api/assignSeat/<id>/ - Asignar asiento a una reserva sin asiento (check-in)
+- /api/joinWaitlist/ - Anotar un pasajero en la lista de espera de un vuelo
+- /api/leaveWaitlist/<id>/ - Sacar una entrada de la lista de espera
 - /api/changeReservationStatus/<id>/ - Cambiar el estado de una reserva
 - /api/generateTicket/<id>/ - Generar un boleto
 - /api/ticketInformation/<barcode>/ - Información de un boleto
@@ -50,13 +60,23 @@ from api.views import (
     BoletoViewSet,
     FlightAvailableListAPIView,
     FlightDetailAPIView,
+    FlightSeatsStreamView,
     FlightFilterAPIView,
+    FlightConnectionsAPIView,
+    CancelFlightAPIView,
+    FlightClassAvailabilityAPIView,
     PlaneLayoutAPIView,
     SeatAvailabilityAPIView,
+    BatchSeatAvailabilityAPIView,
     AvailableSeatsListAPIView,
+    SuggestSeatsAPIView,
     PassengerDetailAPIView,
     ReservationByPassengerAPIView,
     CreateReservationAPIView,
+    CreateGroupReservationAPIView,
+    AssignSeatAPIView,
+    JoinWaitlistAPIView,
+    LeaveWaitlistAPIView,
     ChangeReservationStatusAPIView,
     GenerateTicketAPIView,
     TicketInformationAPIView,
@@ -101,20 +121,50 @@ urlpatterns = [
         name="flight-available",
     ),
     path("flightDetail/<int:pk>/", FlightDetailAPIView.as_view(), name="flight-detail"),
+    path(
+        "flightSeatsStream/<int:pk>/",
+        FlightSeatsStreamView.as_view(),
+        name="flight-seats-stream",
+    ),
     path("flightFilter/", FlightFilterAPIView.as_view(), name="flight-filter"),
+    path(
+        "flightConnections/",
+        FlightConnectionsAPIView.as_view(),
+        name="flight-connections",
+    ),
+    path(
+        "cancelFlight/<int:flight_id>/",
+        CancelFlightAPIView.as_view(),
+        name="cancel-flight",
+    ),
+    path(
+        "flightClassAvailability/<int:flight_id>/",
+        FlightClassAvailabilityAPIView.as_view(),
+        name="flight-class-availability",
+    ),
     path(
         "planeLayout/<int:plane_id>/", PlaneLayoutAPIView.as_view(), name="plane-layout"
     ),
     path(
-        "checkSeatAvailability/<int:plane_id>/<str:seat_code>/",
+        "checkSeatAvailability/<int:flight_id>/<str:seat_code>/",
         SeatAvailabilityAPIView.as_view(),
         name="seat-availability",
     ),
+    path(
+        "checkSeatsAvailability/",
+        BatchSeatAvailabilityAPIView.as_view(),
+        name="seats-availability",
+    ),
     path(
         "availableSeats/<int:flight_id>/",
         AvailableSeatsListAPIView.as_view(),
         name="available-seats",
     ),
+    path(
+        "suggestSeats/<int:flight_id>/",
+        SuggestSeatsAPIView.as_view(),
+        name="suggest-seats",
+    ),
     path(
         "passengerDetail/<int:pk>/",
         PassengerDetailAPIView.as_view(),
@@ -130,6 +180,22 @@ urlpatterns = [
         CreateReservationAPIView.as_view({"post": "create"}),
         name="create-reservation",
     ),
+    path(
+        "createGroupReservation/",
+        CreateGroupReservationAPIView.as_view(),
+        name="create-group-reservation",
+    ),
+    path(
+        "assignSeat/<int:reservation_id>/",
+        AssignSeatAPIView.as_view(),
+        name="assign-seat",
+    ),
+    path("joinWaitlist/", JoinWaitlistAPIView.as_view(), name="join-waitlist"),
+    path(
+        "leaveWaitlist/<int:entry_id>/",
+        LeaveWaitlistAPIView.as_view(),
+        name="leave-waitlist",
+    ),
     path(
         "changeReservationStatus/<int:reservation_id>/",
         ChangeReservationStatusAPIView.as_view(),
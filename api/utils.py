@@ -6,12 +6,35 @@ por toda la API, incluyendo:
 - Formatos de respuesta estandarizados
 - Manejador de excepciones personalizado
 - Funciones de validación comunes
+- Soporte del header Idempotency-Key
 """
 
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.exceptions import APIException
 from rest_framework.views import exception_handler
 from rest_framework.response import Response
 from rest_framework import status
 
+from airline.models import ConflictoVersion
+from api.models import ClaveIdempotencia
+
+
+class Conflicto(APIException):
+    """El recurso fue modificado por otra operación (HTTP 409)"""
+
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "El recurso fue modificado por otra operación."
+    default_code = "conflicto"
+
 
 def custom_exception_handler(exc, context):
     """
@@ -34,6 +57,10 @@ def custom_exception_handler(exc, context):
             "details": {...}
         }
     """
+    # Los conflictos de versión de la capa de modelos se responden con 409
+    if isinstance(exc, ConflictoVersion):
+        exc = Conflicto(str(exc))
+
     # Llamar al manejador por defecto de DRF primero
     response = exception_handler(exc, context)
 
@@ -120,3 +147,169 @@ def error_response(
     return Response(
         {"error": True, "message": message, "details": details}, status=status_code
     )
+
+
+# ============================================================================
+# IDEMPOTENCIA
+# ============================================================================
+
+# Respuestas que no se guardan: el cliente puede reintentar con la misma clave
+CODIGOS_NO_CACHEABLES = {status.HTTP_409_CONFLICT, status.HTTP_429_TOO_MANY_REQUESTS}
+
+
+def idempotente(metodo):
+    """
+    Decorador para los métodos POST de las vistas que crean recursos.
+
+    Si la petición trae el header Idempotency-Key, la primera con esa clave
+    (por usuario y endpoint) ejecuta la operación y guarda su respuesta;
+    los reintentos reciben la respuesta guardada sin volver a ejecutarla.
+    Los duplicados concurrentes esperan a que termine la primera (hasta
+    IDEMPOTENCIA_ESPERA_SEGUNDOS) y, si sigue en curso, reciben un 409.
+    Reutilizar una clave con otros datos devuelve un 422.
+
+    Uso:
+        class MiVista(APIView):
+            @idempotente
+            def post(self, request):
+                ...
+    """
+
+    @wraps(metodo)
+    def wrapper(self, request, *args, **kwargs):
+        clave = request.headers.get("Idempotency-Key")
+        if not clave:
+            return metodo(self, request, *args, **kwargs)
+        if len(clave) > 255:
+            return error_response("La Idempotency-Key admite hasta 255 caracteres.")
+
+        endpoint = f"{request.method} {request.path}"
+        huella = _huella_peticion(request)
+        registro, es_nueva = _reclamar_clave(request.user, endpoint, clave, huella)
+
+        if not es_nueva:
+            if registro.huella != huella:
+                return error_response(
+                    "La Idempotency-Key ya se usó con otros datos.",
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            registro = _esperar_respuesta(registro)
+            if registro is None:
+                return error_response(
+                    "Hay una petición en curso con esta Idempotency-Key.",
+                    status_code=status.HTTP_409_CONFLICT,
+                )
+            return Response(
+                registro.respuesta,
+                status=registro.codigo_estado,
+                headers={"Idempotent-Replayed": "true"},
+            )
+
+        try:
+            try:
+                response = metodo(self, request, *args, **kwargs)
+            except Exception as exc:
+                # Los errores de validación también se guardan como respuesta
+                response = self.handle_exception(exc)
+        except Exception:
+            _reclamo(registro).delete()
+            raise
+
+        # Si el plazo venció y otro reintento reclamó la clave, no se la pisa
+        if response.status_code >= 500 or response.status_code in CODIGOS_NO_CACHEABLES:
+            _reclamo(registro).delete()
+        else:
+            _reclamo(registro).update(
+                estado="completada",
+                codigo_estado=response.status_code,
+                respuesta=response.data,
+            )
+        return response
+
+    return wrapper
+
+
+def _huella_peticion(request):
+    """Hash del cuerpo de la petición, independiente del orden de las llaves"""
+    datos = request.data
+    if hasattr(datos, "lists"):
+        datos = dict(datos.lists())
+    contenido = json.dumps(datos, sort_keys=True, cls=DjangoJSONEncoder, default=str)
+    return hashlib.sha256(contenido.encode()).hexdigest()
+
+
+def _reclamo(registro):
+    """Queryset de la clave mientras siga reclamada por esta petición"""
+    return ClaveIdempotencia.objects.filter(
+        pk=registro.pk, estado="en_curso", reclamada_en=registro.reclamada_en
+    )
+
+
+def _plazo_vencido(registro, ahora):
+    """Indica si la petición que reclamó la clave ya se da por perdida"""
+    plazo = timedelta(seconds=settings.IDEMPOTENCIA_PLAZO_SEGUNDOS)
+    return registro.estado == "en_curso" and registro.reclamada_en + plazo <= ahora
+
+
+def _reclamar_clave(usuario, endpoint, clave, huella):
+    """
+    Busca la clave y, si no existe (o venció), la reclama con un INSERT
+    sobre la restricción única: solo una de las peticiones concurrentes lo
+    logra. Una clave en curso cuyo plazo venció se vuelve a reclamar con un
+    UPDATE condicional, que también gana una sola petición. Un reintento de
+    una clave ya guardada se resuelve con una consulta.
+
+    Returns:
+        tuple: (ClaveIdempotencia, True si la reclamó esta petición)
+    """
+    ahora = timezone.now()
+    claves = ClaveIdempotencia.objects.filter(
+        usuario=usuario, endpoint=endpoint, clave=clave
+    )
+    while True:
+        registro = claves.first()
+        if registro is not None and registro.expira_en <= ahora:
+            claves.filter(pk=registro.pk).delete()
+            registro = None
+        if registro is not None:
+            if registro.huella == huella and _plazo_vencido(registro, ahora):
+                if _reclamo(registro).update(reclamada_en=ahora):
+                    registro.reclamada_en = ahora
+                    return registro, True
+                # Otro reintento la reclamó primero: se vuelve a leer
+                continue
+            return registro, False
+        try:
+            with transaction.atomic():
+                registro = ClaveIdempotencia.objects.create(
+                    usuario=usuario,
+                    endpoint=endpoint,
+                    clave=clave,
+                    huella=huella,
+                    reclamada_en=ahora,
+                    expira_en=ahora + timedelta(hours=settings.IDEMPOTENCIA_TTL_HORAS),
+                )
+            return registro, True
+        except IntegrityError:
+            # Otra petición la reclamó primero: se vuelve a leer
+            continue
+
+
+def _esperar_respuesta(registro):
+    """
+    Espera a que termine la petición que reclamó la clave, como máximo
+    IDEMPOTENCIA_ESPERA_SEGUNDOS y nunca más allá de su plazo: después el
+    próximo reintento puede reclamarla.
+
+    Returns:
+        ClaveIdempotencia completada, o None si sigue en curso (o falló)
+    """
+    limite = time.monotonic() + settings.IDEMPOTENCIA_ESPERA_SEGUNDOS
+    while registro.estado != "completada":
+        if time.monotonic() >= limite or _plazo_vencido(registro, timezone.now()):
+            return None
+        time.sleep(0.1)
+        registro = ClaveIdempotencia.objects.filter(pk=registro.pk).first()
+        if registro is None:
+            return None
+    return registro
@@ -3,19 +3,36 @@ Vistas de la API REST
 Todas las vistas en un solo archivo siguiendo el patrón de Mile
 """
 
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
 from rest_framework import viewsets, status
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import AuthenticationFailed, NotFound, ValidationError
 from rest_framework.generics import ListAPIView, RetrieveAPIView
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
-from django.utils.crypto import get_random_string
-from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from drf_spectacular.utils import (
+    extend_schema,
+    inline_serializer,
+    OpenApiParameter,
+    OpenApiResponse,
+)
 from drf_spectacular.types import OpenApiTypes
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
+from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.tokens import RefreshToken
 from airline.models import Vuelo, Avion, Asiento, Pasajero, Reserva, Boleto
+from airline.services.vuelo_service import ORDEN_BUSQUEDA
+from airline.utils.publicador_asientos import publicador_asientos
 
 from api.serializers import (
     VueloSerializer,
@@ -28,9 +45,16 @@ from api.serializers import (
     BoletoSerializer,
     LoginSerializer,
     RegisterSerializer,
+    DisponibilidadLoteSerializer,
+    ItinerarioSerializer,
+    ReservaGrupoSerializer,
+    ListaEsperaCrearSerializer,
+    ListaEsperaSerializer,
+    serializar_mapa_asientos,
 )
 
-from api.mixins import AuthView, AuthAdminView
+from api.mixins import AuthView, AuthAdminView, BusquedaPaginadaView, VersionView
+from api.utils import idempotente
 from airline.services import (
     VueloService,
     AvionService,
@@ -45,88 +69,336 @@ from airline.services import (
 # ============================================================================
 
 
-class FlightAvailableListAPIView(AuthView, ListAPIView):
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            "min_seats", OpenApiTypes.INT, description="Mínimo de asientos libres"
+        ),
+        OpenApiParameter(
+            "clase",
+            OpenApiTypes.STR,
+            description="Clase para min_seats (economico, ejecutivo, primera)",
+        ),
+    ]
+)
+class FlightAvailableListAPIView(AuthView, BusquedaPaginadaView, ListAPIView):
     """
-    GET /api/flightAvailable/
+    GET /api/flightAvailable/?min_seats=<n>&clase=<tipo>
     Filtra los vuelos disponibles que sean mayor a la fecha de hoy.
+    Opcionalmente filtra por cantidad de asientos libres (total o por clase).
+    Los resultados pasan por la caché de búsquedas de vuelos, página por
+    página, ordenados por fecha de salida.
     Accesible para cualquier usuario autenticado.
     """
 
     permission_classes = [IsAuthenticated]
     serializer_class = VueloListSerializer
-
-    def get_queryset(self):
-        """Obtiene vuelos disponibles usando el servicio"""
-        return VueloService.get_upcoming_flights()
+    orden_cursor = ORDEN_BUSQUEDA
+
+    def buscar_pagina(self, posicion, cantidad, hacia_atras):
+        """Obtiene una página de vuelos disponibles usando el servicio"""
+        return VueloService.buscar_proximos_vuelos(
+            min_asientos=self.request.query_params.get("min_seats"),
+            clase=self.request.query_params.get("clase"),
+            posicion=posicion,
+            cantidad=cantidad,
+            hacia_atras=hacia_atras,
+        )
 
 
 class FlightDetailAPIView(AuthView, RetrieveAPIView):
+    """
+    GET /api/flightDetail/<id>/
+    Detalle del vuelo con su mapa de asientos.
+
+    - Responde con un ETag fuerte derivado de la versión de inventario del
+      vuelo; con If-None-Match igual devuelve 304 sin armar el mapa.
+    - ?since_version=<n> devuelve solo los asientos que cambiaron desde la
+      versión n (campo version_inventario de la respuesta anterior).
+    """
+
     permission_classes = [IsAuthenticated]
     serializer_class = VueloDetailSerializer
     lookup_field = "pk"
 
-    @extend_schema(responses=VueloDetailSerializer)
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "since_version",
+                OpenApiTypes.INT,
+                description="Devolver solo los asientos modificados desde esta versión",
+            ),
+        ],
+        responses=VueloDetailSerializer,
+    )
     def get(self, request, *args, **kwargs):
+        pk = self.kwargs.get("pk")
+
+        desde_version = request.query_params.get("since_version")
+        if desde_version is not None:
+            cambios = VueloService.get_cambios_mapa(pk, desde_version)
+            cambios["asientos"] = serializar_mapa_asientos(cambios["asientos"])
+            return Response({"id": int(pk), **cambios})
+
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match:
+            etag = quote_etag(VueloService.get_version_mapa(pk))
+            etags_cliente = parse_etags(if_none_match)
+            if etag in etags_cliente or "*" in etags_cliente:
+                return self._con_etag(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+
         obj = self.get_object()
+        etag = quote_etag(VueloService.get_version_mapa_de(obj))
         ser = self.get_serializer(obj)
-        return Response(ser.data)
+        return self._con_etag(Response(ser.data), etag)
+
+    def _con_etag(self, response, etag):
+        """Agrega el ETag y obliga a revalidar antes de usar la copia en caché"""
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
 
     def get_object(self):
-        vuelo_id = self.kwargs.get("pk")
-
-        # Debe devolver instancia de Vuelo o lanzar NotFound
-        vuelo = VueloService.get_vuelo(vuelo_id)
-        if vuelo is None:
-            raise NotFound("Vuelo no encontrado")
-        if not isinstance(vuelo, Vuelo):
-            # por si el service devolviera un id
-            vuelo = Vuelo.objects.get(pk=vuelo)
-
-        # Prefetch/optimizaciones
-        return (
-            Vuelo.objects
-            .select_related("avion")
-            .prefetch_related(
-                "avion__asiento_set",
-                "reservas__pasajero",
-                "reservas__asiento",
+        """Obtiene el vuelo con asientos y reservas precargados"""
+        return VueloService.get_vuelo_detalle(self.kwargs.get("pk"))
+
+
+class FlightSeatsStreamView(View):
+    """
+    GET /api/flightSeatsStream/<id>/
+    Stream (server-sent events) con los cambios de asientos de un vuelo a
+    medida que se retienen, confirman o cancelan reservas. Cada conexión
+    espera los eventos del publicador del proceso, sin consultar la base.
+
+    Es una vista async: se sirve con ASGI (gunicorn con el worker de uvicorn,
+    ver aerolinea_project/asgi.py) y cada conexión abierta espera en el event
+    loop del worker, sin ocupar un hilo. Dura como máximo `duracion_maxima`
+    segundos y después el navegador reconecta solo.
+
+    - Cada evento "asientos" lleva como id la versión de inventario, y al
+      abrir la conexión se envía un evento "version" con la versión actual.
+      Al reconectar, el navegador envía Last-Event-ID (o ?since_version=<n>)
+      y se reenvían los cambios desde esa versión, sin perder los ocurridos
+      entre conexiones.
+    - El evento "recargar" indica que se perdieron cambios y hay que volver
+      a pedir /api/flightDetail/<id>/.
+    """
+
+    # Segundos sin eventos tras los cuales se envía un comentario de keep-alive
+    intervalo_ping = 15
+    # Segundos que se mantiene abierta cada conexión antes de pedir reconectar;
+    # cada reconexión consulta la base una vez
+    duracion_maxima = 300
+
+    async def get(self, request, pk):
+        if not await self._autenticar(request):
+            return JsonResponse(
+                {"error": "Autenticación requerida."}, status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        # Suscribirse antes de leer la base para no perder cambios intermedios
+        suscripcion = publicador_asientos.suscribir(
+            pk, loop=asyncio.get_running_loop()
+        )
+        try:
+            cambios = await sync_to_async(self._leer_cambios)(
+                pk,
+                request.headers.get("Last-Event-ID", request.GET.get("since_version")),
             )
-            .get(pk=vuelo.pk)
+        except (NotFound, ValidationError) as exc:
+            publicador_asientos.desuscribir(suscripcion)
+            codigo = (
+                status.HTTP_404_NOT_FOUND
+                if isinstance(exc, NotFound)
+                else status.HTTP_400_BAD_REQUEST
+            )
+            return JsonResponse({"error": exc.detail}, status=codigo)
+
+        response = StreamingHttpResponse(
+            self._eventos(suscripcion, cambios), content_type="text/event-stream"
         )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def _autenticar(self, request):
+        """Acepta sesión de Django o un access token JWT en Authorization"""
+        if (await request.auser()).is_authenticated:
+            return True
+        try:
+            resultado = await sync_to_async(JWTAuthentication().authenticate)(request)
+        except AuthenticationFailed:
+            return False
+        return resultado is not None
+
+    def _leer_cambios(self, pk, desde_version):
+        if desde_version is not None:
+            cambios = VueloService.get_cambios_mapa(pk, desde_version)
+            return {
+                "version_inventario": cambios["version_inventario"],
+                "asientos": [
+                    {
+                        "asiento_id": info["asiento"].id,
+                        "numero": info["asiento"].numero,
+                        "estado": info["estado_vuelo"],
+                        "retenido_hasta": info["retenido_hasta"],
+                    }
+                    for info in cambios["asientos"]
+                ],
+            }
+        return {
+            "version_inventario": VueloService.get_vuelo(pk).version_inventario,
+            "asientos": None,
+        }
+
+    async def _eventos(self, suscripcion, cambios):
+        vuelo_id = suscripcion.vuelo_id
+        version = cambios["version_inventario"]
+        fin = time.monotonic() + self.duracion_maxima
+        try:
+            yield "retry: 3000\n\n"
+            if cambios["asientos"] is None:
+                # Solo fija el Last-Event-ID con el que reconectará el navegador
+                yield _evento_sse("version", {"vuelo": vuelo_id, "version": version}, version)
+            else:
+                yield _evento_sse(
+                    "asientos",
+                    {"vuelo": vuelo_id, "version": version, "asientos": cambios["asientos"]},
+                    version,
+                )
+            while True:
+                restante = fin - time.monotonic()
+                if restante <= 0:
+                    return
+                try:
+                    evento = await asyncio.wait_for(
+                        suscripcion.cola.get(), min(self.intervalo_ping, restante)
+                    )
+                except asyncio.TimeoutError:
+                    if fin - time.monotonic() > 0:
+                        yield ": ping\n\n"
+                    continue
+                if suscripcion.desbordada:
+                    # El cliente no leyó a tiempo: se descartan los pendientes
+                    suscripcion.descartar_pendientes()
+                    yield _evento_sse("recargar", {"vuelo": vuelo_id})
+                    continue
+                yield _evento_sse("asientos", evento, evento["version"])
+        finally:
+            publicador_asientos.desuscribir(suscripcion)
+
+
+def _evento_sse(tipo, datos, id_evento=None):
+    """Formatea un evento server-sent events"""
+    lineas = [f"event: {tipo}"]
+    if id_evento is not None:
+        lineas.append(f"id: {id_evento}")
+    lineas.append(f"data: {json.dumps(datos, cls=DjangoJSONEncoder)}")
+    return "\n".join(lineas) + "\n\n"
 
 
 @extend_schema(
     parameters=[
-        OpenApiParameter("origen", OpenApiTypes.STR, description="Ciudad de origen"),
-        OpenApiParameter("destino", OpenApiTypes.STR, description="Ciudad de destino"),
+        OpenApiParameter(
+            "origen", OpenApiTypes.STR, description="Ciudad de origen o su código"
+        ),
+        OpenApiParameter(
+            "destino", OpenApiTypes.STR, description="Ciudad de destino o su código"
+        ),
         OpenApiParameter(
             "fecha", OpenApiTypes.DATE, description="Fecha de salida (YYYY-MM-DD)"
         ),
     ]
 )
-class FlightFilterAPIView(AuthView, ListAPIView):
+class FlightFilterAPIView(AuthView, BusquedaPaginadaView, ListAPIView):
     """
     GET /api/flightFilter/?origen=<ciudad>&destino=<ciudad>&fecha=<YYYY-MM-DD>
-    Filtra vuelos por origen, destino y fecha de salida.
-    Si no se envía filtro, devuelve todos los vuelos.
+    Filtra vuelos por origen, destino y fecha de salida. Las ciudades se
+    buscan sin distinguir tildes ni mayúsculas, o por su código.
+    Si no se envía filtro, devuelve todos los vuelos. Los resultados pasan
+    por la caché de búsquedas de vuelos, página por página, ordenados por
+    fecha de salida.
     """
 
     permission_classes = [IsAuthenticated]
     serializer_class = VueloListSerializer
-    pagination_class = None
+    orden_cursor = ORDEN_BUSQUEDA
 
-    def get_queryset(self):
-        """Filtra vuelos según parámetros de consulta"""
+    def buscar_pagina(self, posicion, cantidad, hacia_atras):
+        """Filtra una página de vuelos según parámetros de consulta"""
         origen = self.request.query_params.get("origen")
         destino = self.request.query_params.get("destino")
         fecha = self.request.query_params.get("fecha")
 
-        return VueloService.filter_vuelos(origen, destino, fecha)
+        return VueloService.buscar_vuelos(
+            origen,
+            destino,
+            fecha,
+            posicion=posicion,
+            cantidad=cantidad,
+            hacia_atras=hacia_atras,
+        )
 
 
-class FlightViewSet(AuthAdminView, viewsets.ModelViewSet):
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            "origen", OpenApiTypes.STR, required=True, description="Ciudad de origen o su código"
+        ),
+        OpenApiParameter(
+            "destino", OpenApiTypes.STR, required=True, description="Ciudad de destino o su código"
+        ),
+        OpenApiParameter(
+            "fecha", OpenApiTypes.DATE, required=True, description="Fecha de salida (YYYY-MM-DD)"
+        ),
+        OpenApiParameter(
+            "max_escalas", OpenApiTypes.INT, description="Escalas permitidas (0 a 2, default 2)"
+        ),
+        OpenApiParameter(
+            "conexion_min", OpenApiTypes.INT, description="Minutos mínimos de conexión"
+        ),
+        OpenApiParameter(
+            "conexion_max", OpenApiTypes.INT, description="Minutos máximos de conexión"
+        ),
+        OpenApiParameter(
+            "pasajeros", OpenApiTypes.INT, description="Asientos libres necesarios en cada tramo"
+        ),
+    ],
+    responses=inline_serializer(
+        "Conexiones", {"itinerarios": ItinerarioSerializer(many=True)}
+    ),
+)
+class FlightConnectionsAPIView(AuthView, APIView):
+    """
+    GET /api/flightConnections/?origen=<ciudad>&destino=<ciudad>&fecha=<YYYY-MM-DD>
+    Busca itinerarios directos o de hasta dos escalas que salen ese día,
+    respetando los tiempos mínimo y máximo de conexión entre tramos.
+    Devuelve hasta 20, de la llegada más temprana a la más tardía.
     """
-    CRUD completo de vuelos (solo para admins)
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = ItinerarioSerializer
+
+    def get(self, request):
+        """Busca las conexiones usando el servicio"""
+        params = request.query_params
+        opcionales = {
+            nombre: params[nombre]
+            for nombre in ("max_escalas", "conexion_min", "conexion_max", "pasajeros")
+            if params.get(nombre)
+        }
+        itinerarios = VueloService.buscar_conexiones(
+            params.get("origen"), params.get("destino"), params.get("fecha"), **opcionales
+        )
+        return Response(
+            {"itinerarios": ItinerarioSerializer(itinerarios, many=True).data},
+            status=status.HTTP_200_OK,
+        )
+
+
+class FlightViewSet(AuthAdminView, VersionView, viewsets.ModelViewSet):
+    """
+    CRUD completo de vuelos (solo para admins), con If-Match/ETag por versión
     - GET /api/flight-vs/
     - POST /api/flight-vs/
     - GET /api/flight-vs/{id}/
@@ -135,8 +407,49 @@ class FlightViewSet(AuthAdminView, viewsets.ModelViewSet):
     - DELETE /api/flight-vs/{id}/
     """
 
-    queryset = Vuelo.objects.all().order_by("id")
+    queryset = Vuelo.objects.all()
     serializer_class = VueloSerializer
+    orden_cursor = ORDEN_BUSQUEDA
+
+
+class CancelFlightAPIView(AuthAdminView, APIView):
+    """
+    POST /api/cancelFlight/<int:flight_id>/
+    Cancela un vuelo completo: cancela todas sus reservas, anula sus boletos,
+    retira su lista de espera y libera sus asientos en una sola transacción.
+    Solo para admin.
+
+    Respuesta:
+        {
+            "vuelo": 1,
+            "boletos_anulados": 120,
+            "reservas_canceladas": 150,
+            "esperas_retiradas": 4,
+            "asientos_liberados": 150
+        }
+    """
+
+    def post(self, request, flight_id):
+        """Cancela el vuelo y devuelve la cantidad de registros afectados"""
+        resultado = VueloService.cancelar_vuelo(flight_id)
+        return Response(resultado, status=status.HTTP_200_OK)
+
+
+class FlightClassAvailabilityAPIView(AuthView, APIView):
+    """
+    GET /api/flightClassAvailability/<int:flight_id>/
+    Disponibilidad por clase de un vuelo, leída de sus cupos (capacidad,
+    sobreventa, vendidos, retenidos y disponibles).
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, flight_id):
+        """Devuelve los cupos del vuelo"""
+        return Response(
+            {"vuelo": flight_id, "clases": VueloService.get_cupos(flight_id)},
+            status=status.HTTP_200_OK,
+        )
 
 
 # ============================================================================
@@ -182,28 +495,91 @@ class PlaneLayoutAPIView(AuthAdminView, ListAPIView):
 
         return Response({
             "avion": avion_data,
+            "pasillos": avion.get_plantilla().pasillos_para(avion.columnas),
             "asientos": asientos_data
         })
 
 
-class SeatAvailabilityAPIView(AuthView, RetrieveAPIView):
+class SeatAvailabilityAPIView(AuthView, APIView):
     """
-    GET /api/checkSeatAvailability/<int:plane_id>/<str:seat_code>/
-    Verifica si un asiento existe y muestra su estado actual.
+    GET /api/checkSeatAvailability/<int:flight_id>/<str:seat_code>/
+    Verifica si un asiento existe en un vuelo y muestra su estado en ese vuelo
+    (según el inventario del vuelo, no el estado general del asiento del avión).
     Ejemplo: /api/checkSeatAvailability/4/1A/
     """
 
     permission_classes = [IsAuthenticated]
-    serializer_class = AsientoSerializer
 
-    def get(self, request, plane_id, seat_code):
-        """Verifica disponibilidad de un asiento específico"""
-        data = AsientoService.check_disponibilidad(plane_id, seat_code)
-        if not data:
+    def get(self, request, flight_id, seat_code):
+        """Verifica disponibilidad de un asiento específico en un vuelo"""
+        (resultado,) = AsientoService.check_disponibilidad_lote([(flight_id, seat_code)])
+        if not resultado["existe"]:
             return Response(
-                {"error": "El asiento no existe."}, status=status.HTTP_404_NOT_FOUND
+                {"error": "El asiento no existe en ese vuelo."},
+                status=status.HTTP_404_NOT_FOUND,
             )
-        return Response(data, status=status.HTTP_200_OK)
+        return Response(resultado, status=status.HTTP_200_OK)
+
+
+class BatchSeatAvailabilityAPIView(AuthView, APIView):
+    """
+    POST /api/checkSeatsAvailability/
+    Verifica la disponibilidad de muchos asientos en uno o varios vuelos.
+    La respuesta se resuelve con una única consulta al inventario,
+    sin importar la cantidad de pares consultados.
+
+    Body:
+        {"consultas": [{"vuelo": 1, "asiento": "1A"}, {"vuelo": 2, "asiento": "3C"}]}
+    """
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = DisponibilidadLoteSerializer
+
+    @extend_schema(request=DisponibilidadLoteSerializer)
+    def post(self, request):
+        """Devuelve el estado de cada par (vuelo, asiento) en el orden recibido"""
+        serializer = DisponibilidadLoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        pares = [
+            (consulta["vuelo"], consulta["asiento"])
+            for consulta in serializer.validated_data["consultas"]
+        ]
+        resultados = AsientoService.check_disponibilidad_lote(pares)
+        return Response({"resultados": resultados}, status=status.HTTP_200_OK)
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            "clase",
+            OpenApiTypes.STR,
+            description="Clase de los asientos (economico, ejecutivo, primera)",
+            required=True,
+        ),
+        OpenApiParameter(
+            "cantidad", OpenApiTypes.INT, description="Cantidad de personas", required=True
+        ),
+    ]
+)
+class SuggestSeatsAPIView(AuthView, APIView):
+    """
+    GET /api/suggestSeats/<int:flight_id>/?clase=<clase>&cantidad=<n>
+    Sugiere el mejor bloque de asientos libres y contiguos de una clase para
+    un grupo (misma fila primero, después filas vecinas).
+    Ejemplo: /api/suggestSeats/4/?clase=economico&cantidad=3
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, flight_id):
+        """Devuelve los asientos sugeridos para el grupo"""
+        asientos = AsientoService.asignar_asientos(
+            flight_id,
+            request.query_params.get("clase"),
+            request.query_params.get("cantidad"),
+        )
+        return Response({"asientos": asientos}, status=status.HTTP_200_OK)
 
 
 class AvailableSeatsListAPIView(AuthView, ListAPIView):
@@ -215,6 +591,7 @@ class AvailableSeatsListAPIView(AuthView, ListAPIView):
 
     permission_classes = [IsAuthenticated]
     serializer_class = AsientoSerializer
+    orden_cursor = ("fila", "columna", "id")
 
     def get_queryset(self):
         """Obtiene asientos disponibles para un vuelo"""
@@ -261,13 +638,14 @@ class PassengerDetailAPIView(AuthView, RetrieveAPIView):
 class ReservationByPassengerAPIView(AuthView, ListAPIView):
     """
     GET /api/reservationsByPassenger/<int:passenger_id>/
-    Devuelve todas las reservas asociadas a un pasajero.
+    Devuelve las reservas asociadas a un pasajero, de la más reciente a
+    la más antigua.
     Accesible para cualquier usuario autenticado.
     """
 
     permission_classes = [IsAuthenticated]
     serializer_class = ReservaSerializer
-    pagination_class = None
+    orden_cursor = ("-fecha_reserva", "id")
 
     def get_queryset(self):
         """Obtiene reservas de un pasajero"""
@@ -284,12 +662,16 @@ class CreateReservationAPIView(AuthAdminView, viewsets.ViewSet):
     """
     POST /api/createReservation/
     Crea una reserva para un pasajero en un vuelo (solo para admin).
-    El asiento debe estar disponible.
+    El asiento debe estar disponible. Sin asiento, indicando "clase", se
+    vende un lugar del cupo de esa clase y el asiento se asigna después
+    con /api/assignSeat/<id>/.
+    Admite el header Idempotency-Key para reintentos seguros.
     """
 
     permission_classes = [IsAuthenticated]
     serializer_class = ReservaSerializer
 
+    @idempotente
     def create(self, request):
         """Crea una nueva reserva"""
         data = request.data.copy()
@@ -297,9 +679,10 @@ class CreateReservationAPIView(AuthAdminView, viewsets.ViewSet):
         vuelo_id = data.get("vuelo")
         pasajero_id = data.get("pasajero")
         asiento_id = data.get("asiento")
+        clase = data.get("clase")
 
         # Validaciones básicas
-        if not (vuelo_id and pasajero_id and asiento_id):
+        if not (vuelo_id and pasajero_id and (asiento_id or clase)):
             return Response(
                 {"error": "Faltan campos obligatorios."},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -308,43 +691,124 @@ class CreateReservationAPIView(AuthAdminView, viewsets.ViewSet):
         try:
             vuelo = Vuelo.objects.get(pk=vuelo_id)
             pasajero = Pasajero.objects.get(pk=pasajero_id)
-            asiento = Asiento.objects.get(pk=asiento_id)
+            asiento = Asiento.objects.get(pk=asiento_id) if asiento_id else None
         except (Vuelo.DoesNotExist, Pasajero.DoesNotExist, Asiento.DoesNotExist):
             return Response(
                 {"error": "Alguno de los objetos referenciados no existe."},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        # Verifica si el asiento está disponible
-        if asiento.estado.lower() != "disponible":
-            return Response(
-                {"error": "El asiento no está disponible."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        # Genera código único de reserva
-        codigo_reserva = get_random_string(10).upper()
-
         # Usa el precio_base del vuelo
         precio = vuelo.precio_base
 
-        # Crear la reserva usando el servicio
+        # Crear la reserva usando el servicio, que bloquea y verifica el
+        # inventario del asiento solo para este vuelo. Sus errores (asiento
+        # ocupado, sin cupo, vuelo cancelado, clase inválida) se responden
+        # con su propio mensaje.
         reserva = ReservaService.create_reserva(
-            vuelo_id=vuelo_id,
-            pasajero_id=pasajero_id,
-            asiento_id=asiento_id,
+            vuelo=vuelo,
+            pasajero=pasajero,
+            asiento=asiento,
+            clase=clase,
             precio=precio,
-            codigo_reserva=codigo_reserva,
         )
 
-        # Marca asiento como ocupado
-        asiento.estado = "ocupado"
-        asiento.save()
-
         serializer = ReservaSerializer(reserva)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+class AssignSeatAPIView(AuthAdminView, APIView):
+    """
+    POST /api/assignSeat/<int:reservation_id>/
+    Asigna el asiento de una reserva vendida sin asiento (check-in). Sin
+    "asiento" en el body se elige uno libre de la clase de la reserva.
+    Solo para admin.
+
+    Body:
+        {"asiento": 120}
+    """
+
+    def post(self, request, reservation_id):
+        """Asigna el asiento y devuelve la reserva"""
+        reserva = ReservaService.asignar_asiento(
+            reservation_id, request.data.get("asiento")
+        )
+        return Response(ReservaSerializer(reserva).data, status=status.HTTP_200_OK)
+
+
+class CreateGroupReservationAPIView(AuthAdminView, APIView):
+    """
+    POST /api/createGroupReservation/
+    Crea todas las reservas de un grupo en un vuelo en una sola operación
+    (todo o nada). Solo para admin. Admite el header Idempotency-Key.
+
+    Body:
+        {
+            "vuelo": 1,
+            "estado": "pendiente",
+            "clase": "economico",
+            "pasajeros": [{"pasajero": 3, "asiento": 120}, {"pasajero": 4}]
+        }
+    """
+
+    serializer_class = ReservaGrupoSerializer
+
+    @extend_schema(request=ReservaGrupoSerializer, responses=ReservaSerializer(many=True))
+    @idempotente
+    def post(self, request):
+        """Crea las reservas del grupo"""
+        serializer = ReservaGrupoSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+
+        reservas = ReservaService.create_reservas_grupo(
+            vuelo_id=datos["vuelo"],
+            pasajeros=datos["pasajeros"],
+            clase=datos.get("clase"),
+            estado=datos["estado"],
+        )
+        return Response(
+            ReservaSerializer(reservas, many=True).data, status=status.HTTP_201_CREATED
+        )
+
+
+class JoinWaitlistAPIView(AuthAdminView, APIView):
+    """
+    POST /api/joinWaitlist/
+    Agrega un pasajero a la lista de espera de una clase de un vuelo sin
+    lugares. Cuando se cancela una reserva de esa clase, el primero de la
+    lista recibe una reserva pendiente. Solo para admin.
+
+    Body:
+        {"vuelo": 1, "pasajero": 3, "clase": "economico"}
+    """
+
+    serializer_class = ListaEsperaCrearSerializer
+
+    @extend_schema(request=ListaEsperaCrearSerializer, responses=ListaEsperaSerializer)
+    def post(self, request):
+        """Crea la entrada y devuelve su posición en la cola"""
+        serializer = ListaEsperaCrearSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+        entrada = ReservaService.agregar_lista_espera(
+            vuelo_id=datos["vuelo"], pasajero_id=datos["pasajero"], clase=datos["clase"]
+        )
+        return Response(ListaEsperaSerializer(entrada).data, status=status.HTTP_201_CREATED)
+
+
+class LeaveWaitlistAPIView(AuthAdminView, APIView):
+    """
+    POST /api/leaveWaitlist/<int:entry_id>/
+    Saca una entrada de la lista de espera. Solo para admin.
+    """
+
+    def post(self, request, entry_id):
+        """Marca la entrada como retirada"""
+        entrada = ReservaService.retirar_lista_espera(entry_id)
+        return Response(ListaEsperaSerializer(entrada).data, status=status.HTTP_200_OK)
+
+
 class ChangeReservationStatusAPIView(AuthAdminView, APIView):
     """
     PATCH /api/changeReservationStatus/<int:reservation_id>/
@@ -391,9 +855,9 @@ class ChangeReservationStatusAPIView(AuthAdminView, APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class ReservaViewSet(AuthAdminView, viewsets.ModelViewSet):
+class ReservaViewSet(AuthAdminView, VersionView, viewsets.ModelViewSet):
     """
-    CRUD completo de reservas (solo para admins)
+    CRUD completo de reservas (solo para admins), con If-Match/ETag por versión
     - GET /api/reserva-vs/
     - POST /api/reserva-vs/
     - GET /api/reserva-vs/{id}/
@@ -402,8 +866,13 @@ class ReservaViewSet(AuthAdminView, viewsets.ModelViewSet):
     - DELETE /api/reserva-vs/{id}/
     """
 
-    queryset = Reserva.objects.all().order_by("id")
+    queryset = Reserva.objects.all()
     serializer_class = ReservaSerializer
+    orden_cursor = ("-fecha_reserva", "id")
+
+    def perform_destroy(self, instance):
+        self.version_esperada(instance)
+        ReservaService.eliminar_reserva(instance.id)
 
 
 # ============================================================================
@@ -416,12 +885,13 @@ class GenerateTicketAPIView(AuthAdminView, APIView):
     POST /api/generateTicket/<int:reservation_id>/
     Crea un boleto (ticket) a partir de una reserva confirmada.
     El código de barras se genera automáticamente.
-    Solo para admin.
+    Solo para admin. Admite el header Idempotency-Key.
     """
 
     permission_classes = [IsAdminUser]
     serializer_class = BoletoSerializer
 
+    @idempotente
     def post(self, request, reservation_id):
         """Genera un boleto para una reserva confirmada"""
         try:
@@ -640,7 +1110,7 @@ class PasajerosPorVueloView(APIView):
             reservas = (
                 Reserva.objects
                 .filter(vuelo_id=vuelo_id, estado="confirmada")
-                .select_related("pasajero")
+                .select_related("pasajero", "asiento")
             )
 
             data = [
@@ -649,7 +1119,9 @@ class PasajerosPorVueloView(APIView):
                     "nombre": r.pasajero.nombre,
                     "apellido": r.pasajero.apellido,
                     "documento": r.pasajero.documento,
-                    "asiento": f"{r.asiento.fila}{r.asiento.columna}",
+                    # Las reservas vendidas sin asiento lo reciben en el check-in
+                    "asiento": f"{r.asiento.fila}{r.asiento.columna}" if r.asiento else "sin asignar",
+                    "clase": r.clase,
                     "codigo_reserva": r.codigo_reserva,
                 }
                 for r in reservas